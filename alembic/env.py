@@ -1,14 +1,35 @@
-"""Alembic environment configuration — async-native SQLAlchemy setup."""
+"""Alembic environment configuration — async-native SQLAlchemy setup.
+
+Online migrations are tuned for large, busy tables:
+    - each revision runs in its own transaction (transaction_per_migration),
+      so a failure only rolls back that revision
+    - MIGRATION_LOCK_TIMEOUT_MS / MIGRATION_STATEMENT_TIMEOUT_MS are applied as
+      session defaults, so DDL waiting on a lock fails fast instead of
+      queueing every writer behind it
+    - on lock contention (SQLSTATE 55P03) the remaining revisions are retried
+      with linear backoff, up to MIGRATION_LOCK_RETRIES attempts
+
+Per-revision timeouts, concurrent index builds and batched backfills are
+provided by app.core.migrations.
+"""
 
 import asyncio
+import time
 from logging.config import fileConfig
 
 from sqlalchemy import Connection
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.ext.asyncio import create_async_engine
 
 from alembic import context
 from app.core.config import get_settings
-from app.core.database import Base
+from app.core.counting import RowCount  # noqa: F401  (registers the table)
+from app.core.database import Base, sqlstate
+from app.core.idempotency import IdempotencyKey  # noqa: F401  (registers the table)
+from app.core.jobs import Job  # noqa: F401  (registers the jobs table)
+from app.core.logging import get_logger, setup_logging
+from app.core.migrations import LOCK_NOT_AVAILABLE, reset_timeouts
+from app.notes.models import Note  # noqa: F401  (registers the table)
 
 config = context.config
 
@@ -18,7 +39,13 @@ if config.config_file_name is not None:
 target_metadata = Base.metadata
 
 _settings = get_settings()
-config.set_main_option("sqlalchemy.url", _settings.database_url)
+# Callers (e.g. the test template-database fixture) may target another
+# database via Config.attributes["database_url"].
+_database_url: str = config.attributes.get("database_url", _settings.database_url)
+config.set_main_option("sqlalchemy.url", _database_url)
+
+setup_logging(log_level=_settings.log_level)
+logger = get_logger("alembic.env")
 
 
 def run_migrations_offline() -> None:
@@ -35,15 +62,52 @@ def run_migrations_offline() -> None:
 
 
 def do_run_migrations(connection: Connection) -> None:
-    """Run migrations using a live synchronous connection."""
-    context.configure(connection=connection, target_metadata=target_metadata)
-    with context.begin_transaction():
-        context.run_migrations()
+    """Run migrations using a live synchronous connection.
+
+    Revisions already applied are committed, so a retry after lock
+    contention resumes from the revision that failed.
+    """
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        transaction_per_migration=True,
+    )
+    attempts = max(_settings.migration_lock_retries, 0) + 1
+    for attempt in range(1, attempts + 1):
+        try:
+            with context.begin_transaction():
+                context.run_migrations()
+            return
+        except DBAPIError as exc:
+            if sqlstate(exc) != LOCK_NOT_AVAILABLE or attempt == attempts:
+                raise
+            if connection.in_transaction():
+                connection.rollback()
+            reset_timeouts(connection)
+            delay = _settings.migration_lock_retry_backoff_seconds * attempt
+            logger.warning(
+                "migration.lock.acquire_failed",
+                attempt=attempt,
+                max_attempts=attempts,
+                retry_in_seconds=delay,
+            )
+            time.sleep(delay)
+
+
+def _migration_server_settings() -> dict[str, str]:
+    """Session timeouts sent in the connection startup packet."""
+    return {
+        "lock_timeout": str(_settings.migration_lock_timeout_ms),
+        "statement_timeout": str(_settings.migration_statement_timeout_ms),
+    }
 
 
 async def run_async_migrations() -> None:
     """Create async engine and run migrations via run_sync."""
-    connectable = create_async_engine(_settings.database_url)
+    connectable = create_async_engine(
+        _database_url,
+        connect_args={"server_settings": _migration_server_settings()},
+    )
     async with connectable.connect() as connection:
         await connection.run_sync(do_run_migrations)
     await connectable.dispose()
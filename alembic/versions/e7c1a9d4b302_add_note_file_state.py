@@ -0,0 +1,60 @@
+"""add note metadata and file state
+
+Revision ID: e7c1a9d4b302
+Revises: d3b8e5f27a61
+Create Date: 2026-10-19 19:32:48.550213
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "e7c1a9d4b302"
+down_revision: Union[str, Sequence[str], None] = "d3b8e5f27a61"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Constant defaults: each ADD COLUMN is a catalog change, no table rewrite.
+    op.add_column(
+        "notes",
+        sa.Column(
+            "frontmatter",
+            postgresql.JSONB(),
+            server_default=sa.text("'{}'::jsonb"),
+            nullable=False,
+        ),
+    )
+    for column in ("tags", "links"):
+        op.add_column(
+            "notes",
+            sa.Column(
+                column,
+                postgresql.ARRAY(sa.Text()),
+                server_default=sa.text("'{}'::text[]"),
+                nullable=False,
+            ),
+        )
+    op.add_column("notes", sa.Column("content_hash", sa.String(length=64)))
+    op.add_column("notes", sa.Column("mtime_ns", sa.BigInteger()))
+    op.add_column("notes", sa.Column("size_bytes", sa.BigInteger()))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for column in (
+        "size_bytes",
+        "mtime_ns",
+        "content_hash",
+        "links",
+        "tags",
+        "frontmatter",
+    ):
+        op.drop_column("notes", column)
@@ -0,0 +1,42 @@
+"""add note embeddings
+
+Revision ID: f2a6c8e1b953
+Revises: e7c1a9d4b302
+Create Date: 2026-10-19 21:14:06.318274
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "f2a6c8e1b953"
+down_revision: Union[str, Sequence[str], None] = "e7c1a9d4b302"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "note_embeddings",
+        sa.Column("note_id", sa.BigInteger(), nullable=False),
+        sa.Column("vector", sa.LargeBinary(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(["note_id"], ["notes.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("note_id"),
+    )
+    # Vectors are read whole, never compared in SQL: keep them uncompressed.
+    op.execute("ALTER TABLE note_embeddings ALTER COLUMN vector SET STORAGE EXTERNAL")
+    # Serves the index's "changed since the snapshot" check.
+    op.create_index("ix_note_embeddings_updated_at", "note_embeddings", ["updated_at"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_note_embeddings_updated_at", table_name="note_embeddings")
+    op.drop_table("note_embeddings")
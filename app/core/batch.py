@@ -0,0 +1,274 @@
+"""Batch endpoint: many sub-requests in one HTTP round trip.
+
+    POST /batch
+    {"requests": [{"id": "me", "method": "GET", "path": "/api/notes?page=2"},
+                  {"id": "tags", "method": "GET", "path": "/api/tags"}],
+     "shared_session": true}
+
+Sub-requests are dispatched in-process straight to the application router:
+the outer /batch request pays the middleware stack once, then each item
+goes through routing, dependencies and exception handlers only. Items run
+concurrently up to BATCH_MAX_CONCURRENCY, each bounded by
+BATCH_ITEM_TIMEOUT_SECONDS (504 on timeout), and responses come back in
+request order with their own status codes.
+
+Each item logs under a derived request ID ``{batch request ID}.{index}``,
+also sent to the handler as X-Request-ID. The outer request's headers
+(cookies, authorization) are inherited unless an item overrides them.
+
+``shared_session`` (GET-only batches) runs the items one after another on a
+single database session, so the whole batch costs one pool checkout
+instead of one per item; AsyncSession cannot be used concurrently. Each
+item runs in a SAVEPOINT that is rolled back afterwards, so a failed query
+does not fail the items after it. An item that times out may be cancelled
+mid-query: the connection is invalidated and the remaining items answer
+503 without running.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+from contextlib import AsyncExitStack
+from typing import Annotated, Any, Literal
+
+from fastapi import APIRouter, HTTPException, Request
+from pydantic import BaseModel, Field, model_validator
+from sqlalchemy.ext.asyncio import AsyncSession, AsyncSessionTransaction
+from starlette.exceptions import HTTPException as StarletteHTTPException
+from starlette.types import ASGIApp, Message, Scope
+
+from app.core.config import get_settings
+from app.core.database import shared_session
+from app.core.logging import get_logger, get_request_id, set_request_id
+from app.core.profiling import TimedRoute
+
+logger = get_logger("app.core.batch")
+
+router = APIRouter(tags=["batch"], route_class=TimedRoute)
+
+BATCH_PATH = "/batch"
+
+# Scope keys carried from the outer request; routing state is rebuilt.
+_INHERITED_SCOPE_KEYS = (
+    "type",
+    "asgi",
+    "http_version",
+    "scheme",
+    "server",
+    "client",
+    "root_path",
+    "app",
+    "state",
+    "starlette.exception_handlers",
+)
+_REPLACED_HEADERS = {b"content-length", b"content-type", b"x-request-id"}
+
+
+class SubRequest(BaseModel):
+    id: str | None = None
+    method: Literal["GET", "HEAD", "POST", "PUT", "PATCH", "DELETE"] = "GET"
+    path: str = Field(pattern=r"^/")
+    headers: dict[str, str] = Field(default_factory=dict)
+    body: Any = None
+
+    @model_validator(mode="after")
+    def _not_recursive(self) -> SubRequest:
+        if self.path.partition("?")[0].rstrip("/") == BATCH_PATH:
+            raise ValueError("Sub-requests cannot target the batch endpoint")
+        return self
+
+
+class BatchRequest(BaseModel):
+    requests: Annotated[list[SubRequest], Field(min_length=1)]
+    shared_session: bool = False
+
+
+class SubResponse(BaseModel):
+    id: str | None
+    status: int
+    headers: dict[str, str]
+    body: Any
+
+
+class BatchResponse(BaseModel):
+    responses: list[SubResponse]
+
+
+def _build_scope(base: Scope, item: SubRequest, request_id: str, body: bytes) -> Scope:
+    path, _, query = item.path.partition("?")
+    overridden = {key.lower().encode("latin-1") for key in item.headers}
+    headers = [
+        (name, value)
+        for name, value in base["headers"]
+        if name not in _REPLACED_HEADERS and name not in overridden
+    ]
+    headers.extend(
+        (key.lower().encode("latin-1"), value.encode("latin-1"))
+        for key, value in item.headers.items()
+    )
+    headers.append((b"x-request-id", request_id.encode("latin-1")))
+    if body:
+        headers.append((b"content-type", b"application/json"))
+        headers.append((b"content-length", str(len(body)).encode()))
+    scope = {key: base[key] for key in _INHERITED_SCOPE_KEYS if key in base}
+    scope.update(
+        {
+            "method": item.method,
+            "path": path,
+            "raw_path": path.encode(),
+            "query_string": query.encode(),
+            "headers": headers,
+        }
+    )
+    return scope
+
+
+def _decode_body(raw: bytes, content_type: str) -> Any:  # noqa: ANN401
+    if not raw:
+        return None
+    if content_type.startswith("application/json"):
+        return json.loads(raw)
+    return raw.decode(errors="replace")
+
+
+async def _dispatch(
+    target: ASGIApp, base: Scope, item: SubRequest, request_id: str
+) -> SubResponse:
+    """Run one sub-request against ``target`` and collect its response."""
+    set_request_id(request_id)
+    body = b"" if item.body is None else json.dumps(item.body).encode()
+    sent_body = False
+    status = 500
+    headers: dict[str, str] = {}
+    chunks: list[bytes] = []
+
+    async def receive() -> Message:
+        nonlocal sent_body
+        if not sent_body:
+            sent_body = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        # Only streaming responses wait for a disconnect; the timeout ends them.
+        await asyncio.Future()
+        return {"type": "http.disconnect"}
+
+    async def send(message: Message) -> None:
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+            headers.update(
+                (key.decode("latin-1"), value.decode("latin-1"))
+                for key, value in message.get("headers", [])
+            )
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    start = time.perf_counter()
+    try:
+        scope = _build_scope(base, item, request_id, body)
+        async with (
+            asyncio.timeout(get_settings().batch_item_timeout_seconds),
+            AsyncExitStack() as stack,
+        ):
+            # Normally provided by FastAPI's AsyncExitStackMiddleware, which
+            # sub-requests bypass (closes uploaded files after the response).
+            scope["fastapi_middleware_astack"] = stack
+            await target(scope, receive, send)
+        result = _decode_body(b"".join(chunks), headers.get("content-type", ""))
+    except StarletteHTTPException as exc:
+        status, headers, result = exc.status_code, {}, {"detail": exc.detail}
+    except TimeoutError:
+        status, headers, result = 504, {}, {"detail": "Sub-request timed out"}
+    except Exception:
+        logger.error("batch.item.failed", path=item.path, exc_info=True)
+        status, headers, result = 500, {}, {"detail": "Internal Server Error"}
+    logger.info(
+        "batch.item.completed",
+        method=item.method,
+        path=item.path,
+        status_code=status,
+        duration_seconds=round(time.perf_counter() - start, 4),
+    )
+    return SubResponse(id=item.id, status=status, headers=headers, body=result)
+
+
+async def _release_savepoint(
+    session: AsyncSession, savepoint: AsyncSessionTransaction, response: SubResponse
+) -> bool:
+    """Undo one shared-session item; False if the connection had to be dropped."""
+    try:
+        # 504: cancelled mid-query, the connection state is unknown.
+        if response.status != 504:
+            if savepoint.is_active:
+                await savepoint.rollback()
+            return True
+    except Exception:
+        logger.warning("batch.shared_session.rollback_failed", exc_info=True)
+    await session.invalidate()
+    return False
+
+
+async def _dispatch_shared(
+    target: ASGIApp, base: Scope, items: list[SubRequest], ids: list[str]
+) -> list[SubResponse]:
+    """Run ``items`` one at a time on one session, each in its own savepoint."""
+    responses: list[SubResponse] = []
+    async with shared_session() as session:
+        usable = True
+        for item, request_id in zip(items, ids, strict=True):
+            if not usable:
+                responses.append(
+                    SubResponse(
+                        id=item.id,
+                        status=503,
+                        headers={},
+                        body={"detail": "Not run: the shared session was lost"},
+                    )
+                )
+                continue
+            savepoint = await session.begin_nested()
+            # Its own task so the item's request ID stays in its context.
+            response = await asyncio.create_task(
+                _dispatch(target, base, item, request_id)
+            )
+            usable = await _release_savepoint(session, savepoint, response)
+            responses.append(response)
+    return responses
+
+
+@router.post(BATCH_PATH)
+async def batch(request: Request, payload: BatchRequest) -> BatchResponse:
+    """Execute sub-requests in-process and return every response at once."""
+    settings = get_settings()
+    if len(payload.requests) > settings.batch_max_requests:
+        raise HTTPException(
+            status_code=422,
+            detail=f"At most {settings.batch_max_requests} sub-requests per batch",
+        )
+    if payload.shared_session and any(
+        item.method not in ("GET", "HEAD") for item in payload.requests
+    ):
+        raise HTTPException(
+            status_code=422, detail="shared_session is only allowed for reads"
+        )
+    target: ASGIApp = request.app.router
+    parent_id = get_request_id()
+    ids = [f"{parent_id}.{index}" for index in range(len(payload.requests))]
+
+    if payload.shared_session:
+        responses = await _dispatch_shared(target, request.scope, payload.requests, ids)
+    else:
+        limit = asyncio.Semaphore(settings.batch_max_concurrency)
+
+        async def bounded(item: SubRequest, request_id: str) -> SubResponse:
+            async with limit:
+                return await _dispatch(target, request.scope, item, request_id)
+
+        responses = await asyncio.gather(
+            *(
+                bounded(item, request_id)
+                for item, request_id in zip(payload.requests, ids, strict=True)
+            )
+        )
+    return BatchResponse(responses=list(responses))
@@ -1,7 +1,17 @@
 """Application configuration.
 
-Settings are loaded from environment variables and an optional .env file.
-Access settings via get_settings() which returns a cached singleton.
+Settings are loaded from environment variables and an optional .env file,
+validated once, and held as an immutable (frozen) snapshot. Access them via
+get_settings(), which returns the current snapshot.
+
+In route handlers call get_settings() directly instead of declaring
+``Depends(get_settings)``: a sync dependency is resolved on every request
+and dispatched to the threadpool (see benchmarks/bench_settings_dependency.py).
+
+Hot reload (SIGHUP, installed in lifespan) re-reads the environment and
+swaps in a new snapshot carrying only RELOADABLE_FIELDS changes; other
+fields size pools, middleware and routes at startup and need a restart.
+Callbacks registered with on_settings_reload() apply the new values.
 
 ALLOWED_ORIGINS supports both JSON array and comma-separated string formats:
     ALLOWED_ORIGINS=http://localhost:3000,http://localhost:8123
@@ -10,8 +20,11 @@ ALLOWED_ORIGINS supports both JSON array and comma-separated string formats:
 
 from __future__ import annotations
 
-from functools import lru_cache
-from typing import Any
+import asyncio
+import signal
+from collections.abc import Callable, Sequence
+from types import UnionType
+from typing import Any, Union, get_args, get_origin
 
 from pydantic.fields import FieldInfo
 from pydantic_settings import (
@@ -21,13 +34,19 @@ from pydantic_settings import (
     SettingsConfigDict,
 )
 
+from app.core.logging import get_logger
+
+logger = get_logger("app.core.config")
+
 
 class _CommaFallbackEnvSource(EnvSettingsSource):
     """EnvSettingsSource that falls back to comma-split parsing for list fields.
 
     pydantic-settings v2 requires JSON for complex types by default.
-    This subclass tries JSON first, then falls back to comma-separated parsing
-    so that env vars like ``ALLOWED_ORIGINS=a.com,b.com`` work correctly.
+    Values that look like JSON (start with ``[`` or ``{``) are decoded as
+    JSON; for list fields anything else is split on commas, so that env vars
+    like ``ALLOWED_ORIGINS=a.com,b.com`` work without a failed JSON parse
+    first. Other complex fields (dicts) must be JSON.
     """
 
     def decode_complex_value(
@@ -36,12 +55,23 @@ class _CommaFallbackEnvSource(EnvSettingsSource):
         field: FieldInfo,
         value: Any,  # noqa: ANN401
     ) -> Any:  # noqa: ANN401
-        try:
-            return super().decode_complex_value(field_name, field, value)
-        except Exception:
-            if isinstance(value, str):
-                return [item.strip() for item in value.split(",") if item.strip()]
-            raise
+        if (
+            isinstance(value, str)
+            and not value.lstrip().startswith(("[", "{"))
+            and _is_sequence(field.annotation)
+        ):
+            return [item.strip() for item in value.split(",") if item.strip()]
+        return super().decode_complex_value(field_name, field, value)
+
+
+def _is_sequence(annotation: Any) -> bool:  # noqa: ANN401
+    """Whether ``annotation`` is a list/tuple/set type, possibly optional."""
+    origin = get_origin(annotation)
+    if origin in (Union, UnionType):
+        return any(_is_sequence(arg) for arg in get_args(annotation))
+    return isinstance(origin, type) and issubclass(
+        origin, (list, tuple, set, frozenset, Sequence)
+    )
 
 
 class Settings(BaseSettings):
@@ -51,6 +81,7 @@ class Settings(BaseSettings):
         env_file=".env",
         env_file_encoding="utf-8",
         case_sensitive=False,
+        frozen=True,
     )
 
     # Application
@@ -66,9 +97,144 @@ class Settings(BaseSettings):
         "http://localhost:8123",
     ]
 
+    # Request bodies — size limits enforced while streaming (app.core.limits)
+    request_max_body_bytes: int = 1_048_576
+    request_body_limits: dict[str, int] = {}
+    upload_spool_bytes: int = 1_048_576
+
     # Database
     database_url: str
 
+    # Connection pool and per-connection session settings (empty/0 = server default)
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_warmup_connections: int = 5
+    db_warmup_timeout_seconds: float = 10.0
+    db_search_path: str = ""
+    db_timezone: str = ""
+    db_statement_timeout_ms: int = 0
+    db_lock_timeout_ms: int = 0
+    db_idle_in_transaction_timeout_ms: int = 0
+
+    # Migrations — session timeouts and retries on lock contention (alembic/env.py)
+    migration_lock_timeout_ms: int = 5000
+    migration_statement_timeout_ms: int = 0
+    migration_lock_retries: int = 5
+    migration_lock_retry_backoff_seconds: float = 2.0
+
+    # Tracing — W3C traceparent propagation and batched span export (opt-in)
+    tracing_enabled: bool = False
+    tracing_sample_rate: float = 0.1
+    tracing_export_path: str = "traces/spans.jsonl"
+    tracing_export_interval_seconds: float = 2.0
+    tracing_max_queue_size: int = 2048
+
+    # Background jobs — in-process worker pool (or run: python -m app.core.jobs)
+    jobs_worker_enabled: bool = False
+    jobs_concurrency: int = 4
+    jobs_batch_size: int = 10
+    jobs_poll_interval_seconds: float = 1.0
+    jobs_timeout_seconds: float = 300.0
+    jobs_retry_backoff_seconds: float = 5.0
+
+    # Cache invalidation — LISTEN/NOTIFY fan-out to in-process caches
+    cache_invalidation_enabled: bool = False
+    cache_invalidation_channel: str = "cache_invalidation"
+    cache_invalidation_coalesce_ms: int = 50
+
+    # Server-Sent Events — per-subscriber queue bound, heartbeat, replay buffer
+    events_queue_size: int = 64
+    events_heartbeat_seconds: float = 15.0
+    events_replay_size: int = 256
+    events_max_stream_seconds: float = 300.0
+
+    # Batch endpoint — POST /batch sub-request limits
+    batch_max_requests: int = 20
+    batch_max_concurrency: int = 8
+    batch_item_timeout_seconds: float = 10.0
+
+    # Idempotency keys — stored responses for retried POST/PATCH requests
+    idempotency_enabled: bool = False
+    idempotency_ttl_seconds: float = 86400.0
+    idempotency_lock_timeout_seconds: float = 30.0
+    idempotency_cache_size: int = 1024
+    idempotency_purge_interval_seconds: float = 300.0
+
+    # Process pool — CPU-bound work off the event loop (0 workers disables it)
+    process_pool_workers: int = 2
+    process_pool_timeout_seconds: float = 30.0
+    process_pool_max_tasks_per_child: int = 0
+
+    # Memory diagnostics — /debug/memory router and allocation sampling (opt-in)
+    diagnostics_enabled: bool = False
+    diagnostics_allowed_hosts: list[str] = ["127.0.0.1", "::1"]
+    diagnostics_tracemalloc_frames: int = 0
+    diagnostics_allocation_sample_rate: float = 0.0
+
+    # Event-loop lag monitor — scheduling delay sampling and stall watchdog
+    loop_monitor_enabled: bool = True
+    loop_monitor_interval_seconds: float = 0.1
+    loop_monitor_block_threshold_seconds: float = 0.5
+    loop_monitor_report_interval_seconds: float = 60.0
+
+    # Sharding — shard databases behind get_shard_db (empty disables sharding)
+    db_shard_urls: list[str] = []
+    db_shard_strategy: str = "hash"
+    db_shard_range_bounds: list[int] = []
+    db_shard_key_param: str = "shard_key"
+    db_shard_key_header: str = "X-Shard-Key"
+    db_shard_health_timeout_seconds: float = 2.0
+
+    # Database circuit breaker — fail fast while connections cannot be opened
+    db_circuit_failure_threshold: int = 5
+    db_circuit_recovery_seconds: float = 10.0
+    db_circuit_half_open_max_calls: int = 1
+
+    # Transaction retries — replay of transient failures in run_in_transaction
+    db_retry_max_attempts: int = 4
+    db_retry_base_delay_seconds: float = 0.05
+    db_retry_max_delay_seconds: float = 1.0
+    db_retry_deadline_seconds: float = 5.0
+
+    # Page totals — cached and estimated counts for PaginatedResponse.total
+    counting_cache_size: int = 4096
+    counting_cache_ttl_seconds: float = 30.0
+    counting_exact_below: int = 1000
+
+    # Notes search — fuzzy title matching and highlight snippets
+    notes_trigram_threshold: float = 0.3
+    notes_headline_max_fragments: int = 2
+    notes_search_max_query_length: int = 256
+
+    # Vault ingestion — batched, incremental markdown sync (app.notes.ingest)
+    notes_ingest_batch_size: int = 200
+    notes_ingest_workers: int = 0
+    notes_ingest_max_file_bytes: int = 5_000_000
+
+    # Related notes — in-memory vector index over note embeddings (opt-in)
+    notes_vectors_enabled: bool = False
+    notes_vectors_dimensions: int = 384
+    notes_vectors_directory: str = "vectors"
+    notes_vectors_refresh_interval_seconds: float = 60.0
+    notes_vectors_compact_ratio: float = 0.05
+    notes_vectors_max_staleness_seconds: float = 900.0
+
+    # Graceful shutdown — readiness flip delay and in-flight drain window
+    shutdown_readiness_delay_seconds: float = 0.0
+    shutdown_drain_timeout_seconds: float = 10.0
+
+    # Query instrumentation — slow query log and N+1 detection
+    db_slow_query_threshold_seconds: float = 0.5
+    db_n_plus_one_threshold: int = 10
+
+    # Profiling — Server-Timing breakdowns and sampled stack profiles (opt-in)
+    server_timing_enabled: bool = False
+    profiling_enabled: bool = False
+    profiling_sample_rate: float = 0.0
+    profiling_allowed_hosts: list[str] = ["127.0.0.1", "::1"]
+    profiling_interval_seconds: float = 0.001
+    profiling_output_dir: str = "profiles"
+
     @classmethod
     def settings_customise_sources(
         cls,
@@ -86,7 +252,106 @@ class Settings(BaseSettings):
         )
 
 
-@lru_cache
+# Fields that can change without restarting workers. Everything else sizes
+# pools, registers middleware or builds routes at startup.
+RELOADABLE_FIELDS: frozenset[str] = frozenset(
+    {
+        "log_level",
+        "profiling_sample_rate",
+        "diagnostics_allocation_sample_rate",
+        "loop_monitor_block_threshold_seconds",
+        "tracing_sample_rate",
+        "batch_max_requests",
+        "batch_max_concurrency",
+        "batch_item_timeout_seconds",
+        "db_slow_query_threshold_seconds",
+        "db_n_plus_one_threshold",
+        "db_circuit_failure_threshold",
+        "db_circuit_recovery_seconds",
+        "db_retry_max_attempts",
+        "db_retry_base_delay_seconds",
+        "db_retry_max_delay_seconds",
+        "db_retry_deadline_seconds",
+        "counting_cache_ttl_seconds",
+        "counting_exact_below",
+        "notes_trigram_threshold",
+        "notes_headline_max_fragments",
+    }
+)
+
+_snapshot: Settings | None = None
+_reload_callbacks: list[Callable[[Settings], None]] = []
+
+
 def get_settings() -> Settings:
-    """Return the cached Settings singleton."""
-    return Settings()  # type: ignore[call-arg]
+    """Return the current Settings snapshot, loading it on first use."""
+    global _snapshot
+    if _snapshot is None:
+        _snapshot = Settings()  # type: ignore[call-arg]
+    return _snapshot
+
+
+def reset_settings() -> None:
+    """Drop the current snapshot so the next get_settings() reloads it."""
+    global _snapshot
+    _snapshot = None
+
+
+def on_settings_reload(callback: Callable[[Settings], None]) -> None:
+    """Register ``callback`` to run with the new snapshot after a reload."""
+    _reload_callbacks.append(callback)
+
+
+def reload_settings() -> dict[str, Any]:
+    """Re-read the environment and apply changed RELOADABLE_FIELDS.
+
+    Returns the reloadable fields that changed and their new values. Changes
+    to any other field are logged as requiring a restart and not applied.
+    """
+    global _snapshot
+    current = get_settings()
+    fresh = Settings()  # type: ignore[call-arg]
+    changed: dict[str, Any] = {}
+    ignored: list[str] = []
+    for name in Settings.model_fields:
+        if getattr(fresh, name) == getattr(current, name):
+            continue
+        if name in RELOADABLE_FIELDS:
+            changed[name] = getattr(fresh, name)
+        else:
+            ignored.append(name)
+
+    if ignored:
+        logger.warning("config.reload.restart_required", fields=ignored)
+    if changed:
+        _snapshot = current.model_copy(update=changed)
+        for callback in _reload_callbacks:
+            callback(_snapshot)
+    logger.info("config.reload.completed", changed=sorted(changed))
+    return changed
+
+
+def _reload_from_signal() -> None:
+    try:
+        reload_settings()
+    except Exception:
+        logger.error("config.reload.failed", exc_info=True)
+
+
+def install_reload_signal(loop: asyncio.AbstractEventLoop) -> bool:
+    """Reload settings on SIGHUP; False where signal handlers are unsupported."""
+    sighup = getattr(signal, "SIGHUP", None)
+    if sighup is None:
+        return False
+    try:
+        loop.add_signal_handler(sighup, _reload_from_signal)
+    except (NotImplementedError, RuntimeError, ValueError):
+        return False
+    return True
+
+
+def remove_reload_signal(loop: asyncio.AbstractEventLoop) -> None:
+    """Remove the SIGHUP handler installed by install_reload_signal()."""
+    sighup = getattr(signal, "SIGHUP", None)
+    if sighup is not None:
+        loop.remove_signal_handler(sighup)
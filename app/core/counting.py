@@ -0,0 +1,265 @@
+"""Cheap totals for paginated endpoints.
+
+``PaginatedResponse.total`` as a ``COUNT(*)`` over the filtered set reads
+every matching row on every page request, which on large tables costs more
+than the page itself. Each endpoint picks how its total is produced with a
+PageTotal:
+
+    exact      a maintained counter when ``scope`` is given (a few rows read
+               by primary key), otherwise ``COUNT(*)``
+    cached     the exact total, kept in memory per worker for
+               COUNTING_CACHE_TTL_SECONDS and dropped on invalidation
+    estimated  the planner's row estimate (``EXPLAIN``), or an exact count
+               when the estimate is below COUNTING_EXACT_BELOW; the response
+               then carries ``total_estimated: true``
+
+    notes_total = PageTotal(TotalMode.ESTIMATED)
+
+    @router.get("/notes")
+    async def list_notes(params: PaginationParams = Depends(), db=Depends(get_db)):
+        query = select(Note).where(Note.archived.is_(False)).order_by(Note.id)
+        rows, total = await fetch_page(db, query, params, notes_total)
+        return page_response(NoteRead, rows, total=total.value,
+                             total_estimated=total.estimated,
+                             page=params.page, page_size=params.page_size)
+
+Maintained counters live in ``row_counts``, one row per (scope, slot); a
+scope is any string naming a filtered set (``"notes"``,
+``"notes:vault=42"``). Writers either call adjust_count() in the same
+transaction as the insert/delete, or the table gets statement-level
+triggers from app.core.migrations.create_count_trigger(). Concurrent
+writers update different slots (``pg_backend_pid() % COUNTER_SLOTS``), so
+they do not queue on one hot row; reads sum the slots.
+
+Cached totals are keyed by scope (or by PageTotal's ``cache_key``) and
+invalidated on commit through app.core.invalidation: adjust_count() does
+this for its scope, other writers call invalidate_counts().
+"""
+
+from __future__ import annotations
+
+import json
+import time
+from dataclasses import dataclass
+from enum import StrEnum
+from typing import Any, NamedTuple
+
+import sqlalchemy as sa
+from sqlalchemy import Select, func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.core.config import get_settings
+from app.core.database import Base
+from app.core.invalidation import LocalCache, invalidation, publish_invalidation
+from app.core.logging import get_logger
+from app.shared.models import TimestampMixin
+from app.shared.schemas import PaginationParams
+
+logger = get_logger("app.core.counting")
+
+COUNTER_SLOTS = 8
+CACHE_NAME = "row_counts"
+
+
+class RowCount(TimestampMixin, Base):
+    """One slot of a maintained count; a scope's total is the sum of its slots."""
+
+    __tablename__ = "row_counts"
+
+    scope: Mapped[str] = mapped_column(sa.String(255), primary_key=True)
+    slot: Mapped[int] = mapped_column(sa.SmallInteger, primary_key=True)
+    count: Mapped[int] = mapped_column(sa.BigInteger, default=0)
+
+
+class TotalMode(StrEnum):
+    EXACT = "exact"
+    CACHED = "cached"
+    ESTIMATED = "estimated"
+
+
+class Total(NamedTuple):
+    value: int
+    estimated: bool = False
+
+
+count_cache: LocalCache[tuple[int, float]] = invalidation.register(
+    LocalCache(CACHE_NAME, get_settings().counting_cache_size)
+)
+
+
+async def adjust_count(
+    session: AsyncSession, scope: str, delta: int, *, invalidate: bool = True
+) -> None:
+    """Add ``delta`` to ``scope``'s maintained count in the current transaction."""
+    if delta == 0:
+        return
+    statement = insert(RowCount).values(
+        scope=scope,
+        slot=func.pg_backend_pid() % COUNTER_SLOTS,
+        count=delta,
+        created_at=func.now(),
+        updated_at=func.now(),
+    )
+    await session.execute(
+        statement.on_conflict_do_update(
+            index_elements=[RowCount.scope, RowCount.slot],
+            set_={
+                "count": RowCount.count + statement.excluded.count,
+                "updated_at": statement.excluded.updated_at,
+            },
+        )
+    )
+    if invalidate:
+        await publish_invalidation(session, CACHE_NAME, [scope])
+
+
+async def invalidate_counts(
+    session: AsyncSession, keys: list[str] | None = None
+) -> None:
+    """Drop cached totals for ``keys`` (all when None) in every worker on commit."""
+    await publish_invalidation(session, CACHE_NAME, keys)
+
+
+async def maintained_count(session: AsyncSession, scope: str) -> int:
+    """Sum of ``scope``'s counter slots (0 if it has none)."""
+    result = await session.execute(
+        select(func.coalesce(func.sum(RowCount.count), 0)).where(
+            RowCount.scope == scope
+        )
+    )
+    return int(result.scalar_one())
+
+
+async def reset_count(session: AsyncSession, scope: str, query: Select[Any]) -> int:
+    """Recount ``scope`` from ``query`` and store it in a single slot.
+
+    Repairs a counter after drift (TRUNCATE, writes that bypassed it). The
+    scope's rows are locked by the DELETE, but inserts into the counted
+    table are not: run it while writers to that set are paused.
+    """
+    total = await exact_count(session, query)
+    await session.execute(sa.delete(RowCount).where(RowCount.scope == scope))
+    session.add(RowCount(scope=scope, slot=0, count=total))
+    await session.flush()
+    await invalidate_counts(session, [scope])
+    logger.info("counting.counter.reset", scope=scope, count=total)
+    return total
+
+
+async def exact_count(session: AsyncSession, query: Select[Any]) -> int:
+    """``COUNT(*)`` over ``query`` (ordering and paging stripped)."""
+    counted = query.order_by(None).limit(None).offset(None).subquery()
+    result = await session.execute(select(func.count()).select_from(counted))
+    return int(result.scalar_one())
+
+
+async def estimate_count(session: AsyncSession, query: Select[Any]) -> int:
+    """The planner's row estimate for ``query``, from ``EXPLAIN``.
+
+    Only as good as the table statistics (ANALYZE / autovacuum); expect it
+    to be off for correlated filters. Parameters are rendered inline.
+    """
+    connection = await session.connection()
+    compiled = query.order_by(None).compile(
+        dialect=connection.dialect, compile_kwargs={"literal_binds": True}
+    )
+    result = await connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}")
+    plan = result.scalar_one()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+@dataclass(frozen=True, slots=True)
+class PageTotal:
+    """How one endpoint produces its page total.
+
+    ``scope`` names a maintained counter to read instead of ``COUNT(*)``
+    (and is the cache key); ``cache_key`` caches a COUNT(*) total that has
+    no counter. Unset ``ttl`` and ``exact_below`` follow the COUNTING_*
+    settings.
+    """
+
+    mode: TotalMode = TotalMode.EXACT
+    scope: str | None = None
+    cache_key: str | None = None
+    ttl: float | None = None
+    exact_below: int | None = None
+
+    async def resolve(
+        self,
+        session: AsyncSession,
+        query: Select[Any],
+        *,
+        scope: str | None = None,
+        cache_key: str | None = None,
+    ) -> Total:
+        """The total for ``query``.
+
+        ``scope`` and ``cache_key`` override the endpoint's, for filters that
+        vary per request (``scope=f"notes:vault={vault_id}"``).
+        """
+        scope = scope or self.scope
+        if self.mode == TotalMode.ESTIMATED:
+            return await self._estimate(session, query)
+        if self.mode == TotalMode.CACHED:
+            key = scope or cache_key or self.cache_key
+            if key is None:
+                raise ValueError("Cached totals need a scope or cache_key")
+            return Total(await self._cached(session, query, scope, key))
+        return Total(await self._exact(session, query, scope))
+
+    async def _exact(
+        self, session: AsyncSession, query: Select[Any], scope: str | None
+    ) -> int:
+        if scope is not None:
+            return await maintained_count(session, scope)
+        return await exact_count(session, query)
+
+    async def _cached(
+        self, session: AsyncSession, query: Select[Any], scope: str | None, key: str
+    ) -> int:
+        now = time.monotonic()
+        cached = count_cache.get(key)
+        if cached is not None and cached[1] > now:
+            return cached[0]
+        total = await self._exact(session, query, scope)
+        ttl = (
+            self.ttl
+            if self.ttl is not None
+            else get_settings().counting_cache_ttl_seconds
+        )
+        count_cache.set(key, (total, now + ttl))
+        return total
+
+    async def _estimate(self, session: AsyncSession, query: Select[Any]) -> Total:
+        estimate = await estimate_count(session, query)
+        exact_below = (
+            self.exact_below
+            if self.exact_below is not None
+            else get_settings().counting_exact_below
+        )
+        if estimate < exact_below:
+            return Total(await exact_count(session, query))
+        return Total(estimate, estimated=True)
+
+
+async def fetch_page(
+    session: AsyncSession,
+    query: Select[Any],
+    params: PaginationParams,
+    total: PageTotal,
+    *,
+    scope: str | None = None,
+    cache_key: str | None = None,
+) -> tuple[list[Any], Total]:
+    """Rows of the requested page of ``query`` and its total.
+
+    Rows are ORM instances for single-entity queries, Row tuples otherwise.
+    """
+    result = await session.execute(query.offset(params.offset).limit(params.page_size))
+    single_entity = len(query.column_descriptions) == 1
+    rows: list[Any] = list(result.scalars() if single_entity else result.all())
+    return rows, await total.resolve(session, query, scope=scope, cache_key=cache_key)
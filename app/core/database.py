@@ -7,31 +7,240 @@ Access the database in route handlers via the get_db() dependency:
 
     async def my_route(db: AsyncSession = Depends(get_db)) -> ...:
         ...
+
+Statements are timed by app.core.instrumentation rather than ``echo=True``;
+in development every statement is logged as ``database.query.executed``.
+
+Connection checkouts in get_db() pass through ``circuit_breaker``: after
+DB_CIRCUIT_FAILURE_THRESHOLD consecutive connection failures it opens and
+get_db() raises DatabaseUnavailableError (503) at once instead of waiting
+on the pool and a connect timeout, until a trial checkout succeeds.
+
+Session settings (search_path, timezone, timeouts) are sent in the asyncpg
+startup packet, so every pooled connection gets them without an extra round
+trip. warm_up_pool() opens connections ahead of the first request.
 """
 
 from __future__ import annotations
 
-from collections.abc import AsyncGenerator
+import asyncio
+import time
+from collections.abc import AsyncGenerator, AsyncIterator, Iterator
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from enum import StrEnum
 
+from sqlalchemy import exc as sa_exc
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
     AsyncSession,
     async_sessionmaker,
     create_async_engine,
 )
 from sqlalchemy.orm import DeclarativeBase
 
-from app.core.config import get_settings
+from app.core.config import Settings, get_settings, on_settings_reload
+from app.core.exceptions import DatabaseUnavailableError
+from app.core.instrumentation import instrument_engine
+from app.core.logging import get_logger
+from app.core.tracing import span
+
+logger = get_logger("app.core.database")
+
+# Touches the codecs SQLAlchemy registers on connect (json/jsonb) and the
+# common scalar types so the first real query pays no type introspection.
+_WARMUP_SQL = text(
+    "SELECT NULL::json, NULL::jsonb, NULL::uuid, NULL::timestamptz, NULL::numeric"
+)
+
+
+def server_settings(settings: Settings) -> dict[str, str]:
+    """Build asyncpg ``server_settings`` from the configured session values."""
+    values = {
+        "search_path": settings.db_search_path,
+        "timezone": settings.db_timezone,
+        "statement_timeout": str(settings.db_statement_timeout_ms or ""),
+        "lock_timeout": str(settings.db_lock_timeout_ms or ""),
+        "idle_in_transaction_session_timeout": str(
+            settings.db_idle_in_transaction_timeout_ms or ""
+        ),
+    }
+    return {key: value for key, value in values.items() if value}
+
+
+def create_pooled_engine(url: str, settings: Settings) -> AsyncEngine:
+    """Create an engine with the configured pool size and session settings."""
+    return create_async_engine(
+        url,
+        pool_pre_ping=True,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        connect_args={"server_settings": server_settings(settings)},
+    )
+
 
 _settings = get_settings()
 
-engine = create_async_engine(
-    _settings.database_url,
-    pool_pre_ping=True,
-    pool_size=5,
-    max_overflow=10,
-    echo=_settings.environment == "development",
+engine = create_pooled_engine(_settings.database_url, _settings)
+
+query_thresholds = instrument_engine(
+    engine,
+    slow_threshold=_settings.db_slow_query_threshold_seconds,
+    n_plus_one_threshold=_settings.db_n_plus_one_threshold,
+    log_statements=_settings.environment == "development",
+)
+
+
+def _apply_query_thresholds(settings: Settings) -> None:
+    query_thresholds.slow_seconds = settings.db_slow_query_threshold_seconds
+    query_thresholds.n_plus_one = settings.db_n_plus_one_threshold
+
+
+on_settings_reload(_apply_query_thresholds)
+
+# Failures to obtain a working connection; query errors do not trip the breaker.
+_CONNECTION_ERRORS = (sa_exc.DBAPIError, sa_exc.TimeoutError, OSError)
+
+
+class CircuitState(StrEnum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Fail fast on connection checkout while the database is unreachable.
+
+    closed:    checkouts go through; ``failure_threshold`` consecutive
+               connection failures open the circuit (0 disables it).
+    open:      checkouts raise DatabaseUnavailableError without touching the
+               pool for ``recovery_time`` seconds, then the circuit half-opens.
+    half_open: up to ``half_open_max_calls`` trial checkouts go through at a
+               time; a success closes the circuit, a failure re-opens it.
+
+    Every transition is logged as ``database.circuit.state_changed``.
+    """
+
+    def __init__(
+        self,
+        name: str = "primary",
+        *,
+        failure_threshold: int = 5,
+        recovery_time: float = 10.0,
+        half_open_max_calls: int = 1,
+    ) -> None:
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_time = recovery_time
+        self.half_open_max_calls = half_open_max_calls
+        self.failures = 0
+        self._state = CircuitState.CLOSED
+        self._opened_at = 0.0
+        self._trials = 0
+
+    def configure(self, *, failure_threshold: int, recovery_time: float) -> None:
+        self.failure_threshold = failure_threshold
+        self.recovery_time = recovery_time
+        if failure_threshold <= 0 and self._state is not CircuitState.CLOSED:
+            self._transition(CircuitState.CLOSED)
+
+    @property
+    def state(self) -> CircuitState:
+        if self._state is CircuitState.OPEN and self.retry_after() == 0:
+            self._transition(CircuitState.HALF_OPEN)
+        return self._state
+
+    def retry_after(self) -> float:
+        """Seconds until the open circuit lets a trial checkout through."""
+        if self._state is not CircuitState.OPEN:
+            return 0.0
+        return max(0.0, self._opened_at + self.recovery_time - time.monotonic())
+
+    def _transition(self, state: CircuitState) -> None:
+        previous, self._state = self._state, state
+        if state is CircuitState.OPEN:
+            self._opened_at = time.monotonic()
+        elif state is CircuitState.CLOSED:
+            self.failures = 0
+        log = logger.warning if state is CircuitState.OPEN else logger.info
+        log(
+            "database.circuit.state_changed",
+            circuit=self.name,
+            previous=previous.value,
+            state=state.value,
+            failures=self.failures,
+            recovery_seconds=self.recovery_time,
+        )
+
+    def _reject(self) -> DatabaseUnavailableError:
+        return DatabaseUnavailableError(
+            f"Database unavailable (circuit {self._state.value})",
+            retry_after=self.retry_after() or self.recovery_time,
+        )
+
+    def record_success(self) -> None:
+        if self._state is CircuitState.CLOSED:
+            self.failures = 0
+        else:
+            self._transition(CircuitState.CLOSED)
+
+    def record_failure(self) -> None:
+        if self.failure_threshold <= 0:
+            return
+        self.failures += 1
+        if self._state is CircuitState.HALF_OPEN or (
+            self._state is CircuitState.CLOSED
+            and self.failures >= self.failure_threshold
+        ):
+            self._transition(CircuitState.OPEN)
+
+    @contextmanager
+    def guard(self) -> Iterator[None]:
+        """Wrap a connection checkout; raise at once if the circuit is open."""
+        state = self.state
+        if state is CircuitState.OPEN:
+            raise self._reject()
+        trial = state is CircuitState.HALF_OPEN
+        if trial:
+            if self._trials >= self.half_open_max_calls:
+                raise self._reject()
+            self._trials += 1
+        try:
+            yield
+        except _CONNECTION_ERRORS:
+            self.record_failure()
+            raise
+        else:
+            self.record_success()
+        finally:
+            if trial:
+                self._trials -= 1
+
+    def snapshot(self) -> dict[str, object]:
+        return {
+            "state": self.state.value,
+            "failures": self.failures,
+            "retry_after_seconds": round(self.retry_after(), 3),
+        }
+
+
+circuit_breaker = CircuitBreaker(
+    failure_threshold=_settings.db_circuit_failure_threshold,
+    recovery_time=_settings.db_circuit_recovery_seconds,
+    half_open_max_calls=_settings.db_circuit_half_open_max_calls,
 )
 
+
+def _apply_circuit_settings(settings: Settings) -> None:
+    circuit_breaker.configure(
+        failure_threshold=settings.db_circuit_failure_threshold,
+        recovery_time=settings.db_circuit_recovery_seconds,
+    )
+
+
+on_settings_reload(_apply_circuit_settings)
+
 AsyncSessionLocal = async_sessionmaker(
     engine,
     expire_on_commit=False,
@@ -42,7 +251,95 @@ class Base(DeclarativeBase):
     """Base class for all SQLAlchemy ORM models."""
 
 
+def sqlstate(exc: BaseException) -> str | None:
+    """Return the PostgreSQL SQLSTATE code carried by a DBAPI error, if any."""
+    orig = getattr(exc, "orig", exc)
+    code = getattr(orig, "sqlstate", None) or getattr(orig, "pgcode", None)
+    return code if isinstance(code, str) else None
+
+
+_shared_session_var: ContextVar[AsyncSession | None] = ContextVar(
+    "shared_session", default=None
+)
+
+
+@asynccontextmanager
+async def shared_session() -> AsyncIterator[AsyncSession]:
+    """Make get_db() yield one session for everything run in this context.
+
+    Used by /batch to serve several read-only sub-requests from a single pool
+    checkout. AsyncSession is not safe for concurrent use, so callers must
+    run those requests one at a time. The connection is checked out up front
+    through the circuit breaker, as in get_db(). The session is rolled back
+    on exit.
+    """
+    async with AsyncSessionLocal() as session:
+        with span("db.checkout"), circuit_breaker.guard():
+            await session.connection()
+        token = _shared_session_var.set(session)
+        try:
+            yield session
+        finally:
+            _shared_session_var.reset(token)
+
+
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
-    """Yield an async database session, closing it on exit."""
+    """Yield an async database session, closing it on exit.
+
+    The pooled connection is checked out up front (inside a ``db.checkout``
+    span and the circuit breaker) so pool waits and connect failures surface
+    here rather than at the handler's first query. While the circuit is open
+    this raises DatabaseUnavailableError without waiting on the pool. Inside
+    shared_session() the shared session is yielded instead and left open.
+    """
+    shared = _shared_session_var.get()
+    if shared is not None:
+        yield shared
+        return
     async with AsyncSessionLocal() as session:
+        with span("db.checkout"), circuit_breaker.guard():
+            await session.connection()
         yield session
+
+
+async def warm_up_pool(
+    target: AsyncEngine,
+    connections: int,
+    timeout: float,
+) -> bool:
+    """Open ``connections`` pooled connections in parallel.
+
+    Each connection runs the warm-up query and then waits until all are open,
+    so the pool really holds ``connections`` distinct sockets afterwards.
+    Failures are logged rather than raised: the app still starts and
+    /health/ready reports the database state.
+    """
+    if connections <= 0:
+        return True
+    barrier = asyncio.Barrier(connections)
+
+    async def _open_one() -> None:
+        async with target.connect() as conn:
+            await conn.execute(_WARMUP_SQL)
+            await barrier.wait()
+
+    start = time.perf_counter()
+    logger.info("database.pool.warmup_started", connections=connections)
+    try:
+        async with asyncio.timeout(timeout), asyncio.TaskGroup() as group:
+            for _ in range(connections):
+                group.create_task(_open_one())
+    except Exception:
+        logger.error(
+            "database.pool.warmup_failed",
+            connections=connections,
+            duration_seconds=round(time.perf_counter() - start, 3),
+            exc_info=True,
+        )
+        return False
+    logger.info(
+        "database.pool.warmup_completed",
+        connections=connections,
+        duration_seconds=round(time.perf_counter() - start, 3),
+    )
+    return True
@@ -0,0 +1,330 @@
+"""Memory diagnostics: tracemalloc snapshots, GC stats, per-request allocations.
+
+Opt-in (DIAGNOSTICS_ENABLED=true) and restricted to clients in
+DIAGNOSTICS_ALLOWED_HOSTS; when disabled the router is not mounted and
+RequestLoggingMiddleware skips the allocation hook entirely.
+
+    GET    /debug/memory                          RSS, GC generations, tracing state
+    POST   /debug/memory/tracing?frames=10        start tracemalloc
+    DELETE /debug/memory/tracing                  stop tracemalloc
+    POST   /debug/memory/snapshots                take a snapshot
+    GET    /debug/memory/snapshots/{id}/top       top allocation sites
+    GET    /debug/memory/snapshots/{id}/diff?base={id}   growth since ``base``
+    DELETE /debug/memory/snapshots                drop stored snapshots
+    POST   /debug/memory/gc                       run a full collection
+
+Typical leak hunt: start tracing, take a snapshot, let traffic run, take
+another, and diff the two grouped by ``traceback``. tracemalloc slows
+allocation-heavy code noticeably while tracing, and taking or comparing a
+snapshot pauses the worker; start it on one worker for as long as needed
+(or from boot with DIAGNOSTICS_TRACEMALLOC_FRAMES).
+
+While tracing, a DIAGNOSTICS_ALLOCATION_SAMPLE_RATE fraction of requests
+log ``memory_allocated_bytes`` in ``request.completed``: the change in
+traced memory over the request. Allocations by concurrent requests on the
+same worker are included, so read it across many samples.
+"""
+
+from __future__ import annotations
+
+import gc
+import itertools
+import random
+import resource
+import sys
+import tracemalloc
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+from typing import Annotated, Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from pydantic import BaseModel
+
+from app.core.config import get_settings
+from app.core.logging import get_logger
+from app.core.profiling import TimedRoute
+from app.shared.utils import utcnow
+
+logger = get_logger("app.core.diagnostics")
+
+GroupBy = Literal["lineno", "filename", "traceback"]
+
+_MAX_SNAPSHOTS = 8
+# Allocations made by tracemalloc itself and the import machinery.
+_SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+async def _require_allowed_host(request: Request) -> None:
+    host = request.client.host if request.client else None
+    if host not in get_settings().diagnostics_allowed_hosts:
+        logger.warning("diagnostics.request.rejected", client_host=host)
+        raise HTTPException(status_code=403, detail="Diagnostics not allowed")
+
+
+router = APIRouter(
+    prefix="/debug/memory",
+    tags=["diagnostics"],
+    route_class=TimedRoute,
+    dependencies=[Depends(_require_allowed_host)],
+)
+
+
+def sample_allocations() -> int | None:
+    """Traced bytes at request start, if this request is sampled."""
+    if not tracemalloc.is_tracing():
+        return None
+    rate = get_settings().diagnostics_allocation_sample_rate
+    if not rate or random.random() >= rate:
+        return None
+    return tracemalloc.get_traced_memory()[0]
+
+
+def allocated_since(start: int) -> int:
+    """Net traced bytes allocated since ``start`` (0 if tracing stopped)."""
+    if not tracemalloc.is_tracing():
+        return 0
+    return tracemalloc.get_traced_memory()[0] - start
+
+
+def rss_bytes() -> int | None:
+    """Current resident set size (Linux), or None where unavailable."""
+    try:
+        resident_pages = int(Path("/proc/self/statm").read_text().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return resident_pages * resource.getpagesize()
+
+
+def max_rss_bytes() -> int:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class GCGeneration(BaseModel):
+    generation: int
+    threshold: int
+    pending: int
+    collections: int
+    collected: int
+    uncollectable: int
+
+
+class MemoryStatus(BaseModel):
+    rss_bytes: int | None
+    max_rss_bytes: int
+    tracing: bool
+    traceback_frames: int
+    traced_bytes: int
+    traced_peak_bytes: int
+    gc_enabled: bool
+    gc_frozen_objects: int
+    gc_garbage: int
+    gc_generations: list[GCGeneration]
+    snapshots: list[int]
+
+
+class SnapshotInfo(BaseModel):
+    id: int
+    taken_at: datetime
+    traceback_frames: int
+    traced_bytes: int
+    traced_peak_bytes: int
+
+
+class AllocationSite(BaseModel):
+    location: list[str]
+    size_bytes: int
+    count: int
+    size_diff_bytes: int | None = None
+    count_diff: int | None = None
+
+
+class CollectResult(BaseModel):
+    unreachable: int
+    rss_before_bytes: int | None
+    rss_after_bytes: int | None
+
+
+class SnapshotStore:
+    """The most recent tracemalloc snapshots, by id."""
+
+    def __init__(self, max_snapshots: int = _MAX_SNAPSHOTS) -> None:
+        self.max_snapshots = max_snapshots
+        self._ids = itertools.count(1)
+        self._snapshots: OrderedDict[int, tuple[SnapshotInfo, tracemalloc.Snapshot]] = (
+            OrderedDict()
+        )
+
+    def ids(self) -> list[int]:
+        return list(self._snapshots)
+
+    def take(self) -> SnapshotInfo:
+        traced, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+        info = SnapshotInfo(
+            id=next(self._ids),
+            taken_at=utcnow(),
+            traceback_frames=snapshot.traceback_limit,
+            traced_bytes=traced,
+            traced_peak_bytes=peak,
+        )
+        self._snapshots[info.id] = (info, snapshot)
+        if len(self._snapshots) > self.max_snapshots:
+            self._snapshots.popitem(last=False)
+        return info
+
+    def get(self, snapshot_id: int) -> tracemalloc.Snapshot:
+        try:
+            return self._snapshots[snapshot_id][1]
+        except KeyError:
+            raise HTTPException(
+                status_code=404, detail=f"Snapshot {snapshot_id} not found"
+            ) from None
+
+    def clear(self) -> None:
+        self._snapshots.clear()
+
+
+snapshots = SnapshotStore()
+
+
+def _location(traceback: tracemalloc.Traceback) -> list[str]:
+    # Most recent call first.
+    return [f"{frame.filename}:{frame.lineno}" for frame in reversed(traceback)]
+
+
+def top_sites(
+    snapshot: tracemalloc.Snapshot, group_by: GroupBy, limit: int
+) -> list[AllocationSite]:
+    return [
+        AllocationSite(
+            location=_location(stat.traceback), size_bytes=stat.size, count=stat.count
+        )
+        for stat in snapshot.statistics(group_by)[:limit]
+    ]
+
+
+def diff_sites(
+    snapshot: tracemalloc.Snapshot,
+    base: tracemalloc.Snapshot,
+    group_by: GroupBy,
+    limit: int,
+) -> list[AllocationSite]:
+    """Sites ordered by absolute growth between ``base`` and ``snapshot``."""
+    return [
+        AllocationSite(
+            location=_location(stat.traceback),
+            size_bytes=stat.size,
+            count=stat.count,
+            size_diff_bytes=stat.size_diff,
+            count_diff=stat.count_diff,
+        )
+        for stat in snapshot.compare_to(base, group_by)[:limit]
+    ]
+
+
+@router.get("")
+async def memory_status() -> MemoryStatus:
+    """Process RSS, tracemalloc state and per-generation GC statistics."""
+    traced, peak = tracemalloc.get_traced_memory()
+    thresholds = gc.get_threshold()
+    counts = gc.get_count()
+    return MemoryStatus(
+        rss_bytes=rss_bytes(),
+        max_rss_bytes=max_rss_bytes(),
+        tracing=tracemalloc.is_tracing(),
+        traceback_frames=tracemalloc.get_traceback_limit(),
+        traced_bytes=traced,
+        traced_peak_bytes=peak,
+        gc_enabled=gc.isenabled(),
+        gc_frozen_objects=gc.get_freeze_count(),
+        gc_garbage=len(gc.garbage),
+        gc_generations=[
+            GCGeneration(
+                generation=generation,
+                threshold=thresholds[generation],
+                pending=counts[generation],
+                **stats,
+            )
+            for generation, stats in enumerate(gc.get_stats())
+        ],
+        snapshots=snapshots.ids(),
+    )
+
+
+@router.post("/tracing")
+async def start_tracing(
+    frames: Annotated[int, Query(ge=1, le=100)] = 10,
+) -> MemoryStatus:
+    """Start tracemalloc, storing ``frames`` frames per allocation."""
+    if tracemalloc.is_tracing():
+        raise HTTPException(status_code=409, detail="tracemalloc is already tracing")
+    tracemalloc.start(frames)
+    logger.info("diagnostics.tracing.started", frames=frames)
+    return await memory_status()
+
+
+@router.delete("/tracing")
+async def stop_tracing() -> MemoryStatus:
+    """Stop tracemalloc; stored snapshots stay available."""
+    tracemalloc.stop()
+    logger.info("diagnostics.tracing.stopped")
+    return await memory_status()
+
+
+@router.post("/snapshots")
+async def take_snapshot() -> SnapshotInfo:
+    if not tracemalloc.is_tracing():
+        raise HTTPException(
+            status_code=409, detail="Start tracing before taking snapshots"
+        )
+    info = snapshots.take()
+    logger.info(
+        "diagnostics.snapshot.taken",
+        snapshot_id=info.id,
+        traced_bytes=info.traced_bytes,
+    )
+    return info
+
+
+@router.get("/snapshots/{snapshot_id}/top")
+async def snapshot_top(
+    snapshot_id: int,
+    group_by: GroupBy = "lineno",
+    limit: Annotated[int, Query(ge=1, le=500)] = 25,
+) -> list[AllocationSite]:
+    """Largest allocation sites in one snapshot."""
+    return top_sites(snapshots.get(snapshot_id), group_by, limit)
+
+
+@router.get("/snapshots/{snapshot_id}/diff")
+async def snapshot_diff(
+    snapshot_id: int,
+    base: int,
+    group_by: GroupBy = "lineno",
+    limit: Annotated[int, Query(ge=1, le=500)] = 25,
+) -> list[AllocationSite]:
+    """Allocation sites that grew (or shrank) most since snapshot ``base``."""
+    return diff_sites(snapshots.get(snapshot_id), snapshots.get(base), group_by, limit)
+
+
+@router.delete("/snapshots", status_code=204)
+async def clear_snapshots() -> None:
+    snapshots.clear()
+
+
+@router.post("/gc")
+async def collect_garbage() -> CollectResult:
+    """Run a full collection and report how much RSS it gave back."""
+    before = rss_bytes()
+    unreachable = gc.collect()
+    return CollectResult(
+        unreachable=unreachable, rss_before_bytes=before, rss_after_bytes=rss_bytes()
+    )
@@ -0,0 +1,276 @@
+"""Server-Sent Events hub with per-subscriber bounded queues.
+
+Code anywhere in the worker publishes to a topic; every subscriber to that
+topic receives the event over ``GET /events?topic=...``:
+
+    from app.core.events import hub
+
+    hub.publish("notes", {"id": note.id, "action": "updated"})
+
+Each event is JSON-encoded and framed once; subscribers share the same
+``bytes`` object, so fan-out is one deque append per subscriber. A
+subscriber whose queue reaches EVENTS_QUEUE_SIZE is disconnected rather than
+allowed to grow without bound; the browser's EventSource reconnects with
+``Last-Event-ID`` and missed events still in the replay buffer are resent.
+Idle streams get a comment line every EVENTS_HEARTBEAT_SECONDS so proxies
+keep them open, and every stream ends after EVENTS_MAX_STREAM_SECONDS so the
+client reconnects (uvicorn waits for open streams before running lifespan
+shutdown, so this bounds shutdown time unless --timeout-graceful-shutdown
+is lower).
+
+The hub is per worker: publish() is synchronous and must be called from
+the event loop, and event IDs are only meaningful within one worker.
+
+Streams pass through RequestLoggingMiddleware unbuffered: ``request.completed``
+is logged when the response headers go out, and ``events.stream.opened`` /
+``events.stream.closed`` (carrying the same request_id) bracket the stream.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+from collections import deque
+from collections.abc import AsyncIterator
+from typing import Annotated, Any
+
+from fastapi import APIRouter, Header, Query
+from fastapi.responses import StreamingResponse
+
+from app.core.logging import get_logger
+from app.core.profiling import TimedRoute
+
+logger = get_logger("app.core.events")
+
+router = APIRouter(tags=["events"], route_class=TimedRoute)
+
+_HEARTBEAT = b": keepalive\n\n"
+# Client reconnect delay (ms) after a stream ends.
+_RETRY = b"retry: 1000\n\n"
+_STREAM_HEADERS = {
+    "Cache-Control": "no-cache",
+    # Disable response buffering in nginx and compatible proxies.
+    "X-Accel-Buffering": "no",
+}
+
+
+def encode_event(
+    data: str, *, event: str | None = None, event_id: int | None = None
+) -> bytes:
+    """Frame one event in the text/event-stream wire format."""
+    lines: list[str] = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    if event is not None:
+        lines.append(f"event: {event}")
+    lines.extend(f"data: {line}" for line in data.split("\n"))
+    return ("\n".join(lines) + "\n\n").encode()
+
+
+class SubscriberClosedError(Exception):
+    """Raised by Subscriber.next() once the subscriber is closed and drained."""
+
+
+class Subscriber:
+    """One open stream: a bounded frame queue and a single waiter."""
+
+    __slots__ = ("_buffer", "_waiter", "close_reason", "max_queue", "sent", "topics")
+
+    def __init__(self, topics: frozenset[str], max_queue: int) -> None:
+        self.topics = topics
+        self.max_queue = max_queue
+        self.sent = 0
+        self.close_reason: str | None = None
+        self._buffer: deque[bytes] = deque()
+        self._waiter: asyncio.Future[None] | None = None
+
+    @property
+    def closed(self) -> bool:
+        return self.close_reason is not None
+
+    def _wake(self) -> None:
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+
+    def push(self, frame: bytes) -> bool:
+        """Queue a frame; close the subscriber instead if its queue is full."""
+        if self.closed:
+            return False
+        if len(self._buffer) >= self.max_queue:
+            self.close("slow_consumer")
+            return False
+        self._buffer.append(frame)
+        self._wake()
+        return True
+
+    def close(self, reason: str) -> None:
+        if not self.closed:
+            self.close_reason = reason
+            self._buffer.clear()
+            self._wake()
+
+    async def next(self, timeout: float) -> bytes | None:
+        """Return the next frame, or None if ``timeout`` passes first."""
+        if not self._buffer:
+            if self.closed:
+                raise SubscriberClosedError(self.close_reason)
+            self._waiter = asyncio.get_running_loop().create_future()
+            try:
+                await asyncio.wait_for(self._waiter, timeout)
+            except TimeoutError:
+                return None
+            finally:
+                self._waiter = None
+            if not self._buffer:
+                raise SubscriberClosedError(self.close_reason)
+        self.sent += 1
+        return self._buffer.popleft()
+
+
+class EventHub:
+    """Topic-based fan-out to every Subscriber in this worker."""
+
+    def __init__(
+        self,
+        *,
+        queue_size: int = 64,
+        heartbeat: float = 15.0,
+        replay_size: int = 256,
+        max_lifetime: float = 300.0,
+    ) -> None:
+        self.queue_size = queue_size
+        self.heartbeat = heartbeat
+        self.max_lifetime = max_lifetime
+        self.published = 0
+        self.dropped_subscribers = 0
+        self._topics: dict[str, set[Subscriber]] = {}
+        self._replay: deque[tuple[int, str, bytes]] = deque(maxlen=replay_size)
+        self._next_id = 1
+        self._subscribers = 0
+
+    def configure(
+        self,
+        *,
+        queue_size: int,
+        heartbeat: float,
+        replay_size: int,
+        max_lifetime: float,
+    ) -> None:
+        self.queue_size = queue_size
+        self.heartbeat = heartbeat
+        self.max_lifetime = max_lifetime
+        self._replay = deque(self._replay, maxlen=replay_size)
+
+    @property
+    def subscriber_count(self) -> int:
+        """Open streams in this worker."""
+        return self._subscribers
+
+    def publish(self, topic: str, data: Any) -> int:  # noqa: ANN401
+        """Send ``data`` to every subscriber of ``topic``; returns the event id."""
+        event_id = self._next_id
+        self._next_id += 1
+        frame = encode_event(
+            json.dumps(data, separators=(",", ":"), default=str),
+            event=topic,
+            event_id=event_id,
+        )
+        self._replay.append((event_id, topic, frame))
+        self.published += 1
+        for subscriber in self._topics.get(topic, ()):
+            if not subscriber.push(frame):
+                self.dropped_subscribers += 1
+        return event_id
+
+    def subscribe(
+        self, topics: frozenset[str], last_event_id: int | None = None
+    ) -> Subscriber:
+        """Register a subscriber, pre-loading events missed since ``last_event_id``."""
+        subscriber = Subscriber(topics, self.queue_size)
+        if last_event_id is not None:
+            missed = [
+                frame
+                for event_id, topic, frame in self._replay
+                if event_id > last_event_id and topic in topics
+            ]
+            for frame in missed[-self.queue_size :]:
+                subscriber.push(frame)
+        for topic in topics:
+            self._topics.setdefault(topic, set()).add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        for topic in subscriber.topics:
+            subscribers = self._topics.get(topic)
+            if subscribers is not None:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self._topics[topic]
+
+    async def close(self) -> None:
+        """End every open stream (shutdown)."""
+        for subscribers in list(self._topics.values()):
+            for subscriber in subscribers:
+                subscriber.close("shutdown")
+
+    async def stream(
+        self, topics: frozenset[str], last_event_id: int | None = None
+    ) -> AsyncIterator[bytes]:
+        """Yield frames until the subscriber closes or the client leaves.
+
+        Subscribing happens on first iteration, so a client that disconnects
+        before the body starts never leaves a subscriber behind. Streams end
+        after ``max_lifetime`` seconds and the client reconnects, which
+        rebalances connections and bounds how long a stream can delay
+        server shutdown.
+        """
+        subscriber = self.subscribe(topics, last_event_id)
+        self._subscribers += 1
+        start = time.perf_counter()
+        deadline = start + self.max_lifetime
+        logger.info(
+            "events.stream.opened",
+            topics=sorted(topics),
+            subscribers=self._subscribers,
+        )
+        try:
+            yield _RETRY
+            while True:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    subscriber.close("max_lifetime")
+                try:
+                    frame = await subscriber.next(min(self.heartbeat, remaining))
+                except SubscriberClosedError:
+                    break
+                if frame is not None:
+                    yield frame
+                elif time.perf_counter() < deadline:
+                    yield _HEARTBEAT
+        finally:
+            self._subscribers -= 1
+            self.unsubscribe(subscriber)
+            logger.info(
+                "events.stream.closed",
+                topics=sorted(subscriber.topics),
+                events_sent=subscriber.sent,
+                reason=subscriber.close_reason or "client_disconnected",
+                duration_seconds=round(time.perf_counter() - start, 3),
+            )
+
+
+hub = EventHub()
+
+
+@router.get("/events")
+async def stream_events(
+    topic: Annotated[list[str], Query(min_length=1)],
+    last_event_id: Annotated[int | None, Header()] = None,
+) -> StreamingResponse:
+    """Stream events for the requested topics as text/event-stream."""
+    return StreamingResponse(
+        hub.stream(frozenset(topic), last_event_id),
+        media_type="text/event-stream",
+        headers=_STREAM_HEADERS,
+    )
@@ -10,6 +10,8 @@ Register with app via setup_exception_handlers(app) in app/main.py.
 
 from __future__ import annotations
 
+import math
+
 from fastapi import FastAPI, Request
 from fastapi.responses import JSONResponse
 
@@ -30,9 +32,18 @@ class ValidationError(DatabaseError):
     """Raised when input validation fails before a database operation."""
 
 
+class DatabaseUnavailableError(DatabaseError):
+    """Raised without touching the pool while the database circuit is open."""
+
+    def __init__(self, message: str, retry_after: float = 0.0) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
 _STATUS_MAP: dict[type[Exception], int] = {
     NotFoundError: 404,
     ValidationError: 422,
+    DatabaseUnavailableError: 503,
     DatabaseError: 500,
 }
 
@@ -40,16 +51,23 @@ _STATUS_MAP: dict[type[Exception], int] = {
 async def database_exception_handler(request: Request, exc: Exception) -> JSONResponse:
     """Return a structured JSON error response for database exceptions."""
     status_code = _STATUS_MAP.get(type(exc), 500)
-    logger.error(
-        "database.error",
-        error=str(exc),
-        exc_type=type(exc).__name__,
-        path=request.url.path,
-        exc_info=True,
-    )
+    headers = None
+    if isinstance(exc, DatabaseUnavailableError):
+        # Expected while the circuit is open: no traceback per rejected request.
+        logger.warning("database.unavailable", error=str(exc), path=request.url.path)
+        headers = {"Retry-After": str(max(1, math.ceil(exc.retry_after)))}
+    else:
+        logger.error(
+            "database.error",
+            error=str(exc),
+            exc_type=type(exc).__name__,
+            path=request.url.path,
+            exc_info=True,
+        )
     return JSONResponse(
         status_code=status_code,
         content={"error": str(exc), "type": type(exc).__name__},
+        headers=headers,
     )
 
 
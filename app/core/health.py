@@ -2,8 +2,13 @@
 
 Endpoints are registered WITHOUT a prefix so they live at the root path:
     GET /health       — API process is running
-    GET /health/db    — database connection is available
+    GET /health/db    — database connection is available, retry counters
     GET /health/ready — all dependencies healthy and ready for traffic
+    GET /health/loop  — event-loop lag percentiles (app.core.loop_monitor)
+    GET /health/shards — per-shard database state (app.core.sharding)
+
+/health/ready also consults the process-level ``readiness`` gate, which
+lifecycle phases (pool warm-up, shutdown draining) block while they run.
 """
 
 from __future__ import annotations
@@ -12,13 +17,42 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.config import Settings, get_settings
-from app.core.database import get_db
+from app.core.config import get_settings
+from app.core.database import circuit_breaker, get_db
 from app.core.logging import get_logger
+from app.core.loop_monitor import loop_monitor
+from app.core.profiling import TimedRoute
+from app.core.retry import retry_metrics
+from app.core.sharding import shards
 
 logger = get_logger("app.core.health")
 
-router = APIRouter(tags=["health"])
+router = APIRouter(tags=["health"], route_class=TimedRoute)
+
+
+class Readiness:
+    """Process-level readiness gate; ready when no phase is blocking it."""
+
+    def __init__(self) -> None:
+        self._blockers: set[str] = set()
+
+    def block(self, reason: str) -> None:
+        """Report not-ready until ``unblock(reason)`` is called."""
+        self._blockers.add(reason)
+
+    def unblock(self, reason: str) -> None:
+        self._blockers.discard(reason)
+
+    @property
+    def is_ready(self) -> bool:
+        return not self._blockers
+
+    @property
+    def blockers(self) -> list[str]:
+        return sorted(self._blockers)
+
+
+readiness = Readiness()
 
 
 @router.get("/health")
@@ -28,22 +62,35 @@ async def health() -> dict[str, str]:
 
 
 @router.get("/health/db")
-async def health_db(db: AsyncSession = Depends(get_db)) -> dict[str, str]:  # noqa: B008
-    """Confirm the database connection is available."""
+async def health_db(db: AsyncSession = Depends(get_db)) -> dict[str, object]:  # noqa: B008
+    """Confirm the database connection is available; report retry counters."""
     try:
         await db.execute(text("SELECT 1"))
     except Exception as exc:
         logger.error("database.health_check_failed", exc_info=True)
         raise HTTPException(status_code=503, detail="Database unavailable") from exc
-    return {"status": "healthy", "service": "database", "provider": "postgresql"}
+    return {
+        "status": "healthy",
+        "service": "database",
+        "provider": "postgresql",
+        "transaction_retries": retry_metrics.snapshot(),
+    }
 
 
 @router.get("/health/ready")
 async def health_ready(
     db: AsyncSession = Depends(get_db),  # noqa: B008
-    settings: Settings = Depends(get_settings),  # noqa: B008
 ) -> dict[str, str]:
-    """Confirm all dependencies are ready for traffic."""
+    """Confirm all dependencies are ready for traffic.
+
+    While the database circuit is open get_db() rejects the probe with 503
+    before the handler runs; once it half-opens the probe is a trial checkout.
+    """
+    if not readiness.is_ready:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Not ready: {', '.join(readiness.blockers)}",
+        )
     try:
         await db.execute(text("SELECT 1"))
     except Exception as exc:
@@ -51,6 +98,28 @@ async def health_ready(
         raise HTTPException(status_code=503, detail="Database not ready") from exc
     return {
         "status": "ready",
-        "environment": settings.environment,
+        "environment": get_settings().environment,
         "database": "connected",
+        "database_circuit": circuit_breaker.state.value,
     }
+
+
+@router.get("/health/loop")
+async def health_loop() -> dict[str, object]:
+    """Report recent event-loop scheduling delay and detected stalls."""
+    return loop_monitor.snapshot()
+
+
+@router.get("/health/shards")
+async def health_shards() -> dict[str, object]:
+    """Ping every shard database; 503 if any of them is unavailable."""
+    if not shards.enabled:
+        return {"status": "disabled", "shards": []}
+    results = await shards.check(get_settings().db_shard_health_timeout_seconds)
+    healthy = all(result["status"] == "healthy" for result in results)
+    if not healthy:
+        raise HTTPException(
+            status_code=503,
+            detail={"status": "degraded", "shards": results},
+        )
+    return {"status": "healthy", "strategy": shards.strategy, "shards": results}
@@ -0,0 +1,487 @@
+"""Idempotency-Key support: retried writes replay the stored response.
+
+A client (or proxy) that may retry a POST/PATCH sends a unique key:
+
+    POST /api/notes
+    Idempotency-Key: 5f0c8a2e-...
+
+Keys are scoped to the caller: the stored key is a hash of the key and the
+request's Authorization header (its client address without one), so one
+caller can neither replay nor block another caller's key.
+
+The first request with a key claims it in the ``idempotency_keys`` table,
+runs the handler, and stores the response status, headers and body. Any
+later request with the same key gets that response back with an
+``Idempotent-Replayed: true`` header; the handler never runs again.
+Per-session headers such as Set-Cookie are not stored or replayed.
+
+Concurrent duplicates wait for the first execution instead of racing it:
+within a worker they await the in-flight request directly, across workers
+they poll the row until the response is stored. Waiters give up after
+IDEMPOTENCY_LOCK_TIMEOUT_SECONDS with 409. The holder refreshes its claim
+every third of that timeout while the handler runs, so only a claim whose
+worker died mid-request goes stale and can be taken over.
+
+Responses with status 500 or above are not stored: the key is released so
+the retry re-executes. Reusing a key for a different method, path, query
+or body is rejected with 422.
+
+Completed responses are also kept in a per-worker LRU, so hot replays skip
+the database. Rows expire after IDEMPOTENCY_TTL_SECONDS and are deleted by
+a periodic purge (IdempotencyPurger, started in the lifespan).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import hashlib
+import time
+from collections.abc import AsyncIterator
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any
+
+import sqlalchemy as sa
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.dialects.postgresql import JSONB, insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import Mapped, mapped_column
+from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+
+from app.core.database import Base
+from app.core.invalidation import LocalCache
+from app.core.logging import get_logger
+from app.shared.models import TimestampMixin
+from app.shared.utils import utcnow
+
+logger = get_logger("app.core.idempotency")
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 255
+# Recomputed for the replayed body.
+_SKIPPED_HEADERS = frozenset({"content-length"})
+# Belong to the first caller's session; never replayed.
+_SESSION_HEADERS = frozenset({"set-cookie", "set-cookie2", "authentication-info"})
+
+
+class IdempotencyKey(TimestampMixin, Base):
+    """A claimed key and, once the handler finished, its response."""
+
+    __tablename__ = "idempotency_keys"
+
+    key: Mapped[str] = mapped_column(sa.String(MAX_KEY_LENGTH), primary_key=True)
+    request_hash: Mapped[str] = mapped_column(sa.String(64))
+    # NULL while the first request is still running.
+    status_code: Mapped[int | None] = mapped_column(sa.SmallInteger)
+    headers: Mapped[list[list[str]] | None] = mapped_column(
+        sa.JSON().with_variant(JSONB(), "postgresql")
+    )
+    body: Mapped[bytes | None] = mapped_column(sa.LargeBinary)
+    expires_at: Mapped[datetime] = mapped_column(sa.DateTime(timezone=True), index=True)
+
+
+@dataclass(frozen=True, slots=True)
+class StoredResponse:
+    """Plain copy of a completed row, safe to cache and share across tasks."""
+
+    request_hash: str
+    status_code: int
+    headers: tuple[tuple[str, str], ...]
+    body: bytes
+    expires_at: datetime
+
+    def replay(self) -> Response:
+        return _build_response(
+            self.status_code,
+            (*self.headers, (REPLAYED_HEADER.lower(), "true")),
+            self.body,
+        )
+
+
+def _build_response(
+    status_code: int, headers: tuple[tuple[str, str], ...], body: bytes
+) -> Response:
+    # Raw headers keep repeated names such as set-cookie.
+    response = Response(content=body, status_code=status_code)
+    response.raw_headers = [
+        *((name.encode("latin-1"), value.encode("latin-1")) for name, value in headers),
+        (b"content-length", str(len(body)).encode()),
+    ]
+    return response
+
+
+def request_fingerprint(method: str, path: str, query: str, body: bytes) -> str:
+    """Hash of what a key must keep meaning on every retry."""
+    digest = hashlib.sha256()
+    for part in (method.encode(), path.encode(), query.encode()):
+        digest.update(part)
+        digest.update(b"\0")
+    digest.update(body)
+    return digest.hexdigest()
+
+
+def scoped_key(caller: str, key: str) -> str:
+    """The stored key: ``key`` as sent by ``caller``, hashed to a fixed length."""
+    return hashlib.sha256(f"{caller}\0{key}".encode()).hexdigest()
+
+
+def caller_identity(request: Request) -> str:
+    """Who sent the request: its credentials, or its address without any."""
+    authorization = request.headers.get("authorization")
+    if authorization:
+        return f"auth:{authorization}"
+    host = request.client.host if request.client is not None else ""
+    return f"client:{host}"
+
+
+def claim_statement(
+    key: str, request_hash: str, *, ttl: float, lock_timeout: float
+) -> sa.Insert:
+    """Insert the key, or take over an expired or abandoned one."""
+    now = utcnow()
+    statement = insert(IdempotencyKey).values(
+        key=key,
+        request_hash=request_hash,
+        expires_at=now + timedelta(seconds=ttl),
+        created_at=now,
+        updated_at=now,
+    )
+    table = IdempotencyKey.__table__
+    return statement.on_conflict_do_update(
+        index_elements=[table.c.key],
+        set_={
+            "request_hash": statement.excluded.request_hash,
+            "status_code": None,
+            "headers": None,
+            "body": None,
+            "expires_at": statement.excluded.expires_at,
+            "created_at": statement.excluded.created_at,
+            "updated_at": statement.excluded.updated_at,
+        },
+        where=sa.or_(
+            table.c.expires_at < func.now(),
+            sa.and_(
+                table.c.status_code.is_(None),
+                table.c.updated_at < func.now() - timedelta(seconds=lock_timeout),
+            ),
+        ),
+    ).returning(table.c.key)
+
+
+async def claim_key(
+    session: AsyncSession,
+    key: str,
+    request_hash: str,
+    *,
+    ttl: float,
+    lock_timeout: float,
+) -> bool:
+    """Claim ``key`` for this request; False if someone else holds it."""
+    result = await session.execute(
+        claim_statement(key, request_hash, ttl=ttl, lock_timeout=lock_timeout)
+    )
+    return result.first() is not None
+
+
+async def touch_key(session: AsyncSession, key: str) -> None:
+    """Refresh an unfinished claim so it is not taken over as abandoned."""
+    await session.execute(
+        update(IdempotencyKey)
+        .where(IdempotencyKey.key == key, IdempotencyKey.status_code.is_(None))
+        .values(updated_at=utcnow())
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def load_response(session: AsyncSession, key: str) -> StoredResponse | None:
+    """Return the stored response, or None if absent, pending or expired."""
+    row = (
+        await session.execute(
+            select(
+                IdempotencyKey.request_hash,
+                IdempotencyKey.status_code,
+                IdempotencyKey.headers,
+                IdempotencyKey.body,
+                IdempotencyKey.expires_at,
+            ).where(
+                IdempotencyKey.key == key,
+                IdempotencyKey.status_code.is_not(None),
+                IdempotencyKey.expires_at > func.now(),
+            )
+        )
+    ).first()
+    if row is None:
+        return None
+    request_hash, status_code, headers, body, expires_at = row
+    return StoredResponse(
+        request_hash,
+        status_code,
+        tuple((name, value) for name, value in headers or ()),
+        body or b"",
+        expires_at,
+    )
+
+
+async def save_response(
+    session: AsyncSession, key: str, response: StoredResponse
+) -> None:
+    await session.execute(
+        update(IdempotencyKey)
+        .where(IdempotencyKey.key == key)
+        .values(
+            status_code=response.status_code,
+            headers=[list(header) for header in response.headers],
+            body=response.body,
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def release_key(session: AsyncSession, key: str) -> None:
+    """Drop an unfinished claim so a retry can execute."""
+    await session.execute(
+        delete(IdempotencyKey)
+        .where(IdempotencyKey.key == key, IdempotencyKey.status_code.is_(None))
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def purge_expired(session: AsyncSession) -> int:
+    """Delete expired keys; returns how many were removed."""
+    result = await session.execute(
+        delete(IdempotencyKey)
+        .where(IdempotencyKey.expires_at < func.now())
+        .returning(IdempotencyKey.key)
+        .execution_options(synchronize_session=False)
+    )
+    return len(result.all())
+
+
+def _problem(status_code: int, detail: str) -> JSONResponse:
+    return JSONResponse(status_code=status_code, content={"detail": detail})
+
+
+class IdempotencyMiddleware(BaseHTTPMiddleware):
+    """Run each Idempotency-Key once and replay its response afterwards."""
+
+    def __init__(
+        self,
+        app: Any,  # noqa: ANN401
+        *,
+        session_factory: async_sessionmaker[AsyncSession],
+        ttl: float = 86400.0,
+        lock_timeout: float = 30.0,
+        cache_size: int = 1024,
+        methods: frozenset[str] = frozenset({"POST", "PATCH"}),
+    ) -> None:
+        super().__init__(app)
+        self.session_factory = session_factory
+        self.ttl = ttl
+        self.lock_timeout = lock_timeout
+        self.methods = methods
+        self.cache: LocalCache[StoredResponse] = LocalCache("idempotency", cache_size)
+        # key -> response of the request running it in this worker (None: failed)
+        self._inflight: dict[str, asyncio.Future[StoredResponse | None]] = {}
+
+    def _cached(self, key: str) -> StoredResponse | None:
+        stored = self.cache.get(key)
+        if stored is not None and stored.expires_at <= utcnow():
+            self.cache.invalidate([key])
+            return None
+        return stored
+
+    async def _wait_local(
+        self, waiter: asyncio.Future[StoredResponse | None]
+    ) -> StoredResponse | None:
+        with contextlib.suppress(TimeoutError):
+            return await asyncio.wait_for(asyncio.shield(waiter), self.lock_timeout)
+        return None
+
+    async def _acquire(self, key: str, request_hash: str) -> StoredResponse | None:
+        """Claim ``key`` (None) or wait for the response of whoever holds it.
+
+        Raises TimeoutError if the holder has not finished in ``lock_timeout``.
+        """
+        deadline = time.monotonic() + self.lock_timeout
+        delay = 0.02
+        while True:
+            async with self.session_factory() as session, session.begin():
+                if await claim_key(
+                    session,
+                    key,
+                    request_hash,
+                    ttl=self.ttl,
+                    lock_timeout=self.lock_timeout,
+                ):
+                    return None
+                stored = await load_response(session, key)
+            if stored is not None:
+                return stored
+            if time.monotonic() >= deadline:
+                raise TimeoutError(key)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.5)
+
+    async def _heartbeat(self, key: str) -> None:
+        while True:
+            await asyncio.sleep(self.lock_timeout / 3)
+            try:
+                async with self.session_factory() as session, session.begin():
+                    await touch_key(session, key)
+            except Exception:
+                logger.warning("idempotency.key.refresh_failed", key=key, exc_info=True)
+
+    @contextlib.asynccontextmanager
+    async def _holding(self, key: str) -> AsyncIterator[None]:
+        """Keep the claim on ``key`` fresh while the block runs."""
+        heartbeat = asyncio.create_task(
+            self._heartbeat(key), name="idempotency-heartbeat"
+        )
+        try:
+            yield
+        finally:
+            heartbeat.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await heartbeat
+
+    async def _release(self, key: str) -> None:
+        try:
+            async with self.session_factory() as session, session.begin():
+                await release_key(session, key)
+        except Exception:
+            # Unrefreshed, the claim is taken over after lock_timeout.
+            logger.error("idempotency.key.release_failed", key=key, exc_info=True)
+
+    def _replay(self, key: str, stored: StoredResponse, request_hash: str) -> Response:
+        if stored.request_hash != request_hash:
+            return _problem(
+                422, f"{IDEMPOTENCY_HEADER} was already used for a different request"
+            )
+        logger.info("idempotency.response.replayed", key=key)
+        return stored.replay()
+
+    async def dispatch(
+        self, request: Request, call_next: RequestResponseEndpoint
+    ) -> Response:
+        header = request.headers.get(IDEMPOTENCY_HEADER)
+        if header is None or request.method not in self.methods:
+            return await call_next(request)
+        if not header or len(header) > MAX_KEY_LENGTH:
+            return _problem(
+                400, f"{IDEMPOTENCY_HEADER} must be 1-{MAX_KEY_LENGTH} characters"
+            )
+        key = scoped_key(caller_identity(request), header)
+        request_hash = request_fingerprint(
+            request.method, request.url.path, request.url.query, await request.body()
+        )
+        stored = self._cached(key)
+        if stored is None and (waiter := self._inflight.get(key)) is not None:
+            stored = await self._wait_local(waiter)
+        if stored is not None:
+            return self._replay(key, stored, request_hash)
+
+        # Registered before the first await so local duplicates find it.
+        future: asyncio.Future[StoredResponse | None] = (
+            asyncio.get_running_loop().create_future()
+        )
+        self._inflight[key] = future
+        try:
+            try:
+                stored = await self._acquire(key, request_hash)
+            except TimeoutError:
+                return _problem(
+                    409, f"A request with this {IDEMPOTENCY_HEADER} is still running"
+                )
+            if stored is not None:
+                self.cache.set(key, stored)
+                return self._replay(key, stored, request_hash)
+            return await self._execute(key, request_hash, request, call_next, future)
+        finally:
+            if not future.done():
+                future.set_result(None)
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    async def _execute(
+        self,
+        key: str,
+        request_hash: str,
+        request: Request,
+        call_next: RequestResponseEndpoint,
+        future: asyncio.Future[StoredResponse | None],
+    ) -> Response:
+        try:
+            async with self._holding(key):
+                response = await call_next(request)
+                body = b"".join([chunk async for chunk in response.body_iterator])  # type: ignore[attr-defined]
+        except BaseException:
+            await self._release(key)
+            raise
+        headers = tuple(
+            (name.decode("latin-1"), value.decode("latin-1"))
+            for name, value in response.raw_headers
+            if name.decode("latin-1") not in _SKIPPED_HEADERS
+        )
+        if response.status_code >= 500:
+            await self._release(key)
+        else:
+            stored = StoredResponse(
+                request_hash,
+                response.status_code,
+                tuple(
+                    header for header in headers if header[0] not in _SESSION_HEADERS
+                ),
+                body,
+                utcnow() + timedelta(seconds=self.ttl),
+            )
+            try:
+                async with self.session_factory() as session, session.begin():
+                    await save_response(session, key, stored)
+            except Exception:
+                logger.error("idempotency.response.save_failed", key=key, exc_info=True)
+                await self._release(key)
+            else:
+                self.cache.set(key, stored)
+                future.set_result(stored)
+        return _build_response(response.status_code, headers, body)
+
+
+class IdempotencyPurger:
+    """Delete expired idempotency keys every ``interval`` seconds."""
+
+    def __init__(
+        self, session_factory: async_sessionmaker[AsyncSession], interval: float
+    ) -> None:
+        self.session_factory = session_factory
+        self.interval = interval
+        self._task: asyncio.Task[None] | None = None
+
+    async def purge(self) -> int:
+        async with self.session_factory() as session, session.begin():
+            count = await purge_expired(session)
+        if count:
+            logger.info("idempotency.keys.purged", count=count)
+        return count
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.purge()
+            except Exception:
+                logger.error("idempotency.keys.purge_failed", exc_info=True)
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="idempotency-purger")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
@@ -0,0 +1,217 @@
+"""SQLAlchemy query instrumentation.
+
+Attaches cursor-execute listeners to an engine and records, per statement:
+duration, row count and a normalized fingerprint (literals and bind
+parameters replaced by ``?``). Totals are attributed to the current request
+through a ContextVar that RequestLoggingMiddleware opens per request, and
+appear in the ``request.completed`` event as ``db_query_count`` and
+``db_time_seconds``.
+
+Events:
+    database.query.executed           — every statement (DEBUG, opt-in; free
+                                         unless LOG_LEVEL=DEBUG)
+    database.query.slow               — statement above the slow threshold
+    database.query.n_plus_one_detected — same fingerprint repeated N times
+                                         within one request
+
+Inside a sampled trace each statement is also recorded as a ``db.query``
+span (see app.core.tracing).
+
+Usage:
+
+    from app.core.instrumentation import instrument_engine
+    thresholds = instrument_engine(engine, slow_threshold=0.5)
+
+The returned QueryThresholds are read on every statement, so updating them
+(e.g. from a settings reload) takes effect immediately.
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any
+
+from sqlalchemy import event
+from sqlalchemy.engine import Connection, Engine, ExecutionContext
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.logging import get_logger, is_enabled_for
+from app.core.tracing import Span, tracer
+
+logger = get_logger("app.core.instrumentation")
+
+_START_KEY = "instrumentation.query_start"
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_BIND_PARAM = re.compile(r"\$\d+|%\(\w+\)s|%s|(?<!:):\w+|\?")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=1024)
+def fingerprint(statement: str) -> str:
+    """Return ``statement`` with literals and parameters collapsed to ``?``.
+
+    ``IN (?, ?, ?)`` lists collapse to ``(...)`` so that queries differing
+    only in list length share one fingerprint.
+    """
+    normalized = _STRING_LITERAL.sub("?", statement)
+    normalized = _BIND_PARAM.sub("?", normalized)
+    normalized = _NUMBER_LITERAL.sub("?", normalized)
+    normalized = _IN_LIST.sub("(...)", normalized)
+    return _WHITESPACE.sub(" ", normalized).strip()
+
+
+@dataclass
+class QueryThresholds:
+    """Live-adjustable limits for slow-query and N+1 reporting."""
+
+    slow_seconds: float
+    n_plus_one: int
+
+
+class QueryStats:
+    """Per-request query count, DB time, fingerprints and transaction retries."""
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total_seconds = 0.0
+        self.retries = 0
+        self.fingerprints: Counter[str] = Counter()
+        self.flagged: set[str] = set()
+
+    def add(self, statement_fingerprint: str, seconds: float) -> int:
+        """Record one statement and return how often its fingerprint ran."""
+        self.count += 1
+        self.total_seconds += seconds
+        self.fingerprints[statement_fingerprint] += 1
+        return self.fingerprints[statement_fingerprint]
+
+
+_query_stats_var: ContextVar[QueryStats | None] = ContextVar(
+    "query_stats", default=None
+)
+
+
+def start_query_stats() -> QueryStats:
+    """Install a fresh QueryStats collector for the current request."""
+    stats = QueryStats()
+    _query_stats_var.set(stats)
+    return stats
+
+
+def get_query_stats() -> QueryStats | None:
+    """Return the current request's QueryStats, or None outside a request."""
+    return _query_stats_var.get()
+
+
+def instrument_engine(
+    engine: AsyncEngine | Engine,
+    *,
+    slow_threshold: float = 0.5,
+    n_plus_one_threshold: int = 10,
+    log_statements: bool = False,
+) -> QueryThresholds:
+    """Attach query timing listeners to ``engine`` and return their thresholds.
+
+    Args:
+        engine: Async or sync engine; async engines are instrumented through
+            their underlying ``sync_engine``.
+        slow_threshold: Seconds above which ``database.query.slow`` is logged.
+        n_plus_one_threshold: Repetitions of one fingerprint within a request
+            that trigger ``database.query.n_plus_one_detected``. 0 disables.
+        log_statements: Log every statement at DEBUG (development replacement
+            for ``echo=True``).
+    """
+    sync_engine = engine.sync_engine if isinstance(engine, AsyncEngine) else engine
+    thresholds = QueryThresholds(
+        slow_seconds=slow_threshold, n_plus_one=n_plus_one_threshold
+    )
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before_cursor_execute(
+        conn: Connection,
+        cursor: Any,  # noqa: ANN401
+        statement: str,
+        parameters: Any,  # noqa: ANN401
+        context: ExecutionContext | None,
+        executemany: bool,
+    ) -> None:
+        query_span = tracer.start_child("db.query")
+        conn.info.setdefault(_START_KEY, []).append((time.perf_counter(), query_span))
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after_cursor_execute(
+        conn: Connection,
+        cursor: Any,  # noqa: ANN401
+        statement: str,
+        parameters: Any,  # noqa: ANN401
+        context: ExecutionContext | None,
+        executemany: bool,
+    ) -> None:
+        starts: list[tuple[float, Span | None]] = conn.info.get(_START_KEY, [])
+        if not starts:
+            return
+        started, query_span = starts.pop()
+        duration = time.perf_counter() - started
+        statement_fingerprint = fingerprint(statement)
+        rowcount: int = getattr(cursor, "rowcount", -1)
+        if query_span is not None:
+            query_span.attributes.update(
+                {"db.statement": statement_fingerprint, "db.rowcount": rowcount}
+            )
+            query_span.end()
+
+        # Skips the event dict entirely unless LOG_LEVEL is DEBUG.
+        if log_statements and is_enabled_for(logging.DEBUG):
+            logger.debug(
+                "database.query.executed",
+                statement=statement_fingerprint,
+                duration_seconds=round(duration, 6),
+                rowcount=rowcount,
+                executemany=executemany,
+            )
+        if duration >= thresholds.slow_seconds:
+            logger.warning(
+                "database.query.slow",
+                statement=statement_fingerprint,
+                duration_seconds=round(duration, 6),
+                rowcount=rowcount,
+                threshold_seconds=thresholds.slow_seconds,
+            )
+
+        stats = _query_stats_var.get()
+        if stats is None:
+            return
+        repeats = stats.add(statement_fingerprint, duration)
+        if (
+            thresholds.n_plus_one
+            and repeats >= thresholds.n_plus_one
+            and statement_fingerprint not in stats.flagged
+        ):
+            stats.flagged.add(statement_fingerprint)
+            logger.warning(
+                "database.query.n_plus_one_detected",
+                statement=statement_fingerprint,
+                repeats=repeats,
+            )
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _handle_error(exception_context: Any) -> None:  # noqa: ANN401
+        conn = exception_context.connection
+        if conn is not None:
+            starts: list[tuple[float, Span | None]] = conn.info.get(_START_KEY, [])
+            if starts:
+                _, query_span = starts.pop()
+                if query_span is not None:
+                    query_span.status = "error"
+                    query_span.end()
+
+    return thresholds
@@ -0,0 +1,290 @@
+"""Cross-worker cache invalidation over Postgres LISTEN/NOTIFY.
+
+Every worker holds one dedicated asyncpg connection (outside the engine
+pool) that LISTENs on CACHE_INVALIDATION_CHANNEL. Writers publish
+invalidations inside their transaction; Postgres delivers them to every
+listener, including the publishing worker, only if the transaction
+commits:
+
+    from app.core.invalidation import LocalCache, invalidation, publish_invalidation
+
+    notes_cache: LocalCache[NoteRead] = invalidation.register(LocalCache("notes"))
+
+    async def update_note(db: AsyncSession = Depends(get_db)) -> ...:
+        ...
+        await publish_invalidation(db, "notes", [str(note.id)])
+        await db.commit()
+
+Messages arriving within CACHE_INVALIDATION_COALESCE_MS are merged before
+they are applied, so a burst of writes costs each cache one pass. If the
+listener connection drops it reconnects with exponential backoff and
+clears every registered cache on reconnect, since notifications sent while
+disconnected are lost.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import json
+from collections import OrderedDict
+from collections.abc import Iterable
+from typing import Any, Protocol
+
+import asyncpg
+from sqlalchemy import make_url, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.logging import get_logger
+
+logger = get_logger("app.core.invalidation")
+
+DEFAULT_CHANNEL = "cache_invalidation"
+# NOTIFY payloads must stay under 8000 bytes.
+_MAX_PAYLOAD_BYTES = 7900
+# Past this many distinct keys in one window, clearing is cheaper.
+_MAX_PENDING_KEYS = 1000
+
+
+class InvalidatableCache(Protocol):
+    name: str
+
+    def invalidate(self, keys: Iterable[str]) -> None: ...
+
+    def clear(self) -> None: ...
+
+
+class LocalCache[V]:
+    """Bounded in-process LRU cache invalidated by the listener."""
+
+    def __init__(self, name: str, max_entries: int = 1024) -> None:
+        self.name = name
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, V] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> V | None:
+        value = self._entries.get(key)
+        if value is not None:
+            self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: V) -> None:
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, keys: Iterable[str]) -> None:
+        for key in keys:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+def _payloads(cache: str, keys: list[str] | None) -> list[str]:
+    """Encode one invalidation, split so each payload fits a NOTIFY."""
+    if keys is None:
+        return [json.dumps({"cache": cache})]
+    payloads: list[str] = []
+    chunk: list[str] = []
+    for key in keys:
+        candidate = json.dumps({"cache": cache, "keys": [*chunk, key]})
+        if chunk and len(candidate.encode()) > _MAX_PAYLOAD_BYTES:
+            payloads.append(json.dumps({"cache": cache, "keys": chunk}))
+            chunk = []
+        chunk.append(key)
+    if chunk:
+        payloads.append(json.dumps({"cache": cache, "keys": chunk}))
+    return payloads
+
+
+async def publish_invalidation(
+    session: AsyncSession,
+    cache: str,
+    keys: Iterable[str] | None = None,
+    *,
+    channel: str | None = None,
+) -> None:
+    """Invalidate ``keys`` (or the whole cache) in every worker on commit."""
+    channel = channel or invalidation.channel
+    key_list = None if keys is None else list(dict.fromkeys(keys))
+    if key_list == []:
+        return
+    for payload in _payloads(cache, key_list):
+        await session.execute(
+            text("SELECT pg_notify(:channel, :payload)"),
+            {"channel": channel, "payload": payload},
+        )
+
+
+class InvalidationListener:
+    """Dedicated LISTEN connection that fans invalidations out to caches."""
+
+    def __init__(
+        self,
+        *,
+        channel: str = DEFAULT_CHANNEL,
+        coalesce_window: float = 0.05,
+        keepalive_interval: float = 30.0,
+        reconnect_initial: float = 0.5,
+        reconnect_max: float = 30.0,
+    ) -> None:
+        self.channel = channel
+        self.coalesce_window = coalesce_window
+        self.keepalive_interval = keepalive_interval
+        self.reconnect_initial = reconnect_initial
+        self.reconnect_max = reconnect_max
+        self.connected = False
+        self._established = False
+        self._caches: dict[str, InvalidatableCache] = {}
+        # cache name -> keys to drop, or None to clear the whole cache
+        self._pending: dict[str, set[str] | None] = {}
+        self._flush_handle: asyncio.TimerHandle | None = None
+        self._task: asyncio.Task[None] | None = None
+
+    def configure(self, *, channel: str, coalesce_window: float) -> None:
+        self.channel = channel
+        self.coalesce_window = coalesce_window
+
+    def register[C: InvalidatableCache](self, cache: C) -> C:
+        """Register a local cache by name and return it."""
+        self._caches[cache.name] = cache
+        return cache
+
+    def _on_notification(
+        self,
+        connection: Any,  # noqa: ANN401
+        pid: int,
+        channel: str,
+        payload: str,
+    ) -> None:
+        try:
+            message = json.loads(payload)
+            cache = message["cache"]
+        except (ValueError, KeyError, TypeError):
+            logger.warning("cache.invalidation.payload_invalid", payload=payload[:200])
+            return
+        if cache not in self._caches:
+            return
+        keys = message.get("keys")
+        pending = self._pending.get(cache, set())
+        if keys is None or pending is None:
+            self._pending[cache] = None
+        else:
+            pending.update(keys)
+            self._pending[cache] = None if len(pending) > _MAX_PENDING_KEYS else pending
+        if self._flush_handle is None:
+            loop = asyncio.get_running_loop()
+            self._flush_handle = loop.call_later(self.coalesce_window, self.flush)
+
+    def flush(self) -> None:
+        """Apply every pending invalidation now."""
+        self._flush_handle = None
+        pending, self._pending = self._pending, {}
+        for name, keys in pending.items():
+            cache = self._caches[name]
+            if keys is None:
+                cache.clear()
+            else:
+                cache.invalidate(keys)
+        if pending:
+            logger.debug(
+                "cache.invalidation.applied",
+                caches=sorted(pending),
+                cleared=sorted(name for name, keys in pending.items() if keys is None),
+            )
+
+    def resync(self) -> None:
+        """Clear every cache; used when notifications may have been missed."""
+        self._pending.clear()
+        for cache in self._caches.values():
+            cache.clear()
+        logger.info("cache.invalidation.resynced", caches=sorted(self._caches))
+
+    async def _listen(self, dsn: str) -> None:
+        connection = await asyncpg.connect(dsn)
+        closed = asyncio.Event()
+        connection.add_termination_listener(lambda _: closed.set())
+        try:
+            await connection.add_listener(self.channel, self._on_notification)
+            self.connected = self._established = True
+            self.resync()
+            logger.info("cache.listener.connected", channel=self.channel)
+            while not closed.is_set():
+                with contextlib.suppress(TimeoutError):
+                    await asyncio.wait_for(closed.wait(), self.keepalive_interval)
+                if not closed.is_set():
+                    # Detects half-open TCP connections the server never closed.
+                    await asyncio.wait_for(
+                        connection.fetchval("SELECT 1"), self.keepalive_interval
+                    )
+            raise ConnectionResetError("listener connection closed")
+        finally:
+            self.connected = False
+            if not connection.is_closed():
+                connection.terminate()
+
+    def _retry_delay(self, delay: float) -> float:
+        # Back off from the start again after a connection that worked.
+        if self._established:
+            self._established = False
+            return self.reconnect_initial
+        return delay
+
+    async def _run(self, dsn: str) -> None:
+        delay = self.reconnect_initial
+        while True:
+            try:
+                await self._listen(dsn)
+            # InterfaceError covers ConnectionDoesNotExistError, which is what
+            # a connection dropped mid-query usually raises.
+            except (
+                OSError,
+                TimeoutError,
+                asyncpg.PostgresError,
+                asyncpg.InterfaceError,
+            ):
+                delay = self._retry_delay(delay)
+                logger.warning(
+                    "cache.listener.connection_lost",
+                    retry_in_seconds=delay,
+                    exc_info=True,
+                )
+            except Exception:
+                # A bug, but a dead listener would leave every cache stale
+                # for good: log it and keep reconnecting.
+                delay = self._retry_delay(delay)
+                logger.error(
+                    "cache.listener.failed", retry_in_seconds=delay, exc_info=True
+                )
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.reconnect_max)
+
+    def start(self, database_url: str) -> None:
+        """Connect and listen in the background until stop()."""
+        if self._task is not None:
+            return
+        # asyncpg takes a plain libpq URL, not SQLAlchemy's "+asyncpg" form.
+        dsn = make_url(database_url).set(drivername="postgresql")
+        self._task = asyncio.create_task(
+            self._run(dsn.render_as_string(hide_password=False)),
+            name="cache-invalidation-listener",
+        )
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        self._pending.clear()
+
+
+invalidation = InvalidationListener()
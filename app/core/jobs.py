@@ -0,0 +1,495 @@
+"""Postgres-backed background job queue with an asyncio worker pool.
+
+Work that does not need to finish inside the request is enqueued in the
+caller's transaction, so the job only becomes visible if the request's own
+writes commit:
+
+    from app.core.jobs import enqueue, job_task
+
+    @job_task("notes.reindex")
+    async def reindex(payload: dict[str, Any]) -> None:
+        ...
+
+    async def create_note(db: AsyncSession = Depends(get_db)) -> ...:
+        db.add(note)
+        await enqueue(db, "notes.reindex", {"note_id": note.id}, priority=5)
+        await db.commit()
+
+Workers claim batches with ``UPDATE ... WHERE id IN (SELECT ... FOR UPDATE
+SKIP LOCKED)``, so concurrent workers never block on or double-claim the
+same rows. Higher ``priority`` runs first, then oldest ``run_at``. A claimed
+job holds no connection while its handler runs; the result is recorded in a
+separate short transaction.
+
+Failed jobs are retried with exponential backoff and jitter until
+``max_attempts``; jobs left ``running`` by a crashed worker are requeued
+after twice JOBS_TIMEOUT_SECONDS. Delivery is at-least-once, so handlers
+must be idempotent.
+
+The pool runs inside the API process when JOBS_WORKER_ENABLED is set, or
+standalone:
+
+    uv run python -m app.core.jobs
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import signal
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from enum import StrEnum
+from typing import Any
+
+import sqlalchemy as sa
+from sqlalchemy import case, func, select, update
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.core.database import Base
+from app.core.logging import get_logger
+from app.core.retry import retry_delay
+from app.core.tracing import activate, tracer
+from app.shared.models import TimestampMixin
+from app.shared.utils import utcnow
+
+logger = get_logger("app.core.jobs")
+
+JobHandler = Callable[[dict[str, Any]], Awaitable[None]]
+
+_handlers: dict[str, JobHandler] = {}
+
+
+class JobStatus(StrEnum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
+class Job(TimestampMixin, Base):
+    """One unit of background work."""
+
+    __tablename__ = "jobs"
+    __table_args__ = (
+        # Covers the dequeue query; finished rows never enter the index.
+        sa.Index(
+            "ix_jobs_dequeue",
+            "queue",
+            sa.text("priority DESC"),
+            "run_at",
+            "id",
+            postgresql_where=sa.text("status = 'queued'"),
+        ),
+    )
+
+    id: Mapped[int] = mapped_column(sa.BigInteger, primary_key=True)
+    queue: Mapped[str] = mapped_column(sa.String(64), default="default")
+    task: Mapped[str] = mapped_column(sa.String(128))
+    payload: Mapped[dict[str, Any]] = mapped_column(
+        sa.JSON().with_variant(JSONB(), "postgresql"), default=dict
+    )
+    priority: Mapped[int] = mapped_column(sa.SmallInteger, default=0)
+    status: Mapped[str] = mapped_column(sa.String(16), default=JobStatus.QUEUED)
+    attempts: Mapped[int] = mapped_column(sa.SmallInteger, default=0)
+    max_attempts: Mapped[int] = mapped_column(sa.SmallInteger, default=3)
+    run_at: Mapped[datetime] = mapped_column(
+        sa.DateTime(timezone=True), server_default=func.now()
+    )
+    locked_at: Mapped[datetime | None] = mapped_column(sa.DateTime(timezone=True))
+    last_error: Mapped[str | None] = mapped_column(sa.Text)
+
+
+@dataclass(frozen=True, slots=True)
+class ClaimedJob:
+    """Plain copy of a claimed row, safe to use after its session closes."""
+
+    id: int
+    task: str
+    payload: dict[str, Any]
+    priority: int
+    attempts: int
+    max_attempts: int
+
+
+def job_task(name: str) -> Callable[[JobHandler], JobHandler]:
+    """Register an async handler for jobs enqueued under ``name``."""
+
+    def decorator(handler: JobHandler) -> JobHandler:
+        if name in _handlers and _handlers[name] is not handler:
+            raise ValueError(f"Job task {name!r} is already registered")
+        _handlers[name] = handler
+        return handler
+
+    return decorator
+
+
+async def enqueue(
+    session: AsyncSession,
+    task: str,
+    payload: dict[str, Any] | None = None,
+    *,
+    priority: int = 0,
+    queue: str = "default",
+    delay_seconds: float = 0.0,
+    max_attempts: int = 3,
+) -> int:
+    """Add a job in the session's transaction and return its id.
+
+    The job is only visible to workers once the caller commits.
+    """
+    job = Job(
+        task=task,
+        payload=payload or {},
+        priority=priority,
+        queue=queue,
+        max_attempts=max_attempts,
+    )
+    if delay_seconds > 0:
+        job.run_at = utcnow() + timedelta(seconds=delay_seconds)
+    session.add(job)
+    await session.flush()
+    return job.id
+
+
+def claim_statement(queue: str, limit: int) -> sa.Update:
+    """Mark up to ``limit`` due jobs as running and return them."""
+    claimable = (
+        select(Job.id)
+        .where(
+            Job.queue == queue,
+            Job.status == JobStatus.QUEUED,
+            Job.run_at <= func.now(),
+        )
+        .order_by(Job.priority.desc(), Job.run_at, Job.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    return (
+        update(Job)
+        .where(Job.id.in_(claimable.scalar_subquery()))
+        .values(
+            status=JobStatus.RUNNING,
+            attempts=Job.attempts + 1,
+            locked_at=func.now(),
+        )
+        .returning(
+            Job.id,
+            Job.task,
+            Job.payload,
+            Job.priority,
+            Job.attempts,
+            Job.max_attempts,
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def claim(session: AsyncSession, queue: str, limit: int) -> list[ClaimedJob]:
+    """Claim a batch of jobs, highest priority first; the caller commits."""
+    result = await session.execute(claim_statement(queue, limit))
+    jobs = [ClaimedJob(*row) for row in result.all()]
+    jobs.sort(key=lambda job: -job.priority)
+    return jobs
+
+
+async def mark_succeeded(session: AsyncSession, job_id: int) -> None:
+    await session.execute(
+        update(Job)
+        .where(Job.id == job_id)
+        .values(status=JobStatus.SUCCEEDED, locked_at=None, last_error=None)
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def mark_failed(
+    session: AsyncSession, job: ClaimedJob, error: str, retry_in: float | None
+) -> None:
+    """Requeue the job ``retry_in`` seconds from now, or fail it for good."""
+    values: dict[str, Any] = {"locked_at": None, "last_error": error}
+    if retry_in is None:
+        values["status"] = JobStatus.FAILED
+    else:
+        values["status"] = JobStatus.QUEUED
+        values["run_at"] = func.now() + timedelta(seconds=retry_in)
+    await session.execute(
+        update(Job)
+        .where(Job.id == job.id)
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def requeue_stale(session: AsyncSession, older_than: float) -> int:
+    """Release jobs whose worker died mid-run; returns how many were found."""
+    result = await session.execute(
+        update(Job)
+        .where(
+            Job.status == JobStatus.RUNNING,
+            Job.locked_at < func.now() - timedelta(seconds=older_than),
+        )
+        .values(
+            status=case(
+                (Job.attempts < Job.max_attempts, JobStatus.QUEUED),
+                else_=JobStatus.FAILED,
+            ),
+            locked_at=None,
+            last_error="worker lost while running",
+        )
+        .returning(Job.id)
+        .execution_options(synchronize_session=False)
+    )
+    return len(result.all())
+
+
+@dataclass(slots=True)
+class JobMetrics:
+    """Throughput counters for one worker pool."""
+
+    succeeded: int = 0
+    retried: int = 0
+    failed: int = 0
+    busy_seconds: float = 0.0
+    started: float = field(default_factory=time.monotonic)
+
+    @property
+    def processed(self) -> int:
+        return self.succeeded + self.retried + self.failed
+
+    def snapshot(self) -> dict[str, float]:
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        processed = self.processed
+        return {
+            "processed": processed,
+            "succeeded": self.succeeded,
+            "retried": self.retried,
+            "failed": self.failed,
+            "jobs_per_second": round(processed / elapsed, 2),
+            "mean_duration_seconds": round(self.busy_seconds / processed, 4)
+            if processed
+            else 0.0,
+        }
+
+
+class WorkerPool:
+    """Claim jobs in batches and run up to ``concurrency`` handlers at once."""
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        *,
+        concurrency: int = 4,
+        batch_size: int = 10,
+        poll_interval: float = 1.0,
+        queue: str = "default",
+        timeout: float = 300.0,
+        retry_backoff: float = 5.0,
+        grace: float = 10.0,
+        metrics_interval: float = 60.0,
+    ) -> None:
+        self.session_factory = session_factory
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.queue = queue
+        self.timeout = timeout
+        self.retry_backoff = retry_backoff
+        self.grace = grace
+        self.metrics_interval = metrics_interval
+        self.metrics = JobMetrics()
+        self._running: set[asyncio.Task[None]] = set()
+        self._loop_task: asyncio.Task[None] | None = None
+        self._stopping: asyncio.Event | None = None
+
+    async def _claim_batch(self, limit: int) -> list[ClaimedJob]:
+        async with self.session_factory() as session, session.begin():
+            return await claim(session, self.queue, limit)
+
+    async def _requeue_stale(self) -> None:
+        async with self.session_factory() as session, session.begin():
+            count = await requeue_stale(session, older_than=self.timeout * 2)
+        if count:
+            logger.warning("jobs.worker.stale_requeued", count=count)
+
+    async def _record(self, job: ClaimedJob, error: BaseException | None) -> None:
+        if error is None:
+            async with self.session_factory() as session, session.begin():
+                await mark_succeeded(session, job.id)
+            self.metrics.succeeded += 1
+            return
+        retryable = job.task in _handlers and job.attempts < job.max_attempts
+        retry_in = retry_delay(job.attempts, self.retry_backoff) if retryable else None
+        async with self.session_factory() as session, session.begin():
+            await mark_failed(
+                session, job, f"{type(error).__name__}: {error}", retry_in
+            )
+        if retry_in is None:
+            self.metrics.failed += 1
+            logger.error(
+                "jobs.job.failed",
+                job_id=job.id,
+                task=job.task,
+                attempts=job.attempts,
+                exc_info=error,
+            )
+        else:
+            self.metrics.retried += 1
+            logger.warning(
+                "jobs.job.retry_scheduled",
+                job_id=job.id,
+                task=job.task,
+                attempts=job.attempts,
+                retry_in_seconds=round(retry_in, 2),
+                error=str(error),
+            )
+
+    async def _execute(self, job: ClaimedJob) -> None:
+        start = time.perf_counter()
+        error: BaseException | None = None
+        try:
+            handler = _handlers.get(job.task)
+            if handler is None:
+                raise LookupError(f"No handler registered for job task {job.task!r}")
+            root = tracer.start_root(f"job {job.task}", None)
+            with activate(root):
+                if root is not None:
+                    root.attributes.update(
+                        {"job.id": job.id, "job.attempt": job.attempts}
+                    )
+                async with asyncio.timeout(self.timeout):
+                    await handler(job.payload)
+        except Exception as exc:
+            error = exc
+        duration = time.perf_counter() - start
+        self.metrics.busy_seconds += duration
+        logger.debug(
+            "jobs.job.completed",
+            job_id=job.id,
+            task=job.task,
+            succeeded=error is None,
+            duration_seconds=round(duration, 4),
+        )
+        try:
+            await self._record(job, error)
+        except Exception:
+            # The row stays "running" and is requeued as stale later.
+            logger.error("jobs.job.ack_failed", job_id=job.id, exc_info=True)
+
+    def _spawn(self, job: ClaimedJob) -> None:
+        task = asyncio.create_task(self._execute(job), name=f"job-{job.id}")
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+
+    async def _idle(self, stopping: asyncio.Event) -> None:
+        with contextlib.suppress(TimeoutError):
+            await asyncio.wait_for(stopping.wait(), self.poll_interval)
+
+    async def _run(self, stopping: asyncio.Event) -> None:
+        last_report = last_stale_check = time.monotonic()
+        # Waited on with running jobs when every slot is busy, so that
+        # stop() takes effect without waiting for a job to finish.
+        stopped = asyncio.create_task(stopping.wait())
+        try:
+            while not stopping.is_set():
+                now = time.monotonic()
+                if now - last_report >= self.metrics_interval:
+                    logger.info(
+                        "jobs.worker.metrics_reported", **self.metrics.snapshot()
+                    )
+                    last_report = now
+                free = self.concurrency - len(self._running)
+                if free <= 0:
+                    await asyncio.wait(
+                        {*self._running, stopped}, return_when=asyncio.FIRST_COMPLETED
+                    )
+                    continue
+                limit = min(free, self.batch_size)
+                try:
+                    if now - last_stale_check >= self.timeout:
+                        last_stale_check = now
+                        await self._requeue_stale()
+                    jobs = await self._claim_batch(limit)
+                except Exception:
+                    logger.error("jobs.worker.claim_failed", exc_info=True)
+                    await self._idle(stopping)
+                    continue
+                for job in jobs:
+                    self._spawn(job)
+                if len(jobs) < limit:
+                    await self._idle(stopping)
+        finally:
+            stopped.cancel()
+
+    async def start(self) -> None:
+        """Requeue stale jobs and start claiming in the background."""
+        if self._loop_task is not None:
+            return
+        try:
+            await self._requeue_stale()
+        except Exception:
+            logger.error("jobs.worker.claim_failed", exc_info=True)
+        self.metrics = JobMetrics()
+        self._stopping = asyncio.Event()
+        self._loop_task = asyncio.create_task(
+            self._run(self._stopping), name="job-worker"
+        )
+        logger.info(
+            "jobs.worker.started",
+            queue=self.queue,
+            concurrency=self.concurrency,
+            batch_size=self.batch_size,
+        )
+
+    async def stop(self) -> None:
+        """Stop claiming, give running jobs ``grace`` seconds, cancel the rest.
+
+        Cancelled jobs stay ``running`` and are requeued as stale later.
+        """
+        if self._loop_task is None or self._stopping is None:
+            return
+        self._stopping.set()
+        await self._loop_task
+        self._loop_task = None
+        if self._running:
+            _, pending = await asyncio.wait(self._running, timeout=self.grace)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+        logger.info("jobs.worker.stopped", **self.metrics.snapshot())
+
+
+async def run_worker() -> None:
+    """Run a standalone worker pool until SIGINT/SIGTERM."""
+    # Importing the app registers the same @job_task handlers as the API.
+    import app.main  # noqa: F401
+    from app.core.config import get_settings
+    from app.core.database import AsyncSessionLocal, engine
+    from app.core.logging import setup_logging
+
+    settings = get_settings()
+    setup_logging(log_level=settings.log_level)
+    pool = WorkerPool(
+        AsyncSessionLocal,
+        concurrency=settings.jobs_concurrency,
+        batch_size=settings.jobs_batch_size,
+        poll_interval=settings.jobs_poll_interval_seconds,
+        timeout=settings.jobs_timeout_seconds,
+        retry_backoff=settings.jobs_retry_backoff_seconds,
+        grace=settings.shutdown_drain_timeout_seconds,
+    )
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    await pool.start()
+    await stop.wait()
+    await pool.stop()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(run_worker())
@@ -0,0 +1,210 @@
+"""In-flight request tracking and graceful shutdown.
+
+RequestLoggingMiddleware counts every request in ``in_flight``. On shutdown
+the ShutdownCoordinator runs these phases in order, logging each one as
+``application.shutdown.{phase}_completed`` with its duration:
+
+    readiness — /health/ready starts returning 503 ("draining")
+    drain     — wait up to SHUTDOWN_DRAIN_TIMEOUT_SECONDS for in-flight
+                requests to finish
+    stop_*    — stop background services, most recently registered first
+    pools     — close database pools
+    logs      — flush stdout and logging handlers
+
+Usage in lifespan:
+
+    shutdown_coordinator.configure(drain_timeout=10.0)
+    shutdown_coordinator.add_service("span_exporter", exporter.stop)
+    await shutdown_coordinator.run(close_pools=engine.dispose)
+
+uvicorn runs the lifespan shutdown only after it has closed its listeners
+and waited for open connections to finish. By then /health/ready cannot be
+polled and nothing is left in flight, so readiness and drain would do
+nothing there. GracefulServer runs them as soon as the exit signal arrives,
+while the sockets still accept. run() then skips them. Start the app with
+``serve()`` (``python -m app.main``) to get this; a plain ``uvicorn`` CLI
+run still shuts down cleanly, only without the early drain.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import socket
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+import uvicorn
+from uvicorn.supervisors import ChangeReload, Multiprocess
+
+from app.core.health import Readiness, readiness
+from app.core.logging import flush_logs, get_logger
+
+logger = get_logger("app.core.lifecycle")
+
+
+class InFlightRequests:
+    """Counter of requests currently being handled by this worker."""
+
+    def __init__(self, poll_interval: float = 0.05) -> None:
+        self.count = 0
+        self.poll_interval = poll_interval
+
+    def started(self) -> None:
+        self.count += 1
+
+    def finished(self) -> None:
+        self.count = max(self.count - 1, 0)
+
+    async def wait_idle(self, timeout: float) -> bool:
+        """Wait until no requests are in flight; False if ``timeout`` expired.
+
+        Polls rather than awaiting an Event so the module-level instance is
+        not bound to whichever event loop first waited on it.
+        """
+        deadline = time.monotonic() + timeout
+        while self.count > 0:
+            if time.monotonic() >= deadline:
+                return False
+            await asyncio.sleep(self.poll_interval)
+        return True
+
+
+in_flight = InFlightRequests()
+
+
+class ShutdownCoordinator:
+    """Flip readiness, drain in-flight requests, close pools, flush logs."""
+
+    def __init__(
+        self,
+        *,
+        drain_timeout: float,
+        readiness_delay: float = 0.0,
+        gate: Readiness = readiness,
+        requests: InFlightRequests = in_flight,
+    ) -> None:
+        self.drain_timeout = drain_timeout
+        self.readiness_delay = readiness_delay
+        self.gate = gate
+        self.requests = requests
+        self._services: list[tuple[str, Callable[[], Awaitable[None]]]] = []
+        self._drained = False
+
+    def configure(self, *, drain_timeout: float, readiness_delay: float = 0.0) -> None:
+        """Set the drain timings and forget services from a previous lifespan."""
+        self.drain_timeout = drain_timeout
+        self.readiness_delay = readiness_delay
+        self._services.clear()
+        self._drained = False
+
+    def add_service(self, name: str, stop: Callable[[], Awaitable[None]]) -> None:
+        """Register a background service stopped after draining, before pools."""
+        self._services.append((name, stop))
+
+    async def _phase(
+        self, name: str, action: Callable[[], Awaitable[None]], **fields: object
+    ) -> None:
+        start = time.perf_counter()
+        try:
+            await action()
+        except Exception:
+            logger.error(
+                f"application.shutdown.{name}_failed",
+                duration_seconds=round(time.perf_counter() - start, 3),
+                exc_info=True,
+            )
+            return
+        logger.info(
+            f"application.shutdown.{name}_completed",
+            duration_seconds=round(time.perf_counter() - start, 3),
+            **fields,
+        )
+
+    async def _flip_readiness(self) -> None:
+        self.gate.block("draining")
+        # Give load balancers polling /health/ready time to stop routing here.
+        if self.readiness_delay > 0:
+            await asyncio.sleep(self.readiness_delay)
+
+    async def _drain(self) -> None:
+        pending = self.requests.count
+        if not await self.requests.wait_idle(self.drain_timeout):
+            logger.warning(
+                "application.shutdown.drain_timed_out",
+                pending_requests=self.requests.count,
+                started_with=pending,
+                timeout_seconds=self.drain_timeout,
+            )
+
+    async def _flush_logs(self) -> None:
+        flush_logs()
+
+    async def drain(self) -> None:
+        """Flip readiness and drain in-flight requests; only the first call runs."""
+        if self._drained:
+            return
+        self._drained = True
+        await self._phase("readiness", self._flip_readiness)
+        await self._phase("drain", self._drain, in_flight_at_start=self.requests.count)
+
+    async def run(self, close_pools: Callable[[], Awaitable[None]]) -> None:
+        """Run all shutdown phases; a failing phase never skips later ones."""
+        start = time.perf_counter()
+        await self.drain()
+        for name, stop in reversed(self._services):
+            await self._phase(f"stop_{name}", stop)
+        await self._phase("pools", close_pools)
+        logger.info(
+            "application.shutdown.sequence_completed",
+            duration_seconds=round(time.perf_counter() - start, 3),
+        )
+        await self._phase("logs", self._flush_logs)
+
+
+shutdown_coordinator = ShutdownCoordinator(drain_timeout=10.0)
+
+
+class GracefulServer(uvicorn.Server):
+    """uvicorn Server that drains requests before it closes its sockets.
+
+    Drains ``shutdown_coordinator`` as looked up when shutdown starts, never
+    a stored reference: with reload or several workers uvicorn pickles
+    ``server.run`` into a spawned child, where a stored coordinator (and its
+    readiness gate and request counter) would be a copy nothing else uses.
+    """
+
+    async def _drain(self) -> None:
+        drain = asyncio.create_task(shutdown_coordinator.drain())
+        # A second Ctrl+C sets force_exit: stop waiting.
+        while not (drain.done() or self.force_exit):
+            await asyncio.wait({drain}, timeout=0.1)
+        drain.cancel()
+
+    async def shutdown(self, sockets: list[socket.socket] | None = None) -> None:
+        if not self.force_exit:
+            await self._drain()
+        await super().shutdown(sockets)
+
+
+def serve(app: str, **options: Any) -> None:  # noqa: ANN401
+    """``uvicorn.run`` with GracefulServer; ``options`` are uvicorn.Config's."""
+    config = uvicorn.Config(app, **options)
+    server = GracefulServer(config)
+    try:
+        if config.should_reload:
+            ChangeReload(
+                config, target=server.run, sockets=[config.bind_socket()]
+            ).run()
+        elif config.workers > 1:
+            Multiprocess(
+                config, target=server.run, sockets=[config.bind_socket()]
+            ).run()
+        else:
+            server.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if config.uds and os.path.exists(config.uds):
+            os.remove(config.uds)
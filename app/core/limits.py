@@ -0,0 +1,208 @@
+"""Request body size limits, enforced while the body streams in.
+
+FastAPI reads a JSON body whole before validating it, so without a cap a
+single large request can exhaust a worker's memory. BodyLimitMiddleware
+(added in setup_middleware) caps every request body:
+
+    - a Content-Length above the limit is rejected with 413 before any of
+      the body is read
+    - a body without one (chunked) is counted as it arrives, and reading it
+      fails with 413 as soon as it passes the limit
+
+The limit is REQUEST_MAX_BODY_BYTES unless the route sets its own:
+
+    @router.post("/import")
+    @max_body_size(10 * 1024 * 1024)
+    async def import_note(...) -> ...: ...
+
+REQUEST_BODY_LIMITS overrides both per path template, e.g.
+``{"/api/notes/import": 20971520}``.
+
+A route that accepts a large body should not hold it in memory either.
+stream_body() yields the body chunk by chunk. The spooled_upload
+dependency writes it to a temporary file, which stays in memory only up to
+UPLOAD_SPOOL_BYTES, and hashes it on the way:
+
+    async def import_note(upload: SpooledUpload = Depends(spooled_upload)):
+        text = upload.file.read()
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import tempfile
+from collections.abc import AsyncIterator, Callable, Mapping
+from dataclasses import dataclass
+from typing import IO, Any
+
+from fastapi import HTTPException, Request
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import get_settings
+from app.core.logging import get_logger
+
+logger = get_logger("app.core.limits")
+
+_LIMIT_ATTRIBUTE = "max_body_bytes"
+
+
+class BodyTooLargeError(HTTPException):
+    """Raised while reading a body that passed its limit; answered with 413."""
+
+    def __init__(self, limit: int) -> None:
+        super().__init__(status_code=413, detail=f"Request body exceeds {limit} bytes")
+        self.limit = limit
+
+
+def max_body_size[F: Callable[..., Any]](max_bytes: int) -> Callable[[F], F]:
+    """Set the body limit of a route; put it below the route decorator."""
+
+    def decorator(endpoint: F) -> F:
+        setattr(endpoint, _LIMIT_ATTRIBUTE, max_bytes)
+        return endpoint
+
+    return decorator
+
+
+class BodyLimitMiddleware:
+    """Reject request bodies over their route's limit with 413.
+
+    Pure ASGI rather than BaseHTTPMiddleware: it has to wrap ``receive``
+    to count the body as it is read.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        *,
+        max_bytes: int,
+        limits: Mapping[str, int] | None = None,
+    ) -> None:
+        self.app = app
+        self.max_bytes = max_bytes
+        self.limits = dict(limits or {})
+
+    def limit_for(self, scope: Scope) -> int:
+        """The limit of the route ``scope`` matches; the default if none does."""
+        router = getattr(scope.get("app"), "router", None)
+        for route in getattr(router, "routes", ()):
+            match, _ = route.matches(scope)
+            if match is Match.FULL:
+                path = getattr(route, "path", None)
+                if path in self.limits:
+                    return self.limits[path]
+                endpoint = getattr(route, "endpoint", None)
+                limit: int = getattr(endpoint, _LIMIT_ATTRIBUTE, self.max_bytes)
+                return limit
+        return self.max_bytes
+
+    async def _reject(
+        self, scope: Scope, receive: Receive, send: Send, error: BodyTooLargeError
+    ) -> None:
+        logger.warning(
+            "http.body.rejected",
+            method=scope["method"],
+            path=scope["path"],
+            limit_bytes=error.limit,
+        )
+        response = JSONResponse({"detail": error.detail}, status_code=413)
+        await response(scope, receive, send)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = Headers(scope=scope)
+        length = headers.get("content-length")
+        if (length is None or length == "0") and "transfer-encoding" not in headers:
+            # No body to count.
+            await self.app(scope, receive, send)
+            return
+        limit = self.limit_for(scope)
+        if length is not None and length.isdigit() and int(length) > limit:
+            await self._reject(scope, receive, send, BodyTooLargeError(limit))
+            return
+
+        received = 0
+        started = False
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    raise BodyTooLargeError(limit)
+            return message
+
+        async def tracking_send(message: Message) -> None:
+            nonlocal started
+            started = started or message["type"] == "http.response.start"
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracking_send)
+        except BodyTooLargeError as error:
+            # Routes answer it through the HTTPException handler; this
+            # catches reads outside them, such as a middleware's.
+            if started:
+                raise
+            await self._reject(scope, receive, send, error)
+
+
+async def stream_body(
+    request: Request, max_bytes: int | None = None
+) -> AsyncIterator[bytes]:
+    """Yield the request body as it arrives; 413 once it passes ``max_bytes``.
+
+    BodyLimitMiddleware already enforces the route's limit; ``max_bytes``
+    is for callers that want a tighter one.
+    """
+    received = 0
+    async for chunk in request.stream():
+        received += len(chunk)
+        if max_bytes is not None and received > max_bytes:
+            raise BodyTooLargeError(max_bytes)
+        if chunk:
+            yield chunk
+
+
+@dataclass(frozen=True, slots=True)
+class SpooledUpload:
+    """A request body in a temporary file, rewound to the start."""
+
+    file: IO[bytes]
+    size: int
+    sha256: str
+    content_type: str | None
+
+
+async def spooled_upload(request: Request) -> AsyncIterator[SpooledUpload]:
+    """FastAPI dependency: the body, spooled; the file is closed after the response.
+
+    Memory stays constant: chunks are written as they arrive and the file
+    moves to disk once it passes UPLOAD_SPOOL_BYTES. From then on each write
+    (the rollover included) runs in a thread, off the event loop.
+    """
+    spool_bytes = get_settings().upload_spool_bytes
+    digest = hashlib.sha256()
+    size = 0
+    with tempfile.SpooledTemporaryFile(max_size=spool_bytes) as file:
+        async for chunk in stream_body(request):
+            if size + len(chunk) > spool_bytes:
+                await asyncio.to_thread(file.write, chunk)
+            else:
+                file.write(chunk)
+            digest.update(chunk)
+            size += len(chunk)
+        file.seek(0)
+        yield SpooledUpload(
+            file=file,
+            size=size,
+            sha256=digest.hexdigest(),
+            content_type=request.headers.get("content-type"),
+        )
@@ -9,6 +9,13 @@ Examples:
     request.processing_failed
 
 States: _started, _completed, _failed, _validated, _rejected
+
+Module-level loggers are bound at import, before setup_logging() runs, and
+keep the processor chain they were bound with. So the chain is configured
+once, when this module is imported, and LOG_LEVEL is a module-level value
+its first processor reads: setup_logging() (including the SIGHUP reload)
+changes it for every logger. Check is_enabled_for() before building costly
+debug fields.
 """
 
 from __future__ import annotations
@@ -23,6 +30,10 @@ import structlog
 from structlog.typing import EventDict, WrappedLogger
 
 request_id_var: ContextVar[str] = ContextVar("request_id", default="")
+# (trace_id, span_id) of the active span, maintained by app.core.tracing.
+trace_context_var: ContextVar[tuple[str, str] | None] = ContextVar(
+    "trace_context", default=None
+)
 
 
 def set_request_id(request_id: str | None = None) -> str:
@@ -49,33 +60,93 @@ def _add_request_id(
     return event_dict
 
 
-def setup_logging(log_level: str = "INFO") -> None:
-    """Configure structlog globally with JSON output to stdout."""
-    numeric_level: int = int(getattr(logging, log_level.upper(), logging.INFO))
+def _add_trace_context(
+    logger: WrappedLogger,
+    method: str,
+    event_dict: EventDict,
+) -> EventDict:
+    """Inject trace_id and span_id while a sampled span is active."""
+    context = trace_context_var.get()
+    if context is not None:
+        event_dict["trace_id"], event_dict["span_id"] = context
+    return event_dict
 
-    processors: list[Any] = [
-        _add_request_id,
-        structlog.stdlib.add_log_level,
-        structlog.processors.TimeStamper(fmt="iso"),
-        structlog.processors.StackInfoRenderer(),
-        structlog.processors.ExceptionRenderer(),
-        structlog.processors.JSONRenderer(),
-    ]
 
+_METHOD_LEVELS = {
+    "debug": logging.DEBUG,
+    "info": logging.INFO,
+    "warning": logging.WARNING,
+    "warn": logging.WARNING,
+    "error": logging.ERROR,
+    "exception": logging.ERROR,
+    "critical": logging.CRITICAL,
+    "fatal": logging.CRITICAL,
+}
+_min_level = logging.INFO
+
+
+def is_enabled_for(level: int) -> bool:
+    """Whether events at ``level`` (e.g. ``logging.DEBUG``) are emitted."""
+    return level >= _min_level
+
+
+def _filter_by_level(
+    logger: WrappedLogger,
+    method: str,
+    event_dict: EventDict,
+) -> EventDict:
+    """Drop events below LOG_LEVEL before any other processor runs."""
+    if _METHOD_LEVELS.get(method, logging.CRITICAL) < _min_level:
+        raise structlog.DropEvent
+    return event_dict
+
+
+_PROCESSORS: list[Any] = [
+    _filter_by_level,
+    _add_request_id,
+    _add_trace_context,
+    structlog.stdlib.add_log_level,
+    structlog.processors.TimeStamper(fmt="iso"),
+    structlog.processors.StackInfoRenderer(),
+    structlog.processors.ExceptionRenderer(),
+    structlog.processors.JSONRenderer(),
+]
+
+
+def _configure_structlog() -> None:
     structlog.configure(
-        processors=processors,
+        processors=_PROCESSORS,
         wrapper_class=structlog.stdlib.BoundLogger,
         context_class=dict,
         logger_factory=structlog.PrintLoggerFactory(file=sys.stdout),
         cache_logger_on_first_use=False,
     )
 
+
+_configure_structlog()
+
+
+def setup_logging(log_level: str = "INFO") -> None:
+    """Configure structlog globally with JSON output to stdout at ``log_level``."""
+    global _min_level
+    numeric_level: int = int(getattr(logging, log_level.upper(), logging.INFO))
+    _min_level = numeric_level
+    # Again, in case something (e.g. structlog.testing) replaced the config.
+    _configure_structlog()
+
     root = logging.getLogger()
     root.setLevel(numeric_level)
     if not root.handlers:
         root.addHandler(logging.StreamHandler(sys.stdout))
 
 
+def flush_logs() -> None:
+    """Flush stdout and every root logging handler (used at shutdown)."""
+    sys.stdout.flush()
+    for handler in logging.getLogger().handlers:
+        handler.flush()
+
+
 def get_logger(name: str | None = None) -> structlog.stdlib.BoundLogger:
     """Return a typed structlog stdlib BoundLogger."""
     proxy = (
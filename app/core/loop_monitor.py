@@ -0,0 +1,192 @@
+"""Event-loop lag monitor with a blocking-call watchdog.
+
+A background task sleeps LOOP_MONITOR_INTERVAL_SECONDS at a time and
+records how late each wake-up is: the scheduling delay every coroutine in
+the worker is paying. Recent samples are summarized as percentiles at
+``GET /health/loop`` and logged as ``eventloop.lag.reported`` every
+LOOP_MONITOR_REPORT_INTERVAL_SECONDS.
+
+The task alone cannot say *what* blocked the loop: by the time it runs
+again the blocking call has returned. A watchdog thread therefore checks
+the task's heartbeat, and when no beat arrives for
+LOOP_MONITOR_BLOCK_THRESHOLD_SECONDS past the expected wake-up it captures
+the event-loop thread's stack while the call is still running and logs
+``eventloop.blocked`` with the innermost (offending) frame and the stack
+that led to it, once per stall.
+
+Started in the lifespan; the threshold follows settings reloads.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from types import FrameType
+
+from app.core.logging import get_logger
+
+logger = get_logger("app.core.loop_monitor")
+
+_STACK_LIMIT = 30
+
+
+def _format_frame(frame: traceback.FrameSummary) -> str:
+    return f"{frame.filename}:{frame.lineno} in {frame.name}"
+
+
+def _percentile(ordered: list[float], pct: float) -> float:
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class LoopLagMonitor:
+    """Measure scheduling delay on the running loop and watch for stalls."""
+
+    def __init__(
+        self,
+        *,
+        interval: float = 0.1,
+        threshold: float = 0.5,
+        window: int = 600,
+        report_interval: float = 60.0,
+    ) -> None:
+        self.interval = interval
+        self.threshold = threshold
+        self.report_interval = report_interval
+        self.blocked_events = 0
+        self._samples: deque[float] = deque(maxlen=window)
+        self._last_beat = time.monotonic()
+        self._loop_thread_id: int | None = None
+        self._task: asyncio.Task[None] | None = None
+        self._watchdog: threading.Thread | None = None
+        self._stopping = threading.Event()
+
+    def configure(
+        self, *, interval: float, threshold: float, report_interval: float
+    ) -> None:
+        self.interval = interval
+        self.threshold = threshold
+        self.report_interval = report_interval
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def record(self, lag: float) -> None:
+        self._samples.append(lag)
+
+    def percentiles(self) -> dict[str, float]:
+        """p50/p90/p99/max of recent lag samples, in seconds."""
+        ordered = sorted(self._samples)
+        if not ordered:
+            return {"p50": 0.0, "p90": 0.0, "p99": 0.0, "max": 0.0}
+        return {
+            "p50": round(_percentile(ordered, 50), 4),
+            "p90": round(_percentile(ordered, 90), 4),
+            "p99": round(_percentile(ordered, 99), 4),
+            "max": round(ordered[-1], 4),
+        }
+
+    def snapshot(self) -> dict[str, object]:
+        return {
+            "running": self.running,
+            "interval_seconds": self.interval,
+            "samples": len(self._samples),
+            "lag_seconds": self.percentiles(),
+            "blocked_events": self.blocked_events,
+        }
+
+    async def _measure(self) -> None:
+        loop = asyncio.get_running_loop()
+        last_report = loop.time()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            now = loop.time()
+            self._last_beat = time.monotonic()
+            self.record(max(now - expected, 0.0))
+            if now - last_report >= self.report_interval:
+                last_report = now
+                logger.info(
+                    "eventloop.lag.reported",
+                    blocked_events=self.blocked_events,
+                    **{
+                        f"lag_{name}_seconds": v
+                        for name, v in self.percentiles().items()
+                    },
+                )
+
+    def capture_stack(self) -> list[traceback.FrameSummary]:
+        """Current stack of the event-loop thread, outermost frame first."""
+        if self._loop_thread_id is None:
+            return []
+        frame: FrameType | None = sys._current_frames().get(self._loop_thread_id)
+        if frame is None:
+            return []
+        return list(traceback.extract_stack(frame, limit=_STACK_LIMIT))
+
+    def is_blocked(self) -> bool:
+        """True once the heartbeat is ``threshold`` seconds overdue."""
+        overdue = time.monotonic() - self._last_beat - self.interval
+        return overdue > self.threshold
+
+    def _report_blocked(self, beat: float) -> None:
+        stack = self.capture_stack()
+        self.blocked_events += 1
+        logger.warning(
+            "eventloop.blocked",
+            blocked_seconds=round(time.monotonic() - beat - self.interval, 3),
+            threshold_seconds=self.threshold,
+            frame=_format_frame(stack[-1]) if stack else None,
+            stack=[_format_frame(frame) for frame in reversed(stack)],
+        )
+
+    def _watch(self) -> None:
+        reported_beat: float | None = None
+        while not self._stopping.wait(max(min(self.threshold / 4, 0.1), 0.005)):
+            beat = self._last_beat
+            if beat == reported_beat or not self.is_blocked():
+                continue
+            # Once per stall: the next beat starts a new episode.
+            reported_beat = beat
+            try:
+                self._report_blocked(beat)
+            except Exception:
+                logger.error("eventloop.watchdog.failed", exc_info=True)
+
+    def start(self) -> None:
+        """Start measuring on the running loop and launch the watchdog."""
+        if self._task is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stopping.clear()
+        self._task = asyncio.create_task(self._measure(), name="loop-lag-monitor")
+        self._watchdog = threading.Thread(
+            target=self._watch, name="loop-watchdog", daemon=True
+        )
+        self._watchdog.start()
+        logger.info(
+            "eventloop.monitor.started",
+            interval_seconds=self.interval,
+            threshold_seconds=self.threshold,
+        )
+
+    async def stop(self) -> None:
+        self._stopping.set()
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        if self._watchdog is not None:
+            await asyncio.to_thread(self._watchdog.join)
+            self._watchdog = None
+
+
+loop_monitor = LoopLagMonitor()
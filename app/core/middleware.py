@@ -3,11 +3,31 @@
 Integrates with app.core.logging for structured JSON logging with
 request-ID correlation. Every request gets a unique ID that propagates
 through all log lines emitted during that request.
+
+Query counts and DB time recorded by app.core.instrumentation are included
+in ``request.completed``. When SERVER_TIMING_ENABLED is set, the per-phase
+breakdown collected by app.core.profiling is returned in a ``Server-Timing``
+response header.
+
+With DIAGNOSTICS_ENABLED, sampled requests also report
+``memory_allocated_bytes`` while tracemalloc is tracing (app.core.diagnostics).
+
+With IDEMPOTENCY_ENABLED, POST/PATCH requests carrying an Idempotency-Key
+pass through app.core.idempotency inside request logging, so replayed
+responses are logged like any other.
+
+Request bodies are capped by app.core.limits: per route, rejected early on
+Content-Length and otherwise while streaming. It runs inside request logging,
+so 413s are logged, and outside idempotency, which reads the body.
+
+Requests are counted in app.core.lifecycle.in_flight so shutdown can drain
+them before closing database pools.
 """
 
 from __future__ import annotations
 
 import time
+from typing import Any
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
@@ -16,7 +36,15 @@ from starlette.requests import Request
 from starlette.responses import Response
 
 from app.core.config import get_settings
+from app.core.database import AsyncSessionLocal
+from app.core.diagnostics import allocated_since, sample_allocations
+from app.core.idempotency import IdempotencyMiddleware
+from app.core.instrumentation import start_query_stats
+from app.core.lifecycle import in_flight
+from app.core.limits import BodyLimitMiddleware
 from app.core.logging import get_logger, get_request_id, set_request_id
+from app.core.profiling import ProfilingMiddleware, start_request_timings
+from app.core.tracing import TracingMiddleware
 
 logger = get_logger("app.core.middleware")
 
@@ -24,11 +52,25 @@ logger = get_logger("app.core.middleware")
 class RequestLoggingMiddleware(BaseHTTPMiddleware):
     """Log every request with a correlation ID and wall-clock timing."""
 
+    def __init__(
+        self,
+        app: Any,  # noqa: ANN401
+        *,
+        server_timing: bool = False,
+        allocation_sampling: bool = False,
+    ) -> None:
+        super().__init__(app)
+        self.server_timing = server_timing
+        self.allocation_sampling = allocation_sampling
+
     async def dispatch(
         self, request: Request, call_next: RequestResponseEndpoint
     ) -> Response:
         request_id = request.headers.get("X-Request-ID")
         set_request_id(request_id)
+        timings = start_request_timings() if self.server_timing else None
+        query_stats = start_query_stats()
+        allocations = sample_allocations() if self.allocation_sampling else None
 
         start_time = time.perf_counter()
         logger.info(
@@ -38,17 +80,32 @@ class RequestLoggingMiddleware(BaseHTTPMiddleware):
             client_host=request.client.host if request.client else None,
         )
 
+        in_flight.started()
         try:
             response = await call_next(request)
             duration = time.perf_counter() - start_time
+            extra = (
+                {}
+                if allocations is None
+                else {"memory_allocated_bytes": allocated_since(allocations)}
+            )
+            if query_stats.retries:
+                extra["db_retries"] = query_stats.retries
             logger.info(
                 "request.completed",
                 method=request.method,
                 path=request.url.path,
                 status_code=response.status_code,
                 duration_seconds=round(duration, 3),
+                db_query_count=query_stats.count,
+                db_time_seconds=round(query_stats.total_seconds, 3),
+                **extra,
             )
             response.headers["X-Request-ID"] = get_request_id()
+            if timings is not None:
+                timings.record("db", query_stats.total_seconds)
+                timings.close()
+                response.headers["Server-Timing"] = timings.header_value()
             return response
 
         except Exception:
@@ -62,11 +119,42 @@ class RequestLoggingMiddleware(BaseHTTPMiddleware):
             )
             raise
 
+        finally:
+            in_flight.finished()
+
 
 def setup_middleware(app: FastAPI) -> None:
-    """Add request logging and CORS middleware to the application."""
+    """Add request logging, body limits, CORS and the optional middlewares."""
     settings = get_settings()
-    app.add_middleware(RequestLoggingMiddleware)
+    if settings.profiling_enabled:
+        app.add_middleware(
+            ProfilingMiddleware,
+            allowed_hosts=settings.profiling_allowed_hosts,
+            interval=settings.profiling_interval_seconds,
+            output_dir=settings.profiling_output_dir,
+        )
+    if settings.idempotency_enabled:
+        # Inside request logging so replays are logged like any response.
+        app.add_middleware(
+            IdempotencyMiddleware,
+            session_factory=AsyncSessionLocal,
+            ttl=settings.idempotency_ttl_seconds,
+            lock_timeout=settings.idempotency_lock_timeout_seconds,
+            cache_size=settings.idempotency_cache_size,
+        )
+    app.add_middleware(
+        BodyLimitMiddleware,
+        max_bytes=settings.request_max_body_bytes,
+        limits=settings.request_body_limits,
+    )
+    app.add_middleware(
+        RequestLoggingMiddleware,
+        server_timing=settings.server_timing_enabled,
+        allocation_sampling=settings.diagnostics_enabled,
+    )
+    if settings.tracing_enabled:
+        # Outside request logging so request.* events carry the trace IDs.
+        app.add_middleware(TracingMiddleware)
     app.add_middleware(
         CORSMiddleware,
         allow_origins=settings.allowed_origins,
@@ -0,0 +1,285 @@
+"""Helpers for online-safe Alembic migrations on large tables.
+
+alembic/env.py runs each revision in its own transaction with session-level
+``lock_timeout`` / ``statement_timeout`` defaults and retries the remaining
+revisions when a lock cannot be acquired (SQLSTATE 55P03). Revision scripts
+use these helpers for work that must not hold locks for long:
+
+    from app.core.migrations import (
+        backfill_in_batches,
+        create_index_concurrently,
+        migration_timeouts,
+    )
+
+    @migration_timeouts(lock_timeout_ms=2000, statement_timeout_ms=0)
+    def upgrade() -> None:
+        op.add_column("notes", sa.Column("slug", sa.Text()))
+        create_index_concurrently("ix_notes_slug", "notes", ["slug"])
+        backfill_in_batches("notes", "slug = lower(title)", where="slug IS NULL")
+
+create_count_trigger() keeps ``row_counts`` (app.core.counting) exact for a
+table's page totals.
+
+Non-transactional steps run inside ``autocommit_block()``, which commits the
+revision's work so far; keep them at the end of ``upgrade()``.
+"""
+
+from __future__ import annotations
+
+import functools
+import time
+from collections.abc import Callable, Sequence
+from typing import Any
+
+from sqlalchemy import Connection, TextClause, text
+
+from alembic import op
+from app.core.counting import COUNTER_SLOTS
+from app.core.logging import get_logger
+
+logger = get_logger("app.core.migrations")
+
+LOCK_NOT_AVAILABLE = "55P03"
+
+
+def _set_timeouts(
+    lock_timeout_ms: int | None, statement_timeout_ms: int | None
+) -> None:
+    if lock_timeout_ms is not None:
+        op.execute(text(f"SET lock_timeout = {int(lock_timeout_ms)}"))
+    if statement_timeout_ms is not None:
+        op.execute(text(f"SET statement_timeout = {int(statement_timeout_ms)}"))
+
+
+def migration_timeouts(
+    *,
+    lock_timeout_ms: int | None = None,
+    statement_timeout_ms: int | None = None,
+) -> Callable[[Callable[[], None]], Callable[[], None]]:
+    """Override the session timeouts for one revision's upgrade/downgrade.
+
+    Timeouts are restored to the connection defaults set by env.py when the
+    function returns, so later revisions are unaffected. 0 disables a limit.
+
+    Session-level SET rather than SET LOCAL: the overrides must also cover
+    steps in ``autocommit_block()``, outside the revision transaction. If
+    the function raises they are not reset here: the transaction has
+    aborted, and a RESET would fail with 25P02 and hide the original error
+    (such as the 55P03 env.py retries on). env.py resets them before a retry.
+    """
+
+    def decorator(func: Callable[[], None]) -> Callable[[], None]:
+        @functools.wraps(func)
+        def wrapper() -> None:
+            _set_timeouts(lock_timeout_ms, statement_timeout_ms)
+            func()
+            if lock_timeout_ms is not None:
+                op.execute(text("RESET lock_timeout"))
+            if statement_timeout_ms is not None:
+                op.execute(text("RESET statement_timeout"))
+
+        return wrapper
+
+    return decorator
+
+
+def reset_timeouts(connection: Connection) -> None:
+    """Restore the session timeouts a failed revision may have overridden.
+
+    Call after rolling back: a SET inside the aborted transaction is undone
+    by the rollback, but one committed by ``autocommit_block()`` is not.
+    """
+    connection.execute(text("RESET lock_timeout"))
+    connection.execute(text("RESET statement_timeout"))
+    connection.commit()
+
+
+def create_index_concurrently(
+    index_name: str,
+    table_name: str,
+    columns: Sequence[str],
+    **kwargs: Any,  # noqa: ANN401
+) -> None:
+    """Build an index with CREATE INDEX CONCURRENTLY outside a transaction.
+
+    ``if_not_exists`` makes re-runs safe; an index left INVALID by a failed
+    concurrent build must be dropped by hand before retrying.
+    """
+    with op.get_context().autocommit_block():
+        op.create_index(
+            index_name,
+            table_name,
+            list(columns),
+            postgresql_concurrently=True,
+            if_not_exists=True,
+            **kwargs,
+        )
+
+
+def drop_index_concurrently(index_name: str, table_name: str) -> None:
+    """Drop an index with DROP INDEX CONCURRENTLY outside a transaction."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            index_name,
+            table_name=table_name,
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+
+
+def backfill_in_batches(
+    table: str,
+    set_clause: str,
+    *,
+    key: str = "id",
+    where: str = "TRUE",
+    batch_size: int = 1000,
+    pause_seconds: float = 0.1,
+) -> int:
+    """UPDATE ``table`` in keyset-ordered batches, committing each batch.
+
+    Each batch locks at most ``batch_size`` rows for one short transaction,
+    then sleeps ``pause_seconds`` so replication and autovacuum keep up.
+    ``where`` must stop matching a row once it is updated (e.g.
+    ``slug IS NULL``), which also makes interrupted backfills resumable.
+    ``table``, ``set_clause``, ``key`` and ``where`` are trusted SQL from
+    the revision script, never user input.
+
+    Returns the total number of rows updated.
+    """
+
+    def batch_sql(resume: bool) -> str:
+        keyset = f" AND {key} > :last" if resume else ""
+        return (
+            f"WITH batch AS ("  # noqa: S608
+            f"SELECT {key} AS batch_key FROM {table} WHERE ({where}){keyset} "
+            f"ORDER BY {key} LIMIT :batch_size) "
+            f"UPDATE {table} SET {set_clause} FROM batch "
+            f"WHERE {table}.{key} = batch.batch_key RETURNING {key}"
+        )
+
+    total = 0
+    last: Any = None
+    start = time.perf_counter()
+    logger.info("migration.backfill.started", table=table, batch_size=batch_size)
+    with op.get_context().autocommit_block():
+        bind = op.get_bind()
+        while True:
+            # Autocommit mode: each batch UPDATE commits on its own.
+            params: dict[str, Any] = {"batch_size": batch_size}
+            if last is not None:
+                params["last"] = last
+            statement = text(batch_sql(resume=last is not None))
+            keys = bind.execute(statement, params).scalars().all()
+            if not keys:
+                break
+            total += len(keys)
+            last = max(keys)
+            logger.info(
+                "migration.backfill.batch_completed",
+                table=table,
+                rows=len(keys),
+                total_rows=total,
+                rows_per_second=round(total / (time.perf_counter() - start), 1),
+            )
+            if pause_seconds > 0:
+                time.sleep(pause_seconds)
+    logger.info(
+        "migration.backfill.completed",
+        table=table,
+        total_rows=total,
+        duration_seconds=round(time.perf_counter() - start, 3),
+    )
+    return total
+
+
+def _literal_sql(sql: str) -> TextClause:
+    # Colons in scope expressions ('notes:' || id) are not bind parameters.
+    return text(sql.replace(":", r"\:"))
+
+
+def _count_rows_sql(scopes: Sequence[str], source: str, delta: int) -> str:
+    return " UNION ALL ".join(
+        f"SELECT {scope} AS scope, {delta} AS delta FROM {source}"  # noqa: S608
+        for scope in scopes
+    )
+
+
+def _apply_counts_sql(rows_sql: str) -> str:
+    return (
+        "INSERT INTO row_counts AS c (scope, slot, count, created_at, updated_at) "  # noqa: S608
+        f"SELECT scope, pg_backend_pid() % {COUNTER_SLOTS}, sum(delta), now(), now() "
+        f"FROM ({rows_sql}) AS changed WHERE scope IS NOT NULL "
+        "GROUP BY scope HAVING sum(delta) <> 0 "
+        "ON CONFLICT (scope, slot) DO UPDATE "
+        "SET count = c.count + EXCLUDED.count, updated_at = EXCLUDED.updated_at;"
+    )
+
+
+def create_count_trigger(table: str, scopes: Sequence[str]) -> None:
+    """Maintain ``row_counts`` for ``table`` with statement-level triggers.
+
+    Each entry of ``scopes`` is a SQL expression over the row giving the
+    counter scope it belongs to, or NULL to skip it, e.g. ``'notes'`` and
+    ``CASE WHEN NOT archived THEN 'notes:vault=' || vault_id END``. The
+    triggers aggregate transition tables, so a bulk statement costs one
+    counter upsert per scope, and an UPDATE that keeps a row's scope
+    writes nothing. TRUNCATE is not counted; see counting.reset_count().
+
+    Current counts are backfilled in the same transaction. Creating the
+    triggers blocks writes to ``table`` until the revision commits, so
+    the backfill's full scan runs with writes blocked. ``table`` and
+    ``scopes`` are trusted SQL from the revision script.
+    """
+    function = f"{table}_row_counts"
+    body = (
+        "BEGIN "
+        "IF TG_OP = 'INSERT' THEN "
+        + _apply_counts_sql(_count_rows_sql(scopes, "new_rows", 1))
+        + " ELSIF TG_OP = 'DELETE' THEN "
+        + _apply_counts_sql(_count_rows_sql(scopes, "old_rows", -1))
+        + " ELSE "
+        + _apply_counts_sql(
+            _count_rows_sql(scopes, "new_rows", 1)
+            + " UNION ALL "
+            + _count_rows_sql(scopes, "old_rows", -1)
+        )
+        + " END IF; RETURN NULL; END"
+    )
+    op.execute(
+        _literal_sql(
+            f"CREATE OR REPLACE FUNCTION {function}() RETURNS trigger "
+            f"LANGUAGE plpgsql AS $body$ {body} $body$"
+        )
+    )
+    # Transition tables allow only one event per trigger.
+    for event, referencing in (
+        ("INSERT", "NEW TABLE AS new_rows"),
+        ("UPDATE", "OLD TABLE AS old_rows NEW TABLE AS new_rows"),
+        ("DELETE", "OLD TABLE AS old_rows"),
+    ):
+        op.execute(
+            _literal_sql(
+                f"CREATE TRIGGER {function}_{event.lower()} AFTER {event} ON {table} "
+                f"REFERENCING {referencing} FOR EACH STATEMENT "
+                f"EXECUTE FUNCTION {function}()"
+            )
+        )
+    op.execute(
+        _literal_sql(
+            "INSERT INTO row_counts AS c (scope, slot, count, created_at, updated_at) "  # noqa: S608
+            "SELECT scope, 0, sum(delta), now(), now() "
+            f"FROM ({_count_rows_sql(scopes, table, 1)}) AS existing "
+            "WHERE scope IS NOT NULL GROUP BY scope "
+            "ON CONFLICT (scope, slot) DO UPDATE "
+            "SET count = EXCLUDED.count, updated_at = EXCLUDED.updated_at"
+        )
+    )
+
+
+def drop_count_trigger(table: str) -> None:
+    """Drop the triggers created by create_count_trigger() (counts are kept)."""
+    function = f"{table}_row_counts"
+    for event in ("insert", "update", "delete"):
+        op.execute(text(f"DROP TRIGGER IF EXISTS {function}_{event} ON {table}"))
+    op.execute(text(f"DROP FUNCTION IF EXISTS {function}()"))
@@ -0,0 +1,289 @@
+"""Managed process pool for CPU-bound work.
+
+Every handler in a worker shares one event loop, so a CPU-heavy call (say,
+rendering a large markdown note) stalls every other request until it
+returns. Such work runs in a ProcessPoolExecutor started in the lifespan
+with PROCESS_POOL_WORKERS processes instead:
+
+    from app.core.processes import ProcessPool, cpu_bound, get_process_pool
+
+    @cpu_bound(timeout=5)
+    def render(markdown: str) -> str:
+        ...  # runs in a child process
+
+    @router.post("/render")
+    async def render_note(body: str) -> str:
+        return await render(body)
+
+    @router.post("/render-many")
+    async def render_notes(
+        bodies: list[str], pool: ProcessPool = Depends(get_process_pool)
+    ) -> list[str]:
+        return await pool.map(render_one, bodies, chunksize=16)
+
+Functions must be importable module-level callables and their arguments
+and results picklable; call ``pool.run`` with ``functools.partial`` for
+keyword arguments. ``@cpu_bound`` functions are looked up by name in the
+child, so the decorated name can be awaited everywhere.
+
+A call that exceeds its timeout raises TimeoutError. If it was still
+queued it never runs; one already handed to a child (running, or next in
+line) cannot be interrupted and finishes in the background, its result
+discarded. Cancelling the awaiting
+task behaves the same way. Each call logs ``process_pool.task.completed``
+with the time spent waiting for a free process and the time spent running,
+so an undersized pool shows up as queue wait.
+
+A child that dies (segfault, OOM kill) breaks the executor; the failing
+calls raise BrokenProcessPool and the pool is replaced for later calls.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import importlib
+import math
+import multiprocessing
+import time
+from collections.abc import Awaitable, Callable, Iterable, Sequence
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import batched
+from typing import Any
+
+from app.core.logging import get_logger
+
+logger = get_logger("app.core.processes")
+
+# "module:qualname" -> undecorated @cpu_bound function, per process.
+_registry: dict[str, Callable[..., Any]] = {}
+
+
+def _timed_call(
+    fn: Callable[..., Any], args: tuple[Any, ...]
+) -> tuple[Any, float, float]:
+    """Child-side wrapper: returns the result with its wall-clock start/end."""
+    started = time.time()
+    result = fn(*args)
+    return result, started, time.time()
+
+
+def _run_chunk(fn: Callable[[Any], Any], items: Sequence[Any]) -> list[Any]:
+    return [fn(item) for item in items]
+
+
+def _call_registered(key: str, *args: Any, **kwargs: Any) -> Any:  # noqa: ANN401
+    if key not in _registry:
+        # Importing the defining module re-runs its @cpu_bound decorators.
+        importlib.import_module(key.partition(":")[0])
+    return _registry[key](*args, **kwargs)
+
+
+def _name(fn: Callable[..., Any]) -> str:
+    if isinstance(fn, functools.partial):
+        if fn.func is _call_registered:
+            return str(fn.args[0])
+        return _name(fn.func)
+    return getattr(fn, "__qualname__", type(fn).__name__)
+
+
+class ProcessPool:
+    """Lifespan-managed ProcessPoolExecutor with timeouts and timing logs."""
+
+    def __init__(
+        self,
+        *,
+        max_workers: int = 2,
+        timeout: float | None = 30.0,
+        max_tasks_per_child: int | None = None,
+    ) -> None:
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.max_tasks_per_child = max_tasks_per_child
+        self._executor: ProcessPoolExecutor | None = None
+
+    def configure(
+        self,
+        *,
+        max_workers: int,
+        timeout: float | None,
+        max_tasks_per_child: int | None,
+    ) -> None:
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.max_tasks_per_child = max_tasks_per_child
+
+    @property
+    def running(self) -> bool:
+        return self._executor is not None
+
+    def _create_executor(self) -> ProcessPoolExecutor:
+        # Forking a process that runs an event loop and DB connections copies
+        # them into the child; forkserver children start from a clean process.
+        return ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=multiprocessing.get_context("forkserver"),
+            max_tasks_per_child=self.max_tasks_per_child,
+        )
+
+    def start(self) -> None:
+        """Create the executor; processes are spawned as work arrives."""
+        if self._executor is None:
+            self._executor = self._create_executor()
+            logger.info("process_pool.started", max_workers=self.max_workers)
+
+    async def stop(self) -> None:
+        """Drop queued calls and wait for running ones to finish."""
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            await asyncio.to_thread(executor.shutdown, wait=True, cancel_futures=True)
+            logger.info("process_pool.stopped")
+
+    def _submit(
+        self, fn: Callable[..., Any], args: tuple[Any, ...]
+    ) -> tuple[ProcessPoolExecutor, Future[tuple[Any, float, float]]]:
+        executor = self._executor
+        if executor is None:
+            raise RuntimeError("Process pool is not running")
+        try:
+            return executor, executor.submit(_timed_call, fn, args)
+        except BrokenProcessPool:
+            self._replace_broken(executor)
+            raise
+
+    def _replace_broken(self, executor: ProcessPoolExecutor) -> None:
+        # Every call pending on a broken executor fails; replace it once.
+        if self._executor is not executor:
+            return
+        logger.error("process_pool.broken", max_workers=self.max_workers)
+        executor.shutdown(wait=False, cancel_futures=True)
+        self._executor = self._create_executor()
+
+    async def _await(
+        self,
+        name: str,
+        submission: tuple[ProcessPoolExecutor, Future[tuple[Any, float, float]]],
+        submitted: float,
+        timeout: float | None,
+    ) -> Any:  # noqa: ANN401
+        executor, future = submission
+        try:
+            # Cancelling the wrapper also cancels ``future`` if it is queued.
+            result, started, finished = await asyncio.wait_for(
+                asyncio.wrap_future(future), timeout
+            )
+        except TimeoutError:
+            logger.warning(
+                "process_pool.task.timed_out",
+                function=name,
+                timeout_seconds=timeout,
+                # A queued call was cancelled with the wrapper; never ran.
+                started=not future.cancelled(),
+            )
+            raise
+        except BrokenProcessPool:
+            self._replace_broken(executor)
+            raise
+        logger.info(
+            "process_pool.task.completed",
+            function=name,
+            queue_wait_seconds=round(max(started - submitted, 0.0), 4),
+            execution_seconds=round(finished - started, 4),
+        )
+        return result
+
+    async def run[*Ts, R](
+        self,
+        fn: Callable[[*Ts], R],
+        *args: *Ts,
+        timeout: float | None = None,
+    ) -> R:
+        """Run ``fn(*args)`` in a child process and return its result.
+
+        ``timeout`` defaults to the pool's; pass ``math.inf`` for none.
+        """
+        limit = self.timeout if timeout is None else timeout
+        submitted = time.time()
+        submission = self._submit(fn, args)
+        result: R = await self._await(
+            _name(fn), submission, submitted, None if limit == math.inf else limit
+        )
+        return result
+
+    async def map[T, R](
+        self,
+        fn: Callable[[T], R],
+        items: Iterable[T],
+        *,
+        chunksize: int | None = None,
+        timeout: float | None = None,
+    ) -> list[R]:
+        """Apply ``fn`` to every item in chunks, preserving order.
+
+        Each chunk is one round trip to a child, so small items should use a
+        larger ``chunksize``; the default splits the work into about four
+        chunks per process. ``timeout`` bounds the whole map, and remaining
+        chunks are cancelled if it passes or any chunk fails.
+        """
+        materialized = list(items)
+        if not materialized:
+            return []
+        if chunksize is None:
+            chunksize = math.ceil(len(materialized) / (self.max_workers * 4))
+        limit = self.timeout if timeout is None else timeout
+        name = _name(fn)
+        submitted = time.time()
+        submissions = [
+            self._submit(_run_chunk, (fn, chunk))
+            for chunk in batched(materialized, chunksize)
+        ]
+        tasks = [
+            asyncio.ensure_future(self._await(name, submission, submitted, None))
+            for submission in submissions
+        ]
+        try:
+            async with asyncio.timeout(None if limit == math.inf else limit):
+                chunks = await asyncio.gather(*tasks)
+        except TimeoutError:
+            logger.warning(
+                "process_pool.task.timed_out",
+                function=name,
+                timeout_seconds=limit,
+                chunks=len(tasks),
+            )
+            raise
+        finally:
+            # Cancels chunks still queued after a failure, timeout or cancel.
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        return [result for chunk in chunks for result in chunk]
+
+
+process_pool = ProcessPool()
+
+
+async def get_process_pool() -> ProcessPool:
+    """FastAPI dependency returning the worker's process pool."""
+    return process_pool
+
+
+def cpu_bound[**P, R](
+    *, timeout: float | None = None
+) -> Callable[[Callable[P, R]], Callable[P, Awaitable[R]]]:
+    """Make a module-level function awaitable, running it in the process pool."""
+
+    def decorator(fn: Callable[P, R]) -> Callable[P, Awaitable[R]]:
+        key = f"{fn.__module__}:{fn.__qualname__}"
+        _registry[key] = fn
+
+        @functools.wraps(fn)
+        async def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+            call = functools.partial(_call_registered, key, *args, **kwargs)
+            result: R = await process_pool.run(call, timeout=timeout)
+            return result
+
+        return wrapper
+
+    return decorator
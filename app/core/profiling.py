@@ -0,0 +1,312 @@
+"""Per-request timing breakdowns and an opt-in sampling profiler.
+
+Server-Timing (SERVER_TIMING_ENABLED=true):
+    RequestLoggingMiddleware opens a RequestTimings collector per request and
+    TimedRoute splits the route into phases. The breakdown is returned as:
+
+        Server-Timing: mw;dur=0.4, deps;dur=1.2, handler;dur=8.1,
+                       serialize;dur=0.3, total;dur=10.0
+
+    mw        — middleware stack outside the route
+    deps      — body parsing and dependency resolution (get_db, get_settings)
+    handler   — the path operation function itself
+    serialize — response validation and serialization
+
+Profiling (PROFILING_ENABLED=true):
+    ProfilingMiddleware samples the event-loop thread's stack while a request
+    runs. A request is profiled when it sends ``X-Profile: 1`` from a host in
+    PROFILING_ALLOWED_HOSTS, or at random with PROFILING_SAMPLE_RATE.
+    Profiles are written as collapsed stacks (flamegraph.pl / speedscope input)
+    to PROFILING_OUTPUT_DIR; ``X-Profile: inline`` returns them as the body.
+    Files get server-generated names; the ``profiling.request.captured`` log
+    line ties each one to its request ID.
+
+Route handlers opt into phase timing through the route class:
+
+    router = APIRouter(route_class=TimedRoute)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import inspect
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from collections.abc import Callable, Coroutine, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from types import FrameType
+from typing import Any
+
+from fastapi.routing import APIRoute
+from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse, Response
+
+from app.core.config import get_settings
+from app.core.logging import get_logger
+from app.core.tracing import span
+
+logger = get_logger("app.core.profiling")
+
+_PHASE_ORDER = ("mw", "deps", "handler", "serialize")
+
+
+class RequestTimings:
+    """Mutable per-request phase durations, in seconds."""
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.phases: dict[str, float] = {}
+        self.route_started: float | None = None
+        self.handler_started: float | None = None
+        self.handler_finished: float | None = None
+
+    def record(self, name: str, seconds: float) -> None:
+        """Add ``seconds`` to the named phase."""
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def close_route(self, finished: float) -> None:
+        """Split the route span into deps, handler and serialize phases."""
+        if self.route_started is None:
+            return
+        if self.handler_started is None or self.handler_finished is None:
+            self.record("deps", finished - self.route_started)
+            return
+        self.record("deps", self.handler_started - self.route_started)
+        self.record("handler", self.handler_finished - self.handler_started)
+        self.record("serialize", finished - self.handler_finished)
+
+    def close(self) -> float:
+        """Attribute remaining time to middleware and return the total."""
+        total = time.perf_counter() - self.started
+        inner = sum(self.phases.get(name, 0.0) for name in _PHASE_ORDER[1:])
+        self.phases["mw"] = max(total - inner, 0.0)
+        self.phases["total"] = total
+        return total
+
+    def header_value(self) -> str:
+        """Render phases as a Server-Timing header value (milliseconds)."""
+        names = [n for n in _PHASE_ORDER if n in self.phases]
+        names += [n for n in self.phases if n not in _PHASE_ORDER and n != "total"]
+        if "total" in self.phases:
+            names.append("total")
+        return ", ".join(f"{name};dur={self.phases[name] * 1000:.1f}" for name in names)
+
+
+_timings_var: ContextVar[RequestTimings | None] = ContextVar(
+    "request_timings", default=None
+)
+
+
+def start_request_timings() -> RequestTimings:
+    """Install a fresh RequestTimings collector for the current request."""
+    timings = RequestTimings()
+    _timings_var.set(timings)
+    return timings
+
+
+def get_request_timings() -> RequestTimings | None:
+    """Return the current request's collector, or None when timing is off."""
+    return _timings_var.get()
+
+
+@contextmanager
+def timed(name: str) -> Iterator[None]:
+    """Record the duration of the block as a named Server-Timing phase."""
+    timings = _timings_var.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.record(name, time.perf_counter() - start)
+
+
+@contextmanager
+def _handler_phase() -> Iterator[None]:
+    timings = _timings_var.get()
+    if timings is not None:
+        timings.handler_started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if timings is not None:
+            timings.handler_finished = time.perf_counter()
+
+
+def _timed_endpoint(endpoint: Callable[..., Any]) -> Callable[..., Any]:
+    """Wrap an endpoint so its execution time and ``handler`` span are recorded.
+
+    FastAPI unwraps ``functools.wraps`` wrappers when reading the signature,
+    so dependency injection and response-model inference are unaffected.
+    """
+    span_name = f"handler {endpoint.__name__}"
+    if inspect.iscoroutinefunction(endpoint):
+
+        @functools.wraps(endpoint)
+        async def async_wrapper(*args: Any, **kwargs: Any) -> Any:  # noqa: ANN401
+            with _handler_phase(), span(span_name):
+                return await endpoint(*args, **kwargs)
+
+        return async_wrapper
+
+    @functools.wraps(endpoint)
+    def sync_wrapper(*args: Any, **kwargs: Any) -> Any:  # noqa: ANN401
+        with _handler_phase(), span(span_name):
+            return endpoint(*args, **kwargs)
+
+    return sync_wrapper
+
+
+class TimedRoute(APIRoute):
+    """APIRoute that records deps / handler / serialize phase timings."""
+
+    def __init__(
+        self,
+        path: str,
+        endpoint: Callable[..., Any],
+        **kwargs: Any,  # noqa: ANN401
+    ) -> None:
+        super().__init__(path, _timed_endpoint(endpoint), **kwargs)
+
+    def get_route_handler(self) -> Callable[[Request], Coroutine[Any, Any, Response]]:
+        handler = super().get_route_handler()
+
+        async def timed_handler(request: Request) -> Response:
+            timings = _timings_var.get()
+            if timings is None:
+                return await handler(request)
+            timings.route_started = time.perf_counter()
+            try:
+                return await handler(request)
+            finally:
+                timings.close_route(time.perf_counter())
+
+        return timed_handler
+
+
+def _frame_label(frame: FrameType) -> str:
+    code = frame.f_code
+    return f"{code.co_qualname} ({Path(code.co_filename).name}:{frame.f_lineno})"
+
+
+class StackSampler:
+    """Sample one thread's Python stack at a fixed interval.
+
+    Sampling runs in a daemon thread, so the profiled code pays only the
+    interpreter switch cost. Samples from the event-loop thread include any
+    coroutine running at that moment, not only the profiled request.
+    """
+
+    def __init__(self, thread_id: int, interval: float = 0.001) -> None:
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples: Counter[str] = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="stack-sampler", daemon=True
+        )
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack: list[str] = []
+            current: FrameType | None = frame
+            while current is not None:
+                stack.append(_frame_label(current))
+                current = current.f_back
+            self.samples[";".join(reversed(stack))] += 1
+
+    def collapsed(self) -> str:
+        """Return samples in collapsed-stack format, heaviest first."""
+        return "\n".join(
+            f"{stack} {count}" for stack, count in self.samples.most_common()
+        )
+
+
+class ProfilingMiddleware(BaseHTTPMiddleware):
+    """Profile sampled or explicitly requested requests with StackSampler."""
+
+    def __init__(
+        self,
+        app: Any,  # noqa: ANN401
+        *,
+        sample_rate: float | None = None,
+        allowed_hosts: list[str] | None = None,
+        interval: float = 0.001,
+        output_dir: str = "profiles",
+    ) -> None:
+        super().__init__(app)
+        self.sample_rate = sample_rate
+        self.allowed_hosts = set(allowed_hosts or [])
+        self.interval = interval
+        self.output_dir = Path(output_dir)
+
+    def _profile_mode(self, request: Request) -> str | None:
+        requested = request.headers.get("X-Profile")
+        if requested:
+            host = request.client.host if request.client else None
+            if host not in self.allowed_hosts:
+                logger.warning("profiling.request.rejected", client_host=host)
+                return None
+            return "inline" if requested == "inline" else "file"
+        # None follows PROFILING_SAMPLE_RATE, so settings reloads apply live.
+        sample_rate = self.sample_rate
+        if sample_rate is None:
+            sample_rate = get_settings().profiling_sample_rate
+        if sample_rate and random.random() < sample_rate:
+            return "file"
+        return None
+
+    async def dispatch(
+        self, request: Request, call_next: RequestResponseEndpoint
+    ) -> Response:
+        mode = self._profile_mode(request)
+        if mode is None:
+            return await call_next(request)
+
+        sampler = StackSampler(threading.get_ident(), self.interval)
+        sampler.start()
+        try:
+            response = await call_next(request)
+        finally:
+            sampler.stop()
+
+        sample_count = sum(sampler.samples.values())
+        if mode == "inline":
+            return PlainTextResponse(
+                sampler.collapsed(),
+                headers={"X-Profile-Status": str(response.status_code)},
+            )
+
+        # Never name the file after the request ID: clients choose it.
+        output_dir = self.output_dir.resolve()
+        output_dir.mkdir(parents=True, exist_ok=True)
+        path = (output_dir / f"{time.time_ns()}-{uuid.uuid4().hex}.collapsed").resolve()
+        if path.parent != output_dir:
+            raise RuntimeError(f"Profile path {path} escapes {output_dir}")
+        await asyncio.to_thread(path.write_text, sampler.collapsed(), "utf-8")
+        logger.info(
+            "profiling.request.captured",
+            path=str(path),
+            samples=sample_count,
+        )
+        return response
@@ -0,0 +1,217 @@
+"""Replay transactions that fail for transient reasons.
+
+Serialization failures, deadlocks and dropped connections are not bugs in
+the request: the same transaction usually succeeds if run again. Instead of
+letting them surface as 500s (and the client re-sending the whole request),
+run the unit of work through run_in_transaction():
+
+    from app.core.retry import run_in_transaction
+
+    async def transfer(session: AsyncSession) -> Note:
+        ...
+
+    note = await run_in_transaction(transfer)
+
+Each attempt gets a fresh session and transaction, committed when ``work``
+returns. ``work`` may run more than once, so it must not have side effects
+outside the session (enqueue jobs through the session, publish events after
+it returns). Retryable failures are classified by SQLSTATE
+(RETRYABLE_SQLSTATES) or by the driver reporting a lost connection; anything
+else is raised at once.
+
+Attempts back off exponentially with jitter, up to DB_RETRY_MAX_ATTEMPTS and
+within DB_RETRY_DEADLINE_SECONDS overall. When retries run out the last
+error is raised as DatabaseUnavailableError (503 with Retry-After).
+
+Events:
+    database.retry.attempt_failed  — an attempt failed and will be retried
+    database.retry.succeeded       — succeeded after at least one retry
+    database.retry.exhausted       — gave up; attempts or deadline used up
+
+Retries are counted per request (``db_retries`` in ``request.completed``) and
+per process in ``retry_metrics``, reported at ``GET /health/db``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import random
+import time
+from collections import Counter
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+
+from sqlalchemy import exc as sa_exc
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core import database
+from app.core.config import get_settings
+from app.core.database import CircuitBreaker, sqlstate
+from app.core.exceptions import DatabaseUnavailableError
+from app.core.instrumentation import get_query_stats
+from app.core.logging import get_logger
+
+logger = get_logger("app.core.retry")
+
+# SQLSTATEs after which replaying the whole transaction can succeed.
+RETRYABLE_SQLSTATES: dict[str, str] = {
+    "40001": "serialization_failure",
+    "40P01": "deadlock_detected",
+    "55P03": "lock_not_available",
+    "57P01": "admin_shutdown",
+    "57P03": "cannot_connect_now",
+    "08000": "connection_exception",
+    "08003": "connection_does_not_exist",
+    "08006": "connection_failure",
+    "08001": "sqlclient_unable_to_establish_sqlconnection",
+    "08004": "sqlserver_rejected_establishment_of_sqlconnection",
+}
+
+
+def retry_delay(attempt: int, base: float, cap: float = 300.0) -> float:
+    """Exponential backoff with jitter for the retry after ``attempt``."""
+    delay: float = min(cap, base * 2.0 ** (attempt - 1))
+    return delay * random.uniform(0.5, 1.0)
+
+
+def failure_reason(exc: BaseException) -> str | None:
+    """Why ``exc`` is worth retrying, or None if it is not."""
+    code = sqlstate(exc)
+    if code is not None:
+        return RETRYABLE_SQLSTATES.get(code)
+    if isinstance(exc, sa_exc.DBAPIError) and exc.connection_invalidated:
+        return "connection_invalidated"
+    if isinstance(exc, (ConnectionError, sa_exc.InterfaceError)):
+        return "connection_lost"
+    if isinstance(getattr(exc, "orig", None), ConnectionError):
+        return "connection_lost"
+    return None
+
+
+@dataclass(frozen=True, slots=True)
+class RetryPolicy:
+    """Attempt limit, backoff and overall deadline for one unit of work."""
+
+    max_attempts: int = 4
+    base_delay: float = 0.05
+    max_delay: float = 1.0
+    deadline: float = 5.0
+
+    @classmethod
+    def from_settings(cls) -> RetryPolicy:
+        settings = get_settings()
+        return cls(
+            max_attempts=settings.db_retry_max_attempts,
+            base_delay=settings.db_retry_base_delay_seconds,
+            max_delay=settings.db_retry_max_delay_seconds,
+            deadline=settings.db_retry_deadline_seconds,
+        )
+
+
+@dataclass(slots=True)
+class RetryMetrics:
+    """Process-wide transaction and retry counters."""
+
+    transactions: int = 0
+    retries: int = 0
+    recovered: int = 0
+    exhausted: int = 0
+    reasons: Counter[str] = field(default_factory=Counter)
+
+    def snapshot(self) -> dict[str, object]:
+        return {
+            "transactions": self.transactions,
+            "retries": self.retries,
+            "recovered": self.recovered,
+            "exhausted": self.exhausted,
+            "retry_rate": round(self.retries / self.transactions, 4)
+            if self.transactions
+            else 0.0,
+            "reasons": dict(self.reasons),
+        }
+
+
+retry_metrics = RetryMetrics()
+
+
+async def _attempt[T](
+    work: Callable[[AsyncSession], Awaitable[T]],
+    session_factory: async_sessionmaker[AsyncSession],
+    breaker: CircuitBreaker | None,
+) -> T:
+    async with session_factory() as session:
+        if breaker is not None:
+            with breaker.guard():
+                await session.connection()
+        async with session.begin():
+            return await work(session)
+
+
+async def run_in_transaction[T](
+    work: Callable[[AsyncSession], Awaitable[T]],
+    *,
+    session_factory: async_sessionmaker[AsyncSession] | None = None,
+    policy: RetryPolicy | None = None,
+) -> T:
+    """Run ``work`` in its own transaction, replaying it on transient failures.
+
+    Uses AsyncSessionLocal (checked out through the database circuit
+    breaker) unless ``session_factory`` is given, and the DB_RETRY_* settings
+    unless ``policy`` is.
+    """
+    breaker = None
+    if session_factory is None:
+        session_factory = database.AsyncSessionLocal
+        breaker = database.circuit_breaker
+    policy = policy or RetryPolicy.from_settings()
+    name = getattr(work, "__qualname__", repr(work))
+    started = time.monotonic()
+    retry_metrics.transactions += 1
+    attempt = 1
+    while True:
+        try:
+            result = await _attempt(work, session_factory, breaker)
+        except Exception as exc:
+            reason = failure_reason(exc)
+            if reason is None:
+                raise
+            elapsed = time.monotonic() - started
+            delay = retry_delay(attempt, policy.base_delay, policy.max_delay)
+            if attempt >= policy.max_attempts or elapsed + delay > policy.deadline:
+                retry_metrics.exhausted += 1
+                logger.error(
+                    "database.retry.exhausted",
+                    work=name,
+                    attempts=attempt,
+                    reason=reason,
+                    sqlstate=sqlstate(exc),
+                    elapsed_seconds=round(elapsed, 3),
+                )
+                raise DatabaseUnavailableError(
+                    f"Transaction failed after {attempt} attempts ({reason})",
+                    retry_after=policy.max_delay,
+                ) from exc
+            retry_metrics.retries += 1
+            retry_metrics.reasons[reason] += 1
+            if (stats := get_query_stats()) is not None:
+                stats.retries += 1
+            logger.warning(
+                "database.retry.attempt_failed",
+                work=name,
+                attempt=attempt,
+                reason=reason,
+                sqlstate=sqlstate(exc),
+                retry_in_seconds=round(delay, 3),
+            )
+            await asyncio.sleep(delay)
+            attempt += 1
+            continue
+        if attempt > 1:
+            retry_metrics.recovered += 1
+            logger.info(
+                "database.retry.succeeded",
+                work=name,
+                attempts=attempt,
+                elapsed_seconds=round(time.monotonic() - started, 3),
+            )
+        return result
@@ -0,0 +1,335 @@
+"""Horizontal sharding across several PostgreSQL databases.
+
+DB_SHARD_URLS lists one database per shard; each gets its own pooled engine
+with the same pool size and session settings as the primary ``engine``. A
+shard key (a vault id, a user id) is mapped to a shard index by a
+ShardKeyFunction built from DB_SHARD_STRATEGY:
+
+    hash   jump consistent hash of the key: an even spread, and growing
+           from N to N+1 shards moves only about 1/(N+1) of the keys
+    range  integer keys; DB_SHARD_RANGE_BOUNDS holds the ascending,
+           exclusive upper bound of every shard but the last
+
+Any ``Callable[[str], int]`` can be passed to ``shards.configure()`` instead.
+
+Route handlers get the session of the request's shard:
+
+    from app.core.sharding import get_shard_db
+
+    @router.get("/vaults/{shard_key}/notes")
+    async def list_notes(db: AsyncSession = Depends(get_shard_db)) -> ...:
+        ...
+
+get_shard_db reads the DB_SHARD_KEY_PARAM path parameter, falling back to
+the DB_SHARD_KEY_HEADER header. Cross-shard reads use scatter_gather(),
+which runs a query on every shard concurrently, each on its own session,
+and merges the per-shard results.
+
+Unsharded tables (jobs, idempotency keys) stay on DATABASE_URL; migrations
+are applied to each shard database separately.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import bisect
+import hashlib
+import heapq
+import itertools
+import time
+from collections.abc import (
+    AsyncGenerator,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Sequence,
+)
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any
+
+from fastapi import HTTPException, Request
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+
+from app.core.config import Settings, get_settings, on_settings_reload
+from app.core.database import CircuitBreaker, create_pooled_engine
+from app.core.instrumentation import QueryThresholds, instrument_engine
+from app.core.logging import get_logger
+from app.core.tracing import span
+
+logger = get_logger("app.core.sharding")
+
+ShardKeyFunction = Callable[[str], int]
+
+_JUMP_MULTIPLIER = 2862933555777941757
+_MASK64 = (1 << 64) - 1
+
+
+def jump_hash(key: int, buckets: int) -> int:
+    """Jump consistent hash (Lamping and Veach) of a 64-bit ``key``."""
+    bucket, candidate = -1, 0
+    while candidate < buckets:
+        bucket = candidate
+        key = (key * _JUMP_MULTIPLIER + 1) & _MASK64
+        candidate = int((bucket + 1) * ((1 << 31) / ((key >> 33) + 1)))
+    return bucket
+
+
+def hash_shard_key(shard_count: int) -> ShardKeyFunction:
+    """Map keys to shards by jump hash of a stable 64-bit digest."""
+
+    def shard_for(key: str) -> int:
+        digest = hashlib.blake2b(key.encode(), digest_size=8).digest()
+        return jump_hash(int.from_bytes(digest), shard_count)
+
+    return shard_for
+
+
+def range_shard_key(bounds: Sequence[int]) -> ShardKeyFunction:
+    """Map integer keys to shards by ascending exclusive upper ``bounds``."""
+    ordered = list(bounds)
+    if ordered != sorted(set(ordered)):
+        raise ValueError("Shard range bounds must be strictly ascending")
+
+    def shard_for(key: str) -> int:
+        return bisect.bisect_right(ordered, int(key))
+
+    return shard_for
+
+
+def shard_key_function(
+    strategy: str, shard_count: int, bounds: Sequence[int] = ()
+) -> ShardKeyFunction:
+    """Build the key function for DB_SHARD_STRATEGY."""
+    if strategy == "hash":
+        return hash_shard_key(shard_count)
+    if strategy == "range":
+        if len(bounds) != shard_count - 1:
+            raise ValueError(
+                f"Range sharding over {shard_count} shards needs "
+                f"{shard_count - 1} bounds, got {len(bounds)}"
+            )
+        return range_shard_key(bounds)
+    raise ValueError(f"Unknown shard strategy {strategy!r}")
+
+
+@dataclass(frozen=True)
+class Shard:
+    """One shard database: its pooled engine, sessions and circuit breaker."""
+
+    index: int
+    engine: AsyncEngine
+    session_factory: async_sessionmaker[AsyncSession]
+    breaker: CircuitBreaker = field(default_factory=CircuitBreaker)
+
+    @property
+    def name(self) -> str:
+        """Host and database, without credentials."""
+        url = self.engine.url
+        return f"{url.host or 'localhost'}/{url.database}"
+
+
+class ShardRouter:
+    """Shard engines and the function that routes keys to them."""
+
+    def __init__(self) -> None:
+        self.shards: list[Shard] = []
+        self.strategy = "hash"
+        self._key_function: ShardKeyFunction | None = None
+        self._thresholds: list[QueryThresholds] = []
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.shards)
+
+    def configure(
+        self,
+        urls: Sequence[str],
+        settings: Settings,
+        key_function: ShardKeyFunction | None = None,
+    ) -> None:
+        """Create one engine per URL; ``key_function`` overrides the strategy."""
+        if self.shards:
+            raise RuntimeError("Shards are already configured")
+        self._key_function = key_function or shard_key_function(
+            settings.db_shard_strategy, len(urls), settings.db_shard_range_bounds
+        )
+        self.strategy = "custom" if key_function else settings.db_shard_strategy
+        for index, url in enumerate(urls):
+            engine = create_pooled_engine(url, settings)
+            self._thresholds.append(
+                instrument_engine(
+                    engine,
+                    slow_threshold=settings.db_slow_query_threshold_seconds,
+                    n_plus_one_threshold=settings.db_n_plus_one_threshold,
+                    log_statements=settings.environment == "development",
+                )
+            )
+            breaker = CircuitBreaker(
+                f"shard-{index}",
+                failure_threshold=settings.db_circuit_failure_threshold,
+                recovery_time=settings.db_circuit_recovery_seconds,
+                half_open_max_calls=settings.db_circuit_half_open_max_calls,
+            )
+            self.shards.append(
+                Shard(
+                    index,
+                    engine,
+                    async_sessionmaker(engine, expire_on_commit=False),
+                    breaker,
+                )
+            )
+        logger.info(
+            "database.shards.configured",
+            shards=[shard.name for shard in self.shards],
+            strategy=self.strategy,
+        )
+
+    def apply_settings(self, settings: Settings) -> None:
+        """Apply reloaded query thresholds and circuit settings to every shard."""
+        for thresholds in self._thresholds:
+            thresholds.slow_seconds = settings.db_slow_query_threshold_seconds
+            thresholds.n_plus_one = settings.db_n_plus_one_threshold
+        for shard in self.shards:
+            shard.breaker.configure(
+                failure_threshold=settings.db_circuit_failure_threshold,
+                recovery_time=settings.db_circuit_recovery_seconds,
+            )
+
+    def shard_for(self, key: str) -> Shard:
+        """The shard holding ``key``; ValueError if the key cannot be routed."""
+        if self._key_function is None or not self.shards:
+            raise RuntimeError("Sharding is not configured (DB_SHARD_URLS)")
+        index = self._key_function(key)
+        if not 0 <= index < len(self.shards):
+            raise ValueError(f"Shard key maps to shard {index}, which does not exist")
+        return self.shards[index]
+
+    @asynccontextmanager
+    async def session(self, shard: Shard) -> AsyncIterator[AsyncSession]:
+        """A session on ``shard``, checked out through the shard's breaker."""
+        async with shard.session_factory() as session:
+            with span("db.checkout", shard=shard.index), shard.breaker.guard():
+                await session.connection()
+            yield session
+
+    async def scatter[T](
+        self,
+        query: Callable[[AsyncSession], Awaitable[T]],
+        *,
+        timeout: float | None = None,
+    ) -> list[T]:
+        """Run ``query`` on every shard concurrently; results in shard order.
+
+        Sessions are checked out through each shard's breaker, as in
+        session(), so a shard with an open circuit fails at once. The first
+        failure cancels the other shards' queries and is raised.
+        """
+
+        async def _on_shard(shard: Shard) -> T:
+            async with self.session(shard) as session:
+                with span("db.shard_query", shard=shard.index):
+                    return await query(session)
+
+        if not self.shards:
+            raise RuntimeError("Sharding is not configured (DB_SHARD_URLS)")
+        try:
+            async with asyncio.timeout(timeout), asyncio.TaskGroup() as group:
+                tasks = [group.create_task(_on_shard(shard)) for shard in self.shards]
+        except ExceptionGroup as errors:
+            raise errors.exceptions[0] from None
+        return [task.result() for task in tasks]
+
+    async def scatter_gather[T](
+        self,
+        query: Callable[[AsyncSession], Awaitable[Sequence[T]]],
+        *,
+        key: Callable[[T], Any] | None = None,
+        reverse: bool = False,
+        limit: int | None = None,
+        timeout: float | None = None,
+    ) -> list[T]:
+        """Run ``query`` on every shard and merge the rows it returns.
+
+        With ``key``, each shard's rows must already be sorted by it (ORDER BY
+        in the query, descending when ``reverse``) and are merged in order;
+        without it rows are concatenated in shard order. For top-N reads,
+        apply the same LIMIT per shard and pass ``limit`` here.
+        """
+        results = await self.scatter(query, timeout=timeout)
+        merged = (
+            heapq.merge(*results, key=key, reverse=reverse)
+            if key is not None
+            else itertools.chain.from_iterable(results)
+        )
+        return list(itertools.islice(merged, limit))
+
+    async def check(self, timeout: float) -> list[dict[str, object]]:
+        """Ping every shard concurrently and report each one's state."""
+
+        async def _ping(shard: Shard) -> dict[str, object]:
+            start = time.perf_counter()
+            try:
+                async with asyncio.timeout(timeout), shard.engine.connect() as conn:
+                    await conn.execute(text("SELECT 1"))
+            except Exception:
+                logger.error(
+                    "database.shard.health_check_failed",
+                    shard=shard.index,
+                    database=shard.name,
+                    exc_info=True,
+                )
+                status = "unavailable"
+            else:
+                status = "healthy"
+            return {
+                "shard": shard.index,
+                "database": shard.name,
+                "status": status,
+                "latency_ms": round((time.perf_counter() - start) * 1000, 2),
+                "circuit": shard.breaker.state.value,
+            }
+
+        return list(await asyncio.gather(*(_ping(shard) for shard in self.shards)))
+
+    async def dispose(self) -> None:
+        """Close every shard's pool."""
+        await asyncio.gather(*(shard.engine.dispose() for shard in self.shards))
+        if self.shards:
+            logger.info("database.shards.closed", shards=len(self.shards))
+        self.shards = []
+        self._thresholds = []
+        self._key_function = None
+
+
+shards = ShardRouter()
+on_settings_reload(shards.apply_settings)
+
+
+def shard_key_from_request(request: Request) -> str:
+    """The shard key from the path parameter or, failing that, the header."""
+    settings = get_settings()
+    key = request.path_params.get(settings.db_shard_key_param) or request.headers.get(
+        settings.db_shard_key_header
+    )
+    if not key:
+        raise HTTPException(
+            status_code=400,
+            detail=(
+                f"Missing shard key: '{settings.db_shard_key_param}' path "
+                f"parameter or {settings.db_shard_key_header} header"
+            ),
+        )
+    return str(key)
+
+
+async def get_shard_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    """Yield a session on the shard that holds the request's shard key."""
+    key = shard_key_from_request(request)
+    try:
+        shard = shards.shard_for(key)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail="Invalid shard key") from exc
+    async with shards.session(shard) as session:
+        yield session
@@ -0,0 +1,218 @@
+"""Tests for app/core/batch.py."""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import AsyncGenerator, AsyncIterator, Generator
+from contextlib import asynccontextmanager
+from typing import Any
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from fastapi import Depends, FastAPI, Request
+from httpx import ASGITransport, AsyncClient
+
+from app.core import database as db_module
+from app.core.batch import router
+from app.core.config import get_settings
+from app.core.database import CircuitBreaker, get_db
+from app.core.exceptions import NotFoundError, setup_exception_handlers
+from app.core.logging import get_request_id
+from app.core.middleware import RequestLoggingMiddleware
+
+
+def _make_app() -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(RequestLoggingMiddleware)
+    setup_exception_handlers(app)
+    app.include_router(router)
+
+    @app.get("/items/{item_id}")
+    async def read_item(item_id: int, request: Request) -> dict[str, Any]:
+        return {
+            "id": item_id,
+            "request_id": get_request_id(),
+            "header": request.headers.get("x-request-id"),
+            "auth": request.headers.get("authorization"),
+        }
+
+    @app.post("/echo")
+    async def echo(payload: dict[str, Any]) -> dict[str, Any]:
+        return payload
+
+    @app.get("/missing")
+    async def missing() -> None:
+        raise NotFoundError("nope")
+
+    @app.get("/slow")
+    async def slow() -> None:
+        await asyncio.sleep(5)
+
+    @app.get("/session")
+    async def session(db: Any = Depends(get_db)) -> dict[str, int]:  # noqa: B008
+        return {"session": id(db)}
+
+    return app
+
+
+async def _batch(payload: dict[str, Any], **headers: str) -> Any:
+    async with AsyncClient(
+        transport=ASGITransport(app=_make_app()), base_url="http://test"
+    ) as client:
+        return await client.post("/batch", json=payload, headers=headers)
+
+
+async def test_batch_returns_responses_in_order_with_statuses() -> None:
+    response = await _batch(
+        {
+            "requests": [
+                {"id": "a", "path": "/items/1"},
+                {"id": "b", "method": "POST", "path": "/echo", "body": {"x": 1}},
+                {"id": "c", "path": "/missing"},
+                {"id": "d", "path": "/does-not-exist"},
+                {"id": "e", "path": "/items/not-an-int"},
+            ]
+        }
+    )
+    assert response.status_code == 200
+    items = response.json()["responses"]
+    assert [item["id"] for item in items] == ["a", "b", "c", "d", "e"]
+    assert [item["status"] for item in items] == [200, 200, 404, 404, 422]
+    assert items[1]["body"] == {"x": 1}
+    assert items[2]["body"]["type"] == "NotFoundError"
+
+
+async def test_sub_requests_get_derived_request_ids_and_parent_headers() -> None:
+    response = await _batch(
+        {"requests": [{"path": "/items/1"}, {"path": "/items/2"}]},
+        **{"X-Request-ID": "outer", "Authorization": "Bearer t"},
+    )
+    bodies = [item["body"] for item in response.json()["responses"]]
+    assert [body["request_id"] for body in bodies] == ["outer.0", "outer.1"]
+    assert [body["header"] for body in bodies] == ["outer.0", "outer.1"]
+    assert all(body["auth"] == "Bearer t" for body in bodies)
+    assert response.headers["x-request-id"] == "outer"
+
+
+async def test_sub_request_timeout_returns_504() -> None:
+    settings = get_settings().model_copy(update={"batch_item_timeout_seconds": 0.01})
+    with patch("app.core.batch.get_settings", return_value=settings):
+        response = await _batch({"requests": [{"path": "/slow"}]})
+    assert response.json()["responses"][0]["status"] == 504
+
+
+@pytest.mark.parametrize(
+    "payload",
+    [
+        {"requests": []},
+        {"requests": [{"path": "/batch"}]},
+        {"requests": [{"path": "relative"}]},
+        {"requests": [{"method": "POST", "path": "/echo"}], "shared_session": True},
+        {"requests": [{"path": "/items/1"}] * 21},
+    ],
+)
+async def test_invalid_batches_are_rejected(payload: dict[str, Any]) -> None:
+    response = await _batch(payload)
+    assert response.status_code == 422
+
+
+class FakeSessions:
+    """Stands in for AsyncSessionLocal; records the sessions and savepoints."""
+
+    def __init__(self) -> None:
+        self.opened: list[MagicMock] = []
+        self.savepoints: list[MagicMock] = []
+
+    def _begin_nested(self) -> MagicMock:
+        savepoint = MagicMock(is_active=True, rollback=AsyncMock())
+        self.savepoints.append(savepoint)
+        return savepoint
+
+    @asynccontextmanager
+    async def __call__(self) -> AsyncIterator[MagicMock]:
+        session = MagicMock(connection=AsyncMock(), invalidate=AsyncMock())
+        session.begin_nested = AsyncMock(side_effect=self._begin_nested)
+        self.opened.append(session)
+        yield session
+
+
+@pytest.fixture
+def sessions() -> Generator[FakeSessions, None, None]:
+    fake = FakeSessions()
+    with patch.object(db_module, "AsyncSessionLocal", fake):
+        yield fake
+
+
+async def test_shared_session_serves_one_session_to_every_item(
+    sessions: FakeSessions,
+) -> None:
+    response = await _batch(
+        {
+            "requests": [{"path": "/session"}, {"path": "/session"}],
+            "shared_session": True,
+        }
+    )
+    ids = {item["body"]["session"] for item in response.json()["responses"]}
+    assert len(sessions.opened) == 1
+    assert ids == {id(sessions.opened[0])}
+    sessions.opened[0].connection.assert_awaited_once()
+
+
+async def test_shared_session_rolls_back_each_item_to_its_savepoint(
+    sessions: FakeSessions,
+) -> None:
+    response = await _batch(
+        {
+            "requests": [{"path": "/missing"}, {"path": "/session"}],
+            "shared_session": True,
+        }
+    )
+    statuses = [item["status"] for item in response.json()["responses"]]
+    assert statuses == [404, 200]
+    assert len(sessions.savepoints) == 2
+    assert all(sp.rollback.await_count == 1 for sp in sessions.savepoints)
+    sessions.opened[0].invalidate.assert_not_awaited()
+
+
+async def test_shared_session_timeout_drops_the_connection_and_skips_the_rest(
+    sessions: FakeSessions,
+) -> None:
+    settings = get_settings().model_copy(update={"batch_item_timeout_seconds": 0.01})
+    with patch("app.core.batch.get_settings", return_value=settings):
+        response = await _batch(
+            {
+                "requests": [
+                    {"path": "/session"},
+                    {"path": "/slow"},
+                    {"path": "/session"},
+                ],
+                "shared_session": True,
+            }
+        )
+    statuses = [item["status"] for item in response.json()["responses"]]
+    assert statuses == [200, 504, 503]
+    assert len(sessions.savepoints) == 2
+    sessions.savepoints[1].rollback.assert_not_awaited()
+    sessions.opened[0].invalidate.assert_awaited_once()
+
+
+async def test_shared_session_checks_out_through_the_circuit_breaker(
+    sessions: FakeSessions,
+) -> None:
+    breaker = CircuitBreaker(failure_threshold=1)
+    breaker.record_failure()
+    with patch.object(db_module, "circuit_breaker", breaker):
+        response = await _batch(
+            {"requests": [{"path": "/session"}], "shared_session": True}
+        )
+    assert response.status_code == 503
+    assert sessions.opened[0].connection.await_count == 0
+
+
+async def test_get_db_yields_shared_session_inside_context(
+    sessions: FakeSessions,
+) -> None:
+    async with db_module.shared_session() as shared:
+        generator: AsyncGenerator[Any, None] = get_db()
+        assert await anext(generator) is shared
+        await generator.aclose()
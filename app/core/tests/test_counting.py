@@ -0,0 +1,131 @@
+"""Tests for app/core/counting.py."""
+
+from __future__ import annotations
+
+from collections.abc import Generator
+from typing import Any
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from sqlalchemy import Column, Integer, MetaData, String, Table, select
+from sqlalchemy.dialects import postgresql
+
+from app.core import counting
+from app.core.counting import PageTotal, Total, TotalMode, adjust_count, fetch_page
+from app.core.invalidation import LocalCache
+from app.shared.schemas import PaginationParams
+
+notes = Table(
+    "notes",
+    MetaData(),
+    Column("id", Integer, primary_key=True),
+    Column("vault", String),
+)
+QUERY = select(notes).where(notes.c.vault == "work").order_by(notes.c.id)
+
+
+@pytest.fixture
+def counts() -> Generator[dict[str, AsyncMock], None, None]:
+    """Patched count sources and a fresh cache."""
+    sources = {
+        "maintained_count": AsyncMock(return_value=42),
+        "exact_count": AsyncMock(return_value=40),
+        "estimate_count": AsyncMock(return_value=50_000),
+    }
+    with (
+        patch.multiple(counting, **sources),
+        patch.object(counting, "count_cache", LocalCache("row_counts", 16)),
+    ):
+        yield sources
+
+
+async def test_exact_total_reads_counter_for_scope(
+    counts: dict[str, AsyncMock],
+) -> None:
+    session = AsyncMock()
+    assert await PageTotal(scope="notes").resolve(session, QUERY) == Total(42)
+    assert await PageTotal().resolve(session, QUERY) == Total(40)
+    counts["maintained_count"].assert_awaited_once_with(session, "notes")
+    counts["exact_count"].assert_awaited_once_with(session, QUERY)
+
+
+async def test_cached_total_is_reused_until_invalidated_or_expired(
+    counts: dict[str, AsyncMock],
+) -> None:
+    total = PageTotal(TotalMode.CACHED, ttl=60.0)
+    session = AsyncMock()
+    for _ in range(3):
+        assert await total.resolve(session, QUERY, cache_key="notes:work") == Total(40)
+    assert counts["exact_count"].await_count == 1
+
+    counting.count_cache.invalidate(["notes:work"])
+    await total.resolve(session, QUERY, cache_key="notes:work")
+    assert counts["exact_count"].await_count == 2
+
+    expired = PageTotal(TotalMode.CACHED, scope="notes", ttl=0.0)
+    await expired.resolve(session, QUERY)
+    await expired.resolve(session, QUERY)
+    assert counts["maintained_count"].await_count == 2
+
+    with pytest.raises(ValueError, match="scope or cache_key"):
+        await PageTotal(TotalMode.CACHED).resolve(session, QUERY)
+
+
+async def test_estimated_total_falls_back_to_exact_when_small(
+    counts: dict[str, AsyncMock],
+) -> None:
+    session = AsyncMock()
+    total = PageTotal(TotalMode.ESTIMATED, exact_below=1000)
+    assert await total.resolve(session, QUERY) == Total(50_000, estimated=True)
+    counts["exact_count"].assert_not_awaited()
+
+    counts["estimate_count"].return_value = 120
+    assert await total.resolve(session, QUERY) == Total(40)
+
+
+async def test_estimate_count_reads_planner_rows() -> None:
+    connection = AsyncMock()
+    connection.dialect = postgresql.dialect()  # type: ignore[no-untyped-call]
+    connection.exec_driver_sql.return_value.scalar_one = MagicMock(
+        return_value='[{"Plan": {"Node Type": "Seq Scan", "Plan Rows": 1234}}]'
+    )
+    session = AsyncMock()
+    session.connection.return_value = connection
+    assert await counting.estimate_count(session, QUERY) == 1234
+    sql = connection.exec_driver_sql.call_args.args[0]
+    assert sql.startswith("EXPLAIN (FORMAT JSON) SELECT")
+    assert "notes.vault = 'work'" in sql
+    assert "ORDER BY" not in sql
+
+
+def _compiled(statement: Any) -> str:
+    return str(statement.compile(dialect=postgresql.dialect()))  # type: ignore[no-untyped-call]
+
+
+async def test_adjust_count_upserts_a_slot_and_invalidates_on_commit() -> None:
+    session = AsyncMock()
+    with patch.object(counting, "publish_invalidation") as publish:
+        await adjust_count(session, "notes:vault=work", 3)
+        await adjust_count(session, "notes", 0)
+    (statement,) = [call.args[0] for call in session.execute.await_args_list]
+    sql = _compiled(statement)
+    assert "INSERT INTO row_counts" in sql
+    assert "pg_backend_pid() %" in sql
+    assert "ON CONFLICT (scope, slot) DO UPDATE" in sql
+    assert "row_counts.count + excluded.count" in sql
+    publish.assert_awaited_once_with(session, "row_counts", ["notes:vault=work"])
+
+
+async def test_fetch_page_applies_paging_and_resolves_total(
+    counts: dict[str, AsyncMock],
+) -> None:
+    session = AsyncMock()
+    session.execute.return_value.all = MagicMock(return_value=[(21, "work")])
+    rows, total = await fetch_page(
+        session, QUERY, PaginationParams(page=3, page_size=10), PageTotal()
+    )
+    assert rows == [(21, "work")]
+    assert total == Total(40)
+    sql = _compiled(session.execute.await_args.args[0])
+    assert "LIMIT" in sql
+    assert "OFFSET" in sql
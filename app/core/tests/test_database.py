@@ -3,11 +3,14 @@
 from __future__ import annotations
 
 import inspect
-from unittest.mock import AsyncMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
+import pytest
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
 
 from app.core import database as db_module
+from app.core.exceptions import DatabaseUnavailableError
 
 
 async def test_engine_is_not_none() -> None:
@@ -54,3 +57,150 @@ def _make_async_context_manager(value: AsyncSession) -> object:
             pass
 
     return _CM()
+
+
+def test_server_settings_omits_unset_values() -> None:
+    settings = MagicMock(
+        db_search_path="app,public",
+        db_timezone="",
+        db_statement_timeout_ms=5000,
+        db_lock_timeout_ms=0,
+        db_idle_in_transaction_timeout_ms=0,
+    )
+    assert db_module.server_settings(settings) == {
+        "search_path": "app,public",
+        "statement_timeout": "5000",
+    }
+
+
+def _make_warmup_engine() -> MagicMock:
+    engine = MagicMock()
+    engine.opened = 0
+    conn = AsyncMock()
+
+    class _Connect:
+        async def __aenter__(self) -> AsyncMock:
+            engine.opened += 1
+            return conn
+
+        async def __aexit__(self, *args: object) -> None:
+            pass
+
+    engine.connect.side_effect = _Connect
+    engine.conn = conn
+    return engine
+
+
+async def test_warm_up_pool_opens_connections_in_parallel() -> None:
+    engine = _make_warmup_engine()
+    assert await db_module.warm_up_pool(engine, 3, timeout=1.0) is True
+    assert engine.opened == 3
+    assert engine.conn.execute.await_count == 3
+
+
+async def test_warm_up_pool_logs_and_returns_false_on_failure() -> None:
+    engine = _make_warmup_engine()
+    engine.conn.execute.side_effect = OSError("connection refused")
+    with patch.object(db_module, "logger") as mock_logger:
+        assert await db_module.warm_up_pool(engine, 2, timeout=1.0) is False
+    assert mock_logger.error.call_args.args[0] == "database.pool.warmup_failed"
+
+
+async def test_warm_up_pool_skips_when_disabled() -> None:
+    engine = _make_warmup_engine()
+    assert await db_module.warm_up_pool(engine, 0, timeout=1.0) is True
+    assert engine.opened == 0
+
+
+def test_sqlstate_reads_wrapped_dbapi_error() -> None:
+    orig = Exception("lock timeout")
+    orig.sqlstate = "55P03"  # type: ignore[attr-defined]
+    wrapped = DBAPIError("SET x", {}, orig)
+    assert db_module.sqlstate(wrapped) == "55P03"
+    assert db_module.sqlstate(ValueError("plain")) is None
+
+
+def _connect_error() -> DBAPIError:
+    return DBAPIError("connect", {}, ConnectionRefusedError("refused"))
+
+
+def _checkout(breaker: db_module.CircuitBreaker, error: Exception | None) -> None:
+    with breaker.guard():
+        if error is not None:
+            raise error
+
+
+def test_circuit_breaker_opens_after_consecutive_failures() -> None:
+    breaker = db_module.CircuitBreaker(failure_threshold=3, recovery_time=30.0)
+    with patch.object(db_module, "logger") as mock_logger:
+        for _ in range(2):
+            with pytest.raises(DBAPIError):
+                _checkout(breaker, _connect_error())
+        _checkout(breaker, None)  # a success resets the count
+        for _ in range(3):
+            with pytest.raises(DBAPIError):
+                _checkout(breaker, _connect_error())
+        assert breaker.state.value == "open"
+        with pytest.raises(DatabaseUnavailableError) as rejected:
+            _checkout(breaker, None)
+    assert 29 < rejected.value.retry_after <= 30
+    transition = mock_logger.warning.call_args.kwargs
+    assert mock_logger.warning.call_args.args[0] == "database.circuit.state_changed"
+    assert (transition["previous"], transition["state"]) == ("closed", "open")
+    assert transition["failures"] == 3
+
+
+def test_circuit_breaker_ignores_query_errors() -> None:
+    breaker = db_module.CircuitBreaker(failure_threshold=1)
+    with pytest.raises(ValueError):
+        _checkout(breaker, ValueError("bad input"))
+    assert breaker.state.value == "closed"
+
+
+def test_half_open_circuit_allows_one_trial_then_closes_or_reopens() -> None:
+    breaker = db_module.CircuitBreaker(failure_threshold=1, recovery_time=0.0)
+    with patch.object(db_module, "logger") as mock_logger:
+        with pytest.raises(DBAPIError):
+            _checkout(breaker, _connect_error())
+        assert breaker.state.value == "half_open"
+        with breaker.guard(), pytest.raises(DatabaseUnavailableError):
+            _checkout(breaker, None)  # a second concurrent trial is rejected
+        assert breaker.state.value == "closed"
+
+        breaker.recovery_time = 30.0
+        with pytest.raises(DBAPIError):
+            _checkout(breaker, _connect_error())
+        breaker._opened_at -= 30.0
+        with pytest.raises(OSError):
+            _checkout(breaker, OSError("timeout"))
+        assert breaker.state.value == "open"
+    states = [
+        call.kwargs["state"]
+        for call in mock_logger.info.call_args_list + mock_logger.warning.call_args_list
+    ]
+    assert sorted(states) == sorted(
+        ["open", "half_open", "closed", "open", "half_open", "open"]
+    )
+
+
+def test_circuit_breaker_disabled_with_zero_threshold() -> None:
+    breaker = db_module.CircuitBreaker(failure_threshold=0)
+    for _ in range(10):
+        with pytest.raises(DBAPIError):
+            _checkout(breaker, _connect_error())
+    assert breaker.state.value == "closed"
+
+
+async def test_get_db_fails_fast_while_circuit_is_open() -> None:
+    breaker = db_module.CircuitBreaker(failure_threshold=1, recovery_time=30.0)
+    breaker.record_failure()
+    with (
+        patch.object(db_module, "circuit_breaker", breaker),
+        patch.object(db_module, "AsyncSessionLocal") as session_factory,
+        patch.object(db_module, "logger"),
+    ):
+        session = AsyncMock(spec=AsyncSession)
+        session_factory.return_value = _make_async_context_manager(session)
+        with pytest.raises(DatabaseUnavailableError):
+            await db_module.get_db().__anext__()
+    session.connection.assert_not_awaited()
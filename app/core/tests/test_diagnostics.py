@@ -0,0 +1,153 @@
+"""Tests for app/core/diagnostics.py."""
+
+from __future__ import annotations
+
+import tracemalloc
+from collections.abc import Generator
+from typing import Any
+from unittest.mock import MagicMock, patch
+
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+from app.core import diagnostics
+from app.core.config import get_settings
+from app.core.diagnostics import SnapshotStore, router
+from app.core.middleware import RequestLoggingMiddleware
+
+_retained: list[bytes] = []
+
+
+@pytest.fixture(autouse=True)
+def isolated_tracing() -> Generator[None, None, None]:
+    """Fresh snapshot store; tracemalloc stopped after each test."""
+    with patch.object(diagnostics, "snapshots", SnapshotStore(max_snapshots=2)):
+        yield
+    tracemalloc.stop()
+    _retained.clear()
+
+
+def _client(client: tuple[str, int] = ("127.0.0.1", 123)) -> AsyncClient:
+    app = FastAPI()
+    app.include_router(router)
+
+    @app.get("/allocate")
+    async def allocate() -> dict[str, int]:
+        _retained.extend(bytes(1024) for _ in range(2000))
+        return {"retained": len(_retained)}
+
+    return AsyncClient(
+        transport=ASGITransport(app=app, client=client), base_url="http://test"
+    )
+
+
+async def test_status_reports_rss_and_gc_generations() -> None:
+    async with _client() as client:
+        response = await client.get("/debug/memory")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["tracing"] is False
+    assert [gen["generation"] for gen in body["gc_generations"]] == [0, 1, 2]
+    assert body["max_rss_bytes"] > 0
+
+
+async def test_clients_outside_allowed_hosts_are_rejected() -> None:
+    async with _client(("10.0.0.9", 5000)) as client:
+        response = await client.get("/debug/memory")
+    assert response.status_code == 403
+
+
+async def test_snapshot_diff_points_at_growing_allocation_site() -> None:
+    async with _client() as client:
+        assert (await client.post("/debug/memory/snapshots")).status_code == 409
+        started = await client.post("/debug/memory/tracing", params={"frames": 5})
+        assert started.json()["tracing"] is True
+        base = (await client.post("/debug/memory/snapshots")).json()["id"]
+        await client.get("/allocate")
+        after = (await client.post("/debug/memory/snapshots")).json()["id"]
+
+        top = await client.get(f"/debug/memory/snapshots/{after}/top")
+        diff = await client.get(
+            f"/debug/memory/snapshots/{after}/diff",
+            params={"base": base, "group_by": "traceback", "limit": 5},
+        )
+    assert top.status_code == 200
+    assert top.json()[0]["size_bytes"] > 0
+    growth = diff.json()[0]
+    assert growth["size_diff_bytes"] >= 2000 * 1024
+    assert any("test_diagnostics.py" in frame for frame in growth["location"])
+
+
+async def test_snapshot_store_keeps_most_recent_only() -> None:
+    async with _client() as client:
+        await client.post("/debug/memory/tracing")
+        ids = [
+            (await client.post("/debug/memory/snapshots")).json()["id"]
+            for _ in range(3)
+        ]
+        status = (await client.get("/debug/memory")).json()
+        missing = await client.get(f"/debug/memory/snapshots/{ids[0]}/top")
+        await client.delete("/debug/memory/snapshots")
+        cleared = (await client.get("/debug/memory")).json()
+    assert status["snapshots"] == ids[1:]
+    assert missing.status_code == 404
+    assert cleared["snapshots"] == []
+
+
+async def test_gc_endpoint_runs_a_collection() -> None:
+    async with _client() as client:
+        response = await client.post("/debug/memory/gc")
+    assert response.status_code == 200
+    assert response.json()["unreachable"] >= 0
+
+
+def _logging_app(**options: Any) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(RequestLoggingMiddleware, **options)
+
+    @app.get("/allocate")
+    async def allocate() -> dict[str, int]:
+        _retained.extend(bytes(1024) for _ in range(100))
+        return {}
+
+    return app
+
+
+async def _completed_fields(app: FastAPI, rate: float) -> dict[str, Any]:
+    settings = get_settings().model_copy(
+        update={"diagnostics_allocation_sample_rate": rate}
+    )
+    with (
+        patch("app.core.diagnostics.get_settings", return_value=settings),
+        patch("app.core.middleware.logger") as logger,
+    ):
+        logger.info = MagicMock()
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url="http://test"
+        ) as client:
+            await client.get("/allocate")
+    completed: dict[str, Any]
+    (completed,) = [
+        call.kwargs
+        for call in logger.info.call_args_list
+        if call.args[0] == "request.completed"
+    ]
+    return completed
+
+
+async def test_sampled_requests_log_allocated_bytes_while_tracing() -> None:
+    tracemalloc.start()
+    fields = await _completed_fields(_logging_app(allocation_sampling=True), 1.0)
+    assert fields["memory_allocated_bytes"] >= 100 * 1024
+
+
+async def test_allocation_stats_absent_when_unsampled_or_disabled() -> None:
+    tracemalloc.start()
+    unsampled = await _completed_fields(_logging_app(allocation_sampling=True), 0.0)
+    disabled = await _completed_fields(_logging_app(), 1.0)
+    tracemalloc.stop()
+    not_tracing = await _completed_fields(_logging_app(allocation_sampling=True), 1.0)
+    assert "memory_allocated_bytes" not in unsampled
+    assert "memory_allocated_bytes" not in disabled
+    assert "memory_allocated_bytes" not in not_tracing
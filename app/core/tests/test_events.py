@@ -0,0 +1,120 @@
+"""Tests for app/core/events.py."""
+
+from __future__ import annotations
+
+import asyncio
+from typing import Any
+from unittest.mock import MagicMock, patch
+
+from fastapi import FastAPI
+from starlette.types import Message
+
+from app.core import events
+from app.core.events import EventHub, Subscriber, encode_event, router
+from app.core.logging import get_request_id
+from app.core.middleware import RequestLoggingMiddleware
+
+
+def test_encode_event_frames_multiline_data() -> None:
+    frame = encode_event("a\nb", event="notes", event_id=7)
+    assert frame == b"id: 7\nevent: notes\ndata: a\ndata: b\n\n"
+
+
+def test_publish_shares_one_frame_across_subscribers() -> None:
+    hub = EventHub()
+    first = hub.subscribe(frozenset({"notes"}))
+    second = hub.subscribe(frozenset({"notes", "other"}))
+    unrelated = hub.subscribe(frozenset({"other"}))
+    hub.publish("notes", {"id": 1})
+    assert first._buffer[0] is second._buffer[0]
+    assert not unrelated._buffer
+
+
+def test_slow_consumer_is_closed_when_queue_is_full() -> None:
+    hub = EventHub(queue_size=2)
+    subscriber = hub.subscribe(frozenset({"notes"}))
+    for index in range(3):
+        hub.publish("notes", index)
+    assert subscriber.close_reason == "slow_consumer"
+    assert hub.dropped_subscribers == 1
+    hub.publish("notes", 4)
+    assert hub.dropped_subscribers == 2  # stays closed until unsubscribed
+
+
+def test_subscribe_replays_missed_events_for_its_topics() -> None:
+    hub = EventHub()
+    first = hub.publish("notes", 1)
+    hub.publish("other", 2)
+    hub.publish("notes", 3)
+    subscriber = hub.subscribe(frozenset({"notes"}), last_event_id=first)
+    assert list(subscriber._buffer) == [b"id: 3\nevent: notes\ndata: 3\n\n"]
+
+
+async def test_next_returns_none_on_heartbeat_timeout() -> None:
+    subscriber = Subscriber(frozenset({"notes"}), max_queue=4)
+    assert await subscriber.next(timeout=0.01) is None
+    asyncio.get_running_loop().call_later(0.01, subscriber.push, b"frame")
+    assert await subscriber.next(timeout=1.0) == b"frame"
+
+
+async def test_stream_sends_heartbeats_and_ends_at_max_lifetime() -> None:
+    hub = EventHub(heartbeat=0.01, max_lifetime=0.05)
+    frames = [frame async for frame in hub.stream(frozenset({"notes"}))]
+    assert frames[0].startswith(b"retry:")
+    assert b": keepalive\n\n" in frames
+    assert hub.subscriber_count == 0
+
+
+async def test_stream_is_not_buffered_by_request_logging_middleware() -> None:
+    """Frames reach the client while the stream is still open."""
+    hub = EventHub()
+    app = FastAPI()
+    app.include_router(router)
+    app.add_middleware(RequestLoggingMiddleware)
+    scope: dict[str, Any] = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/events",
+        "raw_path": b"/events",
+        "query_string": b"topic=notes",
+        "root_path": "",
+        "headers": [(b"host", b"test"), (b"x-request-id", b"sse-req-1")],
+        "client": ("127.0.0.1", 1234),
+        "server": ("test", 80),
+    }
+    disconnected = asyncio.Event()
+    bodies: list[bytes] = []
+    first_event = asyncio.Event()
+
+    async def receive() -> Message:
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message: Message) -> None:
+        if message["type"] == "http.response.body":
+            bodies.append(message.get("body", b""))
+            if b"data:" in message.get("body", b""):
+                first_event.set()
+
+    closed_request_ids: list[str] = []
+    mock_logger = MagicMock()
+    mock_logger.info.side_effect = lambda event, **_: (
+        closed_request_ids.append(get_request_id())
+        if event == "events.stream.closed"
+        else None
+    )
+    with patch.object(events, "hub", hub), patch.object(events, "logger", mock_logger):
+        task = asyncio.create_task(app(scope, receive, send))
+        async with asyncio.timeout(2):
+            while hub.subscriber_count == 0:
+                await asyncio.sleep(0.005)
+            hub.publish("notes", {"id": 1})
+            await first_event.wait()
+        assert not task.done()
+        await hub.close()
+        await asyncio.wait_for(task, 2)
+    assert b'data: {"id":1}' in b"".join(bodies)
+    assert closed_request_ids == ["sse-req-1"]
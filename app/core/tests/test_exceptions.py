@@ -9,6 +9,7 @@ from fastapi import Request
 
 from app.core.exceptions import (
     DatabaseError,
+    DatabaseUnavailableError,
     NotFoundError,
     ValidationError,
     database_exception_handler,
@@ -69,3 +70,17 @@ async def test_exception_handler_logs_with_exc_info() -> None:
     mock_logger.error.assert_called_once()
     call_kwargs = mock_logger.error.call_args.kwargs
     assert call_kwargs.get("exc_info") is True
+
+
+async def test_database_unavailable_returns_503_with_retry_after() -> None:
+    request = MagicMock(spec=Request)
+    request.url.path = "/test"
+    exc = DatabaseUnavailableError("circuit open", retry_after=4.2)
+
+    with patch("app.core.exceptions.logger") as mock_logger:
+        response = await database_exception_handler(request, exc)
+
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "5"
+    mock_logger.error.assert_not_called()
+    assert mock_logger.warning.call_args.args[0] == "database.unavailable"
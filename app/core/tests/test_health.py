@@ -2,13 +2,14 @@
 
 from __future__ import annotations
 
-from unittest.mock import AsyncMock
+from unittest.mock import AsyncMock, patch
 
 import pytest
 from httpx import ASGITransport, AsyncClient
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.database import get_db
+from app.core.database import CircuitBreaker, get_db
+from app.core.health import Readiness, readiness
 from app.main import app
 
 
@@ -67,6 +68,7 @@ async def test_health_ready_returns_200_when_ready(mock_db: AsyncMock) -> None:
     assert data["status"] == "ready"
     assert "environment" in data
     assert data["database"] == "connected"
+    assert data["database_circuit"] == "closed"
 
 
 async def test_health_ready_returns_503_when_db_fails(mock_db: AsyncMock) -> None:
@@ -76,3 +78,48 @@ async def test_health_ready_returns_503_when_db_fails(mock_db: AsyncMock) -> Non
     ) as client:
         response = await client.get("/health/ready")
     assert response.status_code == 503
+
+
+async def test_health_ready_returns_503_while_blocked(mock_db: AsyncMock) -> None:
+    readiness.block("warming_up")
+    try:
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url="http://test"
+        ) as client:
+            response = await client.get("/health/ready")
+    finally:
+        readiness.unblock("warming_up")
+    assert response.status_code == 503
+    assert "warming_up" in response.json()["detail"]
+    mock_db.execute.assert_not_called()
+
+
+async def test_health_ready_fails_fast_while_circuit_is_open() -> None:
+    breaker = CircuitBreaker(failure_threshold=1, recovery_time=30.0)
+    with (
+        patch("app.core.database.logger"),
+        patch("app.core.exceptions.logger"),
+        patch("app.core.database.circuit_breaker", breaker),
+        patch("app.core.database.AsyncSessionLocal") as session_factory,
+    ):
+        breaker.record_failure()
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url="http://test"
+        ) as client:
+            response = await client.get("/health/ready")
+    assert response.status_code == 503
+    assert response.json()["type"] == "DatabaseUnavailableError"
+    assert response.headers["retry-after"] == "30"
+    session = session_factory.return_value.__aenter__.return_value
+    session.connection.assert_not_called()
+
+
+def test_readiness_requires_all_blockers_cleared() -> None:
+    gate = Readiness()
+    gate.block("warming_up")
+    gate.block("draining")
+    gate.unblock("warming_up")
+    assert not gate.is_ready
+    assert gate.blockers == ["draining"]
+    gate.unblock("draining")
+    assert gate.is_ready
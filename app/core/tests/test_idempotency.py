@@ -0,0 +1,325 @@
+"""Tests for app/core/idempotency.py."""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Generator
+from dataclasses import replace
+from datetime import timedelta
+from typing import Any
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from fastapi import FastAPI, Response
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy.dialects import postgresql
+
+from app.core import idempotency
+from app.core.idempotency import (
+    IdempotencyMiddleware,
+    IdempotencyPurger,
+    StoredResponse,
+    claim_statement,
+    request_fingerprint,
+    scoped_key,
+)
+from app.shared.utils import utcnow
+
+
+class FakeStore:
+    """In-memory stand-in for the idempotency_keys table."""
+
+    def __init__(self) -> None:
+        self.rows: dict[str, StoredResponse | None] = {}
+        self.claims = 0
+        self.touches = 0
+
+    async def claim_key(
+        self, session: Any, key: str, request_hash: str, **_: Any
+    ) -> bool:
+        if key in self.rows:
+            return False
+        self.rows[key] = None
+        self.claims += 1
+        return True
+
+    async def load_response(self, session: Any, key: str) -> StoredResponse | None:
+        return self.rows.get(key)
+
+    async def save_response(
+        self,
+        session: Any,
+        key: str,
+        response: StoredResponse,
+    ) -> None:
+        self.rows[key] = response
+
+    async def release_key(self, session: Any, key: str) -> None:
+        if self.rows.get(key) is None:
+            self.rows.pop(key, None)
+
+    async def touch_key(self, session: Any, key: str) -> None:
+        self.touches += 1
+
+
+@pytest.fixture
+def store() -> Generator[FakeStore, None, None]:
+    fake = FakeStore()
+    with patch.multiple(
+        idempotency,
+        claim_key=fake.claim_key,
+        load_response=fake.load_response,
+        save_response=fake.save_response,
+        release_key=fake.release_key,
+        touch_key=fake.touch_key,
+    ):
+        yield fake
+
+
+def _factory() -> MagicMock:
+    factory = MagicMock()
+    factory.return_value.__aenter__.return_value = MagicMock()
+    return factory
+
+
+def _app(
+    calls: list[str], gate: asyncio.Event | None = None, **options: Any
+) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(IdempotencyMiddleware, session_factory=_factory(), **options)
+
+    @app.post("/notes")
+    async def create(payload: dict[str, Any], response: Response) -> dict[str, Any]:
+        calls.append(payload["title"])
+        if gate is not None:
+            await gate.wait()
+        response.set_cookie("a", "1")
+        response.set_cookie("b", "2")
+        return {"id": len(calls), **payload}
+
+    @app.post("/boom")
+    async def boom() -> Response:
+        calls.append("boom")
+        return Response(status_code=503)
+
+    return app
+
+
+def _client(app: FastAPI) -> AsyncClient:
+    return AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+
+
+def _key(value: str) -> dict[str, str]:
+    return {"Idempotency-Key": value}
+
+
+def _stored_key(value: str) -> str:
+    # ASGITransport reports every request as coming from 127.0.0.1.
+    return scoped_key("client:127.0.0.1", value)
+
+
+async def test_replay_returns_stored_response_without_running_handler(
+    store: FakeStore,
+) -> None:
+    calls: list[str] = []
+    async with _client(_app(calls)) as client:
+        first = await client.post("/notes", json={"title": "a"}, headers=_key("k1"))
+        second = await client.post("/notes", json={"title": "a"}, headers=_key("k1"))
+    assert calls == ["a"]
+    assert second.status_code == first.status_code == 200
+    assert second.json() == first.json() == {"id": 1, "title": "a"}
+    assert second.headers["idempotent-replayed"] == "true"
+    assert "idempotent-replayed" not in first.headers
+    assert len(first.headers.get_list("set-cookie")) == 2
+    assert "set-cookie" not in second.headers
+
+
+async def test_replay_is_served_from_the_database_after_a_restart(
+    store: FakeStore,
+) -> None:
+    calls: list[str] = []
+    async with _client(_app(calls)) as client:
+        await client.post("/notes", json={"title": "a"}, headers=_key("k1"))
+    async with _client(_app(calls)) as client:
+        replayed = await client.post("/notes", json={"title": "a"}, headers=_key("k1"))
+    assert calls == ["a"]
+    assert replayed.headers["idempotent-replayed"] == "true"
+
+
+async def test_concurrent_duplicates_wait_for_the_first_execution(
+    store: FakeStore,
+) -> None:
+    calls: list[str] = []
+    gate = asyncio.Event()
+    async with _client(_app(calls, gate)) as client:
+        requests = [
+            asyncio.create_task(
+                client.post("/notes", json={"title": "a"}, headers=_key("k1"))
+            )
+            for _ in range(5)
+        ]
+        await asyncio.sleep(0.05)
+        gate.set()
+        responses = await asyncio.gather(*requests)
+    assert calls == ["a"]
+    assert store.claims == 1
+    assert {response.json()["id"] for response in responses} == {1}
+    replayed = [r for r in responses if "idempotent-replayed" in r.headers]
+    assert len(replayed) == 4
+
+
+async def test_duplicate_held_by_another_worker_is_polled_until_stored(
+    store: FakeStore,
+) -> None:
+    store.rows[_stored_key("k1")] = None  # claimed elsewhere, still running
+    stored = StoredResponse(
+        request_fingerprint("POST", "/notes", "", b'{"title":"a"}'),
+        201,
+        (("content-type", "application/json"),),
+        b'{"id":7}',
+        utcnow() + timedelta(hours=1),
+    )
+    calls: list[str] = []
+
+    async def finish_elsewhere() -> None:
+        await asyncio.sleep(0.05)
+        store.rows[_stored_key("k1")] = stored
+
+    async with _client(_app(calls)) as client:
+        task = asyncio.create_task(finish_elsewhere())
+        response = await client.post(
+            "/notes", content=b'{"title":"a"}', headers=_key("k1")
+        )
+        await task
+    assert calls == []
+    assert response.status_code == 201
+    assert response.json() == {"id": 7}
+
+
+async def test_duplicate_gets_409_when_first_request_never_finishes(
+    store: FakeStore,
+) -> None:
+    store.rows[_stored_key("k1")] = None
+    async with _client(_app([], lock_timeout=0.05)) as client:
+        response = await client.post("/notes", json={"title": "a"}, headers=_key("k1"))
+    assert response.status_code == 409
+
+
+async def test_key_reused_for_a_different_request_is_rejected(
+    store: FakeStore,
+) -> None:
+    calls: list[str] = []
+    async with _client(_app(calls)) as client:
+        await client.post("/notes", json={"title": "a"}, headers=_key("k1"))
+        response = await client.post("/notes", json={"title": "b"}, headers=_key("k1"))
+    assert response.status_code == 422
+    assert calls == ["a"]
+
+
+async def test_keys_are_scoped_to_the_caller(store: FakeStore) -> None:
+    calls: list[str] = []
+    async with _client(_app(calls)) as client:
+        for token in ("alice", "bob", "alice"):
+            await client.post(
+                "/notes",
+                json={"title": token},
+                headers={**_key("k1"), "Authorization": f"Bearer {token}"},
+            )
+        await client.post("/notes", json={"title": "anonymous"}, headers=_key("k1"))
+    assert calls == ["alice", "bob", "anonymous"]
+    assert len(store.rows) == 3
+
+
+async def test_claim_is_refreshed_while_the_handler_runs(store: FakeStore) -> None:
+    calls: list[str] = []
+    gate = asyncio.Event()
+    async with _client(_app(calls, gate, lock_timeout=0.06)) as client:
+        request = asyncio.create_task(
+            client.post("/notes", json={"title": "a"}, headers=_key("k1"))
+        )
+        await asyncio.sleep(0.1)
+        gate.set()
+        response = await request
+        touches = store.touches
+        await asyncio.sleep(0.05)
+    assert response.status_code == 200
+    assert touches >= 2
+    assert store.touches == touches
+
+
+async def test_server_errors_release_the_key_for_retry(store: FakeStore) -> None:
+    calls: list[str] = []
+    async with _client(_app(calls)) as client:
+        first = await client.post("/boom", headers=_key("k1"))
+        second = await client.post("/boom", headers=_key("k1"))
+    assert first.status_code == second.status_code == 503
+    assert calls == ["boom", "boom"]
+    assert _stored_key("k1") not in store.rows
+
+
+async def test_requests_without_key_or_with_other_methods_pass_through(
+    store: FakeStore,
+) -> None:
+    calls: list[str] = []
+    app = _app(calls)
+
+    @app.put("/notes")
+    async def put() -> dict[str, str]:
+        calls.append("put")
+        return {}
+
+    async with _client(app) as client:
+        await client.post("/notes", json={"title": "a"})
+        await client.post("/notes", json={"title": "a"})
+        await client.put("/notes", headers=_key("k1"))
+        await client.put("/notes", headers=_key("k1"))
+    assert calls == ["a", "a", "put", "put"]
+    assert store.rows == {}
+
+
+async def test_oversized_key_is_rejected(store: FakeStore) -> None:
+    async with _client(_app([])) as client:
+        response = await client.post(
+            "/notes", json={"title": "a"}, headers=_key("x" * 256)
+        )
+    assert response.status_code == 400
+
+
+def test_expired_cache_entries_are_ignored() -> None:
+    middleware = IdempotencyMiddleware(MagicMock(), session_factory=_factory())
+    stored = StoredResponse("h", 200, (), b"", utcnow() + timedelta(hours=1))
+    middleware.cache.set("live", stored)
+    middleware.cache.set("old", replace(stored, expires_at=utcnow()))
+    assert middleware._cached("live") is stored
+    assert middleware._cached("old") is None
+    assert len(middleware.cache) == 1
+
+
+def test_request_fingerprint_covers_method_path_query_and_body() -> None:
+    base = request_fingerprint("POST", "/notes", "a=1", b"{}")
+    assert base == request_fingerprint("POST", "/notes", "a=1", b"{}")
+    assert base != request_fingerprint("PATCH", "/notes", "a=1", b"{}")
+    assert base != request_fingerprint("POST", "/notes/", "a=1", b"{}")
+    assert base != request_fingerprint("POST", "/notes", "a=2", b"{}")
+    assert base != request_fingerprint("POST", "/notes", "a=1", b"[]")
+
+
+def test_claim_statement_only_takes_over_expired_or_abandoned_keys() -> None:
+    statement = claim_statement("k", "h", ttl=60, lock_timeout=30)
+    sql = str(statement.compile(dialect=postgresql.dialect()))  # type: ignore[no-untyped-call]
+    assert "ON CONFLICT (key) DO UPDATE" in sql
+    assert "idempotency_keys.expires_at < now()" in sql
+    assert "idempotency_keys.status_code IS NULL" in sql
+    assert "RETURNING idempotency_keys.key" in sql
+
+
+async def test_purger_deletes_expired_keys_until_stopped() -> None:
+    purge = AsyncMock(side_effect=[3, RuntimeError("db down"), 0, 0, 0, 0])
+    with patch.object(idempotency, "purge_expired", purge):
+        purger = IdempotencyPurger(_factory(), interval=0.01)
+        purger.start()
+        async with asyncio.timeout(2):
+            while purge.await_count < 3:
+                await asyncio.sleep(0.005)
+        await purger.stop()
+    assert purger._task is None
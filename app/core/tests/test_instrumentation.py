@@ -0,0 +1,110 @@
+"""Tests for app/core/instrumentation.py."""
+
+from __future__ import annotations
+
+import contextvars
+from collections.abc import Generator
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import Engine, create_engine, text
+
+from app.core.instrumentation import (
+    fingerprint,
+    get_query_stats,
+    instrument_engine,
+    start_query_stats,
+)
+from app.core.logging import setup_logging
+
+
+@pytest.fixture
+def sqlite_engine() -> Generator[Engine, None, None]:
+    engine = create_engine("sqlite://")
+    yield engine
+    engine.dispose()
+
+
+def test_fingerprint_replaces_literals_and_params() -> None:
+    statement = "SELECT * FROM notes WHERE id = $1 AND title = 'a''b' LIMIT 10"
+    assert fingerprint(statement) == (
+        "SELECT * FROM notes WHERE id = ? AND title = ? LIMIT ?"
+    )
+
+
+def test_fingerprint_collapses_in_lists_and_whitespace() -> None:
+    first = fingerprint("SELECT id FROM t\n WHERE id IN (1, 2, 3)")
+    second = fingerprint("SELECT id FROM t WHERE id IN (%(a)s, %(b)s)")
+    assert first == second == "SELECT id FROM t WHERE id IN (...)"
+
+
+def test_fingerprint_keeps_postgres_casts() -> None:
+    assert fingerprint("SELECT :value::text") == "SELECT ?::text"
+
+
+def test_query_stats_absent_outside_request() -> None:
+    assert contextvars.Context().run(get_query_stats) is None
+
+
+def test_instrumented_engine_attributes_queries_to_request(
+    sqlite_engine: Engine,
+) -> None:
+    instrument_engine(sqlite_engine)
+    stats = start_query_stats()
+    with sqlite_engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        conn.execute(text("SELECT 2"))
+    assert stats.count == 2
+    assert stats.total_seconds > 0
+    assert stats.fingerprints["SELECT ?"] == 2
+
+
+def test_slow_query_is_logged(sqlite_engine: Engine) -> None:
+    instrument_engine(sqlite_engine, slow_threshold=0.0)
+    with (
+        patch("app.core.instrumentation.logger") as mock_logger,
+        sqlite_engine.connect() as conn,
+    ):
+        conn.execute(text("SELECT 1"))
+    events = [call.args[0] for call in mock_logger.warning.call_args_list]
+    assert "database.query.slow" in events
+
+
+@pytest.mark.parametrize(("level", "logged"), [("DEBUG", 1), ("INFO", 0)])
+def test_statement_log_follows_the_log_level(
+    sqlite_engine: Engine, level: str, logged: int
+) -> None:
+    instrument_engine(sqlite_engine, log_statements=True)
+    setup_logging(log_level=level)
+    try:
+        with (
+            patch("app.core.instrumentation.logger") as mock_logger,
+            sqlite_engine.connect() as conn,
+        ):
+            conn.execute(text("SELECT 1"))
+    finally:
+        setup_logging()
+    assert mock_logger.debug.call_count == logged
+
+
+def test_n_plus_one_is_flagged_once(sqlite_engine: Engine) -> None:
+    instrument_engine(sqlite_engine, n_plus_one_threshold=3)
+    start_query_stats()
+    with (
+        patch("app.core.instrumentation.logger") as mock_logger,
+        sqlite_engine.connect() as conn,
+    ):
+        for value in range(6):
+            conn.execute(text(f"SELECT {value}"))
+    events = [call.args[0] for call in mock_logger.warning.call_args_list]
+    assert events.count("database.query.n_plus_one_detected") == 1
+
+
+def test_failed_statement_does_not_leak_start_time(sqlite_engine: Engine) -> None:
+    instrument_engine(sqlite_engine)
+    stats = start_query_stats()
+    with sqlite_engine.connect() as conn:
+        with pytest.raises(Exception):  # noqa: B017
+            conn.execute(text("SELECT * FROM missing_table"))
+        conn.execute(text("SELECT 1"))
+    assert stats.count == 1
@@ -0,0 +1,137 @@
+"""Tests for app/core/invalidation.py."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+from typing import Any
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import asyncpg
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.invalidation import (
+    InvalidationListener,
+    LocalCache,
+    _payloads,
+    publish_invalidation,
+)
+
+
+def _listener(**kwargs: Any) -> tuple[InvalidationListener, LocalCache[int]]:
+    listener = InvalidationListener(coalesce_window=0.01, **kwargs)
+    cache: LocalCache[int] = listener.register(LocalCache("notes"))
+    for key in ("1", "2", "3"):
+        cache.set(key, int(key))
+    return listener, cache
+
+
+def _notify(listener: InvalidationListener, **message: object) -> None:
+    listener._on_notification(None, 1, "cache_invalidation", json.dumps(message))
+
+
+def test_local_cache_evicts_least_recently_used() -> None:
+    cache: LocalCache[int] = LocalCache("notes", max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert len(cache) == 2
+
+
+def test_payloads_split_large_key_lists() -> None:
+    keys = [f"{index:06d}" for index in range(2000)]
+    payloads = _payloads("notes", keys)
+    assert len(payloads) > 1
+    assert all(len(payload.encode()) <= 7900 for payload in payloads)
+    decoded = [key for payload in payloads for key in json.loads(payload)["keys"]]
+    assert decoded == keys
+
+
+async def test_publish_invalidation_notifies_inside_session() -> None:
+    session = AsyncMock(spec=AsyncSession)
+    await publish_invalidation(session, "notes", ["1", "1", "2"])
+    params = session.execute.await_args.args[1]
+    assert params["channel"] == "cache_invalidation"
+    assert json.loads(params["payload"]) == {"cache": "notes", "keys": ["1", "2"]}
+
+
+async def test_publish_invalidation_skips_empty_key_list() -> None:
+    session = AsyncMock(spec=AsyncSession)
+    await publish_invalidation(session, "notes", [])
+    session.execute.assert_not_awaited()
+
+
+async def test_notifications_are_coalesced_then_applied() -> None:
+    listener, cache = _listener()
+    _notify(listener, cache="notes", keys=["1"])
+    _notify(listener, cache="notes", keys=["2"])
+    assert cache.get("1") == 1  # not applied until the window closes
+    await asyncio.sleep(0.03)
+    assert (cache.get("1"), cache.get("2"), cache.get("3")) == (None, None, 3)
+
+
+async def test_whole_cache_invalidation_wins_over_keys() -> None:
+    listener, cache = _listener()
+    _notify(listener, cache="notes", keys=["1"])
+    _notify(listener, cache="notes")
+    _notify(listener, cache="notes", keys=["2"])
+    listener.flush()
+    assert len(cache) == 0
+
+
+async def test_unknown_cache_and_invalid_payload_are_ignored() -> None:
+    listener, cache = _listener()
+    _notify(listener, cache="other", keys=["1"])
+    listener._on_notification(None, 1, "cache_invalidation", "not json")
+    listener.flush()
+    assert len(cache) == 3
+
+
+async def test_listener_reconnects_and_resyncs_caches() -> None:
+    listener, cache = _listener(reconnect_initial=0.001, keepalive_interval=0.01)
+    connection = MagicMock()
+    connection.add_listener = AsyncMock()
+    connection.fetchval = AsyncMock(return_value=1)
+    connection.is_closed.return_value = False
+    connect = AsyncMock(side_effect=[OSError("refused"), connection])
+    with patch("app.core.invalidation.asyncpg.connect", connect):
+        listener.start("postgresql+asyncpg://user:pw@db/app")
+        async with asyncio.timeout(1):
+            while not listener.connected:
+                await asyncio.sleep(0.001)
+        await listener.stop()
+    assert connect.await_args_list[-1].args[0] == "postgresql://user:pw@db/app"
+    connection.add_listener.assert_awaited_once()
+    connection.terminate.assert_called_once()
+    assert len(cache) == 0
+    assert listener.connected is False
+
+
+async def test_listener_survives_dropped_connections_and_bugs() -> None:
+    listener, _ = _listener(reconnect_initial=0.001, keepalive_interval=0.01)
+    connection = MagicMock()
+    connection.add_listener = AsyncMock()
+    connection.fetchval = AsyncMock(return_value=1)
+    connection.is_closed.return_value = False
+    connect = AsyncMock(
+        side_effect=[
+            asyncpg.exceptions.ConnectionDoesNotExistError("gone"),
+            asyncpg.InterfaceError("closed"),
+            ValueError("unexpected"),
+            connection,
+        ]
+    )
+    with (
+        patch("app.core.invalidation.asyncpg.connect", connect),
+        patch("app.core.invalidation.logger") as logger,
+    ):
+        listener.start("postgresql+asyncpg://user:pw@db/app")
+        async with asyncio.timeout(1):
+            while not listener.connected:
+                await asyncio.sleep(0.001)
+        await listener.stop()
+    assert connect.await_count == 4
+    assert logger.warning.call_count == 2
+    assert logger.error.call_args.args[0] == "cache.listener.failed"
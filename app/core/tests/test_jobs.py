@@ -0,0 +1,183 @@
+"""Tests for app/core/jobs.py."""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Generator
+from typing import Any
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.core import jobs
+from app.core.jobs import ClaimedJob, JobMetrics, WorkerPool, claim_statement
+
+
+@pytest.fixture
+def handlers() -> Generator[dict[str, Any], None, None]:
+    """Isolate the handler registry for one test."""
+    with patch.dict(jobs._handlers, clear=True):
+        yield jobs._handlers
+
+
+@pytest.fixture
+def store() -> Generator[dict[str, AsyncMock], None, None]:
+    """Patch the SQL helpers the pool calls; ``claim`` serves one batch."""
+    batches: list[list[ClaimedJob]] = []
+    mocks = {
+        "claim": AsyncMock(side_effect=lambda *_: batches.pop(0) if batches else []),
+        "mark_succeeded": AsyncMock(),
+        "mark_failed": AsyncMock(),
+        "requeue_stale": AsyncMock(return_value=0),
+    }
+    with patch.multiple(jobs, **mocks):
+        mocks["batches"] = batches  # type: ignore[assignment]
+        yield mocks
+
+
+def _job(job_id: int, task: str = "test.task", attempts: int = 1) -> ClaimedJob:
+    return ClaimedJob(job_id, task, {"n": job_id}, 0, attempts, 3)
+
+
+def _pool(**kwargs: Any) -> WorkerPool:
+    session = MagicMock()
+    factory = MagicMock()
+    factory.return_value.__aenter__.return_value = session
+    options: dict[str, Any] = {"poll_interval": 0.01, "retry_backoff": 1.0}
+    options.update(kwargs)
+    return WorkerPool(factory, **options)
+
+
+async def _run_until(pool: WorkerPool, condition: Any) -> None:
+    await pool.start()
+    async with asyncio.timeout(2):
+        while not condition():
+            await asyncio.sleep(0.005)
+    await pool.stop()
+
+
+def test_claim_statement_uses_skip_locked_in_priority_order() -> None:
+    statement = claim_statement("default", 10)
+    sql = str(statement.compile(dialect=postgresql.dialect()))  # type: ignore[no-untyped-call]
+    assert "FOR UPDATE SKIP LOCKED" in sql
+    assert "ORDER BY jobs.priority DESC, jobs.run_at, jobs.id" in sql
+    assert "RETURNING" in sql
+
+
+def test_job_task_rejects_duplicate_names(handlers: dict[str, Any]) -> None:
+    async def first(payload: dict[str, Any]) -> None: ...
+
+    async def second(payload: dict[str, Any]) -> None: ...
+
+    jobs.job_task("dup")(first)
+    with pytest.raises(ValueError, match="already registered"):
+        jobs.job_task("dup")(second)
+
+
+def test_metrics_snapshot_reports_throughput() -> None:
+    metrics = JobMetrics(succeeded=3, retried=1, busy_seconds=0.4)
+    snapshot = metrics.snapshot()
+    assert snapshot["processed"] == 4
+    assert snapshot["mean_duration_seconds"] == 0.1
+    assert snapshot["jobs_per_second"] > 0
+
+
+async def test_pool_runs_claimed_jobs_and_marks_them_succeeded(
+    handlers: dict[str, Any], store: dict[str, Any]
+) -> None:
+    seen: list[int] = []
+
+    @jobs.job_task("test.task")
+    async def handler(payload: dict[str, Any]) -> None:
+        seen.append(payload["n"])
+
+    store["batches"].append([_job(1), _job(2)])
+    pool = _pool()
+    await _run_until(pool, lambda: pool.metrics.succeeded == 2)
+    assert sorted(seen) == [1, 2]
+    assert store["mark_succeeded"].await_count == 2
+    store["requeue_stale"].assert_awaited()
+
+
+async def test_pool_never_claims_more_than_free_slots(
+    handlers: dict[str, Any], store: dict[str, Any]
+) -> None:
+    release = asyncio.Event()
+
+    @jobs.job_task("test.task")
+    async def handler(payload: dict[str, Any]) -> None:
+        await release.wait()
+
+    store["batches"].append([_job(1), _job(2)])
+    pool = _pool(concurrency=2, batch_size=10)
+    await pool.start()
+    await asyncio.sleep(0.05)
+    limits = [call.args[2] for call in store["claim"].await_args_list]
+    assert limits[0] == 2
+    assert len(limits) == 1  # both slots busy, so no further claims
+    release.set()
+    await pool.stop()
+
+
+async def test_pool_retries_failures_then_fails_permanently(
+    handlers: dict[str, Any], store: dict[str, Any]
+) -> None:
+    @jobs.job_task("test.task")
+    async def handler(payload: dict[str, Any]) -> None:
+        raise RuntimeError("boom")
+
+    store["batches"].append([_job(1, attempts=1), _job(2, attempts=3)])
+    pool = _pool()
+    await _run_until(pool, lambda: pool.metrics.processed == 2)
+    retry_in = {
+        call.args[1].id: call.args[3] for call in store["mark_failed"].await_args_list
+    }
+    assert retry_in[1] is not None
+    assert retry_in[2] is None
+    assert (pool.metrics.retried, pool.metrics.failed) == (1, 1)
+
+
+async def test_pool_fails_unknown_tasks_without_retry(
+    handlers: dict[str, Any], store: dict[str, Any]
+) -> None:
+    store["batches"].append([_job(1, task="missing")])
+    pool = _pool()
+    await _run_until(pool, lambda: pool.metrics.failed == 1)
+    call = store["mark_failed"].await_args
+    assert "LookupError" in call.args[2]
+    assert call.args[3] is None
+
+
+async def test_stop_cancels_jobs_still_running_after_grace(
+    handlers: dict[str, Any], store: dict[str, Any]
+) -> None:
+    @jobs.job_task("test.task")
+    async def handler(payload: dict[str, Any]) -> None:
+        await asyncio.sleep(10)
+
+    store["batches"].append([_job(1)])
+    pool = _pool(grace=0.01)
+    await pool.start()
+    await asyncio.sleep(0.03)
+    await pool.stop()
+    assert pool._running == set()
+    store["mark_succeeded"].assert_not_awaited()
+
+
+async def test_stop_is_prompt_while_every_slot_is_busy(
+    handlers: dict[str, Any], store: dict[str, Any]
+) -> None:
+    @jobs.job_task("test.task")
+    async def handler(payload: dict[str, Any]) -> None:
+        await asyncio.sleep(10)
+
+    store["batches"].append([_job(1)])
+    pool = _pool(concurrency=1, grace=0.01, timeout=30.0)
+    await pool.start()
+    async with asyncio.timeout(2):
+        while not pool._running:
+            await asyncio.sleep(0.005)
+    async with asyncio.timeout(1):
+        await pool.stop()
+    assert pool._running == set()
@@ -0,0 +1,175 @@
+"""Tests for app/core/lifecycle.py."""
+
+from __future__ import annotations
+
+import asyncio
+import pickle
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, patch
+
+import uvicorn
+from fastapi import FastAPI
+from httpx import AsyncClient
+
+from app.core.health import Readiness
+from app.core.lifecycle import (
+    GracefulServer,
+    InFlightRequests,
+    ShutdownCoordinator,
+    in_flight,
+    shutdown_coordinator,
+)
+from app.core.middleware import RequestLoggingMiddleware
+
+
+async def test_wait_idle_returns_immediately_when_idle() -> None:
+    assert await InFlightRequests().wait_idle(timeout=0.0) is True
+
+
+async def test_wait_idle_waits_for_requests_to_finish() -> None:
+    requests = InFlightRequests(poll_interval=0.001)
+    requests.started()
+    asyncio.get_running_loop().call_later(0.01, requests.finished)
+    assert await requests.wait_idle(timeout=1.0) is True
+    assert requests.count == 0
+
+
+async def test_wait_idle_times_out() -> None:
+    requests = InFlightRequests(poll_interval=0.001)
+    requests.started()
+    assert await requests.wait_idle(timeout=0.01) is False
+
+
+async def test_shutdown_flips_readiness_before_closing_pools() -> None:
+    gate = Readiness()
+    order: list[str] = []
+
+    async def close_pools() -> None:
+        order.append("ready" if gate.is_ready else "draining")
+
+    coordinator = ShutdownCoordinator(
+        drain_timeout=0.1, gate=gate, requests=InFlightRequests()
+    )
+    await coordinator.run(close_pools=close_pools)
+    assert order == ["draining"]
+    assert gate.blockers == ["draining"]
+
+
+async def test_shutdown_logs_each_phase() -> None:
+    coordinator = ShutdownCoordinator(
+        drain_timeout=0.1, gate=Readiness(), requests=InFlightRequests()
+    )
+    with patch("app.core.lifecycle.logger") as mock_logger:
+        await coordinator.run(close_pools=AsyncMock())
+    events = [call.args[0] for call in mock_logger.info.call_args_list]
+    for phase in ("readiness", "drain", "pools", "logs"):
+        assert f"application.shutdown.{phase}_completed" in events
+
+
+async def test_shutdown_continues_after_drain_timeout_and_pool_failure() -> None:
+    requests = InFlightRequests(poll_interval=0.001)
+    requests.started()
+    close_pools = AsyncMock(side_effect=OSError("already closed"))
+    coordinator = ShutdownCoordinator(
+        drain_timeout=0.01, gate=Readiness(), requests=requests
+    )
+    with patch("app.core.lifecycle.logger") as mock_logger:
+        await coordinator.run(close_pools=close_pools)
+    warnings = [call.args[0] for call in mock_logger.warning.call_args_list]
+    errors = [call.args[0] for call in mock_logger.error.call_args_list]
+    infos = [call.args[0] for call in mock_logger.info.call_args_list]
+    assert "application.shutdown.drain_timed_out" in warnings
+    assert "application.shutdown.pools_failed" in errors
+    assert "application.shutdown.logs_completed" in infos
+
+
+async def test_shutdown_stops_services_in_reverse_before_pools() -> None:
+    order: list[str] = []
+
+    def recorder(name: str) -> AsyncMock:
+        return AsyncMock(side_effect=lambda: order.append(name))
+
+    coordinator = ShutdownCoordinator(
+        drain_timeout=0.1, gate=Readiness(), requests=InFlightRequests()
+    )
+    coordinator.add_service("exporter", recorder("exporter"))
+    coordinator.add_service("worker", recorder("worker"))
+    await coordinator.run(close_pools=recorder("pools"))
+    assert order == ["worker", "exporter", "pools"]
+
+
+async def test_drain_runs_once_across_server_and_lifespan() -> None:
+    coordinator = ShutdownCoordinator(
+        drain_timeout=0.1, gate=Readiness(), requests=InFlightRequests()
+    )
+    with patch("app.core.lifecycle.logger") as mock_logger:
+        await coordinator.drain()
+        await coordinator.run(close_pools=AsyncMock())
+    events = [call.args[0] for call in mock_logger.info.call_args_list]
+    assert events.count("application.shutdown.readiness_completed") == 1
+    assert events.count("application.shutdown.drain_completed") == 1
+
+
+async def test_graceful_server_drains_before_closing_sockets() -> None:
+    gate = Readiness()
+    coordinator = ShutdownCoordinator(
+        drain_timeout=5.0, readiness_delay=0.3, gate=gate, requests=in_flight
+    )
+    release = asyncio.Event()
+    lifespan_saw: list[tuple[bool, int]] = []
+
+    @asynccontextmanager
+    async def lifespan(_: FastAPI) -> AsyncIterator[None]:
+        yield
+        lifespan_saw.append((gate.is_ready, in_flight.count))
+
+    app = FastAPI(lifespan=lifespan)
+    app.add_middleware(RequestLoggingMiddleware)
+
+    @app.get("/slow")
+    async def slow() -> dict[str, bool]:
+        await release.wait()
+        return {"done": True}
+
+    @app.get("/ready")
+    async def ready() -> dict[str, bool]:
+        return {"ready": gate.is_ready}
+
+    config = uvicorn.Config(app, host="127.0.0.1", port=0, ws="none", log_config=None)
+    server = GracefulServer(config)
+    with patch("app.core.lifecycle.shutdown_coordinator", coordinator):
+        await _serve_until_drained(server, gate, release)
+    assert lifespan_saw == [(False, 0)]
+
+
+async def _serve_until_drained(
+    server: GracefulServer, gate: Readiness, release: asyncio.Event
+) -> None:
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+    port = server.servers[0].sockets[0].getsockname()[1]
+    async with AsyncClient(base_url=f"http://127.0.0.1:{port}") as client:
+        slow_request = asyncio.create_task(client.get("/slow"))
+        while in_flight.count == 0:
+            await asyncio.sleep(0.01)
+        # What handle_exit does on SIGTERM, without re-raising the signal.
+        server.should_exit = True
+        while gate.is_ready:
+            await asyncio.sleep(0.01)
+        # The listener still accepts during the readiness delay.
+        async with AsyncClient(base_url=f"http://127.0.0.1:{port}") as probe:
+            assert (await probe.get("/ready")).json() == {"ready": False}
+        release.set()
+        assert (await slow_request).json() == {"done": True}
+    await asyncio.wait_for(serving, 10.0)
+
+
+async def test_graceful_server_drains_this_process_coordinator_after_pickling() -> None:
+    server = GracefulServer(uvicorn.Config("app.main:app"))
+    # What ChangeReload and Multiprocess do to hand the server to a child.
+    run = pickle.loads(pickle.dumps(server.run))  # noqa: S301
+    with patch.object(shutdown_coordinator, "drain", AsyncMock()) as drain:
+        await run.__self__._drain()
+    drain.assert_awaited_once()
@@ -0,0 +1,157 @@
+"""Tests for app/core/limits.py."""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+from collections.abc import AsyncIterator
+from typing import Any
+from unittest.mock import patch
+
+import pytest
+from fastapi import Depends, FastAPI, Request
+from httpx import ASGITransport, AsyncClient
+
+from app.core import limits
+from app.core.config import get_settings
+from app.core.limits import (
+    BodyLimitMiddleware,
+    SpooledUpload,
+    max_body_size,
+    spooled_upload,
+    stream_body,
+)
+from app.core.middleware import setup_middleware
+
+
+def _app(limits: dict[str, int] | None = None) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(BodyLimitMiddleware, max_bytes=10, limits=limits)
+
+    @app.post("/echo")
+    async def echo(payload: dict[str, Any]) -> dict[str, Any]:
+        return payload
+
+    @app.post("/upload/{name}")
+    @max_body_size(100)
+    async def upload(
+        name: str,
+        file: SpooledUpload = Depends(spooled_upload),  # noqa: B008
+    ) -> dict[str, Any]:
+        return {
+            "name": name,
+            "size": file.size,
+            "sha256": file.sha256,
+            "head": file.file.read(5).decode(),
+            "content_type": file.content_type,
+        }
+
+    @app.post("/chunks")
+    async def chunks(request: Request) -> dict[str, int]:
+        sizes = [len(chunk) async for chunk in stream_body(request, max_bytes=20)]
+        return {"chunks": len(sizes), "size": sum(sizes)}
+
+    return app
+
+
+def _client(app: FastAPI) -> AsyncClient:
+    return AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+
+
+async def _chunked(data: bytes, size: int = 4) -> AsyncIterator[bytes]:
+    for start in range(0, len(data), size):
+        yield data[start : start + size]
+
+
+async def test_bodies_within_the_limit_pass() -> None:
+    async with _client(_app()) as client:
+        response = await client.post("/echo", json={"a": 1})
+        empty = await client.post("/chunks")
+    assert response.status_code == 200
+    assert response.json() == {"a": 1}
+    assert empty.json() == {"chunks": 0, "size": 0}
+
+
+async def test_declared_length_over_the_limit_is_rejected_before_reading() -> None:
+    async with _client(_app()) as client:
+        response = await client.post("/echo", json={"payload": "x" * 20})
+    assert response.status_code == 413
+    assert response.json() == {"detail": "Request body exceeds 10 bytes"}
+
+
+async def test_chunked_body_is_counted_as_it_streams() -> None:
+    async with _client(_app()) as client:
+        response = await client.post("/echo", content=_chunked(b'{"a": "xxxxxxxx"}'))
+    assert response.status_code == 413
+
+
+async def test_route_limit_and_settings_override() -> None:
+    body = b"# Title\n" + b"x" * 42
+    async with _client(_app()) as client:
+        response = await client.post(
+            "/upload/a", content=body, headers={"content-type": "text/markdown"}
+        )
+        too_big = await client.post("/upload/a", content=b"x" * 101)
+    assert response.status_code == 200
+    assert response.json() == {
+        "name": "a",
+        "size": 50,
+        "sha256": hashlib.sha256(body).hexdigest(),
+        "head": "# Tit",
+        "content_type": "text/markdown",
+    }
+    assert too_big.status_code == 413
+
+    async with _client(_app({"/upload/{name}": 20})) as client:
+        response = await client.post("/upload/a", content=_chunked(body))
+    assert response.status_code == 413
+    assert response.json() == {"detail": "Request body exceeds 20 bytes"}
+
+
+async def test_spooled_writes_leave_the_event_loop_after_rollover() -> None:
+    settings = get_settings().model_copy(update={"upload_spool_bytes": 10})
+    body = b"0123456789abcdefghij"
+    with (
+        patch.object(limits, "get_settings", return_value=settings),
+        patch("asyncio.to_thread", wraps=asyncio.to_thread) as to_thread,
+    ):
+        async with _client(_app()) as client:
+            response = await client.post("/upload/a", content=_chunked(body))
+    assert response.json()["size"] == 20
+    assert response.json()["sha256"] == hashlib.sha256(body).hexdigest()
+    # 4-byte chunks: the first two stay in memory, the third rolls over.
+    assert to_thread.call_count == 3
+
+
+async def test_stream_body_applies_a_tighter_limit() -> None:
+    app = _app({"/chunks": 100})
+    async with _client(app) as client:
+        response = await client.post("/chunks", content=_chunked(b"x" * 18))
+        too_big = await client.post("/chunks", content=_chunked(b"x" * 21))
+    assert response.json() == {"chunks": 5, "size": 18}
+    assert too_big.status_code == 413
+
+
+async def test_read_outside_a_route_is_answered_by_the_middleware() -> None:
+    async def reader(scope: Any, receive: Any, send: Any) -> None:
+        while (await receive()).get("more_body"):
+            pass
+
+    app = BodyLimitMiddleware(reader, max_bytes=10)
+    async with _client(app) as client:  # type: ignore[arg-type]
+        response = await client.post("/", content=_chunked(b"x" * 11))
+    assert response.status_code == 413
+
+
+@pytest.mark.parametrize(("size", "status"), [(100, 200), (2_000_000, 413)])
+async def test_setup_middleware_caps_bodies(size: int, status: int) -> None:
+    app = FastAPI()
+    setup_middleware(app)
+
+    @app.post("/echo")
+    async def echo(request: Request) -> dict[str, int]:
+        return {"size": len(await request.body())}
+
+    async with _client(app) as client:
+        response = await client.post("/echo", content=b"x" * size)
+    assert response.status_code == status
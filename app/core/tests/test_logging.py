@@ -12,6 +12,7 @@ import structlog
 from app.core.logging import (
     get_logger,
     get_request_id,
+    is_enabled_for,
     request_id_var,
     set_request_id,
     setup_logging,
@@ -86,3 +87,26 @@ def test_exc_info_renders_exception(capsys: pytest.CaptureFixture[str]) -> None:
     data = json.loads(captured.out.strip())
     assert data["event"] == "task.processing_failed"
     assert "exception" in data
+
+
+def test_log_level_applies_to_already_bound_loggers(
+    capsys: pytest.CaptureFixture[str],
+) -> None:
+    setup_logging(log_level="INFO")
+    logger = get_logger("test.level")  # bound before the level changes
+    try:
+        setup_logging(log_level="WARNING")
+        logger.debug("debug.sent")
+        logger.info("info.sent")
+        logger.warning("warning.sent")
+        assert not is_enabled_for(logging.INFO)
+        # A reload calls setup_logging again with the new level.
+        setup_logging(log_level="DEBUG")
+        logger.debug("debug.resent")
+        assert is_enabled_for(logging.DEBUG)
+    finally:
+        setup_logging(log_level="INFO")
+    events = [
+        json.loads(line)["event"] for line in capsys.readouterr().out.splitlines()
+    ]
+    assert events == ["warning.sent", "debug.resent"]
@@ -0,0 +1,83 @@
+"""Tests for app/core/loop_monitor.py."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from unittest.mock import patch
+
+from httpx import ASGITransport, AsyncClient
+
+from app.core import loop_monitor as loop_monitor_module
+from app.core.loop_monitor import LoopLagMonitor
+
+
+def _blocking_call(seconds: float) -> None:
+    time.sleep(seconds)
+
+
+def test_percentiles_summarize_recent_samples() -> None:
+    monitor = LoopLagMonitor(window=100)
+    assert monitor.percentiles() == {"p50": 0.0, "p90": 0.0, "p99": 0.0, "max": 0.0}
+    for value in range(1, 201):
+        monitor.record(value / 1000)
+    # Only the last 100 samples (0.101-0.200) are kept.
+    assert monitor.percentiles() == {
+        "p50": 0.15,
+        "p90": 0.19,
+        "p99": 0.199,
+        "max": 0.2,
+    }
+
+
+async def test_monitor_records_scheduling_delay() -> None:
+    monitor = LoopLagMonitor(interval=0.01, threshold=10.0)
+    monitor.start()
+    await asyncio.sleep(0.05)
+    _blocking_call(0.05)
+    await asyncio.sleep(0.03)
+    await monitor.stop()
+    snapshot = monitor.snapshot()
+    assert snapshot["running"] is False
+    assert isinstance(snapshot["samples"], int)
+    assert snapshot["samples"] >= 3
+    assert monitor.percentiles()["max"] >= 0.04
+    assert monitor.blocked_events == 0
+
+
+async def test_watchdog_logs_blocking_frame_once_per_stall() -> None:
+    monitor = LoopLagMonitor(interval=0.01, threshold=0.05)
+    with patch.object(loop_monitor_module, "logger") as logger:
+        monitor.start()
+        await asyncio.sleep(0.03)
+        _blocking_call(0.3)
+        await asyncio.sleep(0.03)
+        await monitor.stop()
+    blocked = [
+        call
+        for call in logger.warning.call_args_list
+        if call.args[0] == "eventloop.blocked"
+    ]
+    assert len(blocked) == 1
+    fields = blocked[0].kwargs
+    assert "in _blocking_call" in fields["frame"]
+    assert fields["stack"][0] == fields["frame"]
+    assert any("test_watchdog_logs_blocking_frame" in line for line in fields["stack"])
+    assert fields["blocked_seconds"] >= 0.05
+    assert monitor.blocked_events == 1
+
+
+async def test_health_loop_reports_monitor_snapshot() -> None:
+    from app.main import app
+
+    monitor = LoopLagMonitor()
+    monitor.record(0.002)
+    with patch("app.core.health.loop_monitor", monitor):
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url="http://test"
+        ) as client:
+            response = await client.get("/health/loop")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["samples"] == 1
+    assert body["lag_seconds"]["p99"] == 0.002
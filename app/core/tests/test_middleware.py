@@ -9,6 +9,7 @@ import pytest
 from fastapi import FastAPI
 from httpx import ASGITransport, AsyncClient
 
+from app.core.lifecycle import in_flight
 from app.core.logging import request_id_var
 from app.core.middleware import RequestLoggingMiddleware, setup_middleware
 
@@ -96,3 +97,22 @@ async def test_setup_middleware_adds_cors() -> None:
     assert (
         response.headers.get("access-control-allow-origin") == "http://localhost:3000"
     )
+
+
+async def test_middleware_tracks_in_flight_requests() -> None:
+    app = FastAPI()
+    app.add_middleware(RequestLoggingMiddleware)
+    seen: list[int] = []
+
+    @app.get("/count")
+    async def count() -> dict[str, str]:
+        seen.append(in_flight.count)
+        return {"status": "ok"}
+
+    before = in_flight.count
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        await client.get("/count")
+    assert seen == [before + 1]
+    assert in_flight.count == before
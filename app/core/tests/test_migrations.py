@@ -0,0 +1,147 @@
+"""Tests for app/core/migrations.py."""
+
+from __future__ import annotations
+
+import io
+from collections.abc import Generator
+from unittest.mock import MagicMock, patch
+
+import pytest
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+from sqlalchemy import Connection, create_engine, text
+
+from app.core.migrations import (
+    backfill_in_batches,
+    create_count_trigger,
+    drop_count_trigger,
+    migration_timeouts,
+    reset_timeouts,
+)
+
+
+@pytest.fixture
+def migration_conn() -> Generator[Connection, None, None]:
+    """SQLite connection bound to Alembic's ``op`` proxy, with a notes table."""
+    engine = create_engine("sqlite://")
+    with engine.connect() as conn:
+        conn.execute(text("CREATE TABLE notes (id INTEGER PRIMARY KEY, slug TEXT)"))
+        conn.execute(
+            text("INSERT INTO notes (id, slug) VALUES (:id, NULL)"),
+            [{"id": i} for i in range(1, 26)],
+        )
+        conn.commit()
+        context = MigrationContext.configure(conn)
+        with Operations.context(context):
+            yield conn
+    engine.dispose()
+
+
+def test_backfill_updates_all_rows_in_batches(migration_conn: Connection) -> None:
+    with patch("app.core.migrations.logger") as mock_logger:
+        total = backfill_in_batches(
+            "notes",
+            "slug = 'note-' || id",
+            where="slug IS NULL",
+            batch_size=10,
+            pause_seconds=0,
+        )
+    assert total == 25
+    remaining = migration_conn.execute(
+        text("SELECT count(*) FROM notes WHERE slug IS NULL")
+    ).scalar_one()
+    assert remaining == 0
+    batches = [
+        call
+        for call in mock_logger.info.call_args_list
+        if call.args[0] == "migration.backfill.batch_completed"
+    ]
+    assert [call.kwargs["rows"] for call in batches] == [10, 10, 5]
+
+
+def test_backfill_is_resumable(migration_conn: Connection) -> None:
+    migration_conn.execute(text("UPDATE notes SET slug = 'done' WHERE id <= 20"))
+    migration_conn.commit()
+    total = backfill_in_batches(
+        "notes", "slug = 'late'", where="slug IS NULL", pause_seconds=0
+    )
+    assert total == 5
+
+
+def test_migration_timeouts_sets_and_resets_session_values() -> None:
+    executed: list[str] = []
+
+    @migration_timeouts(lock_timeout_ms=2000, statement_timeout_ms=0)
+    def upgrade() -> None:
+        executed.append("upgrade")
+
+    with patch("app.core.migrations.op") as mock_op:
+        mock_op.execute.side_effect = lambda clause: executed.append(str(clause))
+        upgrade()
+
+    assert executed == [
+        "SET lock_timeout = 2000",
+        "SET statement_timeout = 0",
+        "upgrade",
+        "RESET lock_timeout",
+        "RESET statement_timeout",
+    ]
+
+
+def test_migration_timeouts_keeps_the_original_error_of_a_failed_revision() -> None:
+    executed: list[str] = []
+    aborted = False
+
+    def execute(clause: object) -> None:
+        # Postgres rejects every statement after an error in the transaction.
+        if aborted:
+            raise RuntimeError("25P02 current transaction is aborted")
+        executed.append(str(clause))
+
+    @migration_timeouts(lock_timeout_ms=2000)
+    def upgrade() -> None:
+        nonlocal aborted
+        aborted = True
+        raise TimeoutError("55P03 lock not available")
+
+    with patch("app.core.migrations.op") as mock_op:
+        mock_op.execute.side_effect = execute
+        with pytest.raises(TimeoutError, match="55P03"):
+            upgrade()
+
+    assert executed == ["SET lock_timeout = 2000"]
+
+
+def test_reset_timeouts_restores_session_defaults() -> None:
+    connection = MagicMock()
+    reset_timeouts(connection)
+    statements = [str(call.args[0]) for call in connection.execute.call_args_list]
+    assert statements == ["RESET lock_timeout", "RESET statement_timeout"]
+    connection.commit.assert_called_once()
+
+
+def test_create_count_trigger_aggregates_transition_tables() -> None:
+    buffer = io.StringIO()
+    context = MigrationContext.configure(
+        dialect_name="postgresql",
+        opts={"as_sql": True, "output_buffer": buffer},
+    )
+    with Operations.context(context):
+        create_count_trigger(
+            "notes",
+            ["'notes'", "CASE WHEN NOT archived THEN 'notes:vault=' || vault END"],
+        )
+        drop_count_trigger("notes")
+    sql = buffer.getvalue()
+    assert "CREATE OR REPLACE FUNCTION notes_row_counts()" in sql
+    for event, referencing in (
+        ("insert", "REFERENCING NEW TABLE AS new_rows"),
+        ("update", "REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows"),
+        ("delete", "REFERENCING OLD TABLE AS old_rows"),
+    ):
+        assert f"CREATE TRIGGER notes_row_counts_{event}" in sql
+        assert referencing in sql
+    assert "'notes:vault=' || vault" in sql
+    assert "HAVING sum(delta) <> 0" in sql
+    assert "FROM (SELECT 'notes' AS scope, 1 AS delta FROM notes UNION ALL" in sql
+    assert "DROP FUNCTION IF EXISTS notes_row_counts()" in sql
@@ -0,0 +1,141 @@
+"""Tests for app/core/processes.py."""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import multiprocessing
+import os
+import threading
+import time
+from collections.abc import AsyncGenerator
+from concurrent.futures.process import BrokenProcessPool
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app.core import processes
+from app.core.processes import ProcessPool, cpu_bound, get_process_pool
+
+
+def square(value: int) -> int:
+    return value * value
+
+
+def power(value: int, *, exponent: int) -> int:
+    return int(value**exponent)
+
+
+def pid(_: int = 0) -> int:
+    return os.getpid()
+
+
+def nap(seconds: float) -> float:
+    time.sleep(seconds)
+    return seconds
+
+
+def signal_then_nap(started: threading.Event, seconds: float) -> float:
+    started.set()
+    return nap(seconds)
+
+
+def crash() -> None:
+    os._exit(1)
+
+
+@cpu_bound()
+def word_count(text: str, *, unique: bool = False) -> int:
+    words = text.split()
+    return len(set(words)) if unique else len(words)
+
+
+@pytest.fixture
+async def pool() -> AsyncGenerator[ProcessPool, None]:
+    pool = ProcessPool(max_workers=2, timeout=10.0)
+    pool.start()
+    with patch.object(processes, "process_pool", pool):
+        yield pool
+    await pool.stop()
+
+
+async def test_run_returns_result_from_a_child_process(pool: ProcessPool) -> None:
+    assert await pool.run(square, 7) == 49
+    assert await pool.run(pid) != os.getpid()
+
+
+async def test_run_accepts_keyword_arguments_via_partial(pool: ProcessPool) -> None:
+    assert await pool.run(functools.partial(power, exponent=3), 2) == 8
+
+
+async def test_run_logs_queue_wait_and_execution_time(pool: ProcessPool) -> None:
+    with patch.object(processes, "logger") as logger:
+        await pool.run(nap, 0.05)
+    logger.info.assert_called_once()
+    event, fields = logger.info.call_args.args[0], logger.info.call_args.kwargs
+    assert event == "process_pool.task.completed"
+    assert fields["function"] == "nap"
+    assert fields["execution_seconds"] >= 0.04
+    assert fields["queue_wait_seconds"] >= 0
+
+
+async def test_map_preserves_order_across_chunks(pool: ProcessPool) -> None:
+    assert await pool.map(square, range(50), chunksize=7) == [
+        value * value for value in range(50)
+    ]
+    assert await pool.map(square, []) == []
+
+
+async def test_run_timeout_raises_and_skips_queued_call() -> None:
+    # A manager event, since the children do not inherit the test's objects.
+    manager = multiprocessing.Manager()
+    pool = ProcessPool(max_workers=1, timeout=10.0)
+    pool.start()
+    try:
+        # One call runs and, once the child has taken it, two fill the
+        # executor's hand-off queue (capacity max_workers + 1), so the timed
+        # out call is still pending in the parent.
+        started = manager.Event()
+        busy = [pool._submit(signal_then_nap, (started, 0.3))]
+        assert await asyncio.to_thread(started.wait, 10.0)
+        busy += [pool._submit(nap, (0.3,)) for _ in range(2)]
+        with patch.object(processes, "logger") as logger, pytest.raises(TimeoutError):
+            await pool.run(nap, 0.0, timeout=0.05)
+        assert logger.warning.call_args.kwargs["started"] is False
+        for _, future in busy:
+            future.result()
+    finally:
+        await pool.stop()
+        manager.shutdown()
+
+
+async def test_map_timeout_cancels_remaining_chunks(pool: ProcessPool) -> None:
+    start = time.perf_counter()
+    with pytest.raises(TimeoutError):
+        await pool.map(nap, [0.3] * 20, chunksize=1, timeout=0.1)
+    await pool.stop()
+    # Only chunks already handed to a child finish (6s if all 20 ran).
+    assert time.perf_counter() - start < 2.0
+
+
+async def test_cpu_bound_function_runs_in_the_pool(pool: ProcessPool) -> None:
+    assert await word_count("a b a") == 3
+    assert await word_count("a b a", unique=True) == 2
+    assert word_count.__name__ == "word_count"
+
+
+async def test_broken_pool_is_replaced(pool: ProcessPool) -> None:
+    with patch.object(processes, "logger"), pytest.raises(BrokenProcessPool):
+        await pool.run(crash)
+    assert await pool.run(square, 3) == 9
+
+
+async def test_run_requires_a_started_pool() -> None:
+    with pytest.raises(RuntimeError, match="not running"):
+        await ProcessPool().run(square, 2)
+
+
+async def test_dependency_returns_the_module_pool() -> None:
+    sentinel = MagicMock()
+    with patch.object(processes, "process_pool", sentinel):
+        assert await get_process_pool() is sentinel
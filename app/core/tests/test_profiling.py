@@ -0,0 +1,146 @@
+"""Tests for app/core/profiling.py."""
+
+from __future__ import annotations
+
+import threading
+import time
+from pathlib import Path
+
+import pytest
+from fastapi import APIRouter, FastAPI
+from httpx import ASGITransport, AsyncClient
+
+from app.core.middleware import RequestLoggingMiddleware
+from app.core.profiling import (
+    ProfilingMiddleware,
+    RequestTimings,
+    StackSampler,
+    TimedRoute,
+    timed,
+)
+
+
+def _make_app(**profiling: object) -> FastAPI:
+    app = FastAPI()
+    router = APIRouter(route_class=TimedRoute)
+
+    @router.get("/work")
+    async def work() -> dict[str, str]:
+        with timed("custom"):
+            time.sleep(0.01)
+        return {"status": "ok"}
+
+    @router.get("/sync")
+    def sync_work(q: int = 1) -> dict[str, int]:
+        return {"q": q}
+
+    app.include_router(router)
+    if profiling:
+        app.add_middleware(ProfilingMiddleware, **profiling)  # type: ignore[arg-type]
+    app.add_middleware(RequestLoggingMiddleware, server_timing=True)
+    return app
+
+
+def test_request_timings_header_orders_phases() -> None:
+    timings = RequestTimings()
+    timings.record("handler", 0.002)
+    timings.record("deps", 0.001)
+    timings.close()
+    header = timings.header_value()
+    names = [part.split(";")[0] for part in header.split(", ")]
+    assert names == ["mw", "deps", "handler", "total"]
+
+
+def test_timed_is_noop_without_collector() -> None:
+    with timed("anything"):
+        pass
+
+
+async def test_server_timing_header_has_route_phases() -> None:
+    async with AsyncClient(
+        transport=ASGITransport(app=_make_app()), base_url="http://test"
+    ) as client:
+        response = await client.get("/work")
+    header = response.headers["server-timing"]
+    for phase in ("mw", "deps", "handler", "serialize", "custom", "total"):
+        assert f"{phase};dur=" in header
+
+
+async def test_timed_route_preserves_sync_endpoint_signature() -> None:
+    async with AsyncClient(
+        transport=ASGITransport(app=_make_app()), base_url="http://test"
+    ) as client:
+        response = await client.get("/sync", params={"q": 7})
+    assert response.json() == {"q": 7}
+    assert "handler;dur=" in response.headers["server-timing"]
+
+
+async def test_server_timing_absent_by_default() -> None:
+    app = FastAPI()
+    app.add_middleware(RequestLoggingMiddleware)
+
+    @app.get("/ping")
+    async def ping() -> dict[str, str]:
+        return {"pong": "ok"}
+
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        response = await client.get("/ping")
+    assert "server-timing" not in response.headers
+
+
+def test_stack_sampler_collects_samples() -> None:
+    sampler = StackSampler(threading.get_ident(), interval=0.001)
+    sampler.start()
+    deadline = time.perf_counter() + 0.05
+    while time.perf_counter() < deadline:
+        sum(range(1000))
+    sampler.stop()
+    assert sampler.samples
+    assert "test_stack_sampler_collects_samples" in sampler.collapsed()
+
+
+async def test_profile_header_inline_returns_collapsed_stacks() -> None:
+    app = _make_app(allowed_hosts=["127.0.0.1"])
+    async with AsyncClient(
+        transport=ASGITransport(app=app, client=("127.0.0.1", 1234)),
+        base_url="http://test",
+    ) as client:
+        response = await client.get("/work", headers={"X-Profile": "inline"})
+    assert response.headers["x-profile-status"] == "200"
+    assert response.headers["content-type"].startswith("text/plain")
+
+
+async def test_profile_header_rejected_for_unlisted_host(tmp_path: Path) -> None:
+    app = _make_app(allowed_hosts=["10.0.0.1"], output_dir=str(tmp_path))
+    async with AsyncClient(
+        transport=ASGITransport(app=app, client=("127.0.0.1", 1234)),
+        base_url="http://test",
+    ) as client:
+        response = await client.get("/work", headers={"X-Profile": "1"})
+    assert response.json() == {"status": "ok"}
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.parametrize("headers", [{"X-Profile": "1"}, {}])
+async def test_profile_written_to_output_dir(
+    tmp_path: Path, headers: dict[str, str]
+) -> None:
+    app = _make_app(
+        allowed_hosts=["127.0.0.1"],
+        sample_rate=0.0 if headers else 1.0,
+        output_dir=str(tmp_path),
+    )
+    async with AsyncClient(
+        transport=ASGITransport(app=app, client=("127.0.0.1", 1234)),
+        base_url="http://test",
+    ) as client:
+        response = await client.get(
+            "/work", headers={**headers, "X-Request-ID": "../../escaped"}
+        )
+    assert response.json() == {"status": "ok"}
+    [profile] = tmp_path.iterdir()
+    assert profile.suffix == ".collapsed"
+    assert "escaped" not in profile.name
+    assert not (tmp_path.parent.parent / "escaped.collapsed").exists()
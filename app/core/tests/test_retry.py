@@ -0,0 +1,175 @@
+"""Tests for app/core/retry.py."""
+
+from __future__ import annotations
+
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from typing import Any
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from sqlalchemy.exc import DBAPIError, IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import retry
+from app.core.database import CircuitBreaker
+from app.core.exceptions import DatabaseUnavailableError
+from app.core.instrumentation import start_query_stats
+from app.core.retry import RetryMetrics, RetryPolicy, failure_reason, run_in_transaction
+
+FAST = RetryPolicy(max_attempts=4, base_delay=0.001, max_delay=0.002, deadline=1.0)
+
+
+def _pg_error(code: str) -> DBAPIError:
+    orig = Exception(f"sqlstate {code}")
+    orig.sqlstate = code  # type: ignore[attr-defined]
+    return DBAPIError("UPDATE notes", {}, orig)
+
+
+class FakeSession:
+    def __init__(self, log: list[str]) -> None:
+        self.log = log
+
+    @asynccontextmanager
+    async def begin(self) -> AsyncIterator[None]:
+        try:
+            yield
+        except BaseException:
+            self.log.append("rollback")
+            raise
+        self.log.append("commit")
+
+
+def _factory(log: list[str]) -> Any:
+    @asynccontextmanager
+    async def factory() -> AsyncIterator[FakeSession]:
+        yield FakeSession(log)
+
+    return factory
+
+
+def _flaky(*errors: Exception) -> Any:
+    pending = list(errors)
+
+    async def work(session: AsyncSession) -> str:
+        if pending:
+            raise pending.pop(0)
+        return "done"
+
+    return work
+
+
+@pytest.fixture(autouse=True)
+def metrics() -> Any:
+    fresh = RetryMetrics()
+    with patch.object(retry, "retry_metrics", fresh):
+        yield fresh
+
+
+def test_retry_delay_grows_exponentially_and_is_capped() -> None:
+    assert 2.0 <= retry.retry_delay(2, base=4.0) <= 8.0
+    assert 16.0 <= retry.retry_delay(4, base=4.0) <= 32.0
+    assert retry.retry_delay(20, base=4.0, cap=60.0) <= 60.0
+
+
+def test_failure_reason_classifies_transient_errors() -> None:
+    assert failure_reason(_pg_error("40001")) == "serialization_failure"
+    assert failure_reason(_pg_error("40P01")) == "deadlock_detected"
+    dropped = DBAPIError("SELECT 1", {}, ConnectionResetError("reset"))
+    assert failure_reason(dropped) == "connection_lost"
+    invalidated = DBAPIError(
+        "SELECT 1", {}, Exception("gone"), connection_invalidated=True
+    )
+    assert failure_reason(invalidated) == "connection_invalidated"
+    assert failure_reason(_pg_error("23505")) is None
+    assert failure_reason(ValueError("bad input")) is None
+
+
+async def test_transient_failures_are_replayed_in_new_transactions(
+    metrics: RetryMetrics,
+) -> None:
+    log: list[str] = []
+    stats = start_query_stats()
+    work = _flaky(_pg_error("40001"), _pg_error("40P01"))
+    with patch.object(retry, "logger") as logger:
+        result = await run_in_transaction(
+            work, session_factory=_factory(log), policy=FAST
+        )
+    assert result == "done"
+    assert log == ["rollback", "rollback", "commit"]
+    assert stats.retries == 2
+    failed = [call.kwargs for call in logger.warning.call_args_list]
+    assert [(f["attempt"], f["sqlstate"]) for f in failed] == [
+        (1, "40001"),
+        (2, "40P01"),
+    ]
+    assert logger.info.call_args.args[0] == "database.retry.succeeded"
+    assert metrics.snapshot() == {
+        "transactions": 1,
+        "retries": 2,
+        "recovered": 1,
+        "exhausted": 0,
+        "retry_rate": 2.0,
+        "reasons": {"serialization_failure": 1, "deadlock_detected": 1},
+    }
+
+
+async def test_non_retryable_errors_are_raised_at_once() -> None:
+    log: list[str] = []
+    error = IntegrityError("INSERT", {}, Exception("duplicate key"))
+    with pytest.raises(IntegrityError):
+        await run_in_transaction(
+            _flaky(error), session_factory=_factory(log), policy=FAST
+        )
+    assert log == ["rollback"]
+
+
+async def test_exhausted_retries_raise_database_unavailable(
+    metrics: RetryMetrics,
+) -> None:
+    log: list[str] = []
+    work = _flaky(*[_pg_error("40001")] * 10)
+    with (
+        patch.object(retry, "logger") as logger,
+        pytest.raises(DatabaseUnavailableError, match="after 4 attempts"),
+    ):
+        await run_in_transaction(work, session_factory=_factory(log), policy=FAST)
+    assert log == ["rollback"] * 4
+    assert logger.error.call_args.args[0] == "database.retry.exhausted"
+    assert metrics.exhausted == 1
+    assert metrics.retries == 3
+
+
+async def test_deadline_stops_retrying_before_attempts_run_out() -> None:
+    log: list[str] = []
+    policy = RetryPolicy(
+        max_attempts=10, base_delay=0.05, max_delay=0.05, deadline=0.06
+    )
+    work = _flaky(*[_pg_error("40P01")] * 10)
+    with (
+        patch.object(retry, "logger"),
+        pytest.raises(DatabaseUnavailableError),
+    ):
+        await run_in_transaction(work, session_factory=_factory(log), policy=policy)
+    assert 2 <= len(log) < 10
+
+
+async def test_default_factory_checks_out_through_circuit_breaker() -> None:
+    log: list[str] = []
+    session = FakeSession(log)
+    session.connection = AsyncMock()  # type: ignore[attr-defined]
+
+    @asynccontextmanager
+    async def factory() -> AsyncIterator[FakeSession]:
+        yield session
+
+    breaker = CircuitBreaker(failure_threshold=1, recovery_time=30.0)
+    with (
+        patch("app.core.database.AsyncSessionLocal", factory),
+        patch("app.core.database.circuit_breaker", breaker),
+    ):
+        assert await run_in_transaction(_flaky(), policy=FAST) == "done"
+        breaker.record_failure()
+        with patch("app.core.database.logger"), pytest.raises(DatabaseUnavailableError):
+            await run_in_transaction(_flaky(), policy=FAST)
+    assert log == ["commit"]
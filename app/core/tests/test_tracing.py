@@ -0,0 +1,180 @@
+"""Tests for app/core/tracing.py."""
+
+from __future__ import annotations
+
+import json
+from collections.abc import Generator
+from pathlib import Path
+
+import pytest
+from fastapi import APIRouter, FastAPI
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import create_engine, text
+
+from app.core.instrumentation import instrument_engine
+from app.core.logging import trace_context_var
+from app.core.profiling import TimedRoute
+from app.core.tracing import (
+    BatchSpanExporter,
+    Span,
+    TracingMiddleware,
+    activate,
+    get_current_span,
+    parse_traceparent,
+    span,
+    tracer,
+)
+
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+PARENT_ID = "00f067aa0ba902b7"
+
+
+@pytest.fixture
+def exporter(tmp_path: Path) -> Generator[BatchSpanExporter, None, None]:
+    """Enable the global tracer with a file exporter; restore it afterwards."""
+    exporter = BatchSpanExporter(str(tmp_path / "spans.jsonl"))
+    tracer.configure(enabled=True, sample_rate=1.0, exporter=exporter)
+    yield exporter
+    tracer.configure(enabled=False, sample_rate=0.0, exporter=None)
+
+
+def _make_app() -> FastAPI:
+    app = FastAPI()
+    router = APIRouter(route_class=TimedRoute)
+
+    @router.get("/work")
+    async def work() -> dict[str, str | None]:
+        current = get_current_span()
+        return {"span": current.name if current else None}
+
+    app.include_router(router)
+    app.add_middleware(TracingMiddleware)
+    return app
+
+
+def test_parse_traceparent_accepts_valid_header() -> None:
+    header = f"00-{TRACE_ID}-{PARENT_ID}-01"
+    assert parse_traceparent(header) == (TRACE_ID, PARENT_ID, True)
+    assert parse_traceparent(f"00-{TRACE_ID}-{PARENT_ID}-00") == (
+        TRACE_ID,
+        PARENT_ID,
+        False,
+    )
+
+
+@pytest.mark.parametrize(
+    "header",
+    [
+        None,
+        "",
+        "garbage",
+        f"00-{'0' * 32}-{PARENT_ID}-01",
+        f"00-{TRACE_ID}-{'0' * 16}-01",
+        f"01-{TRACE_ID}-{PARENT_ID}",
+    ],
+)
+def test_parse_traceparent_rejects_invalid_header(header: str | None) -> None:
+    assert parse_traceparent(header) is None
+
+
+def test_start_root_is_noop_when_disabled() -> None:
+    assert tracer.start_root("http.request", None) is None
+
+
+def test_start_root_honours_parent_sampled_flag(exporter: BatchSpanExporter) -> None:
+    tracer.sample_rate = 0.0
+    continued = tracer.start_root("http.request", f"00-{TRACE_ID}-{PARENT_ID}-01")
+    assert continued is not None
+    assert (continued.trace_id, continued.parent_id) == (TRACE_ID, PARENT_ID)
+    tracer.sample_rate = 1.0
+    assert tracer.start_root("http.request", f"00-{TRACE_ID}-{PARENT_ID}-00") is None
+
+
+def test_nested_spans_share_trace_and_set_log_context(
+    exporter: BatchSpanExporter,
+) -> None:
+    root = tracer.start_root("root", None)
+    with activate(root):
+        with span("child", key="value") as child:
+            assert child is not None
+            assert root is not None
+            assert child.trace_id == root.trace_id
+            assert child.parent_id == root.span_id
+            assert trace_context_var.get() == (child.trace_id, child.span_id)
+        assert get_current_span() is root
+    assert trace_context_var.get() is None
+    assert get_current_span() is None
+
+
+def test_span_is_noop_outside_a_trace() -> None:
+    with span("orphan") as orphan:
+        assert orphan is None
+
+
+def test_activate_marks_span_as_error_on_exception(
+    exporter: BatchSpanExporter,
+) -> None:
+    root = tracer.start_root("root", None)
+    with pytest.raises(ValueError), activate(root):
+        raise ValueError("boom")
+    assert root is not None
+    assert root.status == "error"
+    assert root.end_ns >= root.start_ns
+
+
+async def test_exporter_drops_when_full_and_flushes_json_lines(
+    tmp_path: Path,
+) -> None:
+    path = tmp_path / "spans.jsonl"
+    exporter = BatchSpanExporter(str(path), max_queue_size=2, batch_size=1)
+    for index in range(3):
+        exporter.export(Span(f"s{index}", TRACE_ID, PARENT_ID, None))
+    assert exporter.dropped == 1
+    assert await exporter.flush() == 2
+    assert exporter.dropped == 0
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [line["name"] for line in lines] == ["s0", "s1"]
+    assert lines[0]["traceId"] == TRACE_ID
+
+
+async def test_middleware_continues_trace_and_sets_traceresponse(
+    exporter: BatchSpanExporter,
+) -> None:
+    async with AsyncClient(
+        transport=ASGITransport(app=_make_app()), base_url="http://test"
+    ) as client:
+        response = await client.get(
+            "/work", headers={"traceparent": f"00-{TRACE_ID}-{PARENT_ID}-01"}
+        )
+    assert response.json() == {"span": "handler work"}
+    assert response.headers["traceresponse"].startswith(f"00-{TRACE_ID}-")
+    await exporter.flush()
+    spans = [json.loads(line) for line in exporter.path.read_text().splitlines()]
+    by_name = {item["name"]: item for item in spans}
+    root = by_name["http.request"]
+    assert root["parentSpanId"] == PARENT_ID
+    assert root["attributes"]["http.status_code"] == 200
+    assert by_name["handler work"]["parentSpanId"] == root["spanId"]
+
+
+async def test_middleware_skips_unsampled_requests() -> None:
+    async with AsyncClient(
+        transport=ASGITransport(app=_make_app()), base_url="http://test"
+    ) as client:
+        response = await client.get("/work")
+    assert response.json() == {"span": None}
+    assert "traceresponse" not in response.headers
+
+
+def test_queries_become_db_query_spans(exporter: BatchSpanExporter) -> None:
+    engine = create_engine("sqlite://")
+    instrument_engine(
+        engine, slow_threshold=10.0, n_plus_one_threshold=0, log_statements=False
+    )
+    with activate(tracer.start_root("root", None)), engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+    engine.dispose()
+    names = [queued.name for queued in exporter._queue]
+    assert "db.query" in names
+    query = next(queued for queued in exporter._queue if queued.name == "db.query")
+    assert query.attributes["db.statement"] == "SELECT ?"
@@ -0,0 +1,277 @@
+"""Lightweight distributed tracing with W3C ``traceparent`` propagation.
+
+TracingMiddleware continues the caller's trace when a valid ``traceparent``
+header arrives (honouring its sampled flag) and otherwise samples new traces
+at TRACING_SAMPLE_RATE. Spans are opened for:
+
+    http.request  — the whole request, including middleware
+    handler       — the path operation function (TimedRoute)
+    db.checkout   — pool checkout in get_db()
+    db.query      — every SQL statement (app.core.instrumentation)
+
+While a span is active its IDs are injected into every structlog event as
+``trace_id`` / ``span_id``. Unsampled requests create no span objects.
+
+Finished spans go to a BatchSpanExporter: a bounded in-memory queue flushed
+by a background task as JSON lines with OTLP field names to
+TRACING_EXPORT_PATH. When the queue is full new spans are dropped and
+counted, so exporting can never back up into request handling.
+
+Usage:
+
+    from app.core.tracing import span
+
+    with span("notes.render", note_id=note.id):
+        ...
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import json
+import random
+import re
+import secrets
+import time
+from collections import deque
+from collections.abc import Iterator
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
+from starlette.requests import Request
+from starlette.responses import Response
+
+from app.core.logging import get_logger, trace_context_var
+
+logger = get_logger("app.core.tracing")
+
+_TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+_INVALID_TRACE_ID = "0" * 32
+_INVALID_SPAN_ID = "0" * 16
+
+
+@dataclass(slots=True)
+class Span:
+    """One timed operation within a trace."""
+
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: str | None
+    start_ns: int = field(default_factory=time.time_ns)
+    end_ns: int = 0
+    attributes: dict[str, Any] = field(default_factory=dict)
+    status: str = "ok"
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def set_attribute(self, key: str, value: Any) -> None:  # noqa: ANN401
+        self.attributes[key] = value
+
+    def end(self) -> None:
+        """Finish the span and hand it to the exporter."""
+        self.end_ns = time.time_ns()
+        if tracer.exporter is not None:
+            tracer.exporter.export(self)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id,
+            "name": self.name,
+            "startTimeUnixNano": self.start_ns,
+            "endTimeUnixNano": self.end_ns,
+            "attributes": self.attributes,
+            "status": self.status,
+        }
+
+
+def parse_traceparent(header: str | None) -> tuple[str, str, bool] | None:
+    """Return ``(trace_id, parent_span_id, sampled)`` or None if invalid."""
+    if not header:
+        return None
+    match = _TRACEPARENT.match(header.strip().lower())
+    if match is None:
+        return None
+    trace_id, span_id, flags = match.groups()
+    if trace_id == _INVALID_TRACE_ID or span_id == _INVALID_SPAN_ID:
+        return None
+    return trace_id, span_id, bool(int(flags, 16) & 0x01)
+
+
+_current_span: ContextVar[Span | None] = ContextVar("current_span", default=None)
+
+
+def get_current_span() -> Span | None:
+    """Return the active span, or None outside a sampled trace."""
+    return _current_span.get()
+
+
+class BatchSpanExporter:
+    """Bounded queue of finished spans, flushed to a JSON-lines file."""
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        max_queue_size: int = 2048,
+        batch_size: int = 512,
+        interval: float = 2.0,
+    ) -> None:
+        self.path = Path(path)
+        self.max_queue_size = max_queue_size
+        self.batch_size = batch_size
+        self.interval = interval
+        self.dropped = 0
+        self._queue: deque[Span] = deque()
+        self._task: asyncio.Task[None] | None = None
+
+    def export(self, finished: Span) -> None:
+        """Queue a span; drop it if the queue is full."""
+        if len(self._queue) >= self.max_queue_size:
+            self.dropped += 1
+            return
+        self._queue.append(finished)
+
+    def _write(self, lines: list[str]) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.path.open("a", encoding="utf-8") as handle:
+            handle.write("\n".join(lines) + "\n")
+
+    async def flush(self) -> int:
+        """Write every queued span and return how many were written."""
+        written = 0
+        while self._queue:
+            count = min(self.batch_size, len(self._queue))
+            batch = [json.dumps(self._queue.popleft().to_dict()) for _ in range(count)]
+            await asyncio.to_thread(self._write, batch)
+            written += count
+        if self.dropped:
+            logger.warning("tracing.export.spans_dropped", count=self.dropped)
+            self.dropped = 0
+        return written
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.flush()
+            except OSError:
+                logger.error("tracing.export.flush_failed", exc_info=True)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="span-exporter")
+
+    async def stop(self) -> None:
+        """Stop the background task and flush what is left."""
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        await self.flush()
+
+
+class Tracer:
+    """Sampling decisions and span creation; disabled until configured."""
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.sample_rate = 0.0
+        self.exporter: BatchSpanExporter | None = None
+
+    def configure(
+        self,
+        *,
+        enabled: bool,
+        sample_rate: float,
+        exporter: BatchSpanExporter | None,
+    ) -> None:
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.exporter = exporter
+
+    def start_root(self, name: str, traceparent: str | None) -> Span | None:
+        """Start a trace's local root span, continuing ``traceparent``."""
+        if not self.enabled:
+            return None
+        incoming = parse_traceparent(traceparent)
+        if incoming is not None:
+            trace_id, parent_id, sampled = incoming
+        else:
+            trace_id, parent_id = secrets.token_hex(16), None
+            sampled = random.random() < self.sample_rate
+        if not sampled:
+            return None
+        return Span(name, trace_id, secrets.token_hex(8), parent_id)
+
+    def start_child(self, name: str, **attributes: Any) -> Span | None:  # noqa: ANN401
+        """Start a child of the active span; None when not in a sampled trace."""
+        parent = _current_span.get()
+        if parent is None:
+            return None
+        return Span(
+            name,
+            parent.trace_id,
+            secrets.token_hex(8),
+            parent.span_id,
+            attributes=attributes,
+        )
+
+
+tracer = Tracer()
+
+
+@contextlib.contextmanager
+def activate(active: Span | None) -> Iterator[Span | None]:
+    """Make ``active`` the current span for the block, then end it."""
+    if active is None:
+        yield None
+        return
+    span_token = _current_span.set(active)
+    log_token = trace_context_var.set((active.trace_id, active.span_id))
+    try:
+        yield active
+    except BaseException:
+        active.status = "error"
+        raise
+    finally:
+        trace_context_var.reset(log_token)
+        _current_span.reset(span_token)
+        active.end()
+
+
+@contextlib.contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Span | None]:  # noqa: ANN401
+    """Open a child span of the current span for the duration of a block."""
+    with activate(tracer.start_child(name, **attributes)) as active:
+        yield active
+
+
+class TracingMiddleware(BaseHTTPMiddleware):
+    """Open the ``http.request`` root span and echo it as ``traceresponse``."""
+
+    async def dispatch(
+        self, request: Request, call_next: RequestResponseEndpoint
+    ) -> Response:
+        root = tracer.start_root("http.request", request.headers.get("traceparent"))
+        if root is None:
+            return await call_next(request)
+        root.attributes.update(
+            {"http.method": request.method, "http.path": request.url.path}
+        )
+        with activate(root):
+            response = await call_next(request)
+            root.set_attribute("http.status_code", response.status_code)
+            if response.status_code >= 500:
+                root.status = "error"
+        response.headers["traceresponse"] = root.traceparent
+        return response
@@ -1,37 +1,190 @@
 """FastAPI application entry point.
 
-Run with: uv run uvicorn app.main:app --reload --port 8123
+Run with: uv run python -m app.main
+
+That serves through app.core.lifecycle.GracefulServer, which drains requests
+before closing the sockets. ``uv run uvicorn app.main:app --reload --port
+8123`` also works, but its shutdown drains only after the sockets close.
 """
 
 from __future__ import annotations
 
+import asyncio
+import contextlib
+import tracemalloc
 from collections.abc import AsyncGenerator
 from contextlib import asynccontextmanager
 
-import uvicorn
 from fastapi import FastAPI
 
-from app.core.config import get_settings
-from app.core.database import engine
+from app.core.batch import router as batch_router
+from app.core.config import (
+    Settings,
+    get_settings,
+    install_reload_signal,
+    on_settings_reload,
+    remove_reload_signal,
+)
+from app.core.database import AsyncSessionLocal, engine, warm_up_pool
+from app.core.diagnostics import router as diagnostics_router
+from app.core.events import hub
+from app.core.events import router as events_router
 from app.core.exceptions import setup_exception_handlers
+from app.core.health import readiness
 from app.core.health import router as health_router
+from app.core.idempotency import IdempotencyPurger
+from app.core.invalidation import invalidation
+from app.core.jobs import WorkerPool
+from app.core.lifecycle import serve, shutdown_coordinator
 from app.core.logging import get_logger, setup_logging
+from app.core.loop_monitor import loop_monitor
 from app.core.middleware import setup_middleware
+from app.core.processes import process_pool
+from app.core.profiling import TimedRoute
+from app.core.sharding import shards
+from app.core.tracing import BatchSpanExporter, tracer
+from app.notes.ingest import ingest_vault_job  # noqa: F401  (registers the job task)
+from app.notes.routes import router as notes_router
+from app.notes.vectors import vector_index
 
 settings = get_settings()
 
 
+async def _warm_up_database() -> None:
+    """Pre-open primary and shard pool connections, then report ready."""
+    connections = min(settings.db_warmup_connections, settings.db_pool_size)
+    timeout = settings.db_warmup_timeout_seconds
+    try:
+        async with asyncio.TaskGroup() as group:
+            for shard in shards.shards:
+                group.create_task(warm_up_pool(shard.engine, connections, timeout))
+            await warm_up_pool(engine, connections, timeout=timeout)
+    finally:
+        readiness.unblock("warming_up")
+
+
+async def _close_database() -> None:
+    await engine.dispose()
+    get_logger("app.main").info("database.connection.closed")
+
+
+def _apply_log_level(new_settings: Settings) -> None:
+    setup_logging(log_level=new_settings.log_level)
+
+
+def _apply_tracing_sample_rate(new_settings: Settings) -> None:
+    tracer.sample_rate = new_settings.tracing_sample_rate
+
+
+def _apply_loop_block_threshold(new_settings: Settings) -> None:
+    loop_monitor.threshold = new_settings.loop_monitor_block_threshold_seconds
+
+
+on_settings_reload(_apply_log_level)
+on_settings_reload(_apply_tracing_sample_rate)
+on_settings_reload(_apply_loop_block_threshold)
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
-    """Configure logging and announce startup/shutdown."""
+    """Configure logging, warm up the pool, and drain gracefully on shutdown."""
     setup_logging(log_level=settings.log_level)
     logger = get_logger("app.main")
     logger.info("application.startup", environment=settings.environment)
+    loop = asyncio.get_running_loop()
+    reload_signal = install_reload_signal(loop)
+    shutdown = shutdown_coordinator
+    shutdown.configure(
+        drain_timeout=settings.shutdown_drain_timeout_seconds,
+        readiness_delay=settings.shutdown_readiness_delay_seconds,
+    )
+    if settings.loop_monitor_enabled:
+        loop_monitor.configure(
+            interval=settings.loop_monitor_interval_seconds,
+            threshold=settings.loop_monitor_block_threshold_seconds,
+            report_interval=settings.loop_monitor_report_interval_seconds,
+        )
+        loop_monitor.start()
+        # First registered, so it keeps watching until the last service stops.
+        shutdown.add_service("loop_monitor", loop_monitor.stop)
+    if settings.diagnostics_enabled and settings.diagnostics_tracemalloc_frames > 0:
+        tracemalloc.start(settings.diagnostics_tracemalloc_frames)
+    if settings.tracing_enabled:
+        exporter = BatchSpanExporter(
+            settings.tracing_export_path,
+            max_queue_size=settings.tracing_max_queue_size,
+            interval=settings.tracing_export_interval_seconds,
+        )
+        tracer.configure(
+            enabled=True, sample_rate=settings.tracing_sample_rate, exporter=exporter
+        )
+        exporter.start()
+        shutdown.add_service("span_exporter", exporter.stop)
+    if settings.db_shard_urls:
+        shards.configure(settings.db_shard_urls, settings)
+        shutdown.add_service("shard_engines", shards.dispose)
+    if settings.process_pool_workers > 0:
+        process_pool.configure(
+            max_workers=settings.process_pool_workers,
+            timeout=settings.process_pool_timeout_seconds,
+            max_tasks_per_child=settings.process_pool_max_tasks_per_child or None,
+        )
+        process_pool.start()
+        # Registered before the job worker so jobs stop before the pool does.
+        shutdown.add_service("process_pool", process_pool.stop)
+    hub.configure(
+        queue_size=settings.events_queue_size,
+        heartbeat=settings.events_heartbeat_seconds,
+        replay_size=settings.events_replay_size,
+        max_lifetime=settings.events_max_stream_seconds,
+    )
+    shutdown.add_service("event_streams", hub.close)
+    if settings.cache_invalidation_enabled:
+        invalidation.configure(
+            channel=settings.cache_invalidation_channel,
+            coalesce_window=settings.cache_invalidation_coalesce_ms / 1000,
+        )
+        invalidation.start(settings.database_url)
+        shutdown.add_service("invalidation_listener", invalidation.stop)
+    if settings.idempotency_enabled:
+        purger = IdempotencyPurger(
+            AsyncSessionLocal, interval=settings.idempotency_purge_interval_seconds
+        )
+        purger.start()
+        shutdown.add_service("idempotency_purger", purger.stop)
+    if settings.notes_vectors_enabled:
+        vector_index.configure(
+            dimensions=settings.notes_vectors_dimensions,
+            directory=settings.notes_vectors_directory,
+            refresh_interval=settings.notes_vectors_refresh_interval_seconds,
+            compact_ratio=settings.notes_vectors_compact_ratio,
+            max_staleness=settings.notes_vectors_max_staleness_seconds,
+        )
+        await vector_index.start(AsyncSessionLocal)
+        shutdown.add_service("vector_index", vector_index.stop)
+    if settings.jobs_worker_enabled:
+        workers = WorkerPool(
+            AsyncSessionLocal,
+            concurrency=settings.jobs_concurrency,
+            batch_size=settings.jobs_batch_size,
+            poll_interval=settings.jobs_poll_interval_seconds,
+            timeout=settings.jobs_timeout_seconds,
+            retry_backoff=settings.jobs_retry_backoff_seconds,
+            grace=settings.shutdown_drain_timeout_seconds,
+        )
+        await workers.start()
+        shutdown.add_service("job_worker", workers.stop)
+    readiness.block("warming_up")
+    warmup = asyncio.create_task(_warm_up_database())
     logger.info("database.connection.initialized")
     yield
-    await engine.dispose()
-    logger.info("database.connection.closed")
+    warmup.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await warmup
     logger.info("application.shutdown")
+    if reload_signal:
+        remove_reload_signal(loop)
+    await shutdown.run(close_pools=_close_database)
 
 
 app = FastAPI(
@@ -39,10 +192,16 @@ app = FastAPI(
     version=settings.version,
     lifespan=lifespan,
 )
+app.router.route_class = TimedRoute
 
 setup_middleware(app)
 setup_exception_handlers(app)
 app.include_router(health_router)
+if settings.diagnostics_enabled:
+    app.include_router(diagnostics_router)
+app.include_router(events_router)
+app.include_router(batch_router)
+app.include_router(notes_router, prefix=settings.api_prefix)
 
 
 @app.get("/")
@@ -56,4 +215,4 @@ def root() -> dict[str, str]:
 
 
 if __name__ == "__main__":
-    uvicorn.run("app.main:app", host="0.0.0.0", port=8123, reload=True)  # noqa: S104
+    serve("app.main:app", host="0.0.0.0", port=8123, reload=True)  # noqa: S104
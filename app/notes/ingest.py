@@ -0,0 +1,358 @@
+"""Incremental vault ingestion: keep a directory of markdown files in sync.
+
+    uv run python -m app.notes.ingest work ~/vaults/work            # now
+    uv run python -m app.notes.ingest work ~/vaults/work --enqueue  # as a job
+
+From code, ``await enqueue_ingest(db, "work", "/srv/vaults/work")`` queues
+the ``notes.ingest_vault`` job in the caller's transaction.
+
+A run:
+    1. walks the vault in a thread and stats every ``*.md`` file. Hidden
+       entries such as .obsidian, .trash and .git are skipped.
+    2. loads the stored (mtime, size, content hash) of the vault's notes. A
+       file whose mtime and size match is not read.
+    3. reads, hashes and parses the remaining files in the process pool, in
+       batches of NOTES_INGEST_BATCH_SIZE. Each batch is written while the
+       next one is being parsed: one multi-row upsert and one commit per
+       batch. A file whose hash matches (after a touch or a git checkout)
+       only gets its mtime updated, so its search vector is not rebuilt.
+    4. deletes the notes whose files are gone.
+
+Memory stays bounded: the walk and the stored state hold a few small values
+per file, and at most two batches of file contents are held at once. A
+re-run with nothing changed costs one walk and one state query. Each batch
+commits, so a run that is interrupted resumes where it stopped on the next
+run.
+
+The directory owns its vault: notes in the vault with no file on disk are
+deleted, including notes created through the API.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import time
+from collections.abc import AsyncIterator, Sequence
+from contextlib import asynccontextmanager
+from dataclasses import asdict, dataclass, field
+from functools import partial
+from itertools import batched
+from pathlib import Path
+from typing import Any, cast
+
+import sqlalchemy as sa
+from sqlalchemy import bindparam, delete, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core import database
+from app.core.config import get_settings
+from app.core.jobs import enqueue, job_task
+from app.core.logging import get_logger, setup_logging
+from app.core.processes import ProcessPool, process_pool
+from app.notes.models import Note
+from app.notes.parsing import FileContent, VaultFile, read_vault_file
+
+logger = get_logger("app.notes.ingest")
+
+INGEST_TASK = "notes.ingest_vault"
+PATH_MAX_LENGTH = 1024
+_DELETE_BATCH = 1000
+
+# (mtime_ns, size_bytes, content_hash) of a stored note.
+type StoredState = tuple[int | None, int | None, str | None]
+
+_upsert = insert(Note)
+_UPSERT = _upsert.on_conflict_do_update(
+    index_elements=[Note.vault, Note.path],
+    set_={
+        column: _upsert.excluded[column]
+        for column in (
+            "title",
+            "body",
+            "frontmatter",
+            "tags",
+            "links",
+            "content_hash",
+            "mtime_ns",
+            "size_bytes",
+            "updated_at",
+        )
+    },
+)
+_notes = cast(sa.Table, Note.__table__)
+# Core executemany: the bind names must differ from the column names.
+_TOUCH = (
+    sa.update(_notes)
+    .where(_notes.c.vault == bindparam("b_vault"), _notes.c.path == bindparam("b_path"))
+    .values(mtime_ns=bindparam("b_mtime_ns"), size_bytes=bindparam("b_size_bytes"))
+)
+
+
+@dataclass(slots=True)
+class IngestPlan:
+    """Files to read, with their stored hash, and stored paths gone from disk."""
+
+    reads: list[tuple[VaultFile, str | None]] = field(default_factory=list)
+    unchanged: int = 0
+    removed: list[str] = field(default_factory=list)
+    too_long: list[str] = field(default_factory=list)
+
+
+@dataclass(slots=True)
+class IngestReport:
+    vault: str
+    scanned: int = 0
+    unchanged: int = 0
+    written: int = 0
+    touched: int = 0
+    deleted: int = 0
+    failed: int = 0
+    elapsed_seconds: float = 0.0
+
+    def snapshot(self) -> dict[str, object]:
+        return asdict(self)
+
+
+def scan_vault(root: Path) -> list[VaultFile]:
+    """Stat every non-hidden ``*.md`` file under ``root``.
+
+    Unreadable directories raise rather than being skipped: their files
+    would otherwise look deleted.
+    """
+    prefix = len(str(root)) + 1
+    files: list[VaultFile] = []
+    stack = [str(root)]
+    while stack:
+        with os.scandir(stack.pop()) as entries:
+            for entry in entries:
+                if entry.name.startswith("."):
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.name.lower().endswith(".md") and entry.is_file():
+                    stat = entry.stat()
+                    files.append(
+                        VaultFile(
+                            entry.path[prefix:].replace(os.sep, "/"),
+                            stat.st_mtime_ns,
+                            stat.st_size,
+                        )
+                    )
+    return files
+
+
+async def load_state(session: AsyncSession, vault: str) -> dict[str, StoredState]:
+    """Stored file state of every note in ``vault``, keyed by path."""
+    result = await session.stream(
+        select(Note.path, Note.mtime_ns, Note.size_bytes, Note.content_hash)
+        .where(Note.vault == vault)
+        .execution_options(yield_per=5000)
+    )
+    return {path: (mtime, size, digest) async for path, mtime, size, digest in result}
+
+
+def plan_changes(
+    files: Sequence[VaultFile], state: dict[str, StoredState]
+) -> IngestPlan:
+    """Compare the walk with the stored state by mtime and size."""
+    plan = IngestPlan()
+    for file in files:
+        stored = state.pop(file.path, None)
+        if len(file.path) > PATH_MAX_LENGTH:
+            plan.too_long.append(file.path)
+        elif stored is not None and stored[:2] == (file.mtime_ns, file.size_bytes):
+            plan.unchanged += 1
+        else:
+            plan.reads.append((file, stored[2] if stored else None))
+    # Whatever the walk did not pop is no longer on disk.
+    plan.removed = list(state)
+    return plan
+
+
+async def _write_batch(
+    session: AsyncSession, vault: str, contents: list[FileContent], report: IngestReport
+) -> None:
+    rows: list[dict[str, Any]] = []
+    touched: list[dict[str, Any]] = []
+    for content in contents:
+        file = content.file
+        if content.error is not None:
+            report.failed += 1
+            logger.warning(
+                "notes.ingest.file_failed",
+                vault=vault,
+                path=file.path,
+                error=content.error,
+            )
+        elif content.note is None:
+            touched.append(
+                {
+                    "b_vault": vault,
+                    "b_path": file.path,
+                    "b_mtime_ns": file.mtime_ns,
+                    "b_size_bytes": file.size_bytes,
+                }
+            )
+        else:
+            note = content.note
+            rows.append(
+                {
+                    "vault": vault,
+                    "path": file.path,
+                    "title": note.title,
+                    "body": note.body,
+                    "frontmatter": note.frontmatter,
+                    "tags": note.tags,
+                    "links": note.links,
+                    "content_hash": content.content_hash,
+                    "mtime_ns": file.mtime_ns,
+                    "size_bytes": file.size_bytes,
+                }
+            )
+    if rows:
+        await session.execute(_UPSERT, rows)
+    if touched:
+        await session.execute(_TOUCH, touched)
+    await session.commit()
+    report.written += len(rows)
+    report.touched += len(touched)
+
+
+async def _delete_removed(
+    session: AsyncSession, vault: str, paths: list[str], report: IngestReport
+) -> None:
+    for chunk in batched(paths, _DELETE_BATCH):
+        await session.execute(
+            delete(Note).where(Note.vault == vault, Note.path.in_(chunk))
+        )
+        await session.commit()
+        report.deleted += len(chunk)
+
+
+async def ingest_vault(
+    vault: str,
+    root: str | os.PathLike[str],
+    *,
+    pool: ProcessPool,
+    session_factory: async_sessionmaker[AsyncSession] | None = None,
+    batch_size: int | None = None,
+) -> IngestReport:
+    """Sync ``vault``'s notes with the markdown files under ``root``."""
+    settings = get_settings()
+    session_factory = session_factory or database.AsyncSessionLocal
+    batch_size = batch_size or settings.notes_ingest_batch_size
+    root_path = Path(root).expanduser().resolve()
+    if not root_path.is_dir():
+        raise NotADirectoryError(f"Vault root {root_path} is not a directory")
+    report = IngestReport(vault)
+    started = time.monotonic()
+    logger.info("notes.ingest.started", vault=vault, root=str(root_path))
+
+    files = await asyncio.to_thread(scan_vault, root_path)
+    report.scanned = len(files)
+    read = partial(
+        read_vault_file, str(root_path), settings.notes_ingest_max_file_bytes
+    )
+    async with session_factory() as session:
+        plan = plan_changes(files, await load_state(session, vault))
+        report.unchanged = plan.unchanged
+        for path in plan.too_long:
+            report.failed += 1
+            logger.warning(
+                "notes.ingest.file_failed",
+                vault=vault,
+                path=path,
+                error="path too long",
+            )
+        # Parse batch N+1 in the pool while batch N is written.
+        pending: asyncio.Future[list[FileContent]] | None = None
+        current: asyncio.Future[list[FileContent]] | None = None
+        try:
+            for batch in batched(plan.reads, batch_size):
+                current = asyncio.ensure_future(pool.map(read, batch))
+                if pending is not None:
+                    await _write_batch(session, vault, await pending, report)
+                pending, current = current, None
+            if pending is not None:
+                await _write_batch(session, vault, await pending, report)
+                pending = None
+        finally:
+            unfinished = [future for future in (pending, current) if future]
+            for future in unfinished:
+                future.cancel()
+            await asyncio.gather(*unfinished, return_exceptions=True)
+        await _delete_removed(session, vault, plan.removed, report)
+
+    report.elapsed_seconds = round(time.monotonic() - started, 3)
+    logger.info("notes.ingest.completed", **report.snapshot())
+    return report
+
+
+@asynccontextmanager
+async def ingest_pool(workers: int | None = None) -> AsyncIterator[ProcessPool]:
+    """The app's process pool if it runs, else a private one for this run."""
+    if process_pool.running:
+        yield process_pool
+        return
+    workers = workers or get_settings().notes_ingest_workers or os.cpu_count() or 1
+    pool = ProcessPool(max_workers=workers, timeout=None)
+    pool.start()
+    try:
+        yield pool
+    finally:
+        await pool.stop()
+
+
+@job_task(INGEST_TASK)
+async def ingest_vault_job(payload: dict[str, Any]) -> None:
+    async with ingest_pool() as pool:
+        await ingest_vault(payload["vault"], payload["root"], pool=pool)
+
+
+async def enqueue_ingest(
+    session: AsyncSession, vault: str, root: str | os.PathLike[str]
+) -> int:
+    """Queue an ingestion job in the session's transaction; returns its id."""
+    return await enqueue(
+        session, INGEST_TASK, {"vault": vault, "root": os.fspath(root)}
+    )
+
+
+async def _run_cli(args: argparse.Namespace) -> None:
+    try:
+        if args.enqueue:
+            async with database.AsyncSessionLocal() as session:
+                job_id = await enqueue_ingest(session, args.vault, args.root)
+                await session.commit()
+            logger.info("notes.ingest.enqueued", vault=args.vault, job_id=job_id)
+            return
+        async with ingest_pool(args.workers) as pool:
+            await ingest_vault(
+                args.vault, args.root, pool=pool, batch_size=args.batch_size
+            )
+    finally:
+        await database.engine.dispose()
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m app.notes.ingest",
+        description="Sync a directory of markdown files into a vault's notes.",
+    )
+    parser.add_argument("vault", help="vault name the notes are stored under")
+    parser.add_argument("root", type=Path, help="vault directory")
+    parser.add_argument("--workers", type=int, help="parser processes")
+    parser.add_argument("--batch-size", type=int, help="files per upsert")
+    parser.add_argument(
+        "--enqueue", action="store_true", help="queue a job instead of running now"
+    )
+    args = parser.parse_args(argv)
+    setup_logging(log_level=get_settings().log_level)
+    asyncio.run(_run_cli(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Notes table with its search indexes, and the note embeddings table."""
+
+from __future__ import annotations
+
+from typing import Any
+
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB, TSVECTOR
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.core.database import Base
+from app.shared.models import TimestampMixin
+
+# Text search configuration of ``search_vector``. Queries must use the same
+# one, or the planner cannot use ix_notes_search_vector.
+SEARCH_CONFIG = "english"
+
+# Title matches outrank body matches: weight A for the title, B for the body.
+SEARCH_VECTOR_SQL = (
+    f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(title, '')), 'A') || "
+    f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(body, '')), 'B')"
+)
+
+
+class Note(TimestampMixin, Base):
+    """One markdown note of a vault, addressed by its path in the vault."""
+
+    __tablename__ = "notes"
+    __table_args__ = (
+        sa.UniqueConstraint("vault", "path", name="uq_notes_vault_path"),
+        sa.Index("ix_notes_search_vector", "search_vector", postgresql_using="gin"),
+        sa.Index(
+            "ix_notes_title_trgm",
+            "title",
+            postgresql_using="gin",
+            postgresql_ops={"title": "gin_trgm_ops"},
+        ),
+    )
+
+    id: Mapped[int] = mapped_column(sa.BigInteger, primary_key=True)
+    vault: Mapped[str] = mapped_column(sa.String(255))
+    path: Mapped[str] = mapped_column(sa.String(1024))
+    title: Mapped[str] = mapped_column(sa.String(512))
+    body: Mapped[str] = mapped_column(sa.Text, default="")
+    frontmatter: Mapped[dict[str, Any]] = mapped_column(
+        JSONB, default=dict, server_default=sa.text("'{}'::jsonb")
+    )
+    tags: Mapped[list[str]] = mapped_column(
+        ARRAY(sa.Text), default=list, server_default=sa.text("'{}'::text[]")
+    )
+    # Link targets as written ([[target]], [text](target.md)), not resolved.
+    links: Mapped[list[str]] = mapped_column(
+        ARRAY(sa.Text), default=list, server_default=sa.text("'{}'::text[]")
+    )
+    # Source file state from vault ingestion (app.notes.ingest); None for
+    # notes created through the API.
+    content_hash: Mapped[str | None] = mapped_column(sa.String(64))
+    mtime_ns: Mapped[int | None] = mapped_column(sa.BigInteger)
+    size_bytes: Mapped[int | None] = mapped_column(sa.BigInteger)
+    # Generated by Postgres on every write; deferred so reads never fetch it.
+    search_vector: Mapped[str] = mapped_column(
+        TSVECTOR, sa.Computed(SEARCH_VECTOR_SQL, persisted=True), deferred=True
+    )
+
+
+class NoteEmbedding(TimestampMixin, Base):
+    """A note's embedding vector, as little-endian float32 bytes.
+
+    Searched in memory by app.notes.vectors, not by Postgres; deleting the
+    note deletes its embedding.
+    """
+
+    __tablename__ = "note_embeddings"
+    __table_args__ = (sa.Index("ix_note_embeddings_updated_at", "updated_at"),)
+
+    note_id: Mapped[int] = mapped_column(
+        sa.BigInteger, sa.ForeignKey("notes.id", ondelete="CASCADE"), primary_key=True
+    )
+    vector: Mapped[bytes] = mapped_column(sa.LargeBinary)
@@ -0,0 +1,185 @@
+"""Markdown parsing for vault ingestion: frontmatter, title, tags and links.
+
+read_vault_file() runs in process-pool children (app.notes.ingest), so this
+module imports nothing from the app: children start without loading
+settings, the engine or the ORM.
+
+Follows Obsidian's conventions closely enough for search and linking:
+    frontmatter  a leading ``---`` YAML block; invalid YAML is dropped
+    title        frontmatter ``title``, else the first ``# heading``, else the
+                 file name
+    tags         frontmatter ``tags`` plus inline ``#tags`` (at least one
+                 non-digit; nested ``#a/b`` kept whole), case-insensitively
+                 unique
+    links        ``[[target]]`` / ``![[embed]]`` targets without heading,
+                 block or alias, and local ``[text](target.md)`` targets
+
+Code blocks and inline code are ignored when looking for tags and links.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
+from datetime import date
+from typing import Any
+from urllib.parse import unquote
+
+import yaml
+
+TITLE_MAX_LENGTH = 512
+
+_FRONTMATTER = re.compile(
+    r"\A---[ \t]*\r?\n(.*?)^(?:---|\.\.\.)[ \t]*(?:\r?\n|\Z)", re.DOTALL | re.MULTILINE
+)
+_FENCED_CODE = re.compile(
+    r"^[ \t]*(`{3,}|~{3,})[^\n]*\n.*?(?:^[ \t]*\1[ \t]*$|\Z)",
+    re.DOTALL | re.MULTILINE,
+)
+_INLINE_CODE = re.compile(r"(`+)[^`].*?\1", re.DOTALL)
+_HEADING = re.compile(r"^#[ \t]+(.+?)[ \t#]*$", re.MULTILINE)
+_TAG = re.compile(r"(?<![\w/&#])#([\w/-]*[^\W\d][\w/-]*)")
+_WIKILINK = re.compile(r"!?\[\[([^\[\]|#^]*)[^\[\]]*\]\]")
+_MARKDOWN_LINK = re.compile(r"!?\[[^\]]*\]\(<?([^()<>\s]+)>?(?:\s+\"[^\"]*\")?\)")
+_URL_SCHEME = re.compile(r"^[a-zA-Z][a-zA-Z0-9+.-]*:")
+# A link's (target) is not prose: ``[x](#anchor)`` is not a tag.
+_LINK_TARGET = re.compile(r"\]\([^()]*\)")
+
+
+@dataclass(frozen=True, slots=True)
+class ParsedMarkdown:
+    title: str
+    body: str
+    frontmatter: dict[str, Any]
+    tags: list[str]
+    links: list[str]
+
+
+@dataclass(frozen=True, slots=True)
+class VaultFile:
+    """A markdown file found by the vault walk; ``path`` is POSIX, relative."""
+
+    path: str
+    mtime_ns: int
+    size_bytes: int
+
+
+@dataclass(frozen=True, slots=True)
+class FileContent:
+    """What reading one file produced.
+
+    ``note`` is None when the content hash equals the stored one (only the
+    file's mtime changed) or when reading failed (``error`` is set).
+    """
+
+    file: VaultFile
+    content_hash: str | None = None
+    note: ParsedMarkdown | None = None
+    error: str | None = None
+
+
+def _json_safe(value: Any) -> Any:  # noqa: ANN401
+    if isinstance(value, dict):
+        return {str(key): _json_safe(item) for key, item in value.items()}
+    if isinstance(value, list | tuple | set):
+        return [_json_safe(item) for item in value]
+    if isinstance(value, date):
+        return value.isoformat()
+    if value is None or isinstance(value, str | int | float | bool):
+        return value
+    return str(value)
+
+
+def split_frontmatter(text: str) -> tuple[dict[str, Any], str]:
+    """The frontmatter mapping (empty if absent or invalid) and the body."""
+    match = _FRONTMATTER.match(text)
+    if match is None:
+        return {}, text
+    try:
+        data = yaml.safe_load(match.group(1))
+    except yaml.YAMLError:
+        data = None
+    frontmatter = _json_safe(data) if isinstance(data, dict) else {}
+    return frontmatter, text[match.end() :]
+
+
+def _unique(values: Iterable[str], key: Callable[[str], str] = str) -> list[str]:
+    seen: set[str] = set()
+    unique: list[str] = []
+    for value in values:
+        if value and key(value) not in seen:
+            seen.add(key(value))
+            unique.append(value)
+    return unique
+
+
+def _frontmatter_tags(frontmatter: dict[str, Any]) -> list[str]:
+    raw = frontmatter.get("tags", frontmatter.get("tag"))
+    if isinstance(raw, str):
+        raw = re.split(r"[,\s]+", raw)
+    if not isinstance(raw, list):
+        return []
+    return [str(tag).strip().lstrip("#") for tag in raw if tag is not None]
+
+
+def _markdown_links(text: str) -> Iterable[str]:
+    for target in _MARKDOWN_LINK.findall(text):
+        if _URL_SCHEME.match(target) or target.startswith("#"):
+            continue
+        yield unquote(target.partition("#")[0])
+
+
+def parse_markdown(text: str, fallback_title: str) -> ParsedMarkdown:
+    """Split a note into frontmatter and body and extract title, tags, links."""
+    frontmatter, body = split_frontmatter(text.removeprefix("\ufeff"))
+    prose = _INLINE_CODE.sub(" ", _FENCED_CODE.sub("", body))
+    title = frontmatter.get("title")
+    if not isinstance(title, str) or not title.strip():
+        heading = _HEADING.search(prose)
+        title = heading.group(1) if heading else fallback_title
+    links = [target.strip() for target in _WIKILINK.findall(prose)]
+    links.extend(_markdown_links(prose))
+    return ParsedMarkdown(
+        title=title.strip()[:TITLE_MAX_LENGTH],
+        body=body,
+        frontmatter=frontmatter,
+        tags=_unique(
+            [
+                *_frontmatter_tags(frontmatter),
+                *_TAG.findall(_LINK_TARGET.sub("]", prose)),
+            ],
+            key=str.casefold,
+        ),
+        links=_unique(links),
+    )
+
+
+def read_vault_file(
+    root: str, max_bytes: int, task: tuple[VaultFile, str | None]
+) -> FileContent:
+    """Read, hash and parse one file; ``task`` is (file, stored content hash).
+
+    Runs in a pool child. Failures are returned, not raised, so one bad file
+    does not fail the batch.
+    """
+    file, known_hash = task
+    try:
+        if file.size_bytes > max_bytes:
+            raise ValueError(f"larger than {max_bytes} bytes")
+        with open(os.path.join(root, file.path), "rb") as handle:
+            raw = handle.read(max_bytes + 1)
+        if len(raw) > max_bytes:
+            raise ValueError(f"larger than {max_bytes} bytes")
+    except (OSError, ValueError) as exc:
+        return FileContent(file, error=f"{type(exc).__name__}: {exc}")
+    content_hash = hashlib.sha256(raw).hexdigest()
+    if content_hash == known_hash:
+        return FileContent(file, content_hash)
+    stem = os.path.splitext(os.path.basename(file.path))[0]
+    # Postgres text cannot hold NUL characters.
+    text = raw.decode("utf-8", errors="replace").replace("\x00", "")
+    note = parse_markdown(text, stem)
+    return FileContent(file, content_hash, note)
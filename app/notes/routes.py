@@ -0,0 +1,164 @@
+"""Notes API: create, read, full-text search and fuzzy title search.
+
+    POST /api/notes                    — create a note (409 if the path exists)
+    POST /api/notes/import?vault=&path= — create one from a raw markdown body
+    GET  /api/notes/{id}               — one note
+    GET  /api/notes/search?q=          — ranked full-text hits with headlines
+    GET  /api/notes/search/titles?q=   — fuzzy (trigram) title matches
+    PUT  /api/notes/{id}/embedding     — store the note's embedding vector
+    DELETE /api/notes/{id}/embedding   — remove it
+    GET  /api/notes/{id}/related       — closest notes by embedding
+
+Both searches take ``vault`` to stay within one vault, and are paged with
+``cursor`` / ``page_size``: pass the previous page's ``next_cursor`` until
+it is null. Headlines contain the note's raw text around the <mark> tags,
+so escape them before rendering as HTML.
+
+Imports are streamed to a spooled temporary file rather than read into
+memory, and may be up to NOTES_INGEST_MAX_FILE_BYTES, like ingested files.
+
+Related notes need NOTES_VECTORS_ENABLED; until the index is loaded they
+return 503.
+"""
+
+from __future__ import annotations
+
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.core.database import get_db
+from app.core.limits import SpooledUpload, max_body_size, spooled_upload
+from app.core.profiling import TimedRoute
+from app.notes import service
+from app.notes.schemas import (
+    NoteCreate,
+    NoteEmbeddingWrite,
+    NoteRead,
+    NoteRelated,
+    NoteSearchHit,
+    NoteTitleMatch,
+)
+from app.notes.vectors import vector_index
+from app.shared.schemas import CursorPage, CursorParams
+from app.shared.serialization import json_response, validate_items
+
+router = APIRouter(prefix="/notes", tags=["notes"], route_class=TimedRoute)
+
+SearchText = Query(
+    min_length=1,
+    max_length=get_settings().notes_search_max_query_length,
+    description="Search text",
+)
+
+
+@router.post("", status_code=201)
+async def create_note(
+    data: NoteCreate,
+    db: AsyncSession = Depends(get_db),  # noqa: B008
+) -> NoteRead:
+    note = await service.create_note(db, data)
+    if note is None:
+        raise HTTPException(
+            status_code=409, detail=f"{data.path} already exists in {data.vault}"
+        )
+    return NoteRead.model_validate(note)
+
+
+@router.post("/import", status_code=201)
+@max_body_size(get_settings().notes_ingest_max_file_bytes)
+async def import_note(
+    vault: Annotated[str, Query(min_length=1, max_length=255)],
+    path: Annotated[str, Query(min_length=1, max_length=1024)],
+    upload: SpooledUpload = Depends(spooled_upload),  # noqa: B008
+    db: AsyncSession = Depends(get_db),  # noqa: B008
+) -> NoteRead:
+    note = await service.import_note(db, vault, path, upload)
+    if note is None:
+        raise HTTPException(status_code=409, detail=f"{path} already exists in {vault}")
+    return NoteRead.model_validate(note)
+
+
+@router.get("/search", response_model=CursorPage[NoteSearchHit])
+async def search_notes(
+    q: str = SearchText,
+    vault: str | None = None,
+    params: CursorParams = Depends(),  # noqa: B008
+    db: AsyncSession = Depends(get_db),  # noqa: B008
+) -> Response:
+    """Full-text search over titles and bodies, best match first."""
+    try:
+        rows, next_cursor = await service.search_notes(
+            db, q, page_size=params.page_size, vault=vault, cursor=params.cursor
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail="Invalid cursor") from exc
+    return json_response(
+        CursorPage[NoteSearchHit](
+            items=validate_items(NoteSearchHit, rows),
+            page_size=params.page_size,
+            next_cursor=next_cursor,
+        )
+    )
+
+
+@router.get("/search/titles", response_model=CursorPage[NoteTitleMatch])
+async def search_titles(
+    q: str = SearchText,
+    vault: str | None = None,
+    params: CursorParams = Depends(),  # noqa: B008
+    db: AsyncSession = Depends(get_db),  # noqa: B008
+) -> Response:
+    """Fuzzy title search that tolerates typos, closest match first."""
+    try:
+        rows, next_cursor = await service.search_titles(
+            db, q, page_size=params.page_size, vault=vault, cursor=params.cursor
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail="Invalid cursor") from exc
+    return json_response(
+        CursorPage[NoteTitleMatch](
+            items=validate_items(NoteTitleMatch, rows),
+            page_size=params.page_size,
+            next_cursor=next_cursor,
+        )
+    )
+
+
+@router.get("/{note_id}")
+async def get_note(
+    note_id: int,
+    db: AsyncSession = Depends(get_db),  # noqa: B008
+) -> NoteRead:
+    return NoteRead.model_validate(await service.get_note(db, note_id))
+
+
+@router.put("/{note_id}/embedding", status_code=204)
+async def store_embedding(
+    note_id: int,
+    data: NoteEmbeddingWrite,
+    db: AsyncSession = Depends(get_db),  # noqa: B008
+) -> None:
+    await service.store_embedding(db, note_id, data.vector)
+
+
+@router.delete("/{note_id}/embedding", status_code=204)
+async def delete_embedding(
+    note_id: int,
+    db: AsyncSession = Depends(get_db),  # noqa: B008
+) -> None:
+    await service.delete_embedding(db, note_id)
+
+
+@router.get("/{note_id}/related")
+async def related_notes(
+    note_id: int,
+    limit: Annotated[int, Query(ge=1, le=100)] = 10,
+    db: AsyncSession = Depends(get_db),  # noqa: B008
+) -> list[NoteRelated]:
+    """Notes closest to this one by embedding (cosine), closest first."""
+    if not vector_index.ready:
+        raise HTTPException(status_code=503, detail="Vector index is not loaded")
+    return await service.related_notes(db, note_id, limit=limit)
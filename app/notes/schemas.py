@@ -0,0 +1,71 @@
+"""Request and response models for the notes slice."""
+
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any
+
+from pydantic import BaseModel, ConfigDict, Field
+
+
+class NoteCreate(BaseModel):
+    vault: str = Field(min_length=1, max_length=255)
+    path: str = Field(min_length=1, max_length=1024)
+    title: str = Field(min_length=1, max_length=512)
+    body: str = ""
+
+
+class NoteRead(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    vault: str
+    path: str
+    title: str
+    body: str
+    frontmatter: dict[str, Any]
+    tags: list[str]
+    links: list[str]
+    created_at: datetime
+    updated_at: datetime
+
+
+class NoteSearchHit(BaseModel):
+    """A full-text match; ``headline`` marks matched terms with <mark> tags."""
+
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    vault: str
+    path: str
+    title: str
+    rank: float
+    headline: str
+
+
+class NoteTitleMatch(BaseModel):
+    """A fuzzy title match; ``similarity`` is the pg_trgm score (0-1)."""
+
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    vault: str
+    path: str
+    title: str
+    similarity: float
+
+
+class NoteEmbeddingWrite(BaseModel):
+    """An embedding of the note from any model with NOTES_VECTORS_DIMENSIONS."""
+
+    vector: list[float] = Field(min_length=1)
+
+
+class NoteRelated(BaseModel):
+    """A note close to another by embedding; ``score`` is cosine similarity."""
+
+    id: int
+    vault: str
+    path: str
+    title: str
+    score: float
@@ -0,0 +1,334 @@
+"""Note storage and search.
+
+Full-text search matches ``search_vector`` (title weighted above body)
+against ``websearch_to_tsquery``, so quoted phrases, ``or`` and ``-term``
+work as in a web search box, and is served by the ix_notes_search_vector
+GIN index. Hits are ranked with ``ts_rank_cd``. Snippets come from
+``ts_headline``, which re-parses the whole body, so it runs only over the
+rows of the returned page.
+
+Fuzzy title search uses pg_trgm's ``%`` operator, served by
+ix_notes_title_trgm, so typos and partial words still match.
+NOTES_TRIGRAM_THRESHOLD sets the minimum similarity.
+
+Both are paged by keyset on (score, id) instead of OFFSET: the cursor
+carries the last row's score and id, and the next page starts strictly
+after it. Page 20 costs about the same as page 1, because the sort only
+keeps the rows that follow the cursor.
+
+Related notes come from the in-memory vector index (app.notes.vectors):
+embeddings are stored in note_embeddings and applied to this worker's
+index at once, and to the other workers' at their next refresh.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Sequence
+from typing import Any
+
+import numpy as np
+import sqlalchemy as sa
+from sqlalchemy import (
+    ColumnClause,
+    ColumnElement,
+    Row,
+    Select,
+    delete,
+    func,
+    select,
+    tuple_,
+)
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.core.exceptions import NotFoundError, ValidationError
+from app.core.limits import SpooledUpload
+from app.core.logging import get_logger
+from app.notes.models import SEARCH_CONFIG, Note, NoteEmbedding
+from app.notes.parsing import ParsedMarkdown, parse_markdown
+from app.notes.schemas import NoteCreate, NoteRelated
+from app.notes.vectors import to_bytes, vector_index
+from app.shared.utils import decode_cursor, encode_cursor
+
+logger = get_logger("app.notes.service")
+
+# pg_trgm's own default for pg_trgm.similarity_threshold.
+DEFAULT_TRIGRAM_THRESHOLD = 0.3
+
+# A constant, so it is inlined rather than bound: the planner needs the
+# regconfig at plan time to match the generated column's expression.
+_CONFIG: ColumnClause[Any] = sa.literal_column(f"'{SEARCH_CONFIG}'::regconfig")
+
+type Keyset = tuple[float, int]
+
+
+async def create_note(session: AsyncSession, data: NoteCreate) -> Note | None:
+    """Insert a note and commit; None if the vault already has that path."""
+    statement = (
+        insert(Note)
+        .values(**data.model_dump())
+        .on_conflict_do_nothing(index_elements=[Note.vault, Note.path])
+        .returning(Note)
+    )
+    note = (await session.execute(statement)).scalar_one_or_none()
+    if note is None:
+        return None
+    await session.commit()
+    logger.info("notes.note.created", note_id=note.id, vault=note.vault)
+    return note
+
+
+def _parse_upload(upload: SpooledUpload, path: str) -> ParsedMarkdown:
+    stem = path.rpartition("/")[2].removesuffix(".md")
+    # Postgres text cannot hold NUL characters.
+    text = upload.file.read().decode("utf-8", errors="replace").replace("\x00", "")
+    return parse_markdown(text, stem)
+
+
+async def import_note(
+    session: AsyncSession, vault: str, path: str, upload: SpooledUpload
+) -> Note | None:
+    """Parse an uploaded markdown file into a note, as ingestion would.
+
+    Commits; None if the vault already has that path. The stored hash lets
+    a later ingestion of the same file skip rewriting it.
+    """
+    parsed = await asyncio.to_thread(_parse_upload, upload, path)
+    statement = (
+        insert(Note)
+        .values(
+            vault=vault,
+            path=path,
+            title=parsed.title,
+            body=parsed.body,
+            frontmatter=parsed.frontmatter,
+            tags=parsed.tags,
+            links=parsed.links,
+            content_hash=upload.sha256,
+            size_bytes=upload.size,
+        )
+        .on_conflict_do_nothing(index_elements=[Note.vault, Note.path])
+        .returning(Note)
+    )
+    note = (await session.execute(statement)).scalar_one_or_none()
+    if note is None:
+        return None
+    await session.commit()
+    logger.info(
+        "notes.note.imported", note_id=note.id, vault=vault, size_bytes=upload.size
+    )
+    return note
+
+
+async def get_note(session: AsyncSession, note_id: int) -> Note:
+    note = await session.get(Note, note_id)
+    if note is None:
+        raise NotFoundError(f"Note {note_id} not found")
+    return note
+
+
+def parse_cursor(cursor: str | None) -> Keyset | None:
+    """The (score, id) keyset of a search cursor; ValueError if it is invalid."""
+    if cursor is None:
+        return None
+    score, note_id = decode_cursor(cursor, 2)
+    if not isinstance(score, int | float) or not isinstance(note_id, int):
+        raise ValueError("Malformed cursor")
+    return float(score), note_id
+
+
+def _after(score: ColumnElement[Any], after: Keyset) -> ColumnElement[bool]:
+    # Row comparison matches ORDER BY score DESC, id DESC.
+    return tuple_(score, Note.id) < tuple_(
+        sa.literal(after[0], sa.Float), sa.literal(after[1], sa.BigInteger)
+    )
+
+
+def headline_options(max_fragments: int) -> str:
+    return (
+        "StartSel=<mark>, StopSel=</mark>, MinWords=15, MaxWords=35, "
+        f'MaxFragments={max_fragments}, FragmentDelimiter=" … "'
+    )
+
+
+def full_text_query(
+    text: str,
+    *,
+    limit: int,
+    vault: str | None = None,
+    after: Keyset | None = None,
+    max_fragments: int = 2,
+) -> Select[Any]:
+    """Ranked full-text matches for ``text``, best first, with headlines."""
+    tsquery = func.websearch_to_tsquery(_CONFIG, text)
+    rank = func.ts_rank_cd(Note.search_vector, tsquery)
+    matches = select(
+        Note.id,
+        Note.vault,
+        Note.path,
+        Note.title,
+        Note.body,
+        rank.label("rank"),
+    ).where(Note.search_vector.op("@@")(tsquery))
+    if vault is not None:
+        matches = matches.where(Note.vault == vault)
+    if after is not None:
+        matches = matches.where(_after(rank, after))
+    page = matches.order_by(rank.desc(), Note.id.desc()).limit(limit).subquery()
+    headline = func.ts_headline(
+        _CONFIG, page.c.body, tsquery, headline_options(max_fragments)
+    )
+    return select(
+        page.c.id,
+        page.c.vault,
+        page.c.path,
+        page.c.title,
+        page.c.rank,
+        headline.label("headline"),
+    ).order_by(page.c.rank.desc(), page.c.id.desc())
+
+
+def title_query(
+    text: str,
+    *,
+    limit: int,
+    vault: str | None = None,
+    after: Keyset | None = None,
+) -> Select[Any]:
+    """Titles within the trigram similarity threshold of ``text``, closest first."""
+    similarity = func.similarity(Note.title, text)
+    query = select(
+        Note.id,
+        Note.vault,
+        Note.path,
+        Note.title,
+        similarity.label("similarity"),
+    ).where(Note.title.op("%")(text))
+    if vault is not None:
+        query = query.where(Note.vault == vault)
+    if after is not None:
+        query = query.where(_after(similarity, after))
+    return query.order_by(similarity.desc(), Note.id.desc()).limit(limit)
+
+
+def _next_page(
+    rows: Sequence[Row[Any]], page_size: int, score: str
+) -> tuple[list[Row[Any]], str | None]:
+    """Trim the look-ahead row; if there was one, the cursor is the last row kept."""
+    if len(rows) <= page_size:
+        return list(rows), None
+    page = list(rows[:page_size])
+    last = page[-1]
+    return page, encode_cursor([getattr(last, score), last.id])
+
+
+async def search_notes(
+    session: AsyncSession,
+    text: str,
+    *,
+    page_size: int,
+    vault: str | None = None,
+    cursor: str | None = None,
+) -> tuple[list[Row[Any]], str | None]:
+    """One page of full-text hits and the cursor of the next page, if any."""
+    query = full_text_query(
+        text,
+        limit=page_size + 1,
+        vault=vault,
+        after=parse_cursor(cursor),
+        max_fragments=get_settings().notes_headline_max_fragments,
+    )
+    rows = (await session.execute(query)).all()
+    return _next_page(rows, page_size, "rank")
+
+
+async def search_titles(
+    session: AsyncSession,
+    text: str,
+    *,
+    page_size: int,
+    vault: str | None = None,
+    cursor: str | None = None,
+) -> tuple[list[Row[Any]], str | None]:
+    """One page of fuzzy title matches and the cursor of the next page, if any."""
+    after = parse_cursor(cursor)
+    threshold = get_settings().notes_trigram_threshold
+    if threshold != DEFAULT_TRIGRAM_THRESHOLD:
+        # Transaction-local, so pooled connections keep the server default.
+        await session.execute(
+            select(
+                func.set_config("pg_trgm.similarity_threshold", str(threshold), True)
+            )
+        )
+    query = title_query(text, limit=page_size + 1, vault=vault, after=after)
+    rows = (await session.execute(query)).all()
+    return _next_page(rows, page_size, "similarity")
+
+
+async def store_embedding(
+    session: AsyncSession, note_id: int, vector: Sequence[float]
+) -> None:
+    """Insert or replace a note's embedding and commit."""
+    dimensions = get_settings().notes_vectors_dimensions
+    array = np.asarray(vector, dtype=np.float32)
+    if array.shape != (dimensions,):
+        raise ValidationError(f"Embedding must have {dimensions} values")
+    if not np.isfinite(array).all():
+        raise ValidationError("Embedding values must be finite")
+    await get_note(session, note_id)
+    upsert = insert(NoteEmbedding).values(note_id=note_id, vector=to_bytes(array))
+    await session.execute(
+        upsert.on_conflict_do_update(
+            index_elements=[NoteEmbedding.note_id],
+            set_={
+                "vector": upsert.excluded.vector,
+                "updated_at": upsert.excluded.updated_at,
+            },
+        )
+    )
+    await session.commit()
+    vector_index.add([note_id], array[np.newaxis])
+
+
+async def delete_embedding(session: AsyncSession, note_id: int) -> None:
+    result = await session.execute(
+        delete(NoteEmbedding)
+        .where(NoteEmbedding.note_id == note_id)
+        .returning(NoteEmbedding.note_id)
+    )
+    if result.scalar_one_or_none() is None:
+        raise NotFoundError(f"Note {note_id} has no embedding")
+    await session.commit()
+    vector_index.remove([note_id])
+
+
+async def related_notes(
+    session: AsyncSession, note_id: int, *, limit: int
+) -> list[NoteRelated]:
+    """The notes whose embeddings are closest to ``note_id``'s, closest first."""
+    vector = vector_index.vector(note_id)
+    if vector is None:
+        raise NotFoundError(f"Note {note_id} has no embedding")
+    [hits] = await asyncio.to_thread(vector_index.search, vector, limit, [note_id])
+    if not hits:
+        return []
+    # The index can trail deletions until its next refresh: drop missing notes.
+    rows = await session.execute(
+        select(Note.id, Note.vault, Note.path, Note.title).where(
+            Note.id.in_([hit_id for hit_id, _ in hits])
+        )
+    )
+    notes = {row.id: row for row in rows}
+    return [
+        NoteRelated(
+            id=hit_id,
+            vault=notes[hit_id].vault,
+            path=notes[hit_id].path,
+            title=notes[hit_id].title,
+            score=score,
+        )
+        for hit_id, score in hits
+        if hit_id in notes
+    ]
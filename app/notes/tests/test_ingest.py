@@ -0,0 +1,197 @@
+"""Tests for app/notes/ingest.py."""
+
+from __future__ import annotations
+
+import hashlib
+from collections.abc import AsyncIterator, Callable, Iterable
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.core.processes import ProcessPool
+from app.notes import ingest
+from app.notes.ingest import (
+    IngestReport,
+    StoredState,
+    ingest_vault,
+    plan_changes,
+    scan_vault,
+)
+from app.notes.parsing import VaultFile
+
+
+class InlinePool:
+    """Runs ``map`` in this process and records the batch sizes."""
+
+    def __init__(self) -> None:
+        self.batches: list[int] = []
+
+    async def map(self, fn: Callable[[Any], Any], items: Iterable[Any]) -> list[Any]:
+        materialized = list(items)
+        self.batches.append(len(materialized))
+        return [fn(item) for item in materialized]
+
+
+def _write(root: Path, path: str, text: str) -> VaultFile:
+    file = root / path
+    file.parent.mkdir(parents=True, exist_ok=True)
+    file.write_text(text)
+    stat = file.stat()
+    return VaultFile(path, stat.st_mtime_ns, stat.st_size)
+
+
+def _session() -> tuple[MagicMock, Callable[[], Any]]:
+    session = MagicMock()
+    session.execute = AsyncMock()
+    session.commit = AsyncMock()
+
+    @asynccontextmanager
+    async def factory() -> AsyncIterator[MagicMock]:
+        yield session
+
+    return session, factory
+
+
+def test_scan_vault_skips_hidden_entries_and_other_files(tmp_path: Path) -> None:
+    _write(tmp_path, "a.md", "a")
+    _write(tmp_path, "projects/deep/b.MD", "bb")
+    _write(tmp_path, "image.png", "png")
+    _write(tmp_path, ".obsidian/workspace.md", "hidden")
+    _write(tmp_path, "projects/.trash/old.md", "hidden")
+    files = sorted(scan_vault(tmp_path), key=lambda file: file.path)
+    assert [(file.path, file.size_bytes) for file in files] == [
+        ("a.md", 1),
+        ("projects/deep/b.MD", 2),
+    ]
+
+
+def test_plan_changes_compares_mtime_and_size() -> None:
+    files = [
+        VaultFile("same.md", 1, 10),
+        VaultFile("touched.md", 2, 10),
+        VaultFile("new.md", 1, 5),
+        VaultFile("x" * (ingest.PATH_MAX_LENGTH + 1), 1, 5),
+    ]
+    state: dict[str, StoredState] = {
+        "same.md": (1, 10, "h1"),
+        "touched.md": (1, 10, "h2"),
+        "gone.md": (1, 3, "h3"),
+    }
+    plan = plan_changes(files, state)
+    assert plan.unchanged == 1
+    assert plan.reads == [(files[1], "h2"), (files[2], None)]
+    assert plan.removed == ["gone.md"]
+    assert plan.too_long == [files[3].path]
+
+
+async def test_ingest_writes_changed_files_in_batches(tmp_path: Path) -> None:
+    same = _write(tmp_path, "same.md", "same")
+    touched = _write(tmp_path, "touched.md", "# Touched")
+    for index in range(3):
+        _write(tmp_path, f"new/{index}.md", f"# New {index}\n#tag")
+    _write(tmp_path, "bad.md", "x" * 50)
+    state = {
+        "same.md": (same.mtime_ns, same.size_bytes, "h"),
+        "touched.md": (
+            touched.mtime_ns - 1,
+            touched.size_bytes,
+            hashlib.sha256(b"# Touched").hexdigest(),
+        ),
+        "gone.md": (1, 1, "h"),
+    }
+    session, factory = _session()
+    pool = InlinePool()
+    settings = MagicMock(notes_ingest_max_file_bytes=20)
+    with (
+        patch.object(ingest, "get_settings", return_value=settings),
+        patch.object(ingest, "load_state", AsyncMock(return_value=state)),
+    ):
+        report = await ingest_vault(
+            "work",
+            tmp_path,
+            pool=pool,  # type: ignore[arg-type]
+            session_factory=factory,  # type: ignore[arg-type]
+            batch_size=2,
+        )
+
+    assert pool.batches == [2, 2, 1]
+    assert (report.scanned, report.unchanged) == (6, 1)
+    assert (report.written, report.touched) == (3, 1)
+    assert (report.deleted, report.failed) == (1, 1)
+    # Three batch commits and one for the deletion.
+    assert session.commit.await_count == 4
+    rows = [
+        row
+        for call in session.execute.await_args_list
+        if call.args[0] is ingest._UPSERT
+        for row in call.args[1]
+    ]
+    assert sorted(row["title"] for row in rows) == ["New 0", "New 1", "New 2"]
+    assert all(row["tags"] == ["tag"] for row in rows)
+    touches = [
+        call.args[1]
+        for call in session.execute.await_args_list
+        if call.args[0] is ingest._TOUCH
+    ]
+    assert touches == [
+        [
+            {
+                "b_vault": "work",
+                "b_path": "touched.md",
+                "b_mtime_ns": touched.mtime_ns,
+                "b_size_bytes": touched.size_bytes,
+            }
+        ]
+    ]
+
+
+async def test_ingest_with_nothing_changed_writes_nothing(tmp_path: Path) -> None:
+    file = _write(tmp_path, "a.md", "a")
+    session, factory = _session()
+    state = {"a.md": (file.mtime_ns, file.size_bytes, "h")}
+    with patch.object(ingest, "load_state", AsyncMock(return_value=state)):
+        report = await ingest_vault(
+            "work",
+            tmp_path,
+            pool=InlinePool(),  # type: ignore[arg-type]
+            session_factory=factory,  # type: ignore[arg-type]
+        )
+    assert report.unchanged == 1
+    session.execute.assert_not_awaited()
+    session.commit.assert_not_awaited()
+
+
+async def test_ingest_rejects_missing_root(tmp_path: Path) -> None:
+    with pytest.raises(NotADirectoryError):
+        await ingest_vault("work", tmp_path / "missing", pool=InlinePool())  # type: ignore[arg-type]
+
+
+async def test_ingest_parses_in_pool_children(tmp_path: Path) -> None:
+    for index in range(4):
+        _write(tmp_path, f"{index}.md", f"---\ntags: [t{index}]\n---\n# Note {index}")
+    session, factory = _session()
+    pool = ProcessPool(max_workers=2, timeout=10.0)
+    pool.start()
+    try:
+        with patch.object(ingest, "load_state", AsyncMock(return_value={})):
+            report = await ingest_vault(
+                "work",
+                tmp_path,
+                pool=pool,
+                session_factory=factory,  # type: ignore[arg-type]
+                batch_size=3,
+            )
+    finally:
+        await pool.stop()
+    assert report.written == 4
+    rows = [row for call in session.execute.await_args_list for row in call.args[1]]
+    assert sorted((row["title"], *row["tags"]) for row in rows) == [
+        (f"Note {index}", f"t{index}") for index in range(4)
+    ]
+
+
+def test_report_snapshot_is_loggable() -> None:
+    assert IngestReport("work", written=2).snapshot()["written"] == 2
@@ -0,0 +1,82 @@
+"""Tests for app/notes/parsing.py."""
+
+from __future__ import annotations
+
+import hashlib
+from pathlib import Path
+
+from app.notes.parsing import (
+    VaultFile,
+    parse_markdown,
+    read_vault_file,
+    split_frontmatter,
+)
+
+NOTE = """---
+title: Sync design
+tags: [project, "#Ingest"]
+created: 2026-01-05
+---
+# Ignored heading
+
+Links to [[Daily Log#Tasks|today]], ![[diagram.png]] and [spec](docs/Spec%20v2.md#api).
+External [site](https://example.com) and [anchor](#local) are not links.
+Tagged #ingest/pipeline and #project, not #123 or a URL http://x.io/#frag.
+
+```python
+# comment #notatag [[not-a-link]]
+```
+Inline `#code [[nope]]` too.
+"""
+
+
+def test_parse_markdown_extracts_frontmatter_tags_and_links() -> None:
+    parsed = parse_markdown(NOTE, "fallback")
+    assert parsed.title == "Sync design"
+    assert parsed.frontmatter == {
+        "title": "Sync design",
+        "tags": ["project", "#Ingest"],
+        "created": "2026-01-05",
+    }
+    assert parsed.body.startswith("# Ignored heading")
+    assert parsed.tags == ["project", "Ingest", "ingest/pipeline"]
+    assert parsed.links == ["Daily Log", "diagram.png", "docs/Spec v2.md"]
+
+
+def test_title_falls_back_to_heading_then_file_name() -> None:
+    assert parse_markdown("intro\n\n# Heading ##\n", "file").title == "Heading"
+    assert parse_markdown("```\n# code\n```\nno heading", "file").title == "file"
+
+
+def test_invalid_or_non_mapping_frontmatter_is_dropped() -> None:
+    assert split_frontmatter("---\n: [broken\n---\nbody") == ({}, "body")
+    assert split_frontmatter("---\n- a list\n---\nbody") == ({}, "body")
+    assert split_frontmatter("no frontmatter\n---\n") == ({}, "no frontmatter\n---\n")
+
+
+def test_read_vault_file_hashes_parses_and_skips_unchanged(tmp_path: Path) -> None:
+    raw = "﻿# Title\nbody\x00 #tag\n".encode()
+    (tmp_path / "note.md").write_bytes(raw)
+    file = VaultFile("note.md", 1, len(raw))
+    digest = hashlib.sha256(raw).hexdigest()
+
+    content = read_vault_file(str(tmp_path), 1000, (file, None))
+    assert content.content_hash == digest
+    assert content.note is not None
+    assert content.note.title == "Title"
+    assert "\x00" not in content.note.body
+    assert content.note.tags == ["tag"]
+
+    unchanged = read_vault_file(str(tmp_path), 1000, (file, digest))
+    assert unchanged.content_hash == digest
+    assert unchanged.note is None
+
+
+def test_read_vault_file_reports_failures(tmp_path: Path) -> None:
+    (tmp_path / "big.md").write_bytes(b"x" * 20)
+    missing = read_vault_file(str(tmp_path), 100, (VaultFile("gone.md", 1, 5), None))
+    too_big = read_vault_file(str(tmp_path), 10, (VaultFile("big.md", 1, 5), None))
+    assert missing.error is not None
+    assert missing.error.startswith("FileNotFoundError")
+    assert too_big.error == "ValueError: larger than 10 bytes"
+    assert too_big.note is None
@@ -0,0 +1,203 @@
+"""Tests for app/notes/routes.py."""
+
+from __future__ import annotations
+
+from collections.abc import AsyncIterator, Iterator
+from datetime import UTC, datetime
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.core.database import get_db
+from app.core.exceptions import NotFoundError
+from app.core.limits import SpooledUpload
+from app.main import app
+from app.notes import service
+from app.notes.schemas import NoteRelated
+from app.notes.vectors import vector_index
+
+
+@pytest.fixture
+def client() -> Iterator[AsyncClient]:
+    session = AsyncMock(spec=AsyncSession)
+
+    async def override() -> AsyncIterator[AsyncSession]:
+        yield session
+
+    app.dependency_overrides[get_db] = override
+    yield AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+    app.dependency_overrides.clear()
+
+
+def _hit(note_id: int) -> SimpleNamespace:
+    return SimpleNamespace(
+        id=note_id,
+        vault="work",
+        path=f"{note_id}.md",
+        title=f"Note {note_id}",
+        rank=0.5,
+        headline="the <mark>vault</mark> sync",
+    )
+
+
+async def test_search_returns_hits_and_next_cursor(client: AsyncClient) -> None:
+    search = AsyncMock(return_value=([_hit(2), _hit(1)], "next"))
+    with patch.object(service, "search_notes", search):
+        response = await client.get(
+            "/api/notes/search",
+            params={"q": "vault", "vault": "work", "page_size": 2, "cursor": "c"},
+        )
+    assert response.status_code == 200
+    body = response.json()
+    assert [item["id"] for item in body["items"]] == [2, 1]
+    assert body["items"][0]["headline"] == "the <mark>vault</mark> sync"
+    assert body["next_cursor"] == "next"
+    search.assert_awaited_once()
+    assert search.await_args is not None
+    assert search.await_args.kwargs == {
+        "page_size": 2,
+        "vault": "work",
+        "cursor": "c",
+    }
+
+
+async def test_search_rejects_bad_cursor_and_query(client: AsyncClient) -> None:
+    invalid = await client.get(
+        "/api/notes/search/titles", params={"q": "x", "cursor": "garbage"}
+    )
+    empty = await client.get("/api/notes/search", params={"q": ""})
+    too_long = await client.get("/api/notes/search", params={"q": "x" * 257})
+    assert invalid.status_code == 400
+    assert invalid.json()["detail"] == "Invalid cursor"
+    assert empty.status_code == 422
+    assert too_long.status_code == 422
+
+
+async def test_title_search_returns_similarity(client: AsyncClient) -> None:
+    match = {"id": 3, "vault": "v", "path": "p.md", "title": "Meeting"}
+    row = SimpleNamespace(**match, similarity=0.6)
+    with patch.object(service, "search_titles", AsyncMock(return_value=([row], None))):
+        response = await client.get("/api/notes/search/titles", params={"q": "meetng"})
+    assert response.json() == {
+        "items": [{**match, "similarity": 0.6}],
+        "page_size": 20,
+        "next_cursor": None,
+    }
+
+
+async def test_create_and_get_note(client: AsyncClient) -> None:
+    now = datetime(2026, 1, 1, tzinfo=UTC)
+    note = SimpleNamespace(
+        id=1,
+        vault="work",
+        path="a.md",
+        title="A",
+        body="alpha",
+        frontmatter={},
+        tags=[],
+        links=[],
+        created_at=now,
+        updated_at=now,
+    )
+    payload = {"vault": "work", "path": "a.md", "title": "A", "body": "alpha"}
+    with (
+        patch.object(service, "create_note", AsyncMock(side_effect=[note, None])),
+        patch.object(
+            service,
+            "get_note",
+            AsyncMock(side_effect=[note, NotFoundError("Note 2 not found")]),
+        ),
+    ):
+        created = await client.post("/api/notes", json=payload)
+        duplicate = await client.post("/api/notes", json=payload)
+        found = await client.get("/api/notes/1")
+        missing = await client.get("/api/notes/2")
+    assert created.status_code == 201
+    assert created.json()["path"] == "a.md"
+    assert duplicate.status_code == 409
+    assert found.json()["title"] == "A"
+    assert missing.status_code == 404
+
+
+async def test_import_note_streams_the_body_within_the_file_limit(
+    client: AsyncClient,
+) -> None:
+    now = datetime(2026, 1, 1, tzinfo=UTC)
+    note = SimpleNamespace(
+        id=1,
+        vault="work",
+        path="a.md",
+        title="Alpha",
+        body="text",
+        frontmatter={},
+        tags=[],
+        links=[],
+        created_at=now,
+        updated_at=now,
+    )
+    sizes: list[int] = []
+
+    async def import_note(
+        _: AsyncSession, vault: str, path: str, upload: SpooledUpload
+    ) -> SimpleNamespace | None:
+        sizes.append(len(upload.file.read()))
+        return note if len(sizes) == 1 else None
+
+    settings = get_settings()
+    # Above the default body limit, within the route's own.
+    large = b"x" * (settings.request_max_body_bytes + 1)
+    params = {"vault": "work", "path": "a.md"}
+    with patch.object(service, "import_note", import_note):
+        created = await client.post(
+            "/api/notes/import", params=params, content=b"# Alpha\ntext"
+        )
+        duplicate = await client.post("/api/notes/import", params=params, content=large)
+        too_big = await client.post(
+            "/api/notes/import",
+            params=params,
+            content=b"x" * (settings.notes_ingest_max_file_bytes + 1),
+        )
+    assert created.status_code == 201
+    assert created.json()["title"] == "Alpha"
+    assert sizes == [12, len(large)]
+    assert duplicate.status_code == 409
+    assert too_big.status_code == 413
+
+
+async def test_related_notes_need_a_loaded_index(client: AsyncClient) -> None:
+    related = [NoteRelated(id=2, vault="work", path="2.md", title="B", score=0.9)]
+    lookup = AsyncMock(return_value=related)
+    with patch.object(service, "related_notes", lookup):
+        with patch.object(vector_index, "_state", MagicMock(meta=None)):
+            unavailable = await client.get("/api/notes/1/related")
+        with patch.object(vector_index, "_state", MagicMock()):
+            found = await client.get("/api/notes/1/related", params={"limit": 5})
+            too_many = await client.get("/api/notes/1/related", params={"limit": 500})
+    assert unavailable.status_code == 503
+    assert found.json() == [related[0].model_dump()]
+    assert lookup.await_args is not None
+    assert lookup.await_args.kwargs == {"limit": 5}
+    assert too_many.status_code == 422
+
+
+async def test_embedding_routes_store_and_delete(client: AsyncClient) -> None:
+    store = AsyncMock()
+    remove = AsyncMock(side_effect=[None, NotFoundError("Note 1 has no embedding")])
+    with (
+        patch.object(service, "store_embedding", store),
+        patch.object(service, "delete_embedding", remove),
+    ):
+        stored = await client.put("/api/notes/1/embedding", json={"vector": [0.5]})
+        empty = await client.put("/api/notes/1/embedding", json={"vector": []})
+        deleted = await client.delete("/api/notes/1/embedding")
+        missing = await client.delete("/api/notes/1/embedding")
+    assert stored.status_code == 204
+    assert store.await_args is not None
+    assert store.await_args.args[1:] == (1, [0.5])
+    assert empty.status_code == 422
+    assert deleted.status_code == 204
+    assert missing.status_code == 404
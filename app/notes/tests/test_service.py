@@ -0,0 +1,197 @@
+"""Tests for app/notes/service.py."""
+
+from __future__ import annotations
+
+import io
+from types import SimpleNamespace
+from typing import Any
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import numpy as np
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.core.config import get_settings
+from app.core.exceptions import NotFoundError, ValidationError
+from app.core.limits import SpooledUpload
+from app.notes import service
+from app.notes.schemas import NoteCreate
+from app.notes.vectors import VectorIndex
+from app.shared.utils import encode_cursor
+
+
+def _sql(query: object) -> str:
+    dialect = postgresql.dialect()  # type: ignore[no-untyped-call]
+    return str(query.compile(dialect=dialect))  # type: ignore[attr-defined]
+
+
+def test_full_text_query_uses_index_and_ranks_before_headlines() -> None:
+    sql = _sql(service.full_text_query("obsidian -draft", limit=21, vault="work"))
+    inner, _, outer = sql.partition("FROM (")[2].rpartition(") AS anon_1")
+    assert "notes.search_vector @@ websearch_to_tsquery('english'::regconfig" in inner
+    assert "ts_rank_cd(notes.search_vector" in inner
+    assert "notes.vault = " in inner
+    assert "ts_headline" not in inner
+    assert "ts_headline('english'::regconfig, anon_1.body" in sql
+    assert "ORDER BY anon_1.rank DESC, anon_1.id DESC" in outer
+
+
+def test_queries_continue_strictly_after_the_cursor() -> None:
+    full_text = _sql(service.full_text_query("x", limit=21, after=(0.25, 7)))
+    titles = _sql(service.title_query("x", limit=21, after=(0.5, 3)))
+    assert "(ts_rank_cd(notes.search_vector" in full_text
+    assert "notes.id) < (%(param_1)s, %(param_2)s)" in full_text
+    assert "notes.title %% %(title_1)s" in titles
+    assert "(similarity(notes.title, %(similarity_1)s), notes.id) < (" in titles
+    assert titles.endswith("DESC, notes.id DESC \n LIMIT %(param_3)s")
+
+
+def test_parse_cursor_round_trips_and_rejects_garbage() -> None:
+    assert service.parse_cursor(None) is None
+    assert service.parse_cursor(encode_cursor([0.0759999975562096, 42])) == (
+        0.0759999975562096,
+        42,
+    )
+    for bad in ("not-a-cursor", encode_cursor([1]), encode_cursor(["a", 1])):
+        with pytest.raises(ValueError, match="Malformed cursor"):
+            service.parse_cursor(bad)
+
+
+def test_next_page_trims_look_ahead_row_into_a_cursor() -> None:
+    rows = [SimpleNamespace(id=i, rank=1 / i) for i in range(1, 4)]
+    page, cursor = service._next_page(rows, 2, "rank")  # type: ignore[arg-type]
+    assert [row.id for row in page] == [1, 2]
+    assert service.parse_cursor(cursor) == (0.5, 2)
+    page, cursor = service._next_page(rows, 3, "rank")  # type: ignore[arg-type]
+    assert len(page) == 3
+    assert cursor is None
+
+
+async def test_search_notes_returns_page_and_cursor() -> None:
+    session = AsyncMock()
+    rows = [SimpleNamespace(id=i, rank=0.1) for i in (9, 8, 7)]
+    session.execute.return_value = MagicMock(all=MagicMock(return_value=rows))
+    page, cursor = await service.search_notes(session, "vault", page_size=2)
+    assert [row.id for row in page] == [9, 8]
+    assert service.parse_cursor(cursor) == (0.1, 8)
+    assert "LIMIT" in _sql(session.execute.await_args.args[0])
+
+
+async def test_search_titles_sets_threshold_only_when_not_default() -> None:
+    session = AsyncMock()
+    session.execute.return_value = MagicMock(all=MagicMock(return_value=[]))
+    await service.search_titles(session, "meeting", page_size=20)
+    assert session.execute.await_count == 1
+
+    session.execute.reset_mock()
+    settings = get_settings().model_copy(update={"notes_trigram_threshold": 0.45})
+    with patch.object(service, "get_settings", return_value=settings):
+        await service.search_titles(session, "meeting", page_size=20)
+    threshold, _ = session.execute.await_args_list
+    assert "set_config" in _sql(threshold.args[0])
+    assert "0.45" in threshold.args[0].compile().params.values()
+
+
+async def test_create_note_commits_or_reports_existing_path() -> None:
+    data = NoteCreate(vault="work", path="a.md", title="A", body="alpha")
+    session = AsyncMock()
+    created: Any = SimpleNamespace(id=1, vault="work")
+    session.execute.return_value = MagicMock(
+        scalar_one_or_none=MagicMock(return_value=created)
+    )
+    assert await service.create_note(session, data) is created
+    session.commit.assert_awaited_once()
+
+    session.reset_mock()
+    session.execute.return_value.scalar_one_or_none.return_value = None
+    assert await service.create_note(session, data) is None
+    session.commit.assert_not_awaited()
+
+
+async def test_import_note_parses_the_upload_and_keeps_its_hash() -> None:
+    raw = b"---\ntags: [a]\n---\n# Plan\n\x00See [[Other]]\n"
+    upload = SpooledUpload(
+        file=io.BytesIO(raw), size=len(raw), sha256="f" * 64, content_type=None
+    )
+    session = AsyncMock()
+    created: Any = SimpleNamespace(id=1)
+    session.execute.return_value = MagicMock(
+        scalar_one_or_none=MagicMock(return_value=created)
+    )
+    assert await service.import_note(session, "work", "dir/plan.md", upload) is created
+    params = session.execute.await_args.args[0].compile().params
+    assert params["title"] == "Plan"
+    assert params["body"] == "# Plan\nSee [[Other]]\n"
+    assert params["tags"] == ["a"]
+    assert params["links"] == ["Other"]
+    assert params["content_hash"] == "f" * 64
+    assert params["size_bytes"] == len(raw)
+    session.commit.assert_awaited_once()
+
+
+async def test_get_note_raises_not_found() -> None:
+    session = AsyncMock()
+    session.get.return_value = None
+    with pytest.raises(NotFoundError, match="Note 5 not found"):
+        await service.get_note(session, 5)
+
+
+async def test_store_embedding_validates_then_upserts_and_updates_index() -> None:
+    dimensions = get_settings().notes_vectors_dimensions
+    session = AsyncMock()
+    index = VectorIndex(dimensions=dimensions)
+    with (
+        patch.object(service, "vector_index", index),
+        patch.object(service, "get_note", AsyncMock()),
+    ):
+        with pytest.raises(ValidationError, match=f"{dimensions} values"):
+            await service.store_embedding(session, 1, [1.0])
+        with pytest.raises(ValidationError, match="finite"):
+            await service.store_embedding(session, 1, [float("nan")] * dimensions)
+        session.execute.assert_not_awaited()
+
+        await service.store_embedding(session, 1, [1.0] * dimensions)
+    statement = session.execute.await_args.args[0]
+    assert "ON CONFLICT (note_id) DO UPDATE" in _sql(statement)
+    session.commit.assert_awaited_once()
+    vector = index.vector(1)
+    assert vector is not None
+    assert np.isclose(np.linalg.norm(vector), 1.0)
+
+
+async def test_delete_embedding_removes_from_index_or_raises() -> None:
+    session = AsyncMock()
+    index = MagicMock()
+    session.execute.return_value = MagicMock(
+        scalar_one_or_none=MagicMock(side_effect=[3, None])
+    )
+    with patch.object(service, "vector_index", index):
+        await service.delete_embedding(session, 3)
+        with pytest.raises(NotFoundError, match="no embedding"):
+            await service.delete_embedding(session, 3)
+    index.remove.assert_called_once_with([3])
+    session.commit.assert_awaited_once()
+
+
+async def test_related_notes_keeps_index_order_and_drops_deleted_notes() -> None:
+    index = MagicMock()
+    index.vector.return_value = np.ones(4, dtype=np.float32)
+    index.search.return_value = [[(7, 0.9), (8, 0.8), (9, 0.7)]]
+    rows = [
+        SimpleNamespace(id=note_id, vault="work", path=f"{note_id}.md", title="T")
+        for note_id in (9, 7)
+    ]
+    session = AsyncMock()
+    session.execute.return_value = rows
+    with patch.object(service, "vector_index", index):
+        related = await service.related_notes(session, 1, limit=3)
+    assert [(note.id, note.score) for note in related] == [(7, 0.9), (9, 0.7)]
+    _, k, exclude = index.search.call_args.args
+    assert (k, exclude) == (3, [1])
+
+    index.vector.return_value = None
+    with (
+        patch.object(service, "vector_index", index),
+        pytest.raises(NotFoundError, match="no embedding"),
+    ):
+        await service.related_notes(session, 2, limit=3)
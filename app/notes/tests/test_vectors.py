@@ -0,0 +1,310 @@
+"""Tests for app/notes/vectors.py."""
+
+from __future__ import annotations
+
+import fcntl
+import threading
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import numpy as np
+import pytest
+
+from app.notes import vectors
+from app.notes.vectors import (
+    SnapshotMeta,
+    SnapshotWriter,
+    VectorIndex,
+    latest_snapshot,
+    normalize,
+    remove_snapshots,
+)
+
+DIMENSIONS = 8
+
+
+def _write(
+    directory: Path, ids: list[int], matrix: np.ndarray, table_rows: int | None = None
+) -> SnapshotMeta:
+    with SnapshotWriter(directory, len(ids), DIMENSIONS) as writer:
+        half = len(ids) // 2
+        writer.append(ids[:half], matrix[:half])
+        writer.append(ids[half:], matrix[half:].ravel())
+        return writer.commit(len(ids) if table_rows is None else table_rows, None)
+
+
+def _index(directory: Path, ids: list[int], matrix: np.ndarray) -> VectorIndex:
+    index = VectorIndex(dimensions=DIMENSIONS, directory=directory)
+    index.load(_write(directory, ids, matrix))
+    return index
+
+
+def _exact(matrix: np.ndarray, query: np.ndarray, ids: list[int], k: int) -> list[int]:
+    scores = normalize(matrix).astype(np.float64) @ normalize(query)[0]
+    return [ids[row] for row in np.argsort(-scores, kind="stable")[:k]]
+
+
+@pytest.fixture
+def corpus() -> tuple[list[int], np.ndarray]:
+    rng = np.random.default_rng(3)
+    return list(range(10, 1010, 5)), rng.standard_normal((200, DIMENSIONS))
+
+
+def test_normalize_returns_unit_rows_and_zeroes_bad_ones() -> None:
+    matrix = normalize([[3.0, 4.0], [0.0, 0.0], [np.nan, 1.0]])
+    assert matrix.dtype == np.float32
+    np.testing.assert_allclose(matrix, [[0.6, 0.8], [0.0, 0.0], [0.0, 0.0]])
+
+
+def test_snapshot_round_trips_and_keeps_only_the_newest(tmp_path: Path) -> None:
+    ids, matrix = [1, 2, 3], np.eye(3, DIMENSIONS) * 2
+    old = _write(tmp_path, ids, matrix)
+    new = _write(tmp_path, ids, matrix, table_rows=4)
+    assert latest_snapshot(tmp_path, DIMENSIONS) == new
+    assert latest_snapshot(tmp_path, DIMENSIONS + 1) is None
+    assert new.generation > old.generation
+
+    remove_snapshots(tmp_path, keep=new.generation)
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        f"{new.generation:020d}.{suffix}"
+        for suffix in ("ids.npy", "json", "vectors.npy")
+    ]
+    index = VectorIndex(dimensions=DIMENSIONS, directory=tmp_path)
+    index.load(new)
+    assert len(index) == 3
+    vector = index.vector(2)
+    assert vector is not None
+    np.testing.assert_allclose(vector, np.eye(3, DIMENSIONS)[1])
+
+
+def test_snapshot_writer_rejects_unordered_ids_and_cleans_up(tmp_path: Path) -> None:
+    with (
+        pytest.raises(ValueError, match="ascending"),
+        SnapshotWriter(tmp_path, 3, DIMENSIONS) as writer,
+    ):
+        writer.append([1, 2], np.ones((2, DIMENSIONS)))
+        writer.append([2], np.ones((1, DIMENSIONS)))
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_search_matches_brute_force_across_chunks(
+    tmp_path: Path, corpus: tuple[list[int], np.ndarray]
+) -> None:
+    ids, matrix = corpus
+    index = _index(tmp_path, ids, matrix)
+    queries = np.random.default_rng(4).standard_normal((5, DIMENSIONS))
+    with patch.object(vectors, "CHUNK_ROWS", 16):
+        hits = index.search(queries, 7)
+    for query, row in zip(queries, hits, strict=True):
+        assert [note_id for note_id, _ in row] == _exact(matrix, query[None], ids, 7)
+        scores = [score for _, score in row]
+        assert scores == sorted(scores, reverse=True)
+
+
+def test_search_excludes_the_query_note(
+    tmp_path: Path, corpus: tuple[list[int], np.ndarray]
+) -> None:
+    ids, matrix = corpus
+    index = _index(tmp_path, ids, matrix)
+    vector = index.vector(ids[0])
+    assert vector is not None
+    [with_self] = index.search(vector, 3)
+    [related] = index.search(vector, 3, exclude=[ids[0]])
+    [closest] = index.search(vector, 4)
+    assert with_self[0][0] == ids[0]
+    assert with_self[0][1] == pytest.approx(1.0)
+    assert related == closest[1:]
+
+
+def test_add_and_remove_apply_before_the_next_snapshot(
+    tmp_path: Path, corpus: tuple[list[int], np.ndarray]
+) -> None:
+    ids, matrix = corpus
+    index = _index(tmp_path, ids, matrix)
+    query = matrix[0]
+    # Replace the closest snapshot row, add a new exact match, remove another.
+    index.add([ids[0], 5000], [-query, query * 3])
+    index.remove([ids[1]])
+    [hits] = index.search(query, len(ids) + 5)
+    found = dict(hits)
+    assert hits[0][0] == 5000
+    assert hits[0][1] == pytest.approx(1.0)
+    assert found[ids[0]] == pytest.approx(-1.0)
+    assert ids[1] not in found
+    assert len(hits) == len(index) == len(ids)
+    assert index.vector(ids[1]) is None
+
+    index.remove([5000])
+    assert index.vector(5000) is None
+    assert 5000 not in dict(index.search(query, 5)[0])
+
+
+def test_add_validates_shape_and_ids(tmp_path: Path) -> None:
+    index = VectorIndex(dimensions=DIMENSIONS, directory=tmp_path)
+    with pytest.raises(ValueError, match="dimensions"):
+        index.add([1], np.ones((1, DIMENSIONS + 1)))
+    with pytest.raises(ValueError, match="Duplicate"):
+        index.add([1, 1], np.ones((2, DIMENSIONS)))
+    assert index.search(np.ones(DIMENSIONS), 3) == [[]]
+
+
+def _factory() -> MagicMock:
+    @asynccontextmanager
+    async def factory() -> AsyncIterator[MagicMock]:
+        yield MagicMock()
+
+    return MagicMock(side_effect=factory)
+
+
+async def test_sync_loads_a_current_snapshot_without_rebuilding(
+    tmp_path: Path, corpus: tuple[list[int], np.ndarray]
+) -> None:
+    ids, matrix = corpus
+    meta = _write(tmp_path, ids, matrix)
+    index = VectorIndex(dimensions=DIMENSIONS, directory=tmp_path)
+    index._session_factory = _factory()
+    build = AsyncMock()
+    with (
+        patch.object(vectors, "_table_state", AsyncMock(return_value=(200, None, 0))),
+        patch.object(vectors, "build_snapshot", build),
+    ):
+        await index.sync()
+    build.assert_not_awaited()
+    assert index.ready
+    assert len(index) == meta.rows
+
+
+async def test_refresh_rebuilds_when_enough_changed(
+    tmp_path: Path, corpus: tuple[list[int], np.ndarray]
+) -> None:
+    ids, matrix = corpus
+    old = _write(tmp_path, ids, matrix)
+    index = VectorIndex(dimensions=DIMENSIONS, directory=tmp_path, compact_ratio=0.05)
+    index._session_factory = _factory()
+    index.load(old)
+    index.add([1], np.ones((1, DIMENSIONS)))
+
+    async def build(*_: object) -> SnapshotMeta:
+        return _write(tmp_path, ids[:-1], matrix[:-1])
+
+    rebuild = AsyncMock(side_effect=build)
+    # 5 of 200 rows changed: below the ratio, and the snapshot is fresh.
+    # Then ten deletions reach it.
+    state = AsyncMock(side_effect=[(200, None, 5), (190, None, 0), (190, None, 0)])
+    with (
+        patch.object(vectors, "build_snapshot", rebuild),
+        patch.object(vectors, "_table_state", state),
+    ):
+        await index.refresh()
+        rebuild.assert_not_awaited()
+        await index.refresh()
+        rebuild.assert_awaited_once()
+    assert len(index) == len(ids) - 1
+    assert index.vector(1) is None
+    assert latest_snapshot(tmp_path, DIMENSIONS) != old
+    assert len(list(tmp_path.glob("*.json"))) == 1
+
+
+async def test_any_change_is_due_once_the_snapshot_is_stale(
+    tmp_path: Path, corpus: tuple[list[int], np.ndarray]
+) -> None:
+    ids, matrix = corpus
+    meta = _write(tmp_path, ids, matrix)
+    index = VectorIndex(dimensions=DIMENSIONS, directory=tmp_path, max_staleness=60)
+    index._session_factory = _factory()
+    with patch.object(vectors, "_table_state", AsyncMock(return_value=(200, None, 1))):
+        assert not await index._due(meta)
+        with patch("time.time", return_value=time.time() + 61):
+            assert await index._due(meta)
+
+
+async def test_sync_loads_while_holding_the_directory_lock(
+    tmp_path: Path, corpus: tuple[list[int], np.ndarray]
+) -> None:
+    ids, matrix = corpus
+    _write(tmp_path, ids, matrix)
+    index = VectorIndex(dimensions=DIMENSIONS, directory=tmp_path)
+    index._session_factory = _factory()
+    load = index.load
+    locked: list[bool] = []
+
+    def checked_load(meta: SnapshotMeta) -> None:
+        with open(tmp_path / ".lock", "a") as handle:
+            try:
+                fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                locked.append(True)
+            else:
+                locked.append(False)
+                fcntl.flock(handle, fcntl.LOCK_UN)
+        load(meta)
+
+    with (
+        patch.object(vectors, "_table_state", AsyncMock(return_value=(200, None, 0))),
+        patch.object(index, "load", checked_load),
+    ):
+        await index.sync()
+    assert locked == [True]
+
+
+async def test_build_snapshot_writes_off_the_event_loop(
+    tmp_path: Path, corpus: tuple[list[int], np.ndarray]
+) -> None:
+    ids, matrix = corpus
+    rows = [
+        (note_id, vector.astype("<f4").tobytes())
+        for note_id, vector in zip(ids, matrix, strict=True)
+    ]
+
+    async def partitions() -> AsyncIterator[list[tuple[int, bytes]]]:
+        yield rows[:100]
+        yield rows[100:]
+
+    count = MagicMock(**{"scalar_one.return_value": len(rows)})
+    session = MagicMock(connection=AsyncMock(), execute=AsyncMock(return_value=count))
+    session.stream = AsyncMock(return_value=MagicMock(partitions=partitions))
+
+    @asynccontextmanager
+    async def factory() -> AsyncIterator[MagicMock]:
+        yield session
+
+    threads: list[str] = []
+    append, commit = SnapshotWriter.append, SnapshotWriter.commit
+
+    def record(method: Any) -> Any:
+        def wrapper(self: SnapshotWriter, *args: Any) -> Any:
+            threads.append(threading.current_thread().name)
+            return method(self, *args)
+
+        return wrapper
+
+    with (
+        patch.object(vectors, "_table_state", AsyncMock(return_value=(200, None, 0))),
+        patch.object(SnapshotWriter, "append", record(append)),
+        patch.object(SnapshotWriter, "commit", record(commit)),
+    ):
+        meta = await vectors.build_snapshot(factory, tmp_path, DIMENSIONS)  # type: ignore[arg-type]
+    assert meta.rows == len(ids)
+    assert len(threads) == 3
+    assert threading.current_thread().name not in threads
+    index = VectorIndex(dimensions=DIMENSIONS, directory=tmp_path)
+    index.load(meta)
+    assert [note_id for note_id, _ in index.search(matrix[0], 1)[0]] == [ids[0]]
+
+
+async def test_start_survives_a_failed_load(tmp_path: Path) -> None:
+    index = VectorIndex(dimensions=DIMENSIONS, directory=tmp_path, refresh_interval=60)
+    with patch.object(index, "sync", AsyncMock(side_effect=OSError("down"))):
+        await index.start(_factory())
+    assert not index.ready
+    await index.stop()
+
+
+async def test_sync_requires_start(tmp_path: Path) -> None:
+    index = VectorIndex(dimensions=DIMENSIONS, directory=tmp_path)
+    with pytest.raises(RuntimeError, match="start"):
+        await index.sync()
@@ -0,0 +1,591 @@
+"""In-process vector index for related-note lookups.
+
+Note embeddings are stored in note_embeddings (NOTES_VECTORS_DIMENSIONS
+float32 values each, from whatever model the client uses). They are
+searched here, in memory, by cosine similarity. Each chunk of rows is one
+matrix product for a whole batch of queries, so a search needs no database
+round trip and no Python loop over rows.
+
+The index has three parts:
+    snapshot   a contiguous (rows, dimensions) float32 matrix of unit-length
+               rows, sorted by note id. It is saved as .npy under
+               NOTES_VECTORS_DIRECTORY and memory-mapped read-only. Every
+               worker maps the same file, so they share its pages through
+               the page cache instead of each holding a copy.
+    additions  vectors added since the snapshot, held in memory
+    removed    a mask over the snapshot's rows that were deleted or replaced
+
+add() and remove() apply at once, but only in the process that calls them.
+Every NOTES_VECTORS_REFRESH_INTERVAL_SECONDS, each worker counts the table
+rows written since its snapshot. A rebuild is due when they reach
+NOTES_VECTORS_COMPACT_RATIO of the rows, or when any exist after
+NOTES_VECTORS_MAX_STALENESS_SECONDS. The first worker to take the directory
+lock rebuilds the snapshot from the table, and the others load it. Loading
+drops the additions and removals, which the table already holds. This is
+the index's compaction, and it is also how workers pick up each other's
+changes. At startup, a snapshot that is not due for a rebuild is loaded;
+otherwise a new one is built.
+
+Searches run in a thread, since NumPy releases the GIL in the matrix
+product. Each search uses the state that was current when it started:
+updates swap in a new state instead of modifying one a search may be
+reading.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import fcntl
+import json
+import os
+import time
+from collections.abc import AsyncIterator, Sequence
+from dataclasses import dataclass, replace
+from datetime import datetime
+from pathlib import Path
+from types import TracebackType
+from typing import Any
+
+import numpy as np
+import numpy.typing as npt
+import sqlalchemy as sa
+from sqlalchemy import Row, func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.logging import get_logger
+from app.notes.models import NoteEmbedding
+
+logger = get_logger("app.notes.vectors")
+
+type Matrix = npt.NDArray[np.float32]
+type Ids = npt.NDArray[np.int64]
+type Mask = npt.NDArray[np.bool_]
+type Hit = tuple[int, float]
+
+VECTOR_DTYPE = np.dtype("<f4")
+# Rows per matrix product; bounds the (queries, rows) score buffer.
+CHUNK_ROWS = 65_536
+_BUILD_BATCH = 5_000
+
+
+def normalize(vectors: npt.ArrayLike) -> Matrix:
+    """Copy of ``vectors`` as float32 unit rows; zero and non-finite rows are 0."""
+    matrix: Matrix = np.array(vectors, dtype=np.float32, ndmin=2)
+    matrix[~np.isfinite(matrix).all(axis=1)] = 0
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.divide(matrix, norms, out=matrix, where=norms > 0)
+    return matrix
+
+
+def to_bytes(vector: npt.ArrayLike) -> bytes:
+    """The note_embeddings.vector encoding of ``vector``."""
+    return np.asarray(vector, dtype=VECTOR_DTYPE).tobytes()
+
+
+@dataclass(frozen=True, slots=True)
+class SnapshotMeta:
+    """State of note_embeddings that a snapshot was built from.
+
+    Stored next to the snapshot's .npy files and written last, so it is
+    present only once the snapshot is complete.
+    """
+
+    generation: int
+    dimensions: int
+    rows: int
+    table_rows: int
+    table_updated_at: datetime | None
+    built_at: float
+
+    def to_json(self) -> str:
+        updated_at = self.table_updated_at
+        return json.dumps(
+            {
+                "generation": self.generation,
+                "dimensions": self.dimensions,
+                "rows": self.rows,
+                "table_rows": self.table_rows,
+                "table_updated_at": updated_at.isoformat() if updated_at else None,
+                "built_at": self.built_at,
+            }
+        )
+
+    @classmethod
+    def from_json(cls, text: str) -> SnapshotMeta:
+        data = json.loads(text)
+        updated_at = data["table_updated_at"]
+        return cls(
+            generation=data["generation"],
+            dimensions=data["dimensions"],
+            rows=data["rows"],
+            table_rows=data["table_rows"],
+            table_updated_at=datetime.fromisoformat(updated_at) if updated_at else None,
+            built_at=data["built_at"],
+        )
+
+
+def _paths(directory: Path, generation: int) -> tuple[Path, Path, Path]:
+    stem = directory / f"{generation:020d}"
+    return (
+        stem.with_suffix(".ids.npy"),
+        stem.with_suffix(".vectors.npy"),
+        stem.with_suffix(".json"),
+    )
+
+
+class SnapshotWriter:
+    """Write a snapshot of ``rows`` vectors in id order, a batch at a time.
+
+    The matrix is filled in place through a writable memory map, so a build
+    never holds more than one batch in memory. Files are written under
+    temporary names and renamed on commit(); leaving the ``with`` block
+    without committing removes them.
+    """
+
+    def __init__(self, directory: Path, rows: int, dimensions: int) -> None:
+        directory.mkdir(parents=True, exist_ok=True)
+        self.directory = directory
+        self.dimensions = dimensions
+        self.generation = time.time_ns()
+        self.rows = 0
+        final = _paths(directory, self.generation)
+        self._final = final[:2]
+        self._temp = tuple(path.with_name(f".{path.name}.tmp") for path in final[:2])
+        self._ids: np.memmap[Any, np.dtype[np.int64]] = np.lib.format.open_memmap(
+            self._temp[0], mode="w+", dtype=np.int64, shape=(rows,)
+        )
+        self._vectors: np.memmap[Any, np.dtype[np.float32]] = np.lib.format.open_memmap(
+            self._temp[1], mode="w+", dtype=VECTOR_DTYPE, shape=(rows, dimensions)
+        )
+
+    def append(self, ids: npt.ArrayLike, vectors: npt.ArrayLike) -> None:
+        """Add a batch; ids must be ascending and above every earlier id."""
+        batch_ids = np.asarray(ids, dtype=np.int64)
+        end = self.rows + len(batch_ids)
+        if len(batch_ids) and (
+            np.any(np.diff(batch_ids) <= 0)
+            or (self.rows and batch_ids[0] <= self._ids[self.rows - 1])
+        ):
+            raise ValueError("Snapshot ids must be strictly ascending")
+        self._ids[self.rows : end] = batch_ids
+        self._vectors[self.rows : end] = normalize(
+            np.asarray(vectors, dtype=np.float32).reshape(-1, self.dimensions)
+        )
+        self.rows = end
+
+    def commit(
+        self, table_rows: int, table_updated_at: datetime | None
+    ) -> SnapshotMeta:
+        if self.rows != len(self._ids):
+            raise ValueError(f"Snapshot has {self.rows} of {len(self._ids)} rows")
+        for array in (self._ids, self._vectors):
+            array.flush()
+        for temp, final in zip(self._temp, self._final, strict=True):
+            os.replace(temp, final)
+        meta = SnapshotMeta(
+            generation=self.generation,
+            dimensions=self.dimensions,
+            rows=self.rows,
+            table_rows=table_rows,
+            table_updated_at=table_updated_at,
+            built_at=time.time(),
+        )
+        meta_path = _paths(self.directory, self.generation)[2]
+        temp = meta_path.with_name(f".{meta_path.name}.tmp")
+        temp.write_text(meta.to_json())
+        os.replace(temp, meta_path)
+        return meta
+
+    def __enter__(self) -> SnapshotWriter:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        for temp in self._temp:
+            temp.unlink(missing_ok=True)
+
+
+def latest_snapshot(directory: Path, dimensions: int) -> SnapshotMeta | None:
+    """The newest complete snapshot in ``directory`` with ``dimensions``."""
+    for meta_path in sorted(directory.glob("*.json"), reverse=True):
+        meta = SnapshotMeta.from_json(meta_path.read_text())
+        if meta.dimensions == dimensions:
+            return meta
+    return None
+
+
+def remove_snapshots(directory: Path, keep: int) -> None:
+    """Delete every snapshot but generation ``keep``; call with the lock held.
+
+    Processes still mapping a deleted snapshot keep reading it: its pages
+    are freed once the last map is closed.
+    """
+    for meta_path in directory.glob("*.json"):
+        generation = int(meta_path.name.partition(".")[0])
+        if generation != keep:
+            # Metadata first: a snapshot without it is never loaded.
+            for path in (meta_path, *_paths(directory, generation)[:2]):
+                path.unlink(missing_ok=True)
+    # Left by builds that died; none can be running while the lock is held.
+    for temp in directory.glob(".*.tmp"):
+        temp.unlink(missing_ok=True)
+
+
+@contextlib.asynccontextmanager
+async def _directory_lock(directory: Path) -> AsyncIterator[None]:
+    """Exclusive across processes: one worker builds, the others wait."""
+    directory.mkdir(parents=True, exist_ok=True)
+    with open(directory / ".lock", "a") as handle:
+        await asyncio.to_thread(fcntl.flock, handle, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+async def _table_state(
+    session: AsyncSession, since: datetime | None
+) -> tuple[int, datetime | None, int]:
+    """Rows, newest update, and rows updated after ``since`` in note_embeddings."""
+    updated = sa.true() if since is None else NoteEmbedding.updated_at > since
+    result = await session.execute(
+        select(
+            func.count(),
+            func.max(NoteEmbedding.updated_at),
+            func.count().filter(updated),
+        ).select_from(NoteEmbedding)
+    )
+    rows, updated_at, changed = result.one()
+    return rows, updated_at, changed
+
+
+def _append_rows(writer: SnapshotWriter, rows: Sequence[Row[Any]]) -> None:
+    """Append streamed ``(note_id, vector bytes)`` rows to ``writer``."""
+    ids = [note_id for note_id, _ in rows]
+    vectors = np.frombuffer(b"".join(vector for _, vector in rows), dtype=VECTOR_DTYPE)
+    writer.append(ids, vectors)
+
+
+async def build_snapshot(
+    session_factory: async_sessionmaker[AsyncSession],
+    directory: Path,
+    dimensions: int,
+) -> SnapshotMeta:
+    """Write a snapshot of every stored vector with ``dimensions`` values.
+
+    Reads in one REPEATABLE READ transaction, so the row count, the
+    watermark and the streamed rows all see the same table. Vectors of
+    another length (from an earlier model) are left out.
+
+    ``updated_at`` is stamped before commit, so a write whose transaction
+    spans the start of the build is older than the watermark yet missing
+    from the snapshot. It is picked up by the next rebuild; writes through
+    app.notes.service commit right after stamping, keeping that window
+    to milliseconds.
+    """
+    started = time.monotonic()
+    matching = func.octet_length(NoteEmbedding.vector) == dimensions * 4
+    async with session_factory() as session:
+        await session.connection(
+            execution_options={"isolation_level": "REPEATABLE READ"}
+        )
+        table_rows, updated_at, _ = await _table_state(session, None)
+        rows = (
+            await session.execute(
+                select(func.count()).select_from(NoteEmbedding).where(matching)
+            )
+        ).scalar_one()
+        result = await session.stream(
+            select(NoteEmbedding.note_id, NoteEmbedding.vector)
+            .where(matching)
+            .order_by(NoteEmbedding.note_id)
+            .execution_options(yield_per=_BUILD_BATCH)
+        )
+        # Decoding, normalizing, memmap writes and the final flush run in
+        # threads: at full size they would stall the event loop for seconds.
+        with SnapshotWriter(directory, rows, dimensions) as writer:
+            async for partition in result.partitions():
+                await asyncio.to_thread(_append_rows, writer, partition)
+            meta = await asyncio.to_thread(writer.commit, table_rows, updated_at)
+    logger.info(
+        "notes.vectors.snapshot_built",
+        rows=rows,
+        skipped=table_rows - rows,
+        generation=meta.generation,
+        duration_seconds=round(time.monotonic() - started, 3),
+    )
+    return meta
+
+
+@dataclass(frozen=True, slots=True)
+class _State:
+    """One consistent view of the index; replaced, never modified."""
+
+    meta: SnapshotMeta | None
+    ids: Ids
+    vectors: Matrix
+    removed: Mask | None
+    added_ids: Ids
+    added: Matrix
+
+    @classmethod
+    def empty(cls, dimensions: int) -> _State:
+        ids: Ids = np.empty(0, dtype=np.int64)
+        vectors: Matrix = np.empty((0, dimensions), dtype=np.float32)
+        return cls(None, ids, vectors, None, ids, vectors)
+
+    def snapshot_rows(self, note_ids: Ids) -> Ids:
+        """Snapshot row numbers of those of ``note_ids`` it holds."""
+        rows = np.searchsorted(self.ids, note_ids)
+        rows = rows[rows < len(self.ids)]
+        return rows[np.isin(self.ids[rows], note_ids)]
+
+    def without(self, note_ids: Ids) -> _State:
+        """This state with ``note_ids`` removed from snapshot and additions."""
+        rows = self.snapshot_rows(note_ids)
+        removed = self.removed
+        if len(rows):
+            removed = (
+                np.zeros(len(self.ids), dtype=np.bool_)
+                if removed is None
+                else removed.copy()
+            )
+            removed[rows] = True
+        keep = ~np.isin(self.added_ids, note_ids)
+        return replace(
+            self,
+            removed=removed,
+            added_ids=self.added_ids[keep],
+            added=self.added[keep],
+        )
+
+
+def _top_k(
+    scores: Matrix, ids: Ids, k: int, best: tuple[Matrix, Ids]
+) -> tuple[Matrix, Ids]:
+    """Merge a (queries, rows) block of scores into the running top ``k``."""
+    candidates = np.broadcast_to(ids, scores.shape)
+    if scores.shape[1] > k:
+        top = np.argpartition(scores, -k, axis=1)[:, -k:]
+        scores = np.take_along_axis(scores, top, axis=1)
+        candidates = ids[top]
+    merged_scores = np.concatenate([best[0], scores], axis=1)
+    merged_ids = np.concatenate([best[1], candidates], axis=1)
+    top = np.argpartition(merged_scores, -k, axis=1)[:, -k:]
+    return (
+        np.take_along_axis(merged_scores, top, axis=1),
+        np.take_along_axis(merged_ids, top, axis=1),
+    )
+
+
+class VectorIndex:
+    """Cosine top-k search over note embeddings; see the module docstring."""
+
+    def __init__(
+        self,
+        *,
+        dimensions: int = 384,
+        directory: str | os.PathLike[str] = "vectors",
+        refresh_interval: float = 60.0,
+        compact_ratio: float = 0.05,
+        max_staleness: float = 900.0,
+    ) -> None:
+        self.dimensions = dimensions
+        self.directory = Path(directory)
+        self.refresh_interval = refresh_interval
+        self.compact_ratio = compact_ratio
+        self.max_staleness = max_staleness
+        self._state = _State.empty(dimensions)
+        self._session_factory: async_sessionmaker[AsyncSession] | None = None
+        self._task: asyncio.Task[None] | None = None
+
+    def configure(
+        self,
+        *,
+        dimensions: int,
+        directory: str | os.PathLike[str],
+        refresh_interval: float,
+        compact_ratio: float,
+        max_staleness: float,
+    ) -> None:
+        self.dimensions = dimensions
+        self.directory = Path(directory)
+        self.refresh_interval = refresh_interval
+        self.compact_ratio = compact_ratio
+        self.max_staleness = max_staleness
+        self._state = _State.empty(dimensions)
+
+    @property
+    def ready(self) -> bool:
+        """Whether a snapshot is loaded."""
+        return self._state.meta is not None
+
+    def __len__(self) -> int:
+        state = self._state
+        removed = 0 if state.removed is None else int(state.removed.sum())
+        return len(state.ids) - removed + len(state.added_ids)
+
+    def load(self, meta: SnapshotMeta) -> None:
+        """Map a snapshot, replacing the current one with its changes."""
+        ids_path, vectors_path, _ = _paths(self.directory, meta.generation)
+        ids: Ids = np.load(ids_path, mmap_mode="r")
+        vectors: Matrix = np.load(vectors_path, mmap_mode="r")
+        if vectors.shape != (meta.rows, self.dimensions) or len(ids) != meta.rows:
+            raise ValueError(f"Snapshot {meta.generation} does not match its metadata")
+        empty = _State.empty(self.dimensions)
+        self._state = replace(empty, meta=meta, ids=ids, vectors=vectors)
+        logger.info(
+            "notes.vectors.snapshot_loaded", rows=meta.rows, generation=meta.generation
+        )
+
+    def add(self, note_ids: Sequence[int], vectors: npt.ArrayLike) -> None:
+        """Add or replace the vectors of ``note_ids`` in this process."""
+        ids = np.asarray(note_ids, dtype=np.int64)
+        matrix = normalize(vectors)
+        if matrix.shape != (len(ids), self.dimensions):
+            raise ValueError(
+                f"Expected {len(ids)} vectors of {self.dimensions} dimensions, "
+                f"got shape {matrix.shape}"
+            )
+        if len(np.unique(ids)) != len(ids):
+            raise ValueError("Duplicate note ids")
+        state = self._state.without(ids)
+        self._state = replace(
+            state,
+            added_ids=np.concatenate([state.added_ids, ids]),
+            added=np.concatenate([state.added, matrix]),
+        )
+
+    def remove(self, note_ids: Sequence[int]) -> None:
+        """Drop the vectors of ``note_ids`` in this process."""
+        self._state = self._state.without(np.asarray(note_ids, dtype=np.int64))
+
+    def vector(self, note_id: int) -> Matrix | None:
+        """The stored (unit) vector of ``note_id``, or None."""
+        state = self._state
+        added = np.flatnonzero(state.added_ids == note_id)
+        if len(added):
+            return np.asarray(state.added[added[0]])
+        rows = state.snapshot_rows(np.array([note_id], dtype=np.int64))
+        if not len(rows) or (state.removed is not None and state.removed[rows[0]]):
+            return None
+        return np.asarray(state.vectors[rows[0]])
+
+    def search(
+        self,
+        queries: npt.ArrayLike,
+        k: int,
+        exclude: Sequence[int | None] | None = None,
+    ) -> list[list[Hit]]:
+        """The ``k`` most similar (note id, cosine) pairs for each query row.
+
+        ``exclude`` gives, per query, a note id to leave out of its hits
+        (the note the query came from). CPU-bound: call it in a thread.
+        """
+        state = self._state
+        matrix = normalize(queries)
+        if matrix.shape[1] != self.dimensions:
+            raise ValueError(f"Expected {self.dimensions} dimensions")
+        fetch = k + (exclude is not None)
+        best: tuple[Matrix, Ids] = (
+            np.full((len(matrix), fetch), -np.inf, dtype=np.float32),
+            np.full((len(matrix), fetch), -1, dtype=np.int64),
+        )
+        for start in range(0, len(state.ids), CHUNK_ROWS):
+            end = start + CHUNK_ROWS
+            scores = matrix @ np.asarray(state.vectors[start:end]).T
+            if state.removed is not None:
+                removed = state.removed[start:end]
+                if removed.any():
+                    scores[:, removed] = -np.inf
+            best = _top_k(scores, np.asarray(state.ids[start:end]), fetch, best)
+        if len(state.added_ids):
+            best = _top_k(matrix @ state.added.T, state.added_ids, fetch, best)
+
+        order = np.argsort(-best[0], axis=1, kind="stable")
+        scores = np.take_along_axis(best[0], order, axis=1)
+        ids = np.take_along_axis(best[1], order, axis=1)
+        hits: list[list[Hit]] = []
+        for row in range(len(matrix)):
+            skip = exclude[row] if exclude is not None else None
+            hits.append(
+                [
+                    (int(note_id), float(score))
+                    for note_id, score in zip(ids[row], scores[row], strict=True)
+                    if note_id != -1 and note_id != skip and score != -np.inf
+                ][:k]
+            )
+        return hits
+
+    def _sessions(self) -> async_sessionmaker[AsyncSession]:
+        if self._session_factory is None:
+            raise RuntimeError("VectorIndex.start() has not been called")
+        return self._session_factory
+
+    async def _due(self, meta: SnapshotMeta) -> bool:
+        """Whether enough changed since ``meta`` was built to rebuild it."""
+        async with self._sessions()() as session:
+            rows, _, changed = await _table_state(session, meta.table_updated_at)
+        # Deleted rows are not in ``changed``; the row count shows them.
+        changed += abs(rows - meta.table_rows)
+        if changed == 0:
+            return False
+        stale = time.time() - meta.built_at >= self.max_staleness
+        return stale or changed >= self.compact_ratio * max(meta.table_rows, 1)
+
+    async def sync(self) -> None:
+        """Load the newest snapshot, rebuilding it first if it is due."""
+        async with _directory_lock(self.directory):
+            meta = latest_snapshot(self.directory, self.dimensions)
+            if meta is None or await self._due(meta):
+                meta = await build_snapshot(
+                    self._sessions(), self.directory, self.dimensions
+                )
+                remove_snapshots(self.directory, keep=meta.generation)
+            # Under the lock: another worker's rebuild would remove it.
+            current = self._state.meta
+            if current is None or current.generation != meta.generation:
+                self.load(meta)
+
+    async def refresh(self) -> None:
+        """Sync if this process's snapshot is due for a rebuild."""
+        meta = self._state.meta
+        if meta is None or await self._due(meta):
+            await self.sync()
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self.refresh()
+            except Exception:
+                logger.error("notes.vectors.refresh_failed", exc_info=True)
+
+    async def start(self, session_factory: async_sessionmaker[AsyncSession]) -> None:
+        """Load (or build) the snapshot, then refresh it in the background.
+
+        A failed load is logged, not raised: the app starts without related
+        notes, and the refresh task tries again.
+        """
+        self._session_factory = session_factory
+        try:
+            await self.sync()
+        except Exception:
+            logger.error("notes.vectors.load_failed", exc_info=True)
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="vector-index-refresh")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+
+vector_index = VectorIndex()
@@ -9,10 +9,10 @@ from app.shared.utils import utcnow
 class TimestampMixin:
     @declared_attr
     def created_at(cls) -> Mapped[datetime]:  # noqa: N805
-        return mapped_column(sa.DateTime, default=utcnow, nullable=False)
+        return mapped_column(sa.DateTime(timezone=True), default=utcnow, nullable=False)
 
     @declared_attr
     def updated_at(cls) -> Mapped[datetime]:  # noqa: N805
         return mapped_column(
-            sa.DateTime, default=utcnow, onupdate=utcnow, nullable=False
+            sa.DateTime(timezone=True), default=utcnow, onupdate=utcnow, nullable=False
         )
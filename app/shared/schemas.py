@@ -1,7 +1,7 @@
 import math
-from typing import Generic, TypeVar
+from typing import Generic, Self, TypeVar
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, computed_field
 
 T = TypeVar("T")
 
@@ -20,11 +20,47 @@ class PaginatedResponse(BaseModel, Generic[T]):  # noqa: UP046
     total: int
     page: int
     page_size: int
+    # True when ``total`` is the planner's estimate (app.core.counting).
+    total_estimated: bool = False
 
+    @computed_field  # type: ignore[prop-decorator]
     @property
     def total_pages(self) -> int:
         return math.ceil(self.total / self.page_size) if self.page_size else 0
 
+    @classmethod
+    def trusted(
+        cls,
+        items: list[T],
+        *,
+        total: int,
+        page: int,
+        page_size: int,
+        total_estimated: bool = False,
+    ) -> Self:
+        """Build without validation; ``items`` must already be of type T."""
+        return cls.model_construct(
+            items=items,
+            total=total,
+            page=page,
+            page_size=page_size,
+            total_estimated=total_estimated,
+        )
+
+
+class CursorParams(BaseModel):
+    """Keyset pagination: ``cursor`` is the previous page's ``next_cursor``."""
+
+    cursor: str | None = Field(default=None, description="Opaque page cursor")
+    page_size: int = Field(default=20, ge=1, le=100, description="Items per page")
+
+
+class CursorPage(BaseModel, Generic[T]):  # noqa: UP046
+    items: list[T]
+    page_size: int
+    # None on the last page.
+    next_cursor: str | None = None
+
 
 class ErrorResponse(BaseModel):
     error: str
@@ -0,0 +1,121 @@
+"""Serialization fast paths for response schemas.
+
+When a handler returns a model, FastAPI dumps it to a dict, validates the
+dict again against ``response_model`` and then serializes it. For pages of
+trusted ORM rows these helpers do the work once and return bytes:
+
+    type_adapter(list[NoteRead])        — one cached TypeAdapter per type
+    validate_items(NoteRead, rows)      — ORM rows to models in one
+                                          pydantic-core call
+    json_response(page)                 — model to JSON bytes, skipping
+                                          FastAPI's response re-validation
+    page_response(NoteRead, rows, ...)  — JSON bytes straight from ORM rows
+
+    items = validate_items(NoteRead, rows)
+    return json_response(
+        PaginatedResponse[NoteRead].trusted(items, total=total, page=1, page_size=20)
+    )
+
+page_response() reads each declared field from the row and encodes with
+pydantic-core, so it suits flat read models whose output equals their
+attributes (no validators, custom serializers or nested ORM relations).
+Routes returning a Response should declare ``response_model`` for the docs.
+"""
+
+from __future__ import annotations
+
+import functools
+import math
+from collections.abc import Callable, Iterable
+from operator import attrgetter
+from typing import Any
+
+from fastapi.responses import Response
+from pydantic import BaseModel, TypeAdapter
+from pydantic_core import to_json
+
+
+@functools.cache
+def type_adapter(tp: Any) -> TypeAdapter[Any]:  # noqa: ANN401
+    """Return a TypeAdapter for ``tp``, building its schema only once."""
+    return TypeAdapter(tp)
+
+
+@functools.cache
+def _row_reader(model: type[BaseModel]) -> Callable[[Any], tuple[Any, ...]]:
+    names = tuple(model.model_fields)
+    getter = attrgetter(*names)
+    if len(names) == 1:
+        return lambda row: (getter(row),)
+    return getter
+
+
+@functools.cache
+def _output_keys(model: type[BaseModel]) -> tuple[str, ...]:
+    return tuple(
+        field.serialization_alias or field.alias or name
+        for name, field in model.model_fields.items()
+    )
+
+
+def validate_items[M: BaseModel](model: type[M], rows: Iterable[Any]) -> list[M]:
+    """Build ``model`` instances from ORM rows in a single pydantic-core call.
+
+    Faster than calling ``model_construct`` per row, which runs in Python.
+    """
+    items: list[M] = type_adapter(list[model]).validate_python(  # type: ignore[valid-type]
+        rows, from_attributes=True
+    )
+    return items
+
+
+def json_response(content: BaseModel) -> Response:
+    """Serialize ``content`` once, bypassing FastAPI's response validation."""
+    return Response(content.model_dump_json(), media_type="application/json")
+
+
+def dump_page_json(
+    model: type[BaseModel],
+    rows: Iterable[Any],
+    *,
+    total: int,
+    page: int,
+    page_size: int,
+    total_estimated: bool = False,
+) -> bytes:
+    """Encode a PaginatedResponse[model] body directly from ORM rows."""
+    read = _row_reader(model)
+    keys = _output_keys(model)
+    return to_json(
+        {
+            "items": [dict(zip(keys, read(row), strict=True)) for row in rows],
+            "total": total,
+            "page": page,
+            "page_size": page_size,
+            "total_estimated": total_estimated,
+            "total_pages": math.ceil(total / page_size) if page_size else 0,
+        }
+    )
+
+
+def page_response(
+    model: type[BaseModel],
+    rows: Iterable[Any],
+    *,
+    total: int,
+    page: int,
+    page_size: int,
+    total_estimated: bool = False,
+) -> Response:
+    """Return a page as a pre-encoded JSON response, bypassing response_model."""
+    return Response(
+        dump_page_json(
+            model,
+            rows,
+            total=total,
+            page=page,
+            page_size=page_size,
+            total_estimated=total_estimated,
+        ),
+        media_type="application/json",
+    )
@@ -24,3 +24,11 @@ def test_timestamp_columns_are_datetime_type() -> None:
     mapper = sa.inspect(SampleModel).mapper
     assert isinstance(mapper.columns["created_at"].type, sa.DateTime)
     assert isinstance(mapper.columns["updated_at"].type, sa.DateTime)
+
+
+def test_timestamp_columns_are_timezone_aware() -> None:
+    mapper = sa.inspect(SampleModel).mapper
+    for name in ("created_at", "updated_at"):
+        column_type = mapper.columns[name].type
+        assert isinstance(column_type, sa.DateTime)
+        assert column_type.timezone is True
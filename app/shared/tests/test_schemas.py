@@ -3,7 +3,13 @@ import math
 import pytest
 from pydantic import ValidationError
 
-from app.shared.schemas import ErrorResponse, PaginatedResponse, PaginationParams
+from app.shared.schemas import (
+    CursorPage,
+    CursorParams,
+    ErrorResponse,
+    PaginatedResponse,
+    PaginationParams,
+)
 
 
 def test_pagination_params_defaults() -> None:
@@ -48,6 +54,10 @@ def test_paginated_response_total_pages_rounds_up() -> None:
         page_size=10,
     )
     assert response.total_pages == math.ceil(25 / 10)  # 3
+    # Derived on every access, so copies with a new total stay consistent.
+    copied = response.model_copy(update={"total": 41})
+    assert copied.total_pages == 5
+    assert copied.model_dump()["total_pages"] == 5
 
 
 def test_error_response_structure() -> None:
@@ -64,3 +74,13 @@ def test_error_response_with_detail() -> None:
         detail="Field 'name' is required",
     )
     assert err.detail == "Field 'name' is required"
+
+
+def test_cursor_params_and_page_defaults() -> None:
+    params = CursorParams()
+    assert params.cursor is None
+    assert params.page_size == 20
+    with pytest.raises(ValidationError):
+        CursorParams(page_size=0)
+    page: CursorPage[int] = CursorPage(items=[1, 2], page_size=2)
+    assert page.next_cursor is None
@@ -0,0 +1,87 @@
+import json
+from datetime import UTC, datetime
+from types import SimpleNamespace
+
+from pydantic import BaseModel, ConfigDict, Field
+
+from app.shared.schemas import PaginatedResponse
+from app.shared.serialization import (
+    dump_page_json,
+    json_response,
+    page_response,
+    type_adapter,
+    validate_items,
+)
+
+
+class ItemRead(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    title: str
+    created_at: datetime
+
+
+class AliasedRead(BaseModel):
+    item_id: int = Field(serialization_alias="itemId")
+
+
+def _rows(count: int) -> list[SimpleNamespace]:
+    created = datetime(2026, 1, 2, 3, 4, 5, tzinfo=UTC)
+    return [
+        SimpleNamespace(id=index, title=f"note {index}", created_at=created, extra=1)
+        for index in range(count)
+    ]
+
+
+def test_type_adapter_is_cached_per_type() -> None:
+    assert type_adapter(list[ItemRead]) is type_adapter(list[ItemRead])
+    assert type_adapter(list[ItemRead]) is not type_adapter(list[int])
+
+
+def test_validate_items_reads_declared_fields_from_rows() -> None:
+    items = validate_items(ItemRead, _rows(2))
+    assert [item.id for item in items] == [0, 1]
+    assert not hasattr(items[0], "extra")
+
+
+def test_trusted_page_matches_validated_page() -> None:
+    rows = _rows(3)
+    validated = PaginatedResponse[ItemRead].model_validate(
+        {"items": rows, "total": 3, "page": 1, "page_size": 2}, from_attributes=True
+    )
+    trusted = PaginatedResponse[ItemRead].trusted(
+        validate_items(ItemRead, rows), total=3, page=1, page_size=2
+    )
+    assert trusted.model_dump_json() == validated.model_dump_json()
+
+
+def test_dump_page_json_matches_model_serialization() -> None:
+    rows = _rows(3)
+    expected = PaginatedResponse[ItemRead].model_validate(
+        {"items": rows, "total": 3, "page": 1, "page_size": 2}, from_attributes=True
+    )
+    body = dump_page_json(ItemRead, rows, total=3, page=1, page_size=2)
+    assert json.loads(body) == json.loads(expected.model_dump_json())
+
+
+def test_dump_page_json_uses_serialization_aliases() -> None:
+    body = dump_page_json(
+        AliasedRead, [SimpleNamespace(item_id=7)], total=1, page=1, page_size=10
+    )
+    assert json.loads(body)["items"] == [{"itemId": 7}]
+
+
+def test_page_response_is_json() -> None:
+    response = page_response(ItemRead, _rows(1), total=1, page=1, page_size=10)
+    assert response.media_type == "application/json"
+    assert json.loads(bytes(response.body))["total_pages"] == 1
+
+
+def test_json_response_serializes_trusted_page() -> None:
+    page = PaginatedResponse[ItemRead].trusted(
+        validate_items(ItemRead, _rows(2)), total=2, page=1, page_size=10
+    )
+    body = json.loads(bytes(json_response(page).body))
+    assert [item["id"] for item in body["items"]] == [0, 1]
+    assert body["total_pages"] == 1
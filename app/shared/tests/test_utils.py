@@ -1,6 +1,8 @@
 from datetime import UTC, datetime
 
-from app.shared.utils import format_iso, utcnow
+import pytest
+
+from app.shared.utils import decode_cursor, encode_cursor, format_iso, utcnow
 
 
 def test_utcnow_returns_timezone_aware_datetime() -> None:
@@ -13,3 +15,15 @@ def test_format_iso_returns_iso8601_string() -> None:
     dt = datetime(2024, 1, 15, 10, 30, 0, tzinfo=UTC)
     result = format_iso(dt)
     assert result == "2024-01-15T10:30:00+00:00"
+
+
+def test_cursor_round_trips_keyset_values() -> None:
+    token = encode_cursor([0.1, 42])
+    assert "=" not in token
+    assert decode_cursor(token, 2) == [0.1, 42]
+
+
+def test_decode_cursor_rejects_malformed_tokens() -> None:
+    for token in ("%%%", encode_cursor([1, 2, 3]), "bm90IGpzb24"):
+        with pytest.raises(ValueError, match="Malformed cursor"):
+            decode_cursor(token, 2)
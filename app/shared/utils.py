@@ -1,4 +1,8 @@
+import base64
+import json
+from collections.abc import Sequence
 from datetime import UTC, datetime
+from typing import Any
 
 
 def utcnow() -> datetime:
@@ -7,3 +11,21 @@ def utcnow() -> datetime:
 
 def format_iso(dt: datetime) -> str:
     return dt.isoformat()
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Encode a keyset position (the last row's sort key) as a URL-safe token."""
+    raw = json.dumps(list(values), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(token: str, length: int) -> list[Any]:
+    """Values of an encode_cursor() token; ValueError unless there are ``length``."""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, UnicodeDecodeError) as exc:
+        raise ValueError("Malformed cursor") from exc
+    if not isinstance(values, list) or len(values) != length:
+        raise ValueError("Malformed cursor")
+    return values
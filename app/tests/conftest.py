@@ -2,38 +2,148 @@
 
 These fixtures require a real PostgreSQL database.
 Run integration tests with: pytest -v -m integration
+In parallel (pytest-xdist, in the dev group): pytest -m integration -n auto
+
+Database lifecycle (fast path for a growing suite):
+    1. Migrations run once into a template database named after a hash of
+       alembic/versions, so it is reused across runs until a migration
+       changes.
+    2. Each pytest-xdist worker clones its own database from the template
+       (CREATE DATABASE ... TEMPLATE is a file copy, not a migration run).
+       Without xdist the single process uses ``<db>_test_main``.
+    3. One engine per session; each test runs inside an outer transaction
+       that is rolled back on teardown. The session joins it with
+       ``join_transaction_mode="create_savepoint"``, so code that calls
+       ``commit()`` only releases a savepoint and still rolls back.
+
+Tests using these fixtures share the session event loop:
+
+    pytestmark = [pytest.mark.integration, pytest.mark.asyncio(loop_scope="session")]
 """
 
 from __future__ import annotations
 
+import asyncio
+import hashlib
+import os
 from collections.abc import AsyncGenerator
+from pathlib import Path
 
-import pytest
-from sqlalchemy.ext.asyncio import (
-    AsyncEngine,
-    AsyncSession,
-    async_sessionmaker,
-    create_async_engine,
-)
+import pytest_asyncio
+from alembic.config import Config
+from sqlalchemy import make_url, text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
 
+from alembic import command
 from app.core.config import get_settings
 
+_ROOT = Path(__file__).resolve().parents[2]
+# Serializes template creation across xdist workers (arbitrary constant).
+_TEMPLATE_LOCK_ID = 7_204_311
+
+
+def _migrations_digest() -> str:
+    """Hash of every migration script, used to version the template DB."""
+    digest = hashlib.sha256()
+    for path in sorted((_ROOT / "alembic" / "versions").glob("*.py")):
+        digest.update(path.name.encode())
+        digest.update(path.read_bytes())
+    digest.update((_ROOT / "alembic" / "env.py").read_bytes())
+    return digest.hexdigest()[:12]
+
+
+def _run_migrations(database_url: str) -> None:
+    config = Config(str(_ROOT / "alembic.ini"))
+    config.attributes["database_url"] = database_url
+    command.upgrade(config, "head")
+
+
+async def _database_exists(admin: AsyncEngine, name: str) -> bool:
+    async with admin.connect() as conn:
+        result = await conn.execute(
+            text("SELECT 1 FROM pg_database WHERE datname = :name"), {"name": name}
+        )
+        return result.scalar() is not None
+
+
+async def _ensure_template(admin: AsyncEngine, base_url: str, name: str) -> None:
+    """Create and migrate the template database unless it already exists."""
+    async with admin.connect() as lock_conn:
+        await lock_conn.execute(
+            text("SELECT pg_advisory_lock(:id)"), {"id": _TEMPLATE_LOCK_ID}
+        )
+        try:
+            if await _database_exists(admin, name):
+                return
+            building = f"{name}_building"
+            async with admin.connect() as conn:
+                await conn.execute(text(f'DROP DATABASE IF EXISTS "{building}"'))
+                await conn.execute(text(f'CREATE DATABASE "{building}"'))
+            url = make_url(base_url).set(database=building)
+            # env.py calls asyncio.run(), which cannot nest in this loop.
+            await asyncio.to_thread(
+                _run_migrations, url.render_as_string(hide_password=False)
+            )
+            async with admin.connect() as conn:
+                await conn.execute(
+                    text(f'ALTER DATABASE "{building}" RENAME TO "{name}"')
+                )
+        finally:
+            await lock_conn.execute(
+                text("SELECT pg_advisory_unlock(:id)"), {"id": _TEMPLATE_LOCK_ID}
+            )
+
+
+@pytest_asyncio.fixture(scope="session", loop_scope="session")
+async def test_database_url() -> AsyncGenerator[str, None]:
+    """Clone a per-worker database from the migrated template; drop it after."""
+    base_url = make_url(get_settings().database_url)
+    base_name = base_url.database or "postgres"
+    template = f"{base_name}_tmpl_{_migrations_digest()}"
+    worker = os.environ.get("PYTEST_XDIST_WORKER", "main")
+    database = f"{base_name}_test_{worker}"
+
+    admin = create_async_engine(
+        base_url.set(database="postgres"), isolation_level="AUTOCOMMIT"
+    )
+    try:
+        await _ensure_template(
+            admin, base_url.render_as_string(hide_password=False), template
+        )
+        async with admin.connect() as conn:
+            await conn.execute(text(f'DROP DATABASE IF EXISTS "{database}"'))
+            await conn.execute(
+                text(f'CREATE DATABASE "{database}" TEMPLATE "{template}"')
+            )
+        yield base_url.set(database=database).render_as_string(hide_password=False)
+        async with admin.connect() as conn:
+            await conn.execute(text(f'DROP DATABASE IF EXISTS "{database}"'))
+    finally:
+        await admin.dispose()
+
 
-@pytest.fixture
-async def test_db_engine() -> AsyncGenerator[AsyncEngine, None]:
-    """Create a fresh async engine for the test, dispose on teardown."""
-    settings = get_settings()
-    engine = create_async_engine(settings.database_url, echo=False)
+@pytest_asyncio.fixture(scope="session", loop_scope="session")
+async def test_db_engine(test_database_url: str) -> AsyncGenerator[AsyncEngine, None]:
+    """One async engine for the whole session, disposed on teardown."""
+    engine = create_async_engine(test_database_url, echo=False)
     yield engine
     await engine.dispose()
 
 
-@pytest.fixture
+@pytest_asyncio.fixture(loop_scope="session")
 async def test_db_session(
     test_db_engine: AsyncEngine,
 ) -> AsyncGenerator[AsyncSession, None]:
-    """Create a fresh AsyncSession per test, rolling back on teardown."""
-    session_factory = async_sessionmaker(test_db_engine, expire_on_commit=False)
-    async with session_factory() as session:
-        yield session
-        await session.rollback()
+    """AsyncSession inside a rolled-back transaction; commits use savepoints."""
+    async with test_db_engine.connect() as connection:
+        transaction = await connection.begin()
+        session = AsyncSession(
+            bind=connection,
+            expire_on_commit=False,
+            join_transaction_mode="create_savepoint",
+        )
+        try:
+            yield session
+        finally:
+            await session.close()
+            await transaction.rollback()
@@ -0,0 +1,105 @@
+"""Integration tests for maintained counts (app/core/counting.py)."""
+
+from __future__ import annotations
+
+import pytest
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+from sqlalchemy import Column, Integer, MetaData, String, Table, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.counting import (
+    PageTotal,
+    Total,
+    adjust_count,
+    estimate_count,
+    maintained_count,
+    reset_count,
+)
+from app.core.migrations import create_count_trigger
+
+pytestmark = [pytest.mark.integration, pytest.mark.asyncio(loop_scope="session")]
+
+probes = Table(
+    "count_probes",
+    MetaData(),
+    Column("id", Integer, primary_key=True),
+    Column("vault", String),
+)
+
+
+async def _create_probes(session: AsyncSession, rows: int = 0) -> None:
+    await session.execute(
+        text("CREATE TABLE count_probes (id serial PRIMARY KEY, vault text)")
+    )
+    if rows:
+        await session.execute(
+            text(
+                "INSERT INTO count_probes (vault) "
+                "SELECT 'v' || (n % 2) FROM generate_series(1, :rows) AS n"
+            ),
+            {"rows": rows},
+        )
+
+
+def _install_trigger(session: Session) -> None:
+    context = MigrationContext.configure(session.connection())
+    with Operations.context(context):
+        create_count_trigger("count_probes", ["'probes'", "'probes:vault=' || vault"])
+
+
+async def test_adjust_count_sums_across_calls(test_db_session: AsyncSession) -> None:
+    await adjust_count(test_db_session, "probes", 3)
+    await adjust_count(test_db_session, "probes", -1)
+    assert await maintained_count(test_db_session, "probes") == 2
+    assert await maintained_count(test_db_session, "missing") == 0
+
+
+async def test_trigger_backfills_and_tracks_writes(
+    test_db_session: AsyncSession,
+) -> None:
+    await _create_probes(test_db_session, rows=10)
+    await test_db_session.run_sync(_install_trigger)
+    assert await maintained_count(test_db_session, "probes") == 10
+    assert await maintained_count(test_db_session, "probes:vault=v0") == 5
+
+    await test_db_session.execute(
+        text("INSERT INTO count_probes (vault) VALUES ('v0'), ('v2')")
+    )
+    await test_db_session.execute(
+        text("UPDATE count_probes SET vault = 'v2' WHERE id = 1")
+    )
+    await test_db_session.execute(text("DELETE FROM count_probes WHERE vault = 'v0'"))
+    counts = {
+        scope: await maintained_count(test_db_session, scope)
+        for scope in ("probes", "probes:vault=v0", "probes:vault=v1", "probes:vault=v2")
+    }
+    assert counts == {
+        "probes": 6,
+        "probes:vault=v0": 0,
+        "probes:vault=v1": 4,
+        "probes:vault=v2": 2,
+    }
+    query = select(probes).where(probes.c.vault == "v2")
+    assert await PageTotal(scope="probes:vault=v2").resolve(
+        test_db_session, query
+    ) == Total(2)
+
+
+async def test_reset_count_repairs_drift(test_db_session: AsyncSession) -> None:
+    await _create_probes(test_db_session, rows=4)
+    await adjust_count(test_db_session, "probes", 99)
+    assert await reset_count(test_db_session, "probes", select(probes)) == 4
+    assert await maintained_count(test_db_session, "probes") == 4
+
+
+async def test_estimate_count_uses_planner_statistics(
+    test_db_session: AsyncSession,
+) -> None:
+    await _create_probes(test_db_session, rows=2000)
+    await test_db_session.execute(text("ANALYZE count_probes"))
+    estimate = await estimate_count(
+        test_db_session, select(probes).where(probes.c.vault == "v1")
+    )
+    assert 500 <= estimate <= 1500
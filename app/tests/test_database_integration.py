@@ -13,7 +13,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.database import Base
 
-pytestmark = pytest.mark.integration
+pytestmark = [pytest.mark.integration, pytest.mark.asyncio(loop_scope="session")]
 
 
 async def test_database_connection(test_db_session: AsyncSession) -> None:
@@ -35,3 +35,22 @@ async def test_session_executes_queries(test_db_session: AsyncSession) -> None:
 async def test_base_metadata_is_configured(test_db_session: AsyncSession) -> None:
     """Verify Base.metadata is accessible (needed for schema operations)."""
     assert Base.metadata is not None
+
+
+async def test_committed_changes_are_rolled_back_after_test(
+    test_db_session: AsyncSession,
+) -> None:
+    """Commits inside a test only release a savepoint of the outer transaction."""
+    await test_db_session.execute(text("CREATE TABLE isolation_probe (id int)"))
+    await test_db_session.commit()
+    result = await test_db_session.execute(text("SELECT count(*) FROM isolation_probe"))
+    assert result.scalar_one() == 0
+
+
+async def test_previous_test_commit_is_not_visible(
+    test_db_session: AsyncSession,
+) -> None:
+    result = await test_db_session.execute(
+        text("SELECT to_regclass('isolation_probe')")
+    )
+    assert result.scalar_one() is None
@@ -0,0 +1,102 @@
+"""Integration tests for the idempotency key store (app/core/idempotency.py)."""
+
+from __future__ import annotations
+
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.idempotency import (
+    IdempotencyKey,
+    StoredResponse,
+    claim_key,
+    load_response,
+    purge_expired,
+    release_key,
+    save_response,
+    touch_key,
+)
+from app.shared.utils import utcnow
+
+pytestmark = [pytest.mark.integration, pytest.mark.asyncio(loop_scope="session")]
+
+
+def _stored(request_hash: str = "h") -> StoredResponse:
+    return StoredResponse(
+        request_hash,
+        201,
+        (("content-type", "application/json"), ("location", "/api/notes/1")),
+        b'{"id":1}',
+        utcnow() + timedelta(hours=1),
+    )
+
+
+async def _claim(session: AsyncSession, key: str, **options: float) -> bool:
+    limits = {"ttl": 3600.0, "lock_timeout": 30.0} | options
+    return await claim_key(session, key, "h", **limits)
+
+
+async def test_key_is_claimed_once_and_pending_until_saved(
+    test_db_session: AsyncSession,
+) -> None:
+    assert await _claim(test_db_session, "k1")
+    assert not await _claim(test_db_session, "k1")
+    assert await load_response(test_db_session, "k1") is None
+    await save_response(test_db_session, "k1", _stored())
+    loaded = await load_response(test_db_session, "k1")
+    assert loaded is not None
+    assert (loaded.status_code, loaded.headers, loaded.body) == (
+        201,
+        (("content-type", "application/json"), ("location", "/api/notes/1")),
+        b'{"id":1}',
+    )
+
+
+async def test_released_key_can_be_claimed_again(
+    test_db_session: AsyncSession,
+) -> None:
+    assert await _claim(test_db_session, "k2")
+    await release_key(test_db_session, "k2")
+    assert await _claim(test_db_session, "k2")
+
+
+async def test_abandoned_claim_is_taken_over_after_lock_timeout(
+    test_db_session: AsyncSession,
+) -> None:
+    assert await _claim(test_db_session, "k3")
+    await test_db_session.execute(
+        update(IdempotencyKey)
+        .where(IdempotencyKey.key == "k3")
+        .values(updated_at=utcnow() - timedelta(minutes=5))
+    )
+    assert await _claim(test_db_session, "k3", lock_timeout=60.0)
+
+
+async def test_touched_claim_is_not_taken_over(
+    test_db_session: AsyncSession,
+) -> None:
+    assert await _claim(test_db_session, "k5")
+    await test_db_session.execute(
+        update(IdempotencyKey)
+        .where(IdempotencyKey.key == "k5")
+        .values(updated_at=utcnow() - timedelta(minutes=5))
+    )
+    await touch_key(test_db_session, "k5")
+    assert not await _claim(test_db_session, "k5", lock_timeout=60.0)
+
+
+async def test_expired_keys_are_hidden_reclaimable_and_purged(
+    test_db_session: AsyncSession,
+) -> None:
+    assert await _claim(test_db_session, "k4")
+    await save_response(test_db_session, "k4", _stored())
+    await test_db_session.execute(
+        update(IdempotencyKey)
+        .where(IdempotencyKey.key == "k4")
+        .values(expires_at=utcnow() - timedelta(seconds=1))
+    )
+    assert await load_response(test_db_session, "k4") is None
+    assert await purge_expired(test_db_session) >= 1
+    assert await _claim(test_db_session, "k4")
@@ -0,0 +1,78 @@
+"""Integration tests for vault ingestion (app/notes/ingest.py)."""
+
+from __future__ import annotations
+
+import os
+from collections.abc import AsyncIterator, Callable, Iterable
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.notes import service
+from app.notes.ingest import ingest_vault
+from app.notes.models import Note
+
+pytestmark = [pytest.mark.integration, pytest.mark.asyncio(loop_scope="session")]
+
+
+class InlinePool:
+    async def map(self, fn: Callable[[Any], Any], items: Iterable[Any]) -> list[Any]:
+        return [fn(item) for item in items]
+
+
+async def _ingest(session: AsyncSession, root: Path) -> Any:
+    @asynccontextmanager
+    async def factory() -> AsyncIterator[AsyncSession]:
+        yield session
+
+    return await ingest_vault(
+        "vault",
+        root,
+        pool=InlinePool(),  # type: ignore[arg-type]
+        session_factory=factory,  # type: ignore[arg-type]
+        batch_size=2,
+    )
+
+
+async def _notes(session: AsyncSession) -> dict[str, Note]:
+    result = await session.scalars(select(Note).where(Note.vault == "vault"))
+    return {note.path: note for note in result}
+
+
+async def test_ingest_syncs_creates_updates_and_deletes(
+    test_db_session: AsyncSession, tmp_path: Path
+) -> None:
+    (tmp_path / "a.md").write_text("---\ntags: [alpha]\n---\n# Alpha\nSee [[b]].")
+    (tmp_path / "b.md").write_text("# Beta\nBody about gardens.")
+    (tmp_path / "c.md").write_text("# Gamma")
+    report = await _ingest(test_db_session, tmp_path)
+    assert (report.written, report.deleted) == (3, 0)
+    notes = await _notes(test_db_session)
+    assert notes["a.md"].tags == ["alpha"]
+    assert notes["a.md"].links == ["b"]
+    assert notes["a.md"].frontmatter == {"tags": ["alpha"]}
+
+    # Nothing changed: nothing is read.
+    report = await _ingest(test_db_session, tmp_path)
+    assert (report.unchanged, report.written, report.touched) == (3, 0, 0)
+
+    # Edited, touched and removed files.
+    (tmp_path / "b.md").write_text("# Beta\nBody about orchards.")
+    stat = (tmp_path / "c.md").stat()
+    os.utime(tmp_path / "c.md", ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    (tmp_path / "a.md").unlink()
+    report = await _ingest(test_db_session, tmp_path)
+    assert (report.written, report.touched, report.deleted) == (1, 1, 1)
+
+    test_db_session.expire_all()
+    notes = await _notes(test_db_session)
+    assert sorted(notes) == ["b.md", "c.md"]
+    assert notes["c.md"].mtime_ns == stat.st_mtime_ns + 10**9
+    rows, _ = await service.search_notes(
+        test_db_session, "orchards", page_size=10, vault="vault"
+    )
+    assert [row.path for row in rows] == ["b.md"]
@@ -0,0 +1,66 @@
+"""Integration tests for the Postgres job queue (app/core/jobs.py)."""
+
+from __future__ import annotations
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from app.core.jobs import Job, JobStatus, claim, enqueue, mark_failed
+
+pytestmark = [pytest.mark.integration, pytest.mark.asyncio(loop_scope="session")]
+
+
+async def test_claim_returns_highest_priority_first(
+    test_db_session: AsyncSession,
+) -> None:
+    low = await enqueue(test_db_session, "test.low", priority=0)
+    high = await enqueue(test_db_session, "test.high", priority=10)
+    claimed = await claim(test_db_session, "default", limit=10)
+    assert [job.id for job in claimed][:2] == [high, low]
+    assert all(job.attempts == 1 for job in claimed)
+
+
+async def test_delayed_jobs_are_not_claimed_early(
+    test_db_session: AsyncSession,
+) -> None:
+    await enqueue(test_db_session, "test.later", delay_seconds=3600)
+    assert await claim(test_db_session, "default", limit=10) == []
+
+
+async def test_failed_job_is_requeued_with_error(
+    test_db_session: AsyncSession,
+) -> None:
+    job_id = await enqueue(test_db_session, "test.retry")
+    (job,) = await claim(test_db_session, "default", limit=1)
+    await mark_failed(test_db_session, job, "RuntimeError: boom", retry_in=0.0)
+    row = (
+        await test_db_session.execute(
+            select(Job.status, Job.last_error).where(Job.id == job_id)
+        )
+    ).one()
+    assert row == (JobStatus.QUEUED, "RuntimeError: boom")
+
+
+async def test_concurrent_claims_skip_locked_rows(test_db_engine: AsyncEngine) -> None:
+    async with AsyncSession(test_db_engine) as session:
+        ids = {await enqueue(session, "test.skip") for _ in range(4)}
+        await session.commit()
+    try:
+        async with (
+            AsyncSession(test_db_engine) as first,
+            AsyncSession(test_db_engine) as second,
+        ):
+            claimed_first = await claim(first, "default", limit=2)
+            claimed_second = await claim(second, "default", limit=2)
+            first_ids = {job.id for job in claimed_first}
+            second_ids = {job.id for job in claimed_second}
+            assert len(first_ids) == len(second_ids) == 2
+            assert first_ids.isdisjoint(second_ids)
+            await first.rollback()
+            await second.rollback()
+    finally:
+        async with AsyncSession(test_db_engine) as cleanup:
+            for job_id in ids:
+                await cleanup.delete(await cleanup.get_one(Job, job_id))
+            await cleanup.commit()
@@ -2,9 +2,13 @@
 
 from __future__ import annotations
 
+import asyncio
+from unittest.mock import AsyncMock, patch
+
 from httpx import ASGITransport, AsyncClient
 
-from app.main import app
+from app.core.health import readiness
+from app.main import app, lifespan
 
 
 async def test_root_returns_correct_structure() -> None:
@@ -52,3 +56,20 @@ async def test_cors_headers_present_for_allowed_origin() -> None:
     assert (
         response.headers.get("access-control-allow-origin") == "http://localhost:3000"
     )
+
+
+async def test_lifespan_reports_ready_after_warmup() -> None:
+    with (
+        patch("app.main.warm_up_pool", new=AsyncMock(return_value=True)) as warm_up,
+        patch("app.main.engine") as mock_engine,
+    ):
+        mock_engine.dispose = AsyncMock()
+        try:
+            async with lifespan(app):
+                await asyncio.sleep(0)
+                assert readiness.is_ready
+            assert readiness.blockers == ["draining"]
+        finally:
+            readiness.unblock("draining")
+        warm_up.assert_awaited_once()
+        mock_engine.dispose.assert_awaited_once()
@@ -0,0 +1,34 @@
+"""Integration tests for migration helpers (app/core/migrations.py)."""
+
+from __future__ import annotations
+
+import pytest
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from alembic import op
+from app.core.database import sqlstate
+from app.core.migrations import migration_timeouts
+
+pytestmark = [pytest.mark.integration, pytest.mark.asyncio(loop_scope="session")]
+
+
+async def test_failed_revision_raises_its_own_error_not_25p02(
+    test_db_session: AsyncSession,
+) -> None:
+    @migration_timeouts(lock_timeout_ms=2000, statement_timeout_ms=0)
+    def upgrade() -> None:
+        op.execute(text("SELECT 1 / 0"))
+
+    def run(session: Session) -> None:
+        context = MigrationContext.configure(session.connection())
+        with Operations.context(context):
+            upgrade()
+
+    with pytest.raises(DBAPIError) as raised:
+        await test_db_session.run_sync(run)
+    assert sqlstate(raised.value) == "22012"
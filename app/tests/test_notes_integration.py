@@ -0,0 +1,123 @@
+"""Integration tests for note search (app/notes/service.py)."""
+
+from __future__ import annotations
+
+import io
+
+import pytest
+from sqlalchemy import insert, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.limits import SpooledUpload
+from app.notes import service
+from app.notes.models import Note
+from app.notes.schemas import NoteCreate
+
+pytestmark = [pytest.mark.integration, pytest.mark.asyncio(loop_scope="session")]
+
+
+async def _seed(session: AsyncSession) -> None:
+    await session.execute(
+        insert(Note),
+        [
+            {"vault": "work", "path": "sync.md", "title": "Vault sync design",
+             "body": "How the ingestion pipeline keeps notes in sync."},
+            {"vault": "work", "path": "daily.md", "title": "Daily log",
+             "body": "Fixed the vault sync bug after lunch."},
+            {"vault": "home", "path": "garden.md", "title": "Garden plans",
+             "body": "Tomatoes, basil and a vault of seeds."},
+            {"vault": "work", "path": "meeting.md", "title": "Meeting notes",
+             "body": "Quarterly planning."},
+        ],
+    )  # fmt: skip
+
+
+async def test_create_note_reports_existing_path(test_db_session: AsyncSession) -> None:
+    data = NoteCreate(vault="work", path="a.md", title="A", body="alpha")
+    note = await service.create_note(test_db_session, data)
+    assert note is not None
+    assert await service.create_note(test_db_session, data) is None
+    assert (await service.get_note(test_db_session, note.id)).body == "alpha"
+
+
+async def test_import_note_is_searchable_and_keeps_its_hash(
+    test_db_session: AsyncSession,
+) -> None:
+    raw = b"# Import plan\n#inbox Streamed from a [[Vault sync design]] upload.\n"
+    upload = SpooledUpload(
+        file=io.BytesIO(raw), size=len(raw), sha256="a" * 64, content_type=None
+    )
+    note = await service.import_note(test_db_session, "work", "import.md", upload)
+    assert note is not None
+    assert (note.title, note.tags, note.links) == (
+        "Import plan",
+        ["inbox"],
+        ["Vault sync design"],
+    )
+    assert (note.content_hash, note.size_bytes, note.mtime_ns) == (
+        "a" * 64,
+        len(raw),
+        None,
+    )
+    upload.file.seek(0)
+    assert (
+        await service.import_note(test_db_session, "work", "import.md", upload) is None
+    )
+    rows, _ = await service.search_notes(test_db_session, "streamed", page_size=10)
+    assert [row.path for row in rows] == ["import.md"]
+
+
+async def test_full_text_ranks_title_matches_first_with_headlines(
+    test_db_session: AsyncSession,
+) -> None:
+    await _seed(test_db_session)
+    rows, cursor = await service.search_notes(
+        test_db_session, "vault sync", page_size=10, vault="work"
+    )
+    assert [row.path for row in rows] == ["sync.md", "daily.md"]
+    assert cursor is None
+    assert "<mark>vault</mark> <mark>sync</mark>" in rows[1].headline
+    excluded, _ = await service.search_notes(
+        test_db_session, "vault -ingestion", page_size=10
+    )
+    assert {row.path for row in excluded} == {"daily.md", "garden.md"}
+
+
+async def test_keyset_pages_cover_every_hit_once(test_db_session: AsyncSession) -> None:
+    await _seed(test_db_session)
+    seen: list[str] = []
+    cursor = None
+    while True:
+        rows, cursor = await service.search_notes(
+            test_db_session, "vault", page_size=1, cursor=cursor
+        )
+        seen.extend(row.path for row in rows)
+        if cursor is None:
+            break
+    assert sorted(seen) == ["daily.md", "garden.md", "sync.md"]
+
+
+async def test_fuzzy_title_search_tolerates_typos(
+    test_db_session: AsyncSession,
+) -> None:
+    await _seed(test_db_session)
+    rows, _ = await service.search_titles(test_db_session, "meetng nots", page_size=5)
+    assert rows[0].path == "meeting.md"
+    assert 0 < rows[0].similarity <= 1
+
+
+async def test_searches_are_served_by_their_indexes(
+    test_db_session: AsyncSession,
+) -> None:
+    await _seed(test_db_session)
+    await test_db_session.execute(text("SET LOCAL enable_seqscan = off"))
+    connection = await test_db_session.connection()
+    for index, query in (
+        ("ix_notes_search_vector", service.full_text_query("vault", limit=5)),
+        ("ix_notes_title_trgm", service.title_query("meetng", limit=5)),
+    ):
+        compiled = query.compile(
+            dialect=connection.dialect, compile_kwargs={"literal_binds": True}
+        )
+        plan = await connection.exec_driver_sql(f"EXPLAIN {compiled}")
+        assert index in "\n".join(row[0] for row in plan)
@@ -0,0 +1,63 @@
+"""Integration tests for the note vector index (app/notes/vectors.py)."""
+
+from __future__ import annotations
+
+from collections.abc import AsyncGenerator
+from pathlib import Path
+
+import numpy as np
+import pytest
+import pytest_asyncio
+from sqlalchemy import delete, insert
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+
+from app.notes.models import Note, NoteEmbedding
+from app.notes.vectors import VectorIndex, build_snapshot, to_bytes
+
+pytestmark = [pytest.mark.integration, pytest.mark.asyncio(loop_scope="session")]
+
+DIMENSIONS = 4
+
+
+@pytest_asyncio.fixture(loop_scope="session")
+async def sessions(
+    test_db_engine: AsyncEngine,
+) -> AsyncGenerator[async_sessionmaker[AsyncSession], None]:
+    """Committed rows: the build reads them in its own transaction."""
+    factory = async_sessionmaker(test_db_engine, expire_on_commit=False)
+    yield factory
+    async with factory() as session, session.begin():
+        await session.execute(delete(Note).where(Note.vault == "vectors"))
+
+
+async def test_build_snapshot_reads_matching_vectors_in_id_order(
+    sessions: async_sessionmaker[AsyncSession], tmp_path: Path
+) -> None:
+    async with sessions() as session, session.begin():
+        ids = (
+            await session.scalars(
+                insert(Note).returning(Note.id, sort_by_parameter_order=True),
+                [
+                    {"vault": "vectors", "path": f"{n}.md", "title": str(n)}
+                    for n in range(3)
+                ],
+            )
+        ).all()
+        await session.execute(
+            insert(NoteEmbedding),
+            [
+                {"note_id": ids[0], "vector": to_bytes([1, 0, 0, 0])},
+                {"note_id": ids[1], "vector": to_bytes([1, 1, 0, 0])},
+                # Another model's size: left out of the snapshot.
+                {"note_id": ids[2], "vector": to_bytes([1, 0, 0])},
+            ],
+        )
+
+    meta = await build_snapshot(sessions, tmp_path, DIMENSIONS)
+    assert meta.rows == 2
+    assert meta.table_rows >= 3
+    index = VectorIndex(dimensions=DIMENSIONS, directory=tmp_path)
+    index.load(meta)
+    [hits] = index.search(np.array([1, 0, 0, 0]), 2)
+    assert [note_id for note_id, _ in hits] == [ids[0], ids[1]]
+    assert hits[1][1] == pytest.approx(2**-0.5)
@@ -0,0 +1,93 @@
+"""Benchmark: job queue throughput (jobs/sec) at various worker counts.
+
+For each concurrency level, enqueues ``jobs`` jobs whose handler sleeps for
+``--work-ms`` (simulated I/O), runs a WorkerPool until the queue is empty and
+reports jobs/sec. Claiming uses FOR UPDATE SKIP LOCKED, so throughput should
+scale with concurrency until the claim/ack round trips dominate.
+
+Requires a migrated database at DATABASE_URL; rows are written to the
+``bench`` queue and deleted afterwards.
+
+Run: uv run python -m benchmarks.bench_job_queue [jobs] [--work-ms 5]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+from typing import Any
+
+from sqlalchemy import delete, func, insert, select
+
+from app.core.database import AsyncSessionLocal, engine
+from app.core.jobs import Job, JobStatus, WorkerPool, job_task
+
+QUEUE = "bench"
+CONCURRENCY = (1, 2, 4, 8, 16, 32)
+
+
+async def _enqueue(count: int) -> None:
+    async with AsyncSessionLocal() as session, session.begin():
+        await session.execute(
+            insert(Job),
+            [{"queue": QUEUE, "task": "bench.sleep", "payload": {}}] * count,
+        )
+
+
+async def _remaining() -> int:
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            select(func.count())
+            .select_from(Job)
+            .where(Job.queue == QUEUE, Job.status != JobStatus.SUCCEEDED)
+        )
+        return result.scalar_one()
+
+
+async def _cleanup() -> None:
+    async with AsyncSessionLocal() as session, session.begin():
+        await session.execute(delete(Job).where(Job.queue == QUEUE))
+
+
+async def _run(jobs: int, concurrency: int) -> float:
+    await _cleanup()
+    await _enqueue(jobs)
+    pool = WorkerPool(
+        AsyncSessionLocal,
+        concurrency=concurrency,
+        batch_size=max(concurrency, 10),
+        poll_interval=0.05,
+        queue=QUEUE,
+        metrics_interval=3600,
+    )
+    start = time.perf_counter()
+    await pool.start()
+    while await _remaining():
+        await asyncio.sleep(0.05)
+    elapsed = time.perf_counter() - start
+    await pool.stop()
+    return jobs / elapsed
+
+
+async def main(jobs: int, work_ms: float) -> None:
+    @job_task("bench.sleep")
+    async def sleep(payload: dict[str, Any]) -> None:
+        await asyncio.sleep(work_ms / 1000)
+
+    print(f"{'workers':>8}{'jobs_per_sec':>14}")
+    try:
+        for concurrency in CONCURRENCY:
+            rate = await _run(jobs, concurrency)
+            print(f"{concurrency:>8}{rate:>14.1f}")
+    finally:
+        await _cleanup()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("jobs", type=int, nargs="?", default=2000)
+    parser.add_argument("--work-ms", type=float, default=5.0)
+    args = parser.parse_args()
+    asyncio.run(main(args.jobs, args.work_ms))
@@ -0,0 +1,214 @@
+"""Benchmark: note search latency over a 100k-note corpus.
+
+Loads a synthetic corpus into the ``bench`` vault: words drawn from a
+5,000-word vocabulary with a Zipf distribution, so a few terms match most
+notes and most terms match few. The corpus is then ANALYZEd, and each
+query kind runs ``--repeat`` times with different terms. p50/p95/p99 are
+reported against a p95 target:
+
+    rare       one rare term (a few hundred hits)
+    multi      two mid-frequency terms (AND)
+    phrase     a quoted two-word phrase taken from a note
+    common     one of the ten most frequent terms; tens of thousands of
+               hits, all ranked before the top page is returned
+    page_5     ``multi`` again, fetching the fifth page through cursors
+    title      fuzzy title search with a typo in one word
+
+Targets assume Postgres on local hardware with the indexes from the
+notes migration. The script exits with status 1 if any target is missed.
+
+Requires a migrated database at DATABASE_URL. The corpus is deleted
+afterwards unless ``--keep`` is given; a kept corpus of the right size is
+reused by the next run.
+
+Run: uv run python -m benchmarks.bench_note_search [notes] [--repeat 50] [--keep]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import itertools
+import random
+import statistics
+import sys
+import time
+from collections.abc import Awaitable, Callable
+from functools import partial
+
+from sqlalchemy import delete, func, insert, select, text
+
+from app.core.database import AsyncSessionLocal, engine
+from app.notes import service
+from app.notes.models import Note
+
+VAULT = "bench"
+VOCABULARY = 5_000
+BATCH = 5_000
+PAGE_SIZE = 20
+# p95 targets in milliseconds.
+TARGETS = {
+    "rare": 15.0,
+    "multi": 40.0,
+    "phrase": 40.0,
+    "common": 250.0,
+    "page_5": 60.0,
+    "title": 40.0,
+}
+
+_SYLLABLES = ("ka", "lo", "mi", "ren", "sa", "tu", "vor", "ne", "pli", "dax", "qu")
+
+
+def _vocabulary(rng: random.Random) -> list[str]:
+    words: set[str] = set()
+    while len(words) < VOCABULARY:
+        words.add("".join(rng.choices(_SYLLABLES, k=rng.randint(2, 4))))
+    return sorted(words, key=lambda word: rng.random())
+
+
+class Corpus:
+    """Deterministic note generator; ``words`` is ordered most frequent first."""
+
+    def __init__(self, seed: int = 7) -> None:
+        self.rng = random.Random(seed)
+        self.words = _vocabulary(self.rng)
+        self._weights = list(
+            itertools.accumulate(1 / rank**1.07 for rank in range(1, VOCABULARY + 1))
+        )
+
+    def text(self, words: int) -> str:
+        return " ".join(
+            self.rng.choices(self.words, cum_weights=self._weights, k=words)
+        )
+
+    def note(self, index: int) -> dict[str, str]:
+        return {
+            "vault": VAULT,
+            "path": f"notes/{index:07d}.md",
+            "title": self.text(self.rng.randint(3, 6)).capitalize(),
+            "body": self.text(self.rng.randint(80, 300)),
+        }
+
+
+async def _count() -> int:
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            select(func.count()).select_from(Note).where(Note.vault == VAULT)
+        )
+        return result.scalar_one()
+
+
+async def _cleanup() -> None:
+    async with AsyncSessionLocal() as session, session.begin():
+        await session.execute(delete(Note).where(Note.vault == VAULT))
+
+
+async def _load(corpus: Corpus, notes: int) -> None:
+    start = time.perf_counter()
+    for offset in range(0, notes, BATCH):
+        rows = [corpus.note(i) for i in range(offset, min(offset + BATCH, notes))]
+        async with AsyncSessionLocal() as session, session.begin():
+            await session.execute(insert(Note), rows)
+    async with engine.connect() as conn:
+        await conn.execute(text("ANALYZE notes"))
+        await conn.commit()
+    elapsed = time.perf_counter() - start
+    print(f"loaded {notes} notes in {elapsed:.1f}s ({notes / elapsed:.0f}/s)")
+
+
+async def _search(query: str, pages: int = 1) -> None:
+    async with AsyncSessionLocal() as session:
+        cursor = None
+        for _ in range(pages):
+            _, cursor = await service.search_notes(
+                session, query, page_size=PAGE_SIZE, vault=VAULT, cursor=cursor
+            )
+            if cursor is None:
+                break
+
+
+async def _titles(query: str) -> None:
+    async with AsyncSessionLocal() as session:
+        await service.search_titles(session, query, page_size=PAGE_SIZE, vault=VAULT)
+
+
+def _typo(rng: random.Random, title: str) -> str:
+    words = title.split()
+    word = rng.choice(words)
+    cut = rng.randrange(len(word))
+    return title.replace(word, word[:cut] + word[cut + 1 :], 1)
+
+
+async def _sample_notes(count: int) -> list[tuple[str, str]]:
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            select(Note.title, func.left(Note.body, 200))
+            .where(Note.vault == VAULT)
+            .order_by(func.random())
+            .limit(count)
+        )
+        return [(title, body) for title, body in result.all()]
+
+
+async def _workloads(
+    corpus: Corpus, repeat: int
+) -> dict[str, list[Callable[[], Awaitable[None]]]]:
+    rng = random.Random(11)
+    words = corpus.words
+    mid, rare, common = words[50:500], words[3_000:], words[:10]
+    samples = await _sample_notes(repeat)
+    phrases = ['"' + " ".join(body.split()[:2]) + '"' for _, body in samples]
+    typos = [_typo(rng, title) for title, _ in samples]
+    pairs = [f"{rng.choice(mid)} {rng.choice(mid)}" for _ in range(repeat)]
+    return {
+        "rare": [partial(_search, rng.choice(rare)) for _ in range(repeat)],
+        "multi": [partial(_search, query) for query in pairs],
+        "phrase": [partial(_search, query) for query in phrases],
+        "common": [partial(_search, rng.choice(common)) for _ in range(repeat)],
+        "page_5": [partial(_search, query, pages=5) for query in pairs],
+        "title": [partial(_titles, query) for query in typos],
+    }
+
+
+async def _measure(calls: list[Callable[[], Awaitable[None]]]) -> list[float]:
+    await calls[0]()  # warm the plan cache and the pool
+    timings = []
+    for call in calls:
+        start = time.perf_counter()
+        await call()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+async def main(notes: int, repeat: int, keep: bool) -> bool:
+    corpus = Corpus()
+    passed = True
+    try:
+        if await _count() != notes:
+            await _cleanup()
+            await _load(corpus, notes)
+        print(f"{'query':>8}{'p50_ms':>10}{'p95_ms':>10}{'p99_ms':>10}{'target':>10}")
+        for name, calls in (await _workloads(corpus, repeat)).items():
+            timings = await _measure(calls)
+            cuts = statistics.quantiles(timings, n=100)
+            p50, p95, p99 = cuts[49], cuts[94], cuts[98]
+            ok = p95 <= TARGETS[name]
+            passed &= ok
+            print(
+                f"{name:>8}{p50:>10.2f}{p95:>10.2f}{p99:>10.2f}"
+                f"{TARGETS[name]:>10.0f}  {'ok' if ok else 'MISSED'}"
+            )
+    finally:
+        if not keep:
+            await _cleanup()
+        await engine.dispose()
+    return passed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("notes", type=int, nargs="?", default=100_000)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--keep", action="store_true")
+    args = parser.parse_args()
+    sys.exit(0 if asyncio.run(main(args.notes, args.repeat, args.keep)) else 1)
@@ -0,0 +1,128 @@
+"""Benchmark: returning a page of ORM rows from a FastAPI endpoint.
+
+Three otherwise identical endpoints, served in-process, at 100, 1,000 and
+10,000 items per page:
+    validated — returns PaginatedResponse[T] validated from the rows;
+                FastAPI then dumps, re-validates and serializes it
+                against response_model
+    trusted   — validate_items() once + PaginatedResponse.trusted(), sent
+                with json_response() (no response re-validation)
+    direct    — page_response(): ORM attributes straight to JSON bytes
+
+Rows are transient SQLAlchemy instances, so attribute access goes through
+the ORM instrumentation just like rows loaded from the database.
+
+Run: uv run python -m benchmarks.bench_page_serialization [repeat]
+"""
+
+from __future__ import annotations
+
+import asyncio
+import statistics
+import sys
+import time
+from datetime import UTC, datetime
+
+import sqlalchemy as sa
+from fastapi import FastAPI, Response
+from httpx import ASGITransport, AsyncClient
+from pydantic import BaseModel, ConfigDict
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
+
+from app.shared.schemas import PaginatedResponse
+from app.shared.serialization import json_response, page_response, validate_items
+
+SIZES = (100, 1_000, 10_000)
+STRATEGIES = ("validated", "trusted", "direct")
+
+
+class _BenchBase(DeclarativeBase):
+    """Separate metadata so the benchmark table never reaches migrations."""
+
+
+class Row(_BenchBase):
+    __tablename__ = "bench_rows"
+    id: Mapped[int] = mapped_column(sa.Integer, primary_key=True)
+    title: Mapped[str] = mapped_column(sa.String)
+    body: Mapped[str] = mapped_column(sa.Text)
+    score: Mapped[float] = mapped_column(sa.Float)
+    created_at: Mapped[datetime] = mapped_column(sa.DateTime(timezone=True))
+
+
+class RowRead(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    title: str
+    body: str
+    score: float
+    created_at: datetime
+
+
+def _rows(count: int) -> list[Row]:
+    created = datetime(2026, 1, 1, tzinfo=UTC)
+    return [
+        Row(id=i, title=f"title {i}", body="x" * 200, score=i / 3, created_at=created)
+        for i in range(count)
+    ]
+
+
+def _build_app(pages: dict[int, list[Row]]) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/validated/{size}")
+    async def validated(size: int) -> PaginatedResponse[RowRead]:
+        rows = pages[size]
+        return PaginatedResponse[RowRead].model_validate(
+            {"items": rows, "total": size, "page": 1, "page_size": size},
+            from_attributes=True,
+        )
+
+    @app.get("/trusted/{size}", response_model=PaginatedResponse[RowRead])
+    async def trusted(size: int) -> Response:
+        items = validate_items(RowRead, pages[size])
+        return json_response(
+            PaginatedResponse[RowRead].trusted(
+                items, total=size, page=1, page_size=size
+            )
+        )
+
+    @app.get("/direct/{size}", response_model=PaginatedResponse[RowRead])
+    async def direct(size: int) -> Response:
+        return page_response(RowRead, pages[size], total=size, page=1, page_size=size)
+
+    return app
+
+
+async def _measure(client: AsyncClient, path: str, repeat: int) -> float:
+    await client.get(path)
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = await client.get(path)
+        samples.append(time.perf_counter() - start)
+    response.raise_for_status()
+    return statistics.median(samples)
+
+
+async def main(repeat: int) -> None:
+    app = _build_app({size: _rows(size) for size in SIZES})
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://bench"
+    ) as client:
+        print(f"{'items':>7}{'strategy':>11}{'median_ms':>11}{'speedup':>9}")
+        for size in SIZES:
+            results = {
+                name: await _measure(client, f"/{name}/{size}", repeat)
+                for name in STRATEGIES
+            }
+            baseline = results["validated"]
+            for name, median in results.items():
+                print(
+                    f"{size:>7}{name:>11}{median * 1e3:>11.2f}"
+                    f"{baseline / median:>8.1f}x"
+                )
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 20))
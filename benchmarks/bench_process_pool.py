@@ -0,0 +1,191 @@
+"""Benchmark: light-request latency while CPU-heavy requests run.
+
+Serves an app with a trivial ``/light`` endpoint and a ``/heavy`` endpoint
+that parses a large markdown note (headings, wikilinks, tags, word counts)
+in pure Python, from a real uvicorn worker over TCP. ``heavy_clients``
+clients call /heavy in a loop while one client calls /light ``requests``
+times; light-request latency percentiles are reported for:
+
+    idle      — no heavy traffic (baseline)
+    inline    — /heavy parses on the event loop
+    pool      — /heavy awaits ProcessPool.run() instead
+
+Run: uv run python -m benchmarks.bench_process_pool [requests] [heavy_clients]
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from collections.abc import AsyncGenerator
+from contextlib import asynccontextmanager
+from typing import Any
+
+from fastapi import FastAPI
+from httpx import AsyncClient, TransportError
+
+from app.core.processes import ProcessPool
+
+_HEADING = re.compile(r"^(#{1,6})\s+(.*)$")
+_LINK = re.compile(r"\[\[([^\]|#]+)")
+_TAG = re.compile(r"(?<!\w)#([\w/-]+)")
+
+NOTE = "\n".join(
+    f"## Section {i}\n"
+    f"Some text linking [[Note {i}]] and [[Other|alias]] with #tag/{i % 7}.\n"
+    + "lorem ipsum dolor sit amet "
+    * 20
+    for i in range(2_000)
+)
+
+
+def parse_note(text: str) -> dict[str, int]:
+    headings: list[str] = []
+    links: set[str] = set()
+    tags: set[str] = set()
+    words = 0
+    for line in text.splitlines():
+        if match := _HEADING.match(line):
+            headings.append(match.group(2))
+        links.update(_LINK.findall(line))
+        tags.update(_TAG.findall(line))
+        words += len(line.split())
+    return {
+        "headings": len(headings),
+        "links": len(links),
+        "tags": len(tags),
+        "words": words,
+    }
+
+
+def _build_app(use_pool: bool) -> FastAPI:
+    pool = ProcessPool(max_workers=2)
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
+        if use_pool:
+            pool.start()
+            await pool.run(parse_note, "")  # spawn a child before measuring
+        yield
+        await pool.stop()
+
+    app = FastAPI(lifespan=lifespan)
+
+    @app.get("/light")
+    async def light() -> dict[str, str]:
+        return {"ok": "yes"}
+
+    @app.get("/heavy")
+    async def heavy() -> dict[str, Any]:
+        if not use_pool:
+            return parse_note(NOTE)
+        return await pool.run(parse_note, NOTE)
+
+    return app
+
+
+# Served by the uvicorn subprocess; BENCH_MODE picks the /heavy strategy.
+app = _build_app(os.environ.get("BENCH_MODE") == "pool")
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port: int = sock.getsockname()[1]
+        return port
+
+
+@asynccontextmanager
+async def _server(mode: str) -> AsyncGenerator[AsyncClient, None]:
+    port = _free_port()
+    process = subprocess.Popen(  # noqa: S603
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "benchmarks.bench_process_pool:app",
+            "--port",
+            str(port),
+            "--log-level",
+            "warning",
+        ],
+        env={**os.environ, "BENCH_MODE": mode},
+        # Per-call timing log lines from the server.
+        stdout=subprocess.DEVNULL,
+    )
+    try:
+        async with AsyncClient(base_url=f"http://127.0.0.1:{port}") as client:
+            for _ in range(200):
+                try:
+                    await client.get("/light")
+                    break
+                except TransportError:
+                    await asyncio.sleep(0.05)
+            yield client
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def _percentile(samples: list[float], pct: float) -> float:
+    return statistics.quantiles(samples, n=100, method="inclusive")[int(pct) - 1]
+
+
+async def _scenario(
+    mode: str, requests: int, heavy_clients: int
+) -> tuple[list[float], int]:
+    stop = asyncio.Event()
+    heavy_done = 0
+    async with _server(mode) as client:
+
+        async def hammer() -> None:
+            nonlocal heavy_done
+            while not stop.is_set():
+                (await client.get("/heavy", timeout=60)).raise_for_status()
+                heavy_done += 1
+
+        hammers = [asyncio.create_task(hammer()) for _ in range(heavy_clients)]
+        await asyncio.sleep(0.5)
+        samples = []
+        for _ in range(requests):
+            start = time.perf_counter()
+            (await client.get("/light", timeout=60)).raise_for_status()
+            samples.append(time.perf_counter() - start)
+            await asyncio.sleep(0.01)
+        stop.set()
+        await asyncio.gather(*hammers)
+    return samples, heavy_done
+
+
+async def main(requests: int, heavy_clients: int) -> None:
+    start = time.perf_counter()
+    parse_note(NOTE)
+    print(f"one /heavy parse: {(time.perf_counter() - start) * 1e3:.1f} ms")
+    print(f"cpus: {os.cpu_count()}\n")
+    print(f"{'scenario':>9}{'p50_ms':>9}{'p99_ms':>9}{'max_ms':>9}{'heavy':>7}")
+    for name, mode, clients in (
+        ("idle", "inline", 0),
+        ("inline", "inline", heavy_clients),
+        ("pool", "pool", heavy_clients),
+    ):
+        samples, heavy_done = await _scenario(mode, requests, clients)
+        print(
+            f"{name:>9}{_percentile(samples, 50) * 1e3:>9.2f}"
+            f"{_percentile(samples, 99) * 1e3:>9.2f}"
+            f"{max(samples) * 1e3:>9.2f}{heavy_done:>7}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(
+        main(
+            int(sys.argv[1]) if len(sys.argv) > 1 else 200,
+            int(sys.argv[2]) if len(sys.argv) > 2 else 2,
+        )
+    )
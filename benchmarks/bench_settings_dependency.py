@@ -0,0 +1,80 @@
+"""Benchmark: cost of injecting settings via Depends(get_settings).
+
+Compares three otherwise identical endpoints served in-process:
+    none    — no settings access (baseline)
+    depends — ``settings: Settings = Depends(get_settings)``
+    direct  — ``get_settings()`` called inside the handler
+
+A sync dependency is resolved on every request and run in the threadpool,
+so ``depends - none`` is the per-request overhead the direct call avoids.
+
+Run: uv run python -m benchmarks.bench_settings_dependency [requests]
+"""
+
+from __future__ import annotations
+
+import asyncio
+import statistics
+import sys
+import time
+
+from fastapi import Depends, FastAPI
+from httpx import ASGITransport, AsyncClient
+
+from app.core.config import Settings, get_settings
+
+
+def _build_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/none")
+    async def no_settings() -> dict[str, str]:
+        return {"environment": "none"}
+
+    @app.get("/depends")
+    async def with_depends(
+        settings: Settings = Depends(get_settings),  # noqa: B008
+    ) -> dict[str, str]:
+        return {"environment": settings.environment}
+
+    @app.get("/direct")
+    async def with_direct_call() -> dict[str, str]:
+        return {"environment": get_settings().environment}
+
+    return app
+
+
+async def _measure(client: AsyncClient, path: str, requests: int) -> list[float]:
+    for _ in range(50):
+        await client.get(path)
+    samples: list[float] = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        await client.get(path)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+async def main(requests: int) -> None:
+    get_settings()
+    async with AsyncClient(
+        transport=ASGITransport(app=_build_app()), base_url="http://bench"
+    ) as client:
+        results = {
+            path: await _measure(client, f"/{path}", requests)
+            for path in ("none", "depends", "direct")
+        }
+
+    baseline = statistics.median(results["none"])
+    print(f"{'endpoint':<10}{'median_us':>12}{'p99_us':>12}{'overhead_us':>14}")
+    for path, samples in results.items():
+        median = statistics.median(samples)
+        p99 = statistics.quantiles(samples, n=100)[98]
+        print(
+            f"{path:<10}{median * 1e6:>12.1f}{p99 * 1e6:>12.1f}"
+            f"{(median - baseline) * 1e6:>14.1f}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000))
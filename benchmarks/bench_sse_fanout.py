@@ -0,0 +1,76 @@
+"""Benchmark: SSE hub memory per connection and fan-out events/sec.
+
+Opens ``subscribers`` streams with EventHub.stream(), each drained by its
+own task the way StreamingResponse drains it (no sockets involved), then:
+
+    memory     — tracemalloc growth per open stream (subscriber, generator
+                 and its consumer task)
+    fan-out    — publishes ``events`` events and waits until every stream
+                 has yielded all of them; reports events/sec published and
+                 frames/sec delivered
+
+Run: uv run python -m benchmarks.bench_sse_fanout [subscribers] [events]
+"""
+
+from __future__ import annotations
+
+import asyncio
+import sys
+import time
+import tracemalloc
+from unittest.mock import patch
+
+from app.core import events as events_module
+from app.core.events import EventHub
+
+
+async def main(subscribers: int, events: int) -> None:
+    hub = EventHub(queue_size=events + 1, heartbeat=3600, max_lifetime=3600)
+    received = [0] * subscribers
+    done = asyncio.Event()
+    finished = 0
+
+    async def consume(index: int) -> None:
+        nonlocal finished
+        async for frame in hub.stream(frozenset({"bench"})):
+            if frame.startswith(b"id:"):
+                received[index] += 1
+                if received[index] == events:
+                    finished += 1
+                    if finished == subscribers:
+                        done.set()
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    tasks = [asyncio.create_task(consume(index)) for index in range(subscribers)]
+    while hub.subscriber_count < subscribers:
+        await asyncio.sleep(0.01)
+    per_stream = (tracemalloc.get_traced_memory()[0] - before) / subscribers
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    for index in range(events):
+        hub.publish("bench", {"seq": index, "payload": "x" * 64})
+    publish_seconds = time.perf_counter() - start
+    await done.wait()
+    delivered_seconds = time.perf_counter() - start
+
+    await hub.close()
+    await asyncio.gather(*tasks)
+
+    print(f"subscribers:          {subscribers}")
+    print(f"bytes per stream:     {per_stream:,.0f}")
+    print(f"publish events/sec:   {events / publish_seconds:,.0f}")
+    print(f"delivered frames/sec: {subscribers * events / delivered_seconds:,.0f}")
+    print(f"end-to-end events/sec:{events / delivered_seconds:>10,.1f}")
+
+
+if __name__ == "__main__":
+    # Per-stream open/close log lines would dominate the measurement.
+    with patch.object(events_module, "logger"):
+        asyncio.run(
+            main(
+                int(sys.argv[1]) if len(sys.argv) > 1 else 10_000,
+                int(sys.argv[2]) if len(sys.argv) > 2 else 100,
+            )
+        )
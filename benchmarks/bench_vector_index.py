@@ -0,0 +1,174 @@
+"""Benchmark: related-note search latency and recall at 100k and 1M vectors.
+
+For each size, writes a snapshot of synthetic embeddings, clustered so that
+neighbours mean something, and loads it memory-mapped into a VectorIndex.
+It then removes 1% and adds 1%, so that searches also go through the
+removal mask and the in-memory additions. Measured per size:
+
+    single    one query, k=10
+    batch     a batch of 32 queries, timed per batch
+    recall    recall@10 against an exact float64 brute-force search over
+              the same live vectors
+
+The index is exact, so a recall below 1.0 is a bug in the chunked top-k
+merge, not an approximation. One query reads the whole matrix, so it is
+bound by memory bandwidth (rows x dimensions x 4 bytes per search); a
+batch reads it once for all its queries, which is why the batch targets
+are 4-6x the single ones for 32x the queries. The p95 targets were set
+on one x86 core (AVX-512, OpenBLAS) with about 9 GB/s of memory
+bandwidth, and a snapshot already in the page cache (the first search
+warms it). The script exits with status 1 if any target is missed.
+
+Needs no database. Snapshots go to a temporary directory: 1M vectors of
+384 dimensions take 1.5 GB.
+
+Run: uv run python -m benchmarks.bench_vector_index [sizes ...] [--dimensions 384]
+     [--repeat 50]
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+import numpy as np
+
+from app.notes.vectors import SnapshotWriter, VectorIndex, normalize
+
+K = 10
+BATCH = 32
+CLUSTERS = 1_000
+WRITE_ROWS = 50_000
+RECALL_QUERIES = 200
+EXACT_ROWS = 100_000
+# p95 targets in milliseconds, per size.
+TARGETS = {
+    100_000: {"single": 25.0, "batch": 100.0},
+    1_000_000: {"single": 200.0, "batch": 1_200.0},
+}
+
+
+def _centers(rng: np.random.Generator, dimensions: int) -> np.ndarray:
+    return rng.standard_normal((CLUSTERS, dimensions)).astype(np.float32)
+
+
+def _sample(
+    rng: np.random.Generator, centers: np.ndarray, rows: int, noise: float = 0.6
+) -> np.ndarray:
+    picked = centers[rng.integers(0, len(centers), rows)]
+    return picked + noise * rng.standard_normal(picked.shape).astype(np.float32)
+
+
+def _build(directory: Path, size: int, dimensions: int) -> VectorIndex:
+    rng = np.random.default_rng(size)
+    centers = _centers(rng, dimensions)
+    start = time.perf_counter()
+    with SnapshotWriter(directory, size, dimensions) as writer:
+        for offset in range(0, size, WRITE_ROWS):
+            rows = min(WRITE_ROWS, size - offset)
+            # Every other id, so additions can land between snapshot ids.
+            ids = np.arange(offset, offset + rows, dtype=np.int64) * 2
+            writer.append(ids, _sample(rng, centers, rows))
+        meta = writer.commit(size, None)
+    index = VectorIndex(dimensions=dimensions, directory=directory)
+    index.load(meta)
+    changes = size // 100
+    index.remove(rng.choice(size, changes, replace=False) * 2)
+    added = rng.choice(size, changes, replace=False) * 2 + 1
+    index.add(added.tolist(), _sample(rng, centers, changes))
+    elapsed = time.perf_counter() - start
+    print(f"built {size} vectors in {elapsed:.1f}s ({size / elapsed:.0f}/s)")
+    return index
+
+
+def _exact(index: VectorIndex, queries: np.ndarray) -> np.ndarray:
+    """Ids of the true top ``K`` per query, by float64 brute force."""
+    state = index._state
+    unit = normalize(queries).astype(np.float64)
+    parts = [
+        (np.asarray(state.ids[start : start + EXACT_ROWS]), state.vectors, start)
+        for start in range(0, len(state.ids), EXACT_ROWS)
+    ]
+    scores, ids = [], []
+    for part_ids, matrix, start in [*parts, (state.added_ids, state.added, 0)]:
+        chunk = np.asarray(matrix[start : start + len(part_ids)], dtype=np.float64)
+        part = unit @ chunk.T
+        if matrix is state.vectors and state.removed is not None:
+            part[:, state.removed[start : start + len(part_ids)]] = -np.inf
+        top = np.argsort(-part, axis=1)[:, :K]
+        scores.append(np.take_along_axis(part, top, axis=1))
+        ids.append(part_ids[top])
+    merged = np.concatenate(scores, axis=1)
+    return np.take_along_axis(
+        np.concatenate(ids, axis=1), np.argsort(-merged, axis=1)[:, :K], axis=1
+    )
+
+
+def _recall(index: VectorIndex, queries: np.ndarray) -> float:
+    found = index.search(queries, K)
+    hits = sum(
+        len(set(expected.tolist()) & {note_id for note_id, _ in got})
+        for expected, got in zip(_exact(index, queries), found, strict=True)
+    )
+    return hits / (len(queries) * K)
+
+
+def _measure(call: Callable[[], object], repeat: int) -> tuple[float, float]:
+    call()  # fault the snapshot into the page cache
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        call()
+        timings.append((time.perf_counter() - start) * 1000)
+    cuts = statistics.quantiles(timings, n=100)
+    return cuts[49], cuts[94]
+
+
+def run(size: int, dimensions: int, repeat: int) -> bool:
+    passed = True
+    with tempfile.TemporaryDirectory(prefix="bench-vectors-") as directory:
+        index = _build(Path(directory), size, dimensions)
+        rng = np.random.default_rng(1)
+        centers = _centers(np.random.default_rng(size), dimensions)
+        queries = _sample(rng, centers, max(BATCH, RECALL_QUERIES))
+        targets = TARGETS.get(size, {})
+        for name, call in (
+            ("single", lambda: index.search(queries[:1], K)),
+            ("batch", lambda: index.search(queries[:BATCH], K)),
+        ):
+            p50, p95 = _measure(call, repeat)
+            target = targets.get(name)
+            ok = target is None or p95 <= target
+            passed &= ok
+            print(
+                f"{size:>9}{name:>8}{p50:>10.2f}{p95:>10.2f}"
+                f"{target or float('nan'):>10.0f}  {'ok' if ok else 'MISSED'}"
+            )
+        recall = _recall(index, queries[:RECALL_QUERIES])
+        ok = recall == 1.0
+        passed &= ok
+        print(
+            f"{size:>9}{'recall':>8}{recall:>10.4f}{'':>10}{1:>10}"
+            f"  {'ok' if ok else 'MISSED'}"
+        )
+    return passed
+
+
+def main(sizes: list[int], dimensions: int, repeat: int) -> bool:
+    print(f"{'vectors':>9}{'query':>8}{'p50_ms':>10}{'p95_ms':>10}{'target':>10}")
+    results = [run(size, dimensions, repeat) for size in sizes]
+    return all(results)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("sizes", type=int, nargs="*", default=[100_000, 1_000_000])
+    parser.add_argument("--dimensions", type=int, default=384)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+    sys.exit(0 if main(args.sizes, args.dimensions, args.repeat) else 1)